@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк бэктеста: цикл run_backtest против run_backtest_vectorized
+Файл: scripts/benchmark_backtest.py
+
+Запуск:
+    python scripts/benchmark_backtest.py --bars 20000 100000 1000000
+
+Цикл по барам (iloc) меряется только до --loop-limit баров -
+на миллионе баров он работает десятки минут.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.ml.training import backtest_engine  # noqa: E402
+from src.ml.training.backtester import Backtester, BacktestConfig  # noqa: E402
+
+
+def make_data(bars: int, seed: int, signal_rate: float):
+    """Случайное блуждание цены и сигналы с заданной частотой"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+    index = pd.date_range('2020-01-01', periods=bars, freq='min')
+    market_data = pd.DataFrame({
+        'open': close,
+        'high': close * (1 + rng.uniform(0, 0.01, bars)),
+        'low': close * (1 - rng.uniform(0, 0.01, bars)),
+        'close': close,
+        'volume': 1.0
+    }, index=index)
+    draws = rng.random(bars)
+    signals = np.where(draws < signal_rate / 2, 'buy',
+                       np.where(draws < signal_rate, 'sell', 'hold'))
+    predictions = pd.DataFrame({
+        'signal': signals,
+        'confidence': rng.uniform(0, 1, bars),
+        'take_profit_percent': rng.uniform(0.5, 4, bars),
+        'stop_loss_percent': rng.uniform(0.3, 3, bars),
+        'strategy': 'benchmark'
+    }, index=index)
+    return market_data, pd.DataFrame(index=index), predictions
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк бэктеста на больших историях")
+    parser.add_argument('--bars', type=int, nargs='+', default=[20_000, 100_000, 1_000_000])
+    parser.add_argument('--loop-limit', type=int, default=20_000,
+                        help="Максимум баров для замера цикла run_backtest")
+    parser.add_argument('--signal-rate', type=float, default=0.4,
+                        help="Доля баров с сигналом buy/sell")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    backtester = Backtester(BacktestConfig(enable_shorting=True, max_open_positions=3))
+    print(f"Numba: {'да' if backtest_engine.HAS_NUMBA else 'нет'}")
+    print(f"{'баров':>10} | {'цикл, с':>9} | {'массивы, с':>10} | {'ускорение':>9} | сделок")
+
+    for bars in args.bars:
+        data = make_data(bars, args.seed, args.signal_rate)
+        # Первый прогон компилирует Numba - не учитываем его
+        backtester.run_backtest_vectorized(*(frame.iloc[:1000] for frame in data))
+        result, vectorized = timed(backtester.run_backtest_vectorized, *data)
+
+        if bars <= args.loop_limit:
+            _, loop = timed(backtester.run_backtest, *data)
+            loop_text, speedup = f"{loop:9.2f}", f"{loop / vectorized:8.0f}x"
+        else:
+            loop_text, speedup = f"{'-':>9}", f"{'-':>9}"
+
+        print(f"{bars:>10} | {loop_text} | {vectorized:10.3f} | {speedup} | {result.total_trades}")
+
+
+if __name__ == '__main__':
+    main()
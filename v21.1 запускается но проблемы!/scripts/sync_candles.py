@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Загрузка истории свечей в таблицу candles без запуска бота
+Файл: scripts/sync_candles.py
+
+Запуск перед обучением ML или бэктестом:
+    python scripts/sync_candles.py
+    python scripts/sync_candles.py --symbols BTCUSDT ETHUSDT --timeframes 5m 1h --days 365
+
+Повторный запуск догружает только недостающее: хвост после последней
+загруженной свечи и, если --days глубже загруженного, начало истории.
+Параметры по умолчанию - TRADING_PAIRS, CANDLE_SYNC_TIMEFRAMES и
+CANDLE_HISTORY_DAYS из конфигурации.
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.unified_config import unified_config as config  # noqa: E402
+from src.data.candle_backfill import get_candle_backfill_service  # noqa: E402
+from src.exchange.bybit_client_v5 import BybitClientV5  # noqa: E402
+
+
+async def run(args) -> int:
+    client = BybitClientV5(config.BYBIT_API_KEY, config.BYBIT_API_SECRET, config.BYBIT_TESTNET)
+    service = get_candle_backfill_service(client, history_days=args.days)
+    try:
+        since = datetime.utcnow() - timedelta(days=args.days)
+        result = await service.backfill(args.symbols, args.timeframes, since=since)
+    finally:
+        await client.close_session()
+
+    for (symbol, timeframe), count in sorted(result['series'].items()):
+        print(f"{symbol:>12} {timeframe:>4}: {count} свечей")
+    stats = result['stats']
+    print(f"Записано {result['candles']} свечей за {result['elapsed']:.1f}с, "
+          f"запросов {stats['requests']}, ошибок {stats['failed_requests']}")
+    return 1 if stats['series_failed'] else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Загрузка истории свечей в таблицу candles")
+    parser.add_argument('--symbols', nargs='+', default=[s.strip() for s in config.TRADING_PAIRS if s.strip()])
+    parser.add_argument('--timeframes', nargs='+', default=config.CANDLE_SYNC_TIMEFRAMES)
+    parser.add_argument('--days', type=int, default=config.CANDLE_HISTORY_DAYS,
+                        help="Глубина истории в днях")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == '__main__':
+    main()
@@ -53,6 +53,7 @@ from ..core.models import (
     BotState, StrategyPerformance, Candle, Balance, 
     MLModel, MLPrediction, NewsAnalysis, SocialSignal, TradingLog
 )
+from ..data.candle_buffer import CandleStore, PRICE_FIELDS
 
 # Подавляем TensorFlow warnings
 import os
@@ -317,8 +318,8 @@ class BotManager:
         self.available_balance = 0.0
         self.trades_today = 0
         self.positions = {}
-        self.candle_cache = {}
-        self.price_history = {}
+        self.candle_cache = CandleStore(depth=config.CANDLE_BUFFER_SIZE)
+        self.price_history = CandleStore(depth=config.CANDLE_BUFFER_SIZE, fields=PRICE_FIELDS)
         
         # === СЧЕТЧИКИ И СТАТИСТИКА ===
         self.cycle_count = 0
@@ -367,10 +368,12 @@ class BotManager:
         
         # === КЭШИРОВАНИЕ ДАННЫХ ===
         self.market_data_cache = {}         # Кэш рыночных данных {symbol: data}
-        self.price_history = defaultdict(lambda: deque(maxlen=1000))  # История цен
+        self.price_history = CandleStore(depth=config.CANDLE_BUFFER_SIZE, fields=PRICE_FIELDS)  # История цен
         self.volume_history = defaultdict(lambda: deque(maxlen=1000))  # История объемов
         self.indicator_cache = defaultdict(dict)  # Кэш индикаторов
-        self.candle_cache = defaultdict(lambda: deque(maxlen=500))  # Кэш свечей
+        self.candle_cache = CandleStore(depth=config.CANDLE_BUFFER_SIZE)  # Кэш свечей (NumPy)
+        self.market_stream = None           # Потоковые данные WebSocket
+        self.candle_backfill = None         # Синхронизация истории свечей в БД
         
         # === МАШИННОЕ ОБУЧЕНИЕ ===
         self.ml_models = {}                # ML модели {symbol: model}
@@ -550,8 +553,10 @@ class BotManager:
                     self.market_data_cache[symbol] = market_data
                     return True
             else:
-                # Прямое получение данных
+                # Прямое получение данных (через общий лимитер запросов)
                 if hasattr(self.exchange_client, 'fetch_ticker'):
+                    from ..exchange.rate_limiter import get_rate_limiter
+                    await get_rate_limiter().acquire('/v5/market/tickers')
                     ticker = await self.exchange_client.fetch_ticker(symbol)
                     if ticker:
                         self.market_data_cache[symbol] = {
@@ -955,26 +960,24 @@ class BotManager:
                         
                         # ✅ ИСПРАВЛЕНО: правильная проверка словаря
                         if market_data and isinstance(market_data, dict):
-                            # Сохраняем candles в кэш если они есть
-                            if 'candles' in market_data and market_data['candles']:
-                                if symbol not in self.candle_cache:
-                                    self.candle_cache[symbol] = deque(maxlen=100)
-                                
+                            # Сохраняем candles в кэш если они есть (символы потока
+                            # читаются из его буферов - там свечи уже есть)
+                            if market_data.get('candles') and not self._stream_serves(symbol):
                                 # Добавляем свечи в кэш
                                 for candle in market_data['candles']:
-                                    self.candle_cache[symbol].append(candle)
+                                    timestamp = candle['timestamp']
+                                    if isinstance(timestamp, datetime):
+                                        timestamp = int(timestamp.timestamp() * 1000)
+                                    self.candle_cache.append(symbol, dict(candle, timestamp=timestamp))
                             
                             # Обновляем последнюю цену
                             if 'ticker' in market_data and market_data['ticker']:
                                 last_price = float(market_data['ticker'].get('last', 0))
                                 
-                                if symbol not in self.price_history:
-                                    self.price_history[symbol] = deque(maxlen=100)
-                                
-                                self.price_history[symbol].append({
+                                self.price_history.append(symbol, {
                                     'price': last_price,
                                     'volume': float(market_data['ticker'].get('volume', 0)),
-                                    'timestamp': datetime.utcnow()
+                                    'timestamp': int(time.time() * 1000)
                                 })
                                 
                                 updated_pairs += 1
@@ -996,12 +999,9 @@ class BotManager:
                             continue
                         
                         if candles and len(candles) > 0:
-                            # Сохраняем данные в кэш
-                            if symbol not in self.candle_cache:
-                                self.candle_cache[symbol] = deque(maxlen=100)
-                            
-                            # Добавляем новые свечи
-                            for candle in candles[-10:]:  # Последние 10 свечей
+                            # Добавляем новые свечи в кэш (свечи символов потока - в его буферах)
+                            recent = [] if self._stream_serves(symbol) else candles[-10:]
+                            for candle in recent:  # Последние 10 свечей
                                 candle_data = {
                                     'timestamp': candle[0] if isinstance(candle, list) else candle.get('timestamp'),
                                     'open': float(candle[1] if isinstance(candle, list) else candle.get('open', 0)),
@@ -1010,19 +1010,16 @@ class BotManager:
                                     'close': float(candle[4] if isinstance(candle, list) else candle.get('close', 0)),
                                     'volume': float(candle[5] if isinstance(candle, list) else candle.get('volume', 0))
                                 }
-                                self.candle_cache[symbol].append(candle_data)
+                                self.candle_cache.append(symbol, candle_data)
                             
                             # Обновляем последнюю цену
                             last_candle = candles[-1]
                             last_price = float(last_candle[4] if isinstance(last_candle, list) else last_candle.get('close', 0))
                             
-                            if symbol not in self.price_history:
-                                self.price_history[symbol] = deque(maxlen=100)
-                            
-                            self.price_history[symbol].append({
+                            self.price_history.append(symbol, {
                                 'price': last_price,
                                 'volume': float(last_candle[5] if isinstance(last_candle, list) else last_candle.get('volume', 0)),
-                                'timestamp': datetime.utcnow()
+                                'timestamp': int(time.time() * 1000)
                             })
                             
                             updated_pairs += 1
@@ -1047,20 +1044,26 @@ class BotManager:
         try:
             logger.debug("🔍 Поиск торговых возможностей...")
             
+            # Подготавливаем данные для анализа
+            prepared = {}
             for symbol in self.active_pairs:
+                market_data = self._prepare_market_data(symbol)
+                
+                if not market_data or len(market_data.get('close', [])) < 20:
+                    logger.debug(f"⚠️ Недостаточно данных для анализа {symbol}")
+                    continue
+                prepared[symbol] = market_data
+            
+            # Индикаторы всех пар одним векторным проходом
+            ml_enabled = getattr(self.config, 'ENABLE_MACHINE_LEARNING', False) and hasattr(self, 'ml_system') and self.ml_system
+            batch_indicators = self._calculate_batch_indicators(prepared, with_features=bool(ml_enabled))
+            
+            for symbol, market_data in prepared.items():
                 try:
-                    # Подготавливаем данные для анализа
-                    market_data = self._prepare_market_data(symbol)
-                    
-                    if not market_data or len(market_data.get('close', [])) < 20:
-                        logger.debug(f"⚠️ Недостаточно данных для анализа {symbol}")
-                        continue
-                    
-                    # Преобразуем в DataFrame для ML анализа
-                    df = self._market_data_to_dataframe(market_data)
+                    indicators = batch_indicators.get(symbol, {})
                     
                     # Анализ базовой стратегией
-                    signal = await self._analyze_with_basic_strategy(symbol, market_data)
+                    signal = await self._analyze_with_basic_strategy(symbol, market_data, indicators.get('basic'))
                     
                     if signal and signal.get('signal') != 'HOLD':
                         opportunity = {
@@ -1077,7 +1080,9 @@ class BotManager:
                         logger.info(f"🎯 Найдена возможность: {symbol} {signal['signal']} (уверенность: {signal.get('confidence', 0):.2f})")
                     
                     # ✅ ML АНАЛИЗ (добавлен согласно интеграции)
-                    if getattr(self.config, 'ENABLE_MACHINE_LEARNING', False) and hasattr(self, 'ml_system') and self.ml_system:
+                    if ml_enabled:
+                        # Преобразуем в DataFrame для ML анализа
+                        df = self._market_data_to_dataframe(market_data, indicators.get('features'))
                         ml_signal = await self._analyze_with_ml(symbol, df)
                         if ml_signal:
                             # Проверяем минимальную уверенность
@@ -1209,18 +1214,26 @@ class BotManager:
             logger.error(f"❌ Ошибка ML анализа для {symbol}: {e}")
             return None
     
-    def _market_data_to_dataframe(self, market_data: dict) -> pd.DataFrame:
-        """Преобразование рыночных данных в DataFrame для ML"""
+    def _market_data_to_dataframe(self, market_data: dict, features: Optional[Dict[str, np.ndarray]] = None) -> pd.DataFrame:
+        """
+        Преобразование рыночных данных в DataFrame для ML
+        
+        Args:
+            market_data: Колонки свечей
+            features: Готовые индикаторы из _calculate_batch_indicators
+        """
         try:
             df = pd.DataFrame({
-                'open': market_data['open'],
-                'high': market_data['high'],
-                'low': market_data['low'],
-                'close': market_data['close'],
-                'volume': market_data['volume']
+                name: np.array(market_data[name], dtype=np.float64)
+                for name in ('open', 'high', 'low', 'close', 'volume')
             })
             
             # Добавляем простые индикаторы для ML
+            if features is not None:
+                for name, values in features.items():
+                    df[name] = values
+                return df.fillna(0)
+            
             df['rsi'] = self._calculate_rsi(df['close'], 14)
             df['macd'] = self._calculate_macd(df['close'])
             df['bb_position'] = self._calculate_bb_position(df['close'])
@@ -1267,44 +1280,34 @@ class BotManager:
         except:
             return pd.Series([0.5] * len(prices))
     
-    async def _analyze_with_basic_strategy(self, symbol: str, market_data: dict):
-        """Базовый анализ для поиска сигналов - УЛУЧШЕННАЯ ВЕРСИЯ"""
+    async def _analyze_with_basic_strategy(self, symbol: str, market_data: dict,
+                                           indicators: Optional[Dict[str, float]] = None):
+        """
+        Базовый анализ для поиска сигналов - УЛУЧШЕННАЯ ВЕРСИЯ
+        
+        Args:
+            symbol: Торговая пара
+            market_data: Колонки свечей
+            indicators: Готовые значения из _calculate_batch_indicators
+                        (если не переданы - считаются для одного символа)
+        """
         try:
-            closes = market_data.get('close', [])
-            volumes = market_data.get('volume', [])
-            
-            if len(closes) < 20:
+            if len(market_data.get('close', [])) < 20:
                 return None
             
-            # Преобразуем в numpy arrays для быстрых вычислений
-            import numpy as np
-            closes = np.array(closes[-50:])  # Последние 50 свечей
-            volumes = np.array(volumes[-50:])
-            
-            # Рассчитываем индикаторы
-            sma_20 = np.mean(closes[-20:])
-            sma_10 = np.mean(closes[-10:])
-            sma_5 = np.mean(closes[-5:])
-            current_price = closes[-1]
-            
-            # RSI
-            rsi = self._calculate_rsi_value(closes, 14)
-            
-            # Объем
-            volume_avg = np.mean(volumes[-20:])
-            current_volume = volumes[-1]
-            volume_ratio = current_volume / volume_avg if volume_avg > 0 else 1
-            
-            # MACD
-            exp1 = pd.Series(closes).ewm(span=12).mean()
-            exp2 = pd.Series(closes).ewm(span=26).mean()
-            macd = exp1.iloc[-1] - exp2.iloc[-1]
-            signal_line = (exp1 - exp2).ewm(span=9).mean().iloc[-1]
+            if indicators is None:
+                indicators = self._calculate_batch_indicators({symbol: market_data})[symbol]['basic']
+            
+            sma_20 = indicators['sma_20']
+            sma_10 = indicators['sma_10']
+            sma_5 = indicators['sma_5']
+            current_price = indicators['price']
+            rsi = indicators['rsi']
+            volume_ratio = indicators['volume_ratio']
+            macd = indicators['macd']
+            signal_line = indicators['macd_signal']
             macd_histogram = macd - signal_line
-            
-            # Изменение цены
-            price_change_5 = (current_price - closes[-5]) / closes[-5] * 100
-            price_change_10 = (current_price - closes[-10]) / closes[-10] * 100
+            price_change_5 = indicators['price_change_5']
             
             # === УЛУЧШЕННЫЕ УСЛОВИЯ ДЛЯ СИГНАЛОВ ===
             
@@ -1312,7 +1315,7 @@ class BotManager:
             buy_signals = 0
             
             # 1. Пересечение MA снизу вверх
-            if sma_5 > sma_10 and closes[-2] < np.mean(closes[-11:-1]):
+            if sma_5 > sma_10 and indicators['prev_close'] < indicators['prev_sma_10']:
                 buy_signals += 1
                 
             # 2. RSI выходит из перепроданности
@@ -1335,7 +1338,7 @@ class BotManager:
             sell_signals = 0
             
             # 1. Пересечение MA сверху вниз
-            if sma_5 < sma_10 and closes[-2] > np.mean(closes[-11:-1]):
+            if sma_5 < sma_10 and indicators['prev_close'] > indicators['prev_sma_10']:
                 sell_signals += 1
                 
             # 2. RSI в перекупленности
@@ -1384,6 +1387,92 @@ class BotManager:
             logger.error(f"❌ Ошибка базового анализа {symbol}: {e}")
             return None
     
+    def _calculate_batch_indicators(self, prepared: Dict[str, dict],
+                                    with_features: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Индикаторы всех символов одним векторным проходом
+        
+        Колонки свечей складываются в матрицы (символы × бары), и каждый
+        индикатор считается одной операцией над матрицей.
+        
+        Returns:
+            {symbol: {'basic': значения для _analyze_with_basic_strategy,
+                      'features': колонки для ML (если with_features)}}
+        """
+        from ..indicators.batch import stack_market_data, compute_batch, latest, unstack_row
+        
+        if not prepared:
+            return {}
+        
+        # Базовая стратегия смотрит на последние 50 свечей
+        symbols, matrices = stack_market_data(prepared, fields=('close', 'volume'), length=50)
+        closes = matrices['close']
+        results = compute_batch(matrices, {
+            'sma_5': ('sma', {'timeperiod': 5}),
+            'sma_10': ('sma', {'timeperiod': 10}),
+            'sma_20': ('sma', {'timeperiod': 20}),
+            'rsi': ('rsi', {'timeperiod': 14}),
+            'macd': ('macd', {'fastperiod': 12, 'slowperiod': 26, 'signalperiod': 9}),
+        })
+        current = latest(results)
+        previous = latest(results, offset=2)
+        
+        volume_avg = np.nanmean(matrices['volume'][:, -20:], axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            volume_ratio = np.where(volume_avg > 0, matrices['volume'][:, -1] / volume_avg, 1.0)
+            price_change_5 = (closes[:, -1] - closes[:, -5]) / closes[:, -5] * 100
+        
+        # Без потерь за период RSI равен 100
+        rsi = np.where(np.isnan(current['rsi']), 100.0, current['rsi'])
+        macd_line, macd_signal, _ = current['macd']
+        
+        batch = {}
+        for row, symbol in enumerate(symbols):
+            batch[symbol] = {'basic': {
+                'price': float(closes[row, -1]),
+                'sma_5': float(current['sma_5'][row]),
+                'sma_10': float(current['sma_10'][row]),
+                'sma_20': float(current['sma_20'][row]),
+                'prev_close': float(closes[row, -2]),
+                'prev_sma_10': float(previous['sma_10'][row]),
+                'rsi': float(rsi[row]),
+                'volume_ratio': float(volume_ratio[row]),
+                'macd': float(macd_line[row]),
+                'macd_signal': float(macd_signal[row]),
+                'price_change_5': float(price_change_5[row]),
+            }}
+        
+        if with_features:
+            # Признаки ML по всей истории (как _market_data_to_dataframe)
+            symbols, matrices = stack_market_data(prepared, fields=('close', 'volume'))
+            closes = matrices['close']
+            volumes = matrices['volume']
+            results = compute_batch(matrices, {
+                'rsi': ('rsi', {'timeperiod': 14}),
+                'macd': ('macd', {}),
+                'bbands': ('bbands', {'timeperiod': 20, 'nbdevup': 2, 'nbdevdn': 2}),
+                'volume_sma': ('sma', {'timeperiod': 20}, ('volume',)),
+                'roc': ('roc', {'timeperiod': 1}),
+            })
+            upper, _, lower = results['bbands']
+            with np.errstate(divide='ignore', invalid='ignore'):
+                bb_position = (closes - lower) / (upper - lower)
+                features = {
+                    'rsi': np.where(np.isnan(results['rsi']), 50.0, results['rsi']),
+                    'macd': np.where(np.isnan(results['macd'][0]), 0.0, results['macd'][0]),
+                    'bb_position': np.where(np.isnan(bb_position), 0.5, bb_position),
+                    'volume_ratio': volumes / results['volume_sma'],
+                    'price_change': results['roc'],
+                }
+            
+            for row, symbol in enumerate(symbols):
+                length = len(prepared[symbol]['close'])
+                batch[symbol]['features'] = {
+                    name: unstack_row(values, row, length) for name, values in features.items()
+                }
+        
+        return batch
+    
     def _calculate_rsi_value(self, prices: np.ndarray, period: int = 14) -> float:
         """Расчет RSI из numpy array"""
         try:
@@ -1836,22 +1925,23 @@ class BotManager:
         except Exception as e:
             logger.error(f"❌ Ошибка отправки уведомления: {e}")
     
+    def _stream_serves(self, symbol: str) -> bool:
+        """Свечи символа ведет MarketDataStream (буферы потока, не candle_cache)"""
+        return bool(self.market_stream and symbol in self.market_stream.symbols)
+    
     def _prepare_market_data(self, symbol: str):
         """Подготовка рыночных данных для анализа"""
         try:
-            if symbol not in self.candle_cache or len(self.candle_cache[symbol]) < 20:
-                return None
+            # Колонки NumPy {'timestamp', 'open', 'high', 'low', 'close', 'volume'}
+            if self._stream_serves(symbol):
+                arrays = self.market_stream.get_arrays(symbol)
+            else:
+                arrays = self.candle_cache.arrays(symbol)
             
-            candles = list(self.candle_cache[symbol])
+            if arrays is None or len(arrays['close']) < 20:
+                return None
             
-            return {
-                'open': [c['open'] for c in candles],
-                'high': [c['high'] for c in candles],
-                'low': [c['low'] for c in candles],
-                'close': [c['close'] for c in candles],
-                'volume': [c['volume'] for c in candles],
-                'timestamp': [c['timestamp'] for c in candles]
-            }
+            return arrays
             
         except Exception as e:
             logger.error(f"❌ Ошибка подготовки данных {symbol}: {e}")
@@ -2704,6 +2794,8 @@ class BotManager:
                 ('database', self._init_database, [], True),
                 ('config_validator', self._init_config_validator, ['database'], True),
                 ('data_collector', self._init_data_collector, [], True),
+                ('market_stream', self._init_market_stream, ['exchange_client', 'data_collector'], False),
+                ('candle_backfill', self._init_candle_backfill, ['exchange_client', 'database'], False),
                 ('market_analyzer', self._init_market_analyzer, ['data_collector'], True),
                 ('risk_manager', self._init_risk_manager, ['market_analyzer'], True),
                 ('portfolio_manager', self._init_portfolio_manager, ['risk_manager'], True),
@@ -3387,6 +3479,12 @@ class BotManager:
                 self._data_export_loop(), name="data_export"
             )
             
+            # Цикл синхронизации истории свечей (первый проход - сразу при старте)
+            if self.candle_backfill:
+                self.tasks['candle_sync'] = asyncio.create_task(
+                    self._candle_sync_loop(), name="candle_sync"
+                )
+            
             # Циклы машинного обучения (если включено)
             if config.ENABLE_MACHINE_LEARNING:
                 self.tasks['ml_training'] = asyncio.create_task(
@@ -3425,7 +3523,6 @@ class BotManager:
         logger.info("🚀 Запуск главного торгового цикла...")
         
         cycle_count = 0
-        last_request_times = defaultdict(lambda: 0)  # Для отслеживания времени запросов
         
         while self.is_running and self.status == BotStatus.RUNNING:
             try:
@@ -3434,31 +3531,14 @@ class BotManager:
                 
                 logger.info(f"🔄 Цикл #{cycle_count} - анализ {len(self.active_pairs)} пар")
                 
-                # === КОНТРОЛЬ RATE LIMITS ===
-                # Bybit limits: 120 requests per minute для spot
-                max_requests_per_minute = 100  # Оставляем запас
-                min_request_interval = 60.0 / max_requests_per_minute  # ~0.6 секунды между запросами
-                
-                # 1. Управление позициями (с задержкой между запросами)
+                # 1. Управление позициями
                 await self._manage_all_positions()
-                await asyncio.sleep(min_request_interval)
                 
-                # 2. Обновляем рыночные данные с контролем частоты
-                for i, symbol in enumerate(self.active_pairs):
-                    # Проверяем время последнего запроса для символа
-                    last_time = last_request_times[symbol]
-                    current_time = time.time()
-                    
-                    if current_time - last_time < min_request_interval:
-                        await asyncio.sleep(min_request_interval - (current_time - last_time))
-                    
-                    # Обновляем данные
-                    await self._update_market_data_for_symbol(symbol)
-                    last_request_times[symbol] = time.time()
-                    
-                    # Пауза между символами
-                    if i < len(self.active_pairs) - 1:
-                        await asyncio.sleep(min_request_interval)
+                # 2. Обновляем рыночные данные параллельно в рамках лимитов API
+                # (символы с актуальными WebSocket данными не опрашиваются)
+                if self.market_stream:
+                    await self.market_stream.sync_symbols(self.active_pairs)
+                await self._update_market_data_concurrently(list(self.active_pairs))
                 
                 # 3. Ищем торговые возможности
                 opportunities = await self._find_all_trading_opportunities()
@@ -3495,21 +3575,68 @@ class BotManager:
         
         logger.info("✅ Главный торговый цикл остановлен")
         
+    async def _update_market_data_concurrently(self, symbols: List[str]) -> int:
+        """
+        Параллельное обновление рыночных данных всех символов
+        
+        Количество одновременных обновлений ограничено бюджетом
+        общего token-bucket лимитера, поэтому время цикла зависит
+        от запаса по лимитам, а не от числа пар.
+        
+        Returns:
+            Количество успешно обновленных символов
+        """
+        if not symbols:
+            return 0
+        
+        from ..exchange.rate_limiter import get_rate_limiter, SYMBOL_REFRESH_WEIGHT
+        
+        limiter = get_rate_limiter()
+        concurrency = min(
+            len(symbols),
+            limiter.max_concurrency('/v5/market/kline', SYMBOL_REFRESH_WEIGHT)
+        )
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def refresh(symbol: str):
+            async with semaphore:
+                return await self._update_market_data_for_symbol(symbol)
+        
+        refresh_start = time.time()
+        results = await asyncio.gather(
+            *(refresh(symbol) for symbol in symbols),
+            return_exceptions=True
+        )
+        
+        updated = sum(1 for result in results if result and not isinstance(result, Exception))
+        logger.debug(
+            f"📊 Рыночные данные обновлены: {updated}/{len(symbols)} "
+            f"за {time.time() - refresh_start:.2f}с (параллельно: {concurrency})"
+        )
+        return updated
+    
     async def _update_market_data_for_symbol(self, symbol: str):
         """Обновление данных для одного символа с контролем ошибок"""
         try:
+            # Свечи уже поступают через WebSocket
+            if self.market_stream and self.market_stream.has_live_data(symbol):
+                return True
+            
             if hasattr(self, 'data_collector') and self.data_collector:
                 # Используем data_collector
                 market_data = await self.data_collector.collect_market_data(symbol)
                 return market_data
             else:
-                # Fallback на прямое получение
+                # Пропуски в буферах потока догружает сам MarketDataStream
+                if self.market_stream and symbol in self.market_stream.symbols:
+                    return False
+                
+                # Fallback на прямое получение (через общий лимитер запросов)
                 if hasattr(self.exchange_client, 'fetch_ohlcv'):
+                    from ..exchange.rate_limiter import get_rate_limiter
+                    await get_rate_limiter().acquire('/v5/market/kline')
                     candles = await self.exchange_client.fetch_ohlcv(symbol, '5m', limit=50)
                     if candles and len(candles) > 0:
-                        if symbol not in self.candle_cache:
-                            self.candle_cache[symbol] = deque(maxlen=100)
-                        
                         for candle in candles[-10:]:
                             candle_data = {
                                 'timestamp': candle[0],
@@ -3519,7 +3646,7 @@ class BotManager:
                                 'close': float(candle[4]),
                                 'volume': float(candle[5])
                             }
-                            self.candle_cache[symbol].append(candle_data)
+                            self.candle_cache.append(symbol, candle_data)
                         
                         return True
             
@@ -4507,10 +4634,19 @@ class BotManager:
                     logger.warning(f"⚠️ Таймаут остановки задачи: {task_name}")
                 except asyncio.CancelledError:
                     pass
+        
+        # Воркеры очереди исполнения: ожидающие сигналы отклоняются
+        execution_engine = getattr(self, 'execution_engine', None)
+        if execution_engine and hasattr(execution_engine, 'stop_workers'):
+            try:
+                await execution_engine.stop_workers()
+            except Exception as e:
+                logger.warning(f"⚠️ Ошибка остановки очереди исполнения: {e}")
     
     async def _close_websocket_connections(self):
         """Закрытие WebSocket соединений"""
-        pass
+        if self.market_stream:
+            await self.market_stream.stop()
     
     async def _stop_ml_system(self):
         """Остановка ML системы"""
@@ -4591,6 +4727,27 @@ class BotManager:
             except asyncio.CancelledError:
                 break
     
+    async def _candle_sync_loop(self):
+        """
+        Цикл синхронизации таблицы candles
+        
+        При старте догружает только свечи после high-water mark каждой серии
+        (новые пары - на CANDLE_HISTORY_DAYS назад), дальше - хвост раз в
+        CANDLE_SYNC_INTERVAL_MINUTES.
+        """
+        while not self._stop_event.is_set():
+            try:
+                await self._pause_event.wait()
+                symbols = list(self.active_pairs)
+                if symbols:
+                    await self.candle_backfill.sync_tail(symbols, config.CANDLE_SYNC_TIMEFRAMES)
+                await asyncio.sleep(config.CANDLE_SYNC_INTERVAL_MINUTES * 60)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"❌ Ошибка синхронизации свечей: {e}")
+                await asyncio.sleep(60)
+    
     async def _pair_discovery_loop(self):
         """Цикл обновления торговых пар"""
         while not self._stop_event.is_set():
@@ -4768,6 +4925,71 @@ class BotManager:
             logger.error(f"❌ Ошибка инициализации DataCollector: {e}")
             return False
     
+    async def _init_market_stream(self) -> bool:
+        """Инициализация потоковых рыночных данных (WebSocket)"""
+        try:
+            if not getattr(config, 'ENABLE_WEBSOCKET', True):
+                logger.info("ℹ️ WebSocket отключен, рыночные данные через REST")
+                return False
+            
+            from ..data.market_stream import MarketDataStream
+            
+            stream = MarketDataStream(
+                self.exchange_client,
+                timeframe=getattr(config, 'MARKET_STREAM_TIMEFRAME', '5m'),
+                max_candles=getattr(config, 'CANDLE_BUFFER_SIZE', 500)
+            )
+            
+            if not await stream.start():
+                return False
+            
+            self.market_stream = stream
+            # Свечи символов потока читаются через stream.get_arrays() под его
+            # блокировкой; candle_cache остается кэшем менеджера для остальных
+            
+            if self.data_collector:
+                self.data_collector.set_market_stream(stream)
+            
+            # Цены позиций из того же потока tickers.* (REST только для остальных)
+            try:
+                from ..exchange.position_manager import get_position_manager
+                get_position_manager().attach_ticker_stream(stream.integration.ws_handler)
+            except Exception as e:
+                logger.warning(f"⚠️ PositionManager не подключен к потоку тикеров: {e}")
+            
+            if self.active_pairs:
+                await stream.sync_symbols(self.active_pairs)
+            
+            logger.info("✅ Потоковые рыночные данные запущены")
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Ошибка инициализации потоковых данных: {e}")
+            return False
+    
+    async def _init_candle_backfill(self) -> bool:
+        """Инициализация синхронизации истории свечей (таблица candles)"""
+        try:
+            if not config.ENABLE_CANDLE_SYNC:
+                logger.info("ℹ️ Синхронизация свечей отключена (ENABLE_CANDLE_SYNC)")
+                return False
+            
+            from ..data.candle_backfill import get_candle_backfill_service
+            
+            # Сама загрузка идет в цикле candle_sync и не задерживает старт
+            self.candle_backfill = get_candle_backfill_service(
+                self.exchange_client,
+                history_days=config.CANDLE_HISTORY_DAYS
+            )
+            
+            logger.info(f"✅ Синхронизация свечей: {', '.join(config.CANDLE_SYNC_TIMEFRAMES)}, "
+                        f"каждые {config.CANDLE_SYNC_INTERVAL_MINUTES} мин")
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Ошибка инициализации синхронизации свечей: {e}")
+            return False
+    
     async def _init_market_analyzer(self) -> bool:
         """Инициализация анализатора рынка"""
         try:
@@ -425,6 +425,22 @@ class Candle(Base):
         Index('idx_candle_symbol_time', 'symbol', 'interval', 'open_time', unique=True),
     )
 
+
+class CandleSyncState(Base):
+    """Границы загруженной истории свечей по каждой серии (symbol, interval)"""
+    __tablename__ = 'candle_sync_state'
+
+    id = Column(Integer, primary_key=True)
+    symbol = Column(String(20), nullable=False)
+    interval = Column(String(10), nullable=False)
+    first_open_time = Column(DateTime)  # Самая ранняя загруженная свеча
+    last_open_time = Column(DateTime)   # Последняя закрытая загруженная свеча (high-water mark)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index('idx_candle_sync_series', 'symbol', 'interval', unique=True),
+    )
+
 class MarketData(Base):
     """
     Модель для хранения последних рыночных данных (тикеров) для торговых пар.
@@ -635,6 +651,7 @@ __all__ = [
     'Trade',
     'Order',
     'Candle',
+    'CandleSyncState',
     'MarketData'
     'MarketCondition',
     'StrategyPerformance',
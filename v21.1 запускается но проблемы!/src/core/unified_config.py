@@ -151,10 +151,16 @@ class UnifiedConfig:
     ML_MODEL_RETRAIN_INTERVAL = int(os.getenv('ML_MODEL_RETRAIN_INTERVAL', '86400'))  # 24 часа
     ENABLE_AUTO_STRATEGY_SELECTION = os.getenv('ENABLE_AUTO_STRATEGY_SELECTION', 'true').lower() == 'true'
     
+    # Обучение моделей в отдельных процессах (не блокирует торговый цикл)
+    ML_TRAINING_WORKERS = int(os.getenv('ML_TRAINING_WORKERS', '2'))
+    ML_TRAINING_MEMORY_LIMIT_MB = int(os.getenv('ML_TRAINING_MEMORY_LIMIT_MB', '0'))  # RLIMIT_DATA процесса, 0 - без лимита
+    
     # ✅ ДОБАВЛЕНЫ ПАРАМЕТРЫ ДЛЯ BOTMANAGER
     MAX_CONCURRENT_ANALYSIS = int(os.getenv('MAX_CONCURRENT_ANALYSIS', '4'))
     ENSEMBLE_MIN_STRATEGIES = int(os.getenv('ENSEMBLE_MIN_STRATEGIES', '2'))
     STRATEGY_PERFORMANCE_WINDOW_DAYS = int(os.getenv('STRATEGY_PERFORMANCE_WINDOW_DAYS', '30'))
+    STRATEGY_EVALUATION_TIMEOUT = float(os.getenv('STRATEGY_EVALUATION_TIMEOUT', '5'))  # секунды на стратегию
+    STRATEGY_EVALUATION_WORKERS = int(os.getenv('STRATEGY_EVALUATION_WORKERS', '4'))  # потоки для analyze()
     MARKET_DATA_UPDATE_INTERVAL = int(os.getenv('MARKET_DATA_UPDATE_INTERVAL', '60'))  # секунды
     REAL_TIME_DATA_ENABLED = os.getenv('REAL_TIME_DATA_ENABLED', 'true').lower() == 'true'
     
@@ -199,6 +205,16 @@ class UnifiedConfig:
     ENABLE_EMAIL_NOTIFICATIONS = os.getenv('ENABLE_EMAIL_NOTIFICATIONS', 'false').lower() == 'true'
     ENABLE_WEBSOCKET = os.getenv('ENABLE_WEBSOCKET', 'true').lower() == 'true'
     
+    # Потоковые рыночные данные (WebSocket свечи вместо REST опроса)
+    MARKET_STREAM_TIMEFRAME = os.getenv('MARKET_STREAM_TIMEFRAME', '5m')
+    CANDLE_BUFFER_SIZE = int(os.getenv('CANDLE_BUFFER_SIZE', '500'))
+    
+    # История свечей в таблице candles (обучение ML и бэктесты)
+    ENABLE_CANDLE_SYNC = os.getenv('ENABLE_CANDLE_SYNC', 'true').lower() == 'true'
+    CANDLE_SYNC_TIMEFRAMES = os.getenv('CANDLE_SYNC_TIMEFRAMES', '5m,15m,1h,4h').split(',')
+    CANDLE_SYNC_INTERVAL_MINUTES = int(os.getenv('CANDLE_SYNC_INTERVAL_MINUTES', '15'))
+    CANDLE_HISTORY_DAYS = int(os.getenv('CANDLE_HISTORY_DAYS', '90'))
+    
     # Валидация и бэкапы
     VALIDATE_CONFIG_ON_STARTUP = os.getenv('VALIDATE_CONFIG_ON_STARTUP', 'true').lower() == 'true'
     CONFIG_BACKUP_ON_CHANGE = os.getenv('CONFIG_BACKUP_ON_CHANGE', 'true').lower() == 'true'
@@ -0,0 +1,494 @@
+"""
+Массовая загрузка истории свечей в таблицу candles
+Файл: src/data/candle_backfill.py
+
+Для N символов × M таймфреймов листает REST kline Bybit окнами по
+1000 свечей, параллельно в пределах бюджета ограничителя запросов,
+и пишет свечи пакетным upsert'ом (INSERT ... ON CONFLICT / ON DUPLICATE
+KEY UPDATE по уникальному индексу symbol, interval, open_time).
+
+Границы загруженной истории каждой серии хранятся в candle_sync_state
+и обновляются в той же транзакции, что и свечи. После перезапуска
+sync_tail догружает только хвост после high-water mark, а backfill -
+еще и недостающее начало истории.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func, insert, select, update
+
+from ..core.database import engine as default_engine
+from ..core.models import Candle, CandleSyncState
+from ..exchange.rate_limiter import get_rate_limiter
+from . import candle_loader as candle_loader_module
+from .market_stream import BYBIT_INTERVALS, INTERVAL_MS, MAX_KLINE_LIMIT
+
+logger = logging.getLogger(__name__)
+
+KLINE_ENDPOINT = '/v5/market/kline'
+
+# Глубина истории для серий, которых еще нет в базе
+DEFAULT_HISTORY_DAYS = 90
+
+# Ключей в одном IN (...) при проверке существующих строк
+ROWS_PER_QUERY = 1000
+
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume', 'close_time')
+
+
+def _to_ms(value: datetime) -> int:
+    """Наивный UTC datetime -> мс"""
+    return int((value - datetime(1970, 1, 1)).total_seconds() * 1000)
+
+
+def _ms_to_datetimes(values: np.ndarray) -> List[datetime]:
+    """Массив мс -> список наивных UTC datetime (как в колонках DateTime)"""
+    return np.asarray(values, dtype='int64').astype('datetime64[ms]').tolist()
+
+
+# =================================================================
+# UPSERT
+# =================================================================
+
+def _upsert_statement(dialect: str, table, key_columns: Sequence[str], update_columns: Sequence[str]):
+    """INSERT с обновлением при конфликте для MySQL/PostgreSQL/SQLite (None - не поддерживается)"""
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(table)
+        return stmt.on_duplicate_key_update({column: stmt.inserted[column] for column in update_columns})
+
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={column: stmt.excluded[column] for column in update_columns}
+        )
+
+    return None
+
+
+def _upsert_rows(conn, table, rows: List[dict], key_columns: Sequence[str],
+                 update_columns: Sequence[str]):
+    """
+    Пакетный upsert строк в открытой транзакции
+
+    Оператор компилируется один раз и выполняется как executemany - драйвер
+    (или insertmanyvalues SQLAlchemy) сам собирает многострочные пакеты.
+    """
+    stmt = _upsert_statement(conn.dialect.name, table, key_columns, update_columns)
+    if stmt is not None:
+        conn.execute(stmt, rows)
+        return
+
+    # Прочие СУБД: существующие ключи обновляем, новые вставляем одним executemany
+    key_filter = [table.c[column] == rows[0][column] for column in key_columns[:-1]]
+    last_key = table.c[key_columns[-1]]
+
+    for offset in range(0, len(rows), ROWS_PER_QUERY):
+        chunk = rows[offset:offset + ROWS_PER_QUERY]
+        existing = set(conn.execute(
+            select(last_key).where(*key_filter, last_key.in_([row[key_columns[-1]] for row in chunk]))
+        ).scalars())
+
+        new_rows = [row for row in chunk if row[key_columns[-1]] not in existing]
+        if new_rows:
+            conn.execute(insert(table), new_rows)
+        for row in chunk:
+            if row[key_columns[-1]] in existing:
+                conn.execute(
+                    update(table)
+                    .where(*[table.c[column] == row[column] for column in key_columns])
+                    .values({column: row[column] for column in update_columns})
+                )
+
+
+# =================================================================
+# СЕРВИС
+# =================================================================
+
+class CandleBackfillService:
+    """
+    Загрузка и инкрементальная синхронизация истории свечей
+    """
+
+    def __init__(self, exchange_client, bind=None, category: str = 'linear',
+                 batch_size: int = 20_000, max_concurrency: Optional[int] = None,
+                 history_days: int = DEFAULT_HISTORY_DAYS, max_retries: int = 3):
+        """
+        Args:
+            exchange_client: BybitClientV5 или клиент с bybit_integration.v5_client
+            bind: Engine SQLAlchemy (по умолчанию основной engine бота)
+            category: Категория инструментов Bybit
+            batch_size: Сколько свечей копить перед записью в базу
+            max_concurrency: Одновременных запросов kline (по умолчанию из бюджета ограничителя, не больше 16)
+            history_days: Глубина истории для новых серий
+            max_retries: Повторов запроса окна при ошибке
+        """
+        self.exchange = exchange_client
+        self.engine = bind if bind is not None else default_engine
+        self.category = category
+        self.batch_size = batch_size
+        self.history_days = history_days
+        self.max_retries = max_retries
+
+        if max_concurrency is None:
+            max_concurrency = min(16, get_rate_limiter().max_concurrency(KLINE_ENDPOINT))
+        self.max_concurrency = max(1, max_concurrency)
+        self._semaphore = None
+
+        self._tables_ready = False
+
+        self.stats = {
+            'requests': 0,
+            'failed_requests': 0,
+            'candles_fetched': 0,
+            'candles_written': 0,
+            'batches': 0,
+            'series_synced': 0,
+            'series_failed': 0,
+            'elapsed': 0.0
+        }
+
+    @property
+    def client(self):
+        """Клиент Bybit V5 с методом get_klines"""
+        integration = getattr(self.exchange, 'bybit_integration', None)
+        if integration is not None and getattr(integration, 'v5_client', None) is not None:
+            return integration.v5_client
+        return self.exchange
+
+    # =================================================================
+    # ПУБЛИЧНЫЕ МЕТОДЫ
+    # =================================================================
+
+    async def backfill(self, symbols: Sequence[str], timeframes: Sequence[str],
+                       since: Optional[datetime] = None,
+                       until: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Загрузка истории [since, until) для всех серий
+
+        Уже загруженный диапазон серии (по candle_sync_state) не запрашивается
+        повторно: догружается только начало до first_open_time и хвост после
+        last_open_time.
+
+        Args:
+            symbols: Символы ('BTCUSDT', ...)
+            timeframes: Таймфреймы ('5m', '1h', ...)
+            since: Начало истории (UTC, по умолчанию history_days назад)
+            until: Конец (UTC, по умолчанию сейчас; незакрытая свеча не пишется)
+
+        Returns:
+            {(symbol, timeframe): загружено свечей} и общая статистика
+        """
+        return await self._run(symbols, timeframes, since, until, fill_head=True)
+
+    async def sync_tail(self, symbols: Sequence[str], timeframes: Sequence[str]) -> Dict[str, Any]:
+        """Догрузка свечей после high-water mark каждой серии"""
+        return await self._run(symbols, timeframes, None, None, fill_head=False)
+
+    def get_sync_state(self) -> Dict[Tuple[str, str], Dict[str, Optional[datetime]]]:
+        """Границы загруженной истории {(symbol, timeframe): {'first', 'last'}}"""
+        self._ensure_tables()
+        table = CandleSyncState.__table__
+        with self.engine.connect() as conn:
+            rows = conn.execute(select(
+                table.c.symbol, table.c.interval, table.c.first_open_time, table.c.last_open_time
+            )).all()
+        return {(row[0], row[1]): {'first': row[2], 'last': row[3]} for row in rows}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика сервиса"""
+        return {'max_concurrency': self.max_concurrency, 'batch_size': self.batch_size, **self.stats}
+
+    # =================================================================
+    # ПЛАНИРОВАНИЕ
+    # =================================================================
+
+    async def _run(self, symbols, timeframes, since, until, fill_head: bool) -> Dict[str, Any]:
+        started = time.perf_counter()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        series = []
+        for timeframe in timeframes:
+            if timeframe not in BYBIT_INTERVALS:
+                logger.warning(f"⚠️ Неизвестный таймфрейм {timeframe}, пропускаем")
+                continue
+            series.extend((symbol, timeframe) for symbol in symbols)
+
+        state = await asyncio.to_thread(self._load_state, series)
+
+        now_ms = int(time.time() * 1000)
+        until_ms = min(_to_ms(until), now_ms) if until else now_ms
+        since_ms = _to_ms(since) if since else now_ms - self.history_days * 86_400_000
+
+        results = await asyncio.gather(*[
+            self._sync_series(symbol, timeframe, state.get((symbol, timeframe)),
+                              since_ms, until_ms, fill_head)
+            for symbol, timeframe in series
+        ], return_exceptions=True)
+
+        loaded = {}
+        for (symbol, timeframe), result in zip(series, results):
+            if isinstance(result, Exception):
+                logger.error(f"❌ Ошибка загрузки свечей {symbol} {timeframe}: {result}")
+                self.stats['series_failed'] += 1
+                loaded[(symbol, timeframe)] = 0
+            else:
+                loaded[(symbol, timeframe)] = result
+
+        elapsed = time.perf_counter() - started
+        self.stats['elapsed'] += elapsed
+        total = sum(loaded.values())
+        logger.info(f"📊 Свечи: {len(series)} серий, записано {total} за {elapsed:.1f}с")
+
+        return {'series': loaded, 'candles': total, 'elapsed': elapsed, 'stats': self.get_stats()}
+
+    def _series_ranges(self, state: Optional[Dict[str, Optional[datetime]]], interval_ms: int,
+                       since_ms: int, until_ms: int, fill_head: bool) -> List[Tuple[int, int]]:
+        """Диапазоны времени открытия [start, end), которых нет в базе"""
+        # Последняя закрытая свеча открылась не позже until - interval
+        end_ms = (until_ms // interval_ms) * interval_ms
+        since_ms = (since_ms // interval_ms) * interval_ms
+
+        if not state or state.get('last') is None:
+            return [(since_ms, end_ms)] if since_ms < end_ms else []
+
+        first_ms = _to_ms(state['first'])
+        last_ms = _to_ms(state['last'])
+
+        ranges = []
+        if fill_head and since_ms < first_ms:
+            ranges.append((since_ms, min(first_ms, end_ms)))
+        if last_ms + interval_ms < end_ms:
+            ranges.append((last_ms + interval_ms, end_ms))
+        return [(start, end) for start, end in ranges if start < end]
+
+    # =================================================================
+    # ЗАГРУЗКА СЕРИИ
+    # =================================================================
+
+    async def _sync_series(self, symbol: str, timeframe: str,
+                           state: Optional[Dict[str, Optional[datetime]]],
+                           since_ms: int, until_ms: int, fill_head: bool) -> int:
+        """Загрузка недостающих диапазонов одной серии"""
+        interval = BYBIT_INTERVALS[timeframe]
+        interval_ms = INTERVAL_MS[interval]
+        window_ms = MAX_KLINE_LIMIT * interval_ms
+
+        written = 0
+        for range_start, range_end in self._series_ranges(state, interval_ms, since_ms, until_ms, fill_head):
+            windows = [(start, min(start + window_ms, range_end))
+                       for start in range(range_start, range_end, window_ms)]
+            # Начало истории грузим от first_open_time назад: записанная часть
+            # всегда примыкает к уже загруженной и в серии не остается дыр
+            is_head = bool(state and state.get('first') is not None and range_end <= _to_ms(state['first']))
+            if is_head:
+                windows.reverse()
+
+            pending = []
+            pending_count = 0
+            # Окна запрашиваются группами; запись идет по порядку, поэтому
+            # границы серии сдвигаются только по непрерывно загруженной истории
+            for offset in range(0, len(windows), self.max_concurrency):
+                group = windows[offset:offset + self.max_concurrency]
+                pages = await asyncio.gather(*[
+                    self._fetch_window(symbol, interval, start, end) for start, end in group
+                ])
+
+                for page in pages:
+                    if page is None:
+                        # Окно не загрузилось - сохраняем то, что есть до него
+                        written += await self._flush(symbol, timeframe, interval_ms, pending, is_head)
+                        logger.error(f"❌ {symbol} {timeframe}: окно не загружено после "
+                                     f"{self.max_retries} попыток, записано {written} свечей")
+                        self.stats['series_failed'] += 1
+                        return written
+                    if len(page):
+                        pending.append(page)
+                        pending_count += len(page)
+
+                if pending_count >= self.batch_size:
+                    written += await self._flush(symbol, timeframe, interval_ms, pending, is_head)
+                    pending = []
+                    pending_count = 0
+
+            written += await self._flush(symbol, timeframe, interval_ms, pending, is_head)
+
+        self.stats['series_synced'] += 1
+        if written:
+            logger.debug(f"📥 {symbol} {timeframe}: записано {written} свечей")
+        return written
+
+    async def _fetch_window(self, symbol: str, interval: str, start_ms: int, end_ms: int) -> Optional[np.ndarray]:
+        """
+        Свечи с временем открытия в [start_ms, end_ms) по возрастанию
+
+        Returns:
+            Массив (n × 6): open_time, open, high, low, close, volume; None при ошибке
+        """
+        for attempt in range(self.max_retries):
+            async with self._semaphore:
+                self.stats['requests'] += 1
+                try:
+                    response = await self.client.get_klines(
+                        self.category, symbol, interval, MAX_KLINE_LIMIT,
+                        start=start_ms, end=end_ms - 1
+                    )
+                except Exception as e:
+                    response = {'retCode': -1, 'retMsg': str(e)}
+
+            if response and response.get('retCode') == 0:
+                raw = (response.get('result') or {}).get('list') or []
+                if not raw:
+                    return np.empty((0, 6))
+
+                page = np.array([row[:6] for row in raw], dtype=np.float64)
+                page = page[np.argsort(page[:, 0], kind='stable')]
+                page = page[(page[:, 0] >= start_ms) & (page[:, 0] < end_ms)]
+                self.stats['candles_fetched'] += len(page)
+                return page
+
+            self.stats['failed_requests'] += 1
+            logger.warning(f"⚠️ kline {symbol} {interval} (попытка {attempt + 1}): "
+                           f"{(response or {}).get('retMsg')}")
+            await asyncio.sleep(0.5 * 2 ** attempt)
+
+        return None
+
+    async def _flush(self, symbol: str, timeframe: str, interval_ms: int, pages: List[np.ndarray],
+                     is_head: bool = False) -> int:
+        """Запись накопленных страниц и границ серии одной транзакцией"""
+        if not pages:
+            return 0
+
+        data = np.concatenate(pages)
+        # Окна не пересекаются, но дубли внутри ответа отбрасываем
+        data = data[np.unique(data[:, 0], return_index=True)[1]]
+        if not len(data):
+            return 0
+
+        count = await asyncio.to_thread(self._write_candles, symbol, timeframe, interval_ms, data)
+        self.stats['candles_written'] += count
+        self.stats['batches'] += 1
+
+        # Хвост CandleLoader догрузит сам, а свечи перед загруженным участком - нет
+        if is_head and candle_loader_module.candle_loader is not None:
+            candle_loader_module.candle_loader.invalidate(symbol, timeframe)
+        return count
+
+    # =================================================================
+    # БАЗА ДАННЫХ
+    # =================================================================
+
+    def _ensure_tables(self):
+        if not self._tables_ready:
+            Candle.__table__.create(bind=self.engine, checkfirst=True)
+            CandleSyncState.__table__.create(bind=self.engine, checkfirst=True)
+            self._tables_ready = True
+
+    def _load_state(self, series: Sequence[Tuple[str, str]]) -> Dict[Tuple[str, str], Dict[str, Optional[datetime]]]:
+        """
+        Границы серий из candle_sync_state
+
+        Для серий без записи состояния границы берутся из самих свечей
+        (min/max по уникальному индексу), чтобы не перекачивать историю,
+        загруженную до появления candle_sync_state.
+        """
+        self._ensure_tables()
+        wanted = set(series)
+        state = {key: value for key, value in self.get_sync_state().items() if key in wanted}
+
+        missing = [key for key in series if key not in state]
+        if missing:
+            table = Candle.__table__
+            with self.engine.connect() as conn:
+                for symbol, timeframe in missing:
+                    first, last = conn.execute(
+                        select(func.min(table.c.open_time), func.max(table.c.open_time))
+                        .where(table.c.symbol == symbol, table.c.interval == timeframe)
+                    ).one()
+                    if last is not None:
+                        state[(symbol, timeframe)] = {'first': first, 'last': last}
+        return state
+
+    def _write_candles(self, symbol: str, timeframe: str, interval_ms: int, data: np.ndarray) -> int:
+        """Upsert свечей и сдвиг границ серии"""
+        open_ms = data[:, 0].astype(np.int64)
+        open_times = _ms_to_datetimes(open_ms)
+        # close_time как у Bybit: последняя миллисекунда свечи
+        close_times = _ms_to_datetimes(open_ms + interval_ms - 1)
+        values = data[:, 1:6].tolist()
+
+        rows = [
+            {
+                'symbol': symbol, 'interval': timeframe, 'open_time': open_time,
+                'open': o, 'high': h, 'low': l, 'close': c, 'volume': v,
+                'close_time': close_time
+            }
+            for open_time, close_time, (o, h, l, c, v) in zip(open_times, close_times, values)
+        ]
+
+        candles = Candle.__table__
+        sync_table = CandleSyncState.__table__
+
+        with self.engine.begin() as conn:
+            _upsert_rows(conn, candles, rows, ('symbol', 'interval', 'open_time'), PRICE_COLUMNS)
+
+            current = conn.execute(
+                select(sync_table.c.first_open_time, sync_table.c.last_open_time)
+                .where(sync_table.c.symbol == symbol, sync_table.c.interval == timeframe)
+            ).first()
+
+            first, last = open_times[0], open_times[-1]
+            if current is None:
+                conn.execute(insert(sync_table).values(
+                    symbol=symbol, interval=timeframe,
+                    first_open_time=first, last_open_time=last,
+                    updated_at=datetime.utcnow()
+                ))
+            else:
+                conn.execute(
+                    update(sync_table)
+                    .where(sync_table.c.symbol == symbol, sync_table.c.interval == timeframe)
+                    .values(
+                        first_open_time=min(first, current[0]) if current[0] else first,
+                        last_open_time=max(last, current[1]) if current[1] else last,
+                        updated_at=datetime.utcnow()
+                    )
+                )
+
+        return len(rows)
+
+
+# =================================================================
+# ГЛОБАЛЬНЫЙ ЭКЗЕМПЛЯР
+# =================================================================
+
+candle_backfill_service = None
+
+
+def get_candle_backfill_service(exchange_client=None, **kwargs) -> CandleBackfillService:
+    """Получить общий сервис загрузки свечей (клиент нужен при первом вызове)"""
+    global candle_backfill_service
+
+    if candle_backfill_service is None:
+        if exchange_client is None:
+            raise ValueError("Для создания CandleBackfillService нужен exchange_client")
+        candle_backfill_service = CandleBackfillService(exchange_client, **kwargs)
+
+    return candle_backfill_service
+
+
+__all__ = [
+    'CandleBackfillService',
+    'get_candle_backfill_service',
+    'DEFAULT_HISTORY_DAYS'
+]
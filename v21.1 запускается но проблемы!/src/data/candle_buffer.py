@@ -0,0 +1,275 @@
+"""
+Колоночные кольцевые буферы свечей на NumPy
+Файл: src/data/candle_buffer.py
+
+Каждая колонка (timestamp, open, high, low, close, volume) хранится
+в заранее выделенном массиве удвоенной длины: каждое значение пишется
+дважды (pos и pos + capacity), поэтому последние N значений всегда
+лежат непрерывно и отдаются как view без копирования.
+"""
+import logging
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CANDLE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+PRICE_FIELDS = ('price', 'volume')
+
+DEFAULT_DEPTH = 500
+
+
+class RingBuffer:
+    """
+    Кольцевой буфер колонок с ключом по времени (open time в мс)
+
+    - append: O(1), повтор последнего timestamp обновляет запись
+    - views: срезы без копирования (только чтение), от старых к новым
+
+    View отражает состояние на момент вызова и перезаписывается
+    следующими append - если данные нужно сохранить, копируйте их.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_DEPTH, fields: Tuple[str, ...] = CANDLE_FIELDS):
+        if capacity < 1:
+            raise ValueError("capacity должен быть >= 1")
+
+        self.capacity = capacity
+        self.fields = tuple(fields)
+        self._timestamps = np.zeros(capacity * 2, dtype=np.int64)
+        self._columns = {name: np.zeros(capacity * 2, dtype=np.float64) for name in self.fields}
+        self._pos = 0      # Позиция следующей записи
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    # ================== ЗАПИСЬ ==================
+
+    def _write(self, index: int, timestamp: int, values: Dict[str, float]):
+        """Запись значения в обе половины массива"""
+        mirror = index + self.capacity
+        self._timestamps[index] = timestamp
+        self._timestamps[mirror] = timestamp
+        for name in self.fields:
+            value = values.get(name, 0.0)
+            self._columns[name][index] = value
+            self._columns[name][mirror] = value
+
+    def append(self, timestamp: int, **values: float) -> bool:
+        """
+        Добавление записи (значения передаются для всех колонок)
+
+        Returns:
+            True если добавлена новая запись, False если обновлена
+            существующая или запись отброшена
+        """
+        timestamp = int(timestamp)
+
+        if self._size:
+            last = self.last_timestamp
+            if timestamp == last:
+                self._write((self._pos - 1) % self.capacity, timestamp, values)
+                return False
+            if timestamp < last:
+                # Редкий случай: запоздавшая или пропущенная запись
+                self.merge([dict(values, timestamp=timestamp)])
+                return False
+
+        self._write(self._pos, timestamp, values)
+        self._pos = (self._pos + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        return True
+
+    def append_candle(self, candle: Dict[str, Any]) -> bool:
+        """Добавление записи из словаря {'timestamp': ..., 'open': ...}"""
+        return self.append(candle['timestamp'], **{name: candle.get(name, 0.0) for name in self.fields})
+
+    def merge(self, records: Iterable[Dict[str, Any]], overwrite_last: bool = True):
+        """
+        Слияние пачки записей без дублей по timestamp (O(n), для догрузки)
+
+        Args:
+            records: Записи в любом порядке
+            overwrite_last: Перезаписывать ли последнюю (текущую) запись буфера
+        """
+        records = list(records)
+        if not records:
+            return
+
+        new_ts = np.array([int(r['timestamp']) for r in records], dtype=np.int64)
+        new_cols = {
+            name: np.array([float(r.get(name, 0.0)) for r in records], dtype=np.float64)
+            for name in self.fields
+        }
+
+        if self._size:
+            current_ts = self.timestamps
+            keep = ~np.isin(current_ts, new_ts)
+            if not overwrite_last:
+                live_ts = current_ts[-1]
+                replaces_live = new_ts == live_ts
+                new_ts = new_ts[~replaces_live]
+                new_cols = {name: col[~replaces_live] for name, col in new_cols.items()}
+                keep[-1] = True
+            all_ts = np.concatenate([current_ts[keep], new_ts])
+            all_cols = {
+                name: np.concatenate([self.column(name)[keep], new_cols[name]])
+                for name in self.fields
+            }
+        else:
+            all_ts, all_cols = new_ts, new_cols
+
+        # Последнее вхождение timestamp в пачке побеждает
+        order = np.argsort(all_ts, kind='stable')
+        all_ts = all_ts[order]
+        unique_last = np.append(all_ts[1:] != all_ts[:-1], True)
+        all_ts = all_ts[unique_last][-self.capacity:]
+        for name in self.fields:
+            all_cols[name] = all_cols[name][order][unique_last][-self.capacity:]
+
+        self._rewrite(all_ts, all_cols)
+
+    def _rewrite(self, timestamps: np.ndarray, columns: Dict[str, np.ndarray]):
+        """Полная перезапись содержимого буфера"""
+        n = len(timestamps)
+        self._timestamps[:n] = timestamps
+        self._timestamps[self.capacity:self.capacity + n] = timestamps
+        for name in self.fields:
+            self._columns[name][:n] = columns[name]
+            self._columns[name][self.capacity:self.capacity + n] = columns[name]
+        self._size = n
+        self._pos = n % self.capacity
+
+    def clear(self):
+        """Очистка буфера"""
+        self._pos = 0
+        self._size = 0
+
+    # ================== ЧТЕНИЕ ==================
+
+    def _view(self, array: np.ndarray) -> np.ndarray:
+        """Непрерывный view последних _size элементов (без копирования)"""
+        end = self._pos + self.capacity
+        view = array[end - self._size:end]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._view(self._timestamps)
+
+    def column(self, name: str) -> np.ndarray:
+        """View колонки по имени"""
+        if name == 'timestamp':
+            return self.timestamps
+        return self._view(self._columns[name])
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        # Доступ к колонкам как к атрибутам: buffer.close, buffer.volume
+        columns = self.__dict__.get('_columns')
+        if columns is not None and name in columns:
+            return self.column(name)
+        raise AttributeError(name)
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        if not self._size:
+            return None
+        return int(self._timestamps[(self._pos - 1) % self.capacity])
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Все колонки как views {'timestamp': ..., 'open': ..., ...}"""
+        data = {'timestamp': self.timestamps}
+        for name in self.fields:
+            data[name] = self.column(name)
+        return data
+
+    def to_dicts(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Записи в виде списка словарей (для совместимости)"""
+        data = self.arrays()
+        start = max(0, self._size - limit) if limit else 0
+        return [
+            {name: (int(values[i]) if name == 'timestamp' else float(values[i]))
+             for name, values in data.items()}
+            for i in range(start, self._size)
+        ]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """DataFrame с копией данных"""
+        return pd.DataFrame({name: np.array(values) for name, values in self.arrays().items()})
+
+
+class CandleStore:
+    """
+    Хранилище кольцевых буферов по (symbol, timeframe)
+
+    Ведет себя как словарь по символу для таймфрейма по умолчанию,
+    поэтому может заменить dict/defaultdict с deque свечей.
+    """
+
+    def __init__(self, depth: int = DEFAULT_DEPTH, timeframe: str = '5m',
+                 fields: Tuple[str, ...] = CANDLE_FIELDS):
+        self.depth = depth
+        self.timeframe = timeframe
+        self.fields = tuple(fields)
+        self._buffers: Dict[Tuple[str, str], RingBuffer] = {}
+
+    def buffer(self, symbol: str, timeframe: Optional[str] = None) -> RingBuffer:
+        """Буфер символа (создается при первом обращении)"""
+        key = (symbol, timeframe or self.timeframe)
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = RingBuffer(self.depth, self.fields)
+            self._buffers[key] = buffer
+        return buffer
+
+    def get(self, symbol: str, timeframe: Optional[str] = None,
+            default: Optional[RingBuffer] = None) -> Optional[RingBuffer]:
+        return self._buffers.get((symbol, timeframe or self.timeframe), default)
+
+    def append(self, symbol: str, record: Dict[str, Any], timeframe: Optional[str] = None) -> bool:
+        """Добавление записи в буфер символа"""
+        return self.buffer(symbol, timeframe).append_candle(record)
+
+    def arrays(self, symbol: str, timeframe: Optional[str] = None) -> Optional[Dict[str, np.ndarray]]:
+        """Views колонок буфера или None"""
+        buffer = self.get(symbol, timeframe)
+        return buffer.arrays() if buffer else None
+
+    def pop(self, symbol: str, default=None, timeframe: Optional[str] = None):
+        return self._buffers.pop((symbol, timeframe or self.timeframe), default)
+
+    def discard_symbol(self, symbol: str):
+        """Удаление буферов символа по всем таймфреймам"""
+        for key in [key for key in self._buffers if key[0] == symbol]:
+            del self._buffers[key]
+
+    def symbols(self) -> List[str]:
+        return sorted({symbol for symbol, _ in self._buffers})
+
+    def clear(self):
+        self._buffers.clear()
+
+    def __contains__(self, symbol: str) -> bool:
+        return (symbol, self.timeframe) in self._buffers
+
+    def __getitem__(self, symbol: str) -> RingBuffer:
+        return self.buffer(symbol)
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+    def items(self):
+        return [(symbol, buffer) for (symbol, tf), buffer in self._buffers.items() if tf == self.timeframe]
+
+    def keys(self):
+        return [symbol for symbol, _ in self.items()]
+
+
+__all__ = ['RingBuffer', 'CandleStore', 'CANDLE_FIELDS', 'PRICE_FIELDS', 'DEFAULT_DEPTH']
@@ -0,0 +1,281 @@
+"""
+Быстрая загрузка свечей из таблицы candles в массивы NumPy
+Файл: src/data/candle_loader.py
+
+Строки читаются через Core select (без ORM-объектов) с потоковым
+курсором (stream_results + yield_per): каждая пачка строк сразу
+раскладывается в типизированные колонки, поэтому память и время не
+зависят от создания Python-объекта на каждую свечу.
+
+Загруженные серии кэшируются по (symbol, interval). Запрос диапазона,
+покрытого кэшем, отдается срезом; новые свечи догружаются запросом
+хвоста после последнего open_time, недостающее начало - запросом головы.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from ..core.database import engine as default_engine
+from ..core.models import Candle
+
+logger = logging.getLogger(__name__)
+
+CANDLE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+# Строк в одной пачке потокового курсора
+DEFAULT_CHUNK_ROWS = 50_000
+
+
+def _empty_series() -> Dict[str, np.ndarray]:
+    series = {'timestamp': np.empty(0, dtype='datetime64[ms]')}
+    series.update({field: np.empty(0, dtype=np.float64) for field in CANDLE_FIELDS})
+    return series
+
+
+def _concat(parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    parts = [part for part in parts if len(part['timestamp'])]
+    if not parts:
+        return _empty_series()
+    if len(parts) == 1:
+        return parts[0]
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+
+def read_candles(conn, symbol: str, interval: str,
+                 after: Optional[datetime] = None,
+                 start: Optional[datetime] = None,
+                 before: Optional[datetime] = None,
+                 end: Optional[datetime] = None,
+                 chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Dict[str, np.ndarray]:
+    """
+    Свечи серии по возрастанию open_time в виде колонок
+
+    Args:
+        conn: Соединение SQLAlchemy
+        after/start: Нижняя граница open_time (строгая/включительная)
+        before/end: Верхняя граница open_time (строгая/включительная)
+
+    Returns:
+        {'timestamp': datetime64[ms], 'open': float64, ...}
+    """
+    table = Candle.__table__
+    stmt = (
+        select(table.c.open_time, *[table.c[field] for field in CANDLE_FIELDS])
+        .where(table.c.symbol == symbol, table.c.interval == interval)
+        .order_by(table.c.open_time)
+    )
+    if after is not None:
+        stmt = stmt.where(table.c.open_time > after)
+    if start is not None:
+        stmt = stmt.where(table.c.open_time >= start)
+    if before is not None:
+        stmt = stmt.where(table.c.open_time < before)
+    if end is not None:
+        stmt = stmt.where(table.c.open_time <= end)
+
+    result = conn.execution_options(stream_results=True, yield_per=chunk_rows).execute(stmt)
+
+    parts = []
+    for partition in result.partitions():
+        columns = list(zip(*partition))
+        # pandas разбирает список datetime на C-уровне, np.array - по одному объекту
+        part = {'timestamp': pd.to_datetime(columns[0]).values.astype('datetime64[ms]')}
+        for field, values in zip(CANDLE_FIELDS, columns[1:]):
+            # None (NULL) превращается в NaN
+            part[field] = np.array(values, dtype=np.float64)
+        parts.append(part)
+
+    return _concat(parts)
+
+
+def to_frame(series: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """Колонки свечей -> DataFrame с индексом timestamp (как в DataPipeline)"""
+    index = pd.DatetimeIndex(series['timestamp'], name='timestamp')
+    return pd.DataFrame({field: series[field] for field in CANDLE_FIELDS}, index=index)
+
+
+class _CachedSeries:
+    """Загруженный участок серии: все свечи с open_time >= loaded_from"""
+
+    __slots__ = ('data', 'loaded_from', 'refreshed_at', 'nbytes')
+
+    def __init__(self, data: Dict[str, np.ndarray], loaded_from: Optional[np.datetime64]):
+        self.data = data
+        self.loaded_from = loaded_from
+        self.refreshed_at = time.monotonic()
+        self.nbytes = sum(values.nbytes for values in data.values())
+
+
+class CandleLoader:
+    """
+    Загрузчик свечей с кэшем серий и инкрементальным обновлением хвоста
+    """
+
+    def __init__(self, bind=None, max_series: int = 64, refresh_after: float = 5.0,
+                 chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        """
+        Args:
+            bind: Engine SQLAlchemy (по умолчанию основной engine бота)
+            max_series: Сколько серий держать в кэше (LRU)
+            refresh_after: Не чаще чем раз в столько секунд запрашивать хвост серии
+            chunk_rows: Строк в пачке потокового курсора
+        """
+        self.engine = bind if bind is not None else default_engine
+        self.max_series = max_series
+        self.refresh_after = refresh_after
+        self.chunk_rows = chunk_rows
+
+        self._series: "OrderedDict[tuple, _CachedSeries]" = OrderedDict()
+        self._lock = threading.RLock()
+
+        self.stats = {
+            'hits': 0,
+            'full_loads': 0,
+            'head_loads': 0,
+            'tail_refreshes': 0,
+            'rows_loaded': 0,
+            'load_seconds': 0.0
+        }
+
+    # =================================================================
+    # ПУБЛИЧНЫЕ МЕТОДЫ
+    # =================================================================
+
+    def load(self, symbol: str, interval: str,
+             start: Optional[datetime] = None,
+             end: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+        """
+        Свечи с open_time в [start, end] в виде колонок NumPy
+
+        Возвращаемые массивы - срезы кэша, их нельзя менять на месте.
+        """
+        key = (symbol, interval)
+        start64 = np.datetime64(start, 'ms') if start is not None else None
+        end64 = np.datetime64(end, 'ms') if end is not None else None
+
+        with self._lock:
+            entry = self._series.get(key)
+            if entry is None:
+                entry = self._load_full(symbol, interval, start)
+                self._series[key] = entry
+                self._evict()
+            else:
+                self._series.move_to_end(key)
+                self.stats['hits'] += 1
+                if entry.loaded_from is not None and (start64 is None or start64 < entry.loaded_from):
+                    self._load_head(symbol, interval, entry, start)
+
+                timestamps = entry.data['timestamp']
+                covered = end64 is not None and len(timestamps) and timestamps[-1] >= end64
+                if not covered and time.monotonic() - entry.refreshed_at >= self.refresh_after:
+                    self._load_tail(symbol, interval, entry)
+
+            return self._slice(entry.data, start64, end64)
+
+    def load_frame(self, symbol: str, interval: str,
+                   start: Optional[datetime] = None,
+                   end: Optional[datetime] = None) -> pd.DataFrame:
+        """То же, что load, но DataFrame с индексом timestamp"""
+        return to_frame(self.load(symbol, interval, start, end))
+
+    def invalidate(self, symbol: Optional[str] = None, interval: Optional[str] = None):
+        """Сбрасывает кэш серий (все или по символу/интервалу)"""
+        with self._lock:
+            for key in list(self._series):
+                if (symbol is None or key[0] == symbol) and (interval is None or key[1] == interval):
+                    del self._series[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика загрузчика"""
+        with self._lock:
+            return {
+                **self.stats,
+                'series': len(self._series),
+                'memory_mb': sum(entry.nbytes for entry in self._series.values()) / (1024 * 1024)
+            }
+
+    # =================================================================
+    # ВНУТРЕННЕЕ (под блокировкой)
+    # =================================================================
+
+    def _read(self, symbol: str, interval: str, **bounds) -> Dict[str, np.ndarray]:
+        started = time.perf_counter()
+        with self.engine.connect() as conn:
+            data = read_candles(conn, symbol, interval, chunk_rows=self.chunk_rows, **bounds)
+        self.stats['rows_loaded'] += len(data['timestamp'])
+        self.stats['load_seconds'] += time.perf_counter() - started
+        return data
+
+    def _load_full(self, symbol: str, interval: str, start: Optional[datetime]) -> _CachedSeries:
+        self.stats['full_loads'] += 1
+        data = self._read(symbol, interval, start=start)
+        return _CachedSeries(data, np.datetime64(start, 'ms') if start is not None else None)
+
+    def _load_head(self, symbol: str, interval: str, entry: _CachedSeries, start: Optional[datetime]):
+        """Догружает свечи перед loaded_from"""
+        self.stats['head_loads'] += 1
+        head = self._read(symbol, interval, start=start, before=entry.loaded_from.astype(datetime))
+        entry.data = _concat([head, entry.data])
+        entry.loaded_from = np.datetime64(start, 'ms') if start is not None else None
+        entry.nbytes = sum(values.nbytes for values in entry.data.values())
+
+    def _load_tail(self, symbol: str, interval: str, entry: _CachedSeries):
+        """Догружает свечи после последнего open_time"""
+        self.stats['tail_refreshes'] += 1
+        timestamps = entry.data['timestamp']
+        if len(timestamps):
+            tail = self._read(symbol, interval, after=timestamps[-1].astype(datetime))
+        elif entry.loaded_from is not None:
+            tail = self._read(symbol, interval, start=entry.loaded_from.astype(datetime))
+        else:
+            tail = self._read(symbol, interval)
+
+        if len(tail['timestamp']):
+            entry.data = _concat([entry.data, tail])
+            entry.nbytes = sum(values.nbytes for values in entry.data.values())
+        entry.refreshed_at = time.monotonic()
+
+    def _evict(self):
+        while len(self._series) > self.max_series:
+            self._series.popitem(last=False)
+
+    @staticmethod
+    def _slice(data: Dict[str, np.ndarray], start64, end64) -> Dict[str, np.ndarray]:
+        timestamps = data['timestamp']
+        lo = int(np.searchsorted(timestamps, start64, side='left')) if start64 is not None else 0
+        hi = int(np.searchsorted(timestamps, end64, side='right')) if end64 is not None else len(timestamps)
+        if lo == 0 and hi == len(timestamps):
+            return dict(data)
+        return {name: values[lo:hi] for name, values in data.items()}
+
+
+# =================================================================
+# ГЛОБАЛЬНЫЙ ЭКЗЕМПЛЯР
+# =================================================================
+
+candle_loader = None
+
+
+def get_candle_loader() -> CandleLoader:
+    """Получить общий загрузчик свечей"""
+    global candle_loader
+
+    if candle_loader is None:
+        candle_loader = CandleLoader()
+
+    return candle_loader
+
+
+__all__ = [
+    'CandleLoader',
+    'get_candle_loader',
+    'read_candles',
+    'to_frame'
+]
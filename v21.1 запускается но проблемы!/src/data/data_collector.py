@@ -10,6 +10,8 @@ import pandas as pd
 import numpy as np
 from collections import defaultdict
 
+from ..exchange.rate_limiter import get_rate_limiter
+
 logger = logging.getLogger(__name__)
 
 class DataCollector:
@@ -24,6 +26,8 @@ class DataCollector:
         self.collection_tasks = {}
         self.update_interval = 60  # секунд
         self.active_pairs = []
+        self.market_stream = None  # MarketDataStream (WebSocket данные)
+        self.rate_limiter = get_rate_limiter()  # общий бюджет запросов к бирже
         
         logger.info("✅ DataCollector инициализирован")
     
@@ -87,10 +91,20 @@ class DataCollector:
                 logger.debug(f"📊 Сохранены внешние данные для {symbol}")
                 return data
             
-            # Иначе собираем сами
+            # Актуальные потоковые данные - без REST запросов
+            if self.market_stream and self.market_stream.has_live_data(symbol):
+                collected = self.market_stream.get_market_snapshot(symbol)
+                self.collected_data[symbol] = {
+                    'data': collected,
+                    'timestamp': datetime.utcnow()
+                }
+                return collected
+            
+            # Иначе собираем сами - каждый REST запрос через общий лимитер
             collected = {}
             
             # 1. Получаем текущую цену и тикер
+            await self.rate_limiter.acquire('/v5/market/tickers')
             ticker = await self.exchange.fetch_ticker(symbol)
             if ticker:
                 collected['ticker'] = {
@@ -105,6 +119,7 @@ class DataCollector:
                 }
             
             # 2. Получаем стакан ордеров
+            await self.rate_limiter.acquire('/v5/market/orderbook')
             orderbook = await self.exchange.fetch_order_book(symbol, limit=20)
             if orderbook:
                 collected['orderbook'] = {
@@ -122,6 +137,7 @@ class DataCollector:
                     collected['ask_depth'] = sum(float(ask[1]) for ask in orderbook['asks'][:5])
             
             # 3. Получаем последние сделки
+            await self.rate_limiter.acquire('/v5/market/recent-trade')
             trades = await self.exchange.fetch_trades(symbol, limit=100)
             if trades:
                 # ✅ ИСПРАВЛЕНО: безопасное получение суммы с преобразованием типов
@@ -138,6 +154,7 @@ class DataCollector:
                 }
             
             # 4. Получаем свечи для технического анализа
+            await self.rate_limiter.acquire('/v5/market/kline')
             ohlcv = await self.exchange.fetch_ohlcv(symbol, '5m', limit=100)
             if ohlcv:
                 # ✅ ИСПРАВЛЕНО: преобразование timestamp и безопасная работа с данными
@@ -181,6 +198,7 @@ class DataCollector:
     async def collect_orderbook(self, symbol: str, depth: int = 20) -> Dict[str, Any]:
         """Сбор данных стакана"""
         try:
+            await self.rate_limiter.acquire('/v5/market/orderbook')
             orderbook = await self.exchange.fetch_order_book(symbol, limit=depth)
             return orderbook
         except Exception as e:
@@ -200,6 +218,11 @@ class DataCollector:
         except:
             return ['BTCUSDT', 'ETHUSDT', 'ADAUSDT', 'BNBUSDT', 'SOLUSDT']
     
+    def set_market_stream(self, market_stream):
+        """Подключение источника потоковых данных"""
+        self.market_stream = market_stream
+        logger.info("📡 DataCollector использует потоковые рыночные данные")
+    
     def set_active_pairs(self, pairs: List[str]):
         """Установка списка активных пар"""
         self.active_pairs = pairs
@@ -0,0 +1,540 @@
+"""
+Потоковые рыночные данные через WebSocket Bybit
+Файл: src/data/market_stream.py
+
+Подписывается на kline, tickers, orderbook и publicTrade для всех
+активных пар и поддерживает в памяти скользящие буферы свечей
+и последних сделок по каждому символу.
+REST используется только для начального заполнения и догрузки
+пропусков после переподключения.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Any, Set
+from datetime import datetime
+
+import numpy as np
+
+from .candle_buffer import CandleStore
+
+logger = logging.getLogger(__name__)
+
+# Таймфрейм -> интервал Bybit
+BYBIT_INTERVALS = {
+    '1m': '1', '3m': '3', '5m': '5', '15m': '15', '30m': '30',
+    '1h': '60', '2h': '120', '4h': '240', '6h': '360', '12h': '720',
+    '1d': 'D'
+}
+
+# Длительность интервала в миллисекундах
+INTERVAL_MS = {
+    '1': 60_000, '3': 180_000, '5': 300_000, '15': 900_000, '30': 1_800_000,
+    '60': 3_600_000, '120': 7_200_000, '240': 14_400_000, '360': 21_600_000,
+    '720': 43_200_000, 'D': 86_400_000
+}
+
+# Максимум свечей в одном REST запросе Bybit
+MAX_KLINE_LIMIT = 1000
+
+# Окно для high_24h/low_24h/volatility
+DAY_MS = 86_400_000
+
+
+class MarketDataStream:
+    """Сервис потоковых рыночных данных со скользящими буферами свечей"""
+
+    def __init__(self, exchange_client, timeframe: str = '5m', max_candles: int = 500,
+                 orderbook_depth: int = 50, stale_after: float = 60.0,
+                 recent_trades: int = 100):
+        """
+        Args:
+            exchange_client: EnhancedUnifiedExchangeClient (с bybit_integration)
+            timeframe: Таймфрейм свечей ('5m', '15m', ...)
+            max_candles: Глубина буфера свечей на символ
+            orderbook_depth: Глубина подписки на стакан
+            stale_after: Через сколько секунд без сообщений данные считаются устаревшими
+            recent_trades: Сколько последних сделок хранить на символ
+        """
+        self.exchange = exchange_client
+        self.timeframe = timeframe
+        self.interval = BYBIT_INTERVALS.get(timeframe, '5')
+        self.interval_ms = INTERVAL_MS[self.interval]
+        self.max_candles = max_candles
+        self.orderbook_depth = orderbook_depth
+        self.stale_after = stale_after
+        self.recent_trades = recent_trades
+        # Сколько свечей покрывает последние 24 часа
+        self.day_candles = max(1, DAY_MS // self.interval_ms)
+
+        # Буферы данных {symbol: ...}
+        self.candles = CandleStore(depth=max_candles, timeframe=timeframe)
+        self.tickers: Dict[str, dict] = {}
+        self.orderbooks: Dict[str, dict] = {}
+        self.trades: Dict[str, deque] = {}
+        self.last_update: Dict[str, float] = {}
+
+        # Символы и подписки
+        self.symbols: Set[str] = set()
+        self._subscribed: Set[str] = set()
+        self._subscribed_ws = None
+        self._needs_backfill: Set[str] = set()
+
+        # WebSocket callbacks приходят из отдельного потока
+        self._lock = threading.Lock()
+
+        self.is_running = False
+        self._monitor_task = None
+        self.monitor_interval = 5
+
+        self.stats = {
+            'kline_messages': 0,
+            'ticker_messages': 0,
+            'orderbook_messages': 0,
+            'trade_messages': 0,
+            'resubscriptions': 0,
+            'backfills': 0,
+            'backfilled_candles': 0,
+            'gaps_detected': 0
+        }
+
+        logger.info(f"✅ MarketDataStream инициализирован ({timeframe}, буфер {max_candles} свечей)")
+
+    # ================== ЖИЗНЕННЫЙ ЦИКЛ ==================
+
+    @property
+    def integration(self):
+        """Менеджер интеграции Bybit (если доступен)"""
+        return getattr(self.exchange, 'bybit_integration', None)
+
+    @property
+    def v5_client(self):
+        """Клиент Bybit V5 (если доступен)"""
+        integration = self.integration
+        return getattr(integration, 'v5_client', None) if integration else None
+
+    def is_available(self) -> bool:
+        """Доступен ли WebSocket источник данных"""
+        return bool(self.integration and self.v5_client and getattr(self.v5_client, 'ws_manager', None))
+
+    async def start(self) -> bool:
+        """Запуск сервиса"""
+        if not self.is_available():
+            logger.warning("⚠️ MarketDataStream: Bybit WebSocket недоступен")
+            return False
+
+        if self.is_running:
+            return True
+
+        handler = self.integration.ws_handler
+        handler.add_callback('kline', self._on_kline)
+        handler.add_callback('ticker', self._on_ticker)
+        handler.add_callback('orderbook', self._on_orderbook)
+        handler.add_callback('trade', self._on_trade)
+
+        self.is_running = True
+        self._monitor_task = asyncio.create_task(self._monitor_loop())
+        logger.info("✅ MarketDataStream запущен")
+        return True
+
+    async def stop(self):
+        """Остановка сервиса"""
+        self.is_running = False
+
+        if self._monitor_task and not self._monitor_task.done():
+            self._monitor_task.cancel()
+            try:
+                await self._monitor_task
+            except asyncio.CancelledError:
+                pass
+
+        logger.info("✅ MarketDataStream остановлен")
+
+    async def sync_symbols(self, symbols: List[str]):
+        """Синхронизация подписок со списком активных пар"""
+        target = set(symbols)
+
+        removed = self.symbols - target
+        added = target - self.symbols
+
+        if removed:
+            self._unsubscribe(removed)
+            with self._lock:
+                for symbol in removed:
+                    self.candles.discard_symbol(symbol)
+                    self.tickers.pop(symbol, None)
+                    self.orderbooks.pop(symbol, None)
+                    self.trades.pop(symbol, None)
+                    self.last_update.pop(symbol, None)
+                    self._needs_backfill.discard(symbol)
+
+        if added:
+            with self._lock:
+                for symbol in added:
+                    self.candles.buffer(symbol)
+                    self._needs_backfill.add(symbol)
+
+        self.symbols = target
+
+        if added:
+            self._subscribe(added)
+            await self._backfill_pending()
+
+    # ================== ПОДПИСКИ ==================
+
+    def _subscribe(self, symbols: Set[str]) -> bool:
+        """Подписка на kline/tickers/orderbook/publicTrade для символов"""
+        client = self.v5_client
+        if not client or not client.ws_manager.ws_connected.get('public'):
+            return False
+
+        subscribed = True
+        for symbol in sorted(symbols):
+            ok = (client.subscribe_kline(symbol, self.interval) and
+                  client.subscribe_ticker(symbol) and
+                  client.subscribe_orderbook(symbol, self.orderbook_depth) and
+                  client.subscribe_trades(symbol))
+            if ok:
+                self._subscribed.add(symbol)
+            subscribed = subscribed and ok
+
+        self._subscribed_ws = client.ws_manager.connections.get('public')
+        return subscribed
+
+    def _unsubscribe(self, symbols: Set[str]):
+        """Отписка от символов"""
+        client = self.v5_client
+        if not client:
+            return
+
+        ws_manager = client.ws_manager
+        for symbol in symbols:
+            ws_manager.unsubscribe("kline", [f"{self.interval}.{symbol}"], "public")
+            ws_manager.unsubscribe("tickers", [symbol], "public")
+            ws_manager.unsubscribe("orderbook", [f"{self.orderbook_depth}.{symbol}"], "public")
+            ws_manager.unsubscribe("publicTrade", [symbol], "public")
+            self._subscribed.discard(symbol)
+
+    async def _monitor_loop(self):
+        """Контроль соединения: переподписка и догрузка пропусков"""
+        while self.is_running:
+            try:
+                await asyncio.sleep(self.monitor_interval)
+
+                client = self.v5_client
+                if not client or not self.symbols:
+                    continue
+
+                ws_manager = client.ws_manager
+                current_ws = ws_manager.connections.get('public')
+                connected = ws_manager.ws_connected.get('public')
+
+                # Новое соединение после переподключения - подписки потеряны
+                if connected and current_ws is not self._subscribed_ws:
+                    logger.info("🔄 Публичный WebSocket переподключен, восстанавливаем подписки")
+                    self._subscribed.clear()
+                    with self._lock:
+                        self._needs_backfill.update(self.symbols)
+                    if self._subscribe(self.symbols):
+                        self.stats['resubscriptions'] += 1
+                elif connected and self.symbols - self._subscribed:
+                    self._subscribe(self.symbols - self._subscribed)
+
+                await self._backfill_pending()
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"❌ Ошибка мониторинга MarketDataStream: {e}")
+
+    # ================== ДОГРУЗКА ЧЕРЕЗ REST ==================
+
+    async def _backfill_pending(self):
+        """Догрузка свечей для символов с пропусками"""
+        with self._lock:
+            pending = list(self._needs_backfill)
+
+        for symbol in pending:
+            if symbol not in self.symbols:
+                continue
+            if await self._backfill_symbol(symbol):
+                with self._lock:
+                    self._needs_backfill.discard(symbol)
+
+    async def _backfill_symbol(self, symbol: str) -> bool:
+        """Загрузка недостающих свечей через REST"""
+        try:
+            with self._lock:
+                buffer = self.candles.get(symbol)
+                last_ts = buffer.last_timestamp if buffer else None
+
+            if last_ts is None:
+                limit = self.max_candles
+            else:
+                missing = (int(time.time() * 1000) - int(last_ts)) // self.interval_ms
+                limit = int(missing) + 2
+            limit = max(2, min(limit, self.max_candles, MAX_KLINE_LIMIT))
+
+            candles = await self._fetch_klines(symbol, limit)
+            if not candles:
+                return False
+
+            with self._lock:
+                self._merge_candles(symbol, candles)
+
+            self.stats['backfills'] += 1
+            self.stats['backfilled_candles'] += len(candles)
+            logger.debug(f"📥 {symbol}: догружено {len(candles)} свечей")
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка догрузки свечей {symbol}: {e}")
+            return False
+
+    async def _fetch_klines(self, symbol: str, limit: int) -> List[dict]:
+        """Получение свечей через REST (по возрастанию времени)"""
+        raw = []
+        client = self.v5_client
+        if client:
+            response = await client.get_klines("linear", symbol, self.interval, limit)
+            if response and response.get('retCode') == 0:
+                raw = response.get('result', {}).get('list', [])
+        elif hasattr(self.exchange, 'fetch_ohlcv'):
+            raw = await self.exchange.fetch_ohlcv(symbol, self.timeframe, limit=limit)
+
+        candles = [
+            {
+                'timestamp': int(k[0]),
+                'open': float(k[1]),
+                'high': float(k[2]),
+                'low': float(k[3]),
+                'close': float(k[4]),
+                'volume': float(k[5])
+            }
+            for k in raw or []
+        ]
+        # Bybit возвращает свечи от новых к старым
+        candles.sort(key=lambda c: c['timestamp'])
+        return candles
+
+    # ================== ОБРАБОТКА СООБЩЕНИЙ ==================
+
+    def _upsert_candle(self, symbol: str, candle: dict):
+        """Добавление или обновление свечи (вызывается под блокировкой)"""
+        buffer = self.candles.get(symbol)
+        if buffer is None:
+            return
+
+        # O(1) для новой/текущей свечи, слияние для запоздавших
+        buffer.append_candle(candle)
+
+    def _merge_candles(self, symbol: str, candles: List[dict]):
+        """Слияние пачки свечей с буфером без дублей (вызывается под блокировкой)"""
+        buffer = self.candles.get(symbol)
+        if buffer is None:
+            return
+
+        # Потоковые данные по текущей свече новее REST
+        buffer.merge(candles, overwrite_last=False)
+
+    def _on_kline(self, klines: List[dict]):
+        """Callback свечей из WebSocket"""
+        for kline in klines:
+            symbol = kline.get('symbol')
+            if symbol not in self.symbols:
+                continue
+
+            candle = {
+                'timestamp': int(kline['start']),
+                'open': float(kline['open']),
+                'high': float(kline['high']),
+                'low': float(kline['low']),
+                'close': float(kline['close']),
+                'volume': float(kline['volume'])
+            }
+
+            with self._lock:
+                buffer = self.candles.get(symbol)
+                if buffer and candle['timestamp'] - buffer.last_timestamp > self.interval_ms:
+                    self._needs_backfill.add(symbol)
+                    self.stats['gaps_detected'] += 1
+                self._upsert_candle(symbol, candle)
+                self.last_update[symbol] = time.time()
+
+            self.stats['kline_messages'] += 1
+
+    def _on_ticker(self, data):
+        """Callback тикеров из WebSocket"""
+        tickers = data if isinstance(data, list) else [data]
+        for ticker in tickers:
+            symbol = ticker.get('symbol')
+            if symbol not in self.symbols:
+                continue
+
+            with self._lock:
+                merged = self.tickers.setdefault(symbol, {})
+                merged.update(ticker)
+                self.last_update[symbol] = time.time()
+
+            self.stats['ticker_messages'] += 1
+
+    def _on_orderbook(self, orderbook: dict):
+        """Callback стакана из WebSocket"""
+        symbol = orderbook.get('symbol')
+        if symbol not in self.symbols:
+            return
+
+        with self._lock:
+            self.orderbooks[symbol] = orderbook
+            self.last_update[symbol] = time.time()
+
+        self.stats['orderbook_messages'] += 1
+
+    def _on_trade(self, data):
+        """Callback публичных сделок из WebSocket"""
+        trades = data if isinstance(data, list) else [data]
+        with self._lock:
+            for trade in trades:
+                symbol = trade.get('s')
+                if symbol not in self.symbols:
+                    continue
+
+                recent = self.trades.get(symbol)
+                if recent is None:
+                    recent = self.trades[symbol] = deque(maxlen=self.recent_trades)
+                recent.append((trade.get('S'), float(trade.get('v', 0) or 0), float(trade.get('p', 0) or 0)))
+                self.last_update[symbol] = time.time()
+                self.stats['trade_messages'] += 1
+
+    # ================== ДОСТУП К ДАННЫМ ==================
+
+    def has_live_data(self, symbol: str, min_candles: int = 20) -> bool:
+        """Есть ли актуальные потоковые данные по символу"""
+        client = self.v5_client
+        if not self.is_running or not client or not client.ws_manager.ws_connected.get('public'):
+            return False
+
+        with self._lock:
+            if symbol in self._needs_backfill:
+                return False
+            buffer = self.candles.get(symbol)
+            if not buffer or len(buffer) < min_candles:
+                return False
+            return time.time() - self.last_update.get(symbol, 0) < self.stale_after
+
+    def get_candles(self, symbol: str, limit: Optional[int] = None) -> List[dict]:
+        """Свечи символа списком словарей (для совместимости)"""
+        with self._lock:
+            buffer = self.candles.get(symbol)
+            if not buffer:
+                return []
+            return buffer.to_dicts(limit)
+
+    def get_arrays(self, symbol: str) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Колонки свечей символа {'timestamp', 'open', ..., 'volume'}
+
+        Буфер пишется из потока WebSocket, поэтому отдается снимок
+        (копия непрерывных массивов, без создания объектов на свечу).
+        """
+        with self._lock:
+            buffer = self.candles.get(symbol)
+            if not buffer:
+                return None
+            return {name: values.copy() for name, values in buffer.arrays().items()}
+
+    def get_market_snapshot(self, symbol: str) -> Dict[str, Any]:
+        """
+        Снимок рыночных данных в формате DataCollector.collect_market_data
+        """
+        with self._lock:
+            ticker = dict(self.tickers.get(symbol, {}))
+            orderbook = self.orderbooks.get(symbol)
+            trades = list(self.trades.get(symbol, ()))
+
+        arrays = self.get_arrays(symbol)
+        collected = {}
+
+        if ticker:
+            collected['ticker'] = {
+                'symbol': symbol,
+                'last': float(ticker.get('lastPrice', 0) or 0),
+                'bid': float(ticker.get('bid1Price', 0) or 0),
+                'ask': float(ticker.get('ask1Price', 0) or 0),
+                'volume': float(ticker.get('volume24h', 0) or 0),
+                'quote_volume': float(ticker.get('turnover24h', 0) or 0),
+                'change': float(ticker.get('price24hPcnt', 0) or 0) * 100,
+                'timestamp': datetime.utcnow()
+            }
+
+        if orderbook:
+            bids = orderbook.get('bids', [])
+            asks = orderbook.get('asks', [])
+            collected['orderbook'] = {
+                'bids': bids[:10],
+                'asks': asks[:10],
+                'timestamp': orderbook.get('timestamp')
+            }
+            if bids and asks:
+                best_bid = float(bids[0][0])
+                best_ask = float(asks[0][0])
+                collected['spread'] = (best_ask - best_bid) / best_bid * 100
+                collected['bid_depth'] = sum(float(bid[1]) for bid in bids[:5])
+                collected['ask_depth'] = sum(float(ask[1]) for ask in asks[:5])
+
+        if trades:
+            collected['recent_trades'] = {
+                'count': len(trades),
+                'buy_volume': sum(amount for side, amount, _ in trades if side == 'Buy'),
+                'sell_volume': sum(amount for side, amount, _ in trades if side == 'Sell'),
+                'avg_price': sum(price for _, _, price in trades) / len(trades),
+                'timestamp': datetime.utcnow()
+            }
+
+        if arrays is not None and len(arrays['close']) >= 20:
+            closes = arrays['close']
+            volumes = arrays['volume']
+
+            # Буфер может быть глубже суток - 24h метрики по последним свечам
+            day = slice(-self.day_candles, None)
+            day_closes = closes[day]
+            previous = day_closes[:-1]
+            valid = previous != 0
+            changes = np.diff(day_closes)[valid] / previous[valid]
+
+            collected['candles'] = [
+                dict(candle, timestamp=datetime.utcfromtimestamp(candle['timestamp'] / 1000))
+                for candle in self.get_candles(symbol, limit=20)
+            ]
+            collected['technical'] = {
+                'sma_20': float(closes[-20:].mean()),
+                'volume_avg': float(volumes[-20:].mean()),
+                'volatility': float(np.std(changes, ddof=1) * 100) if len(changes) > 1 else 0.0,
+                'high_24h': float(arrays['high'][day].max()),
+                'low_24h': float(arrays['low'][day].min())
+            }
+
+        return collected
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика сервиса"""
+        with self._lock:
+            buffered = {symbol: len(buffer) for symbol, buffer in self.candles.items()}
+            trades = sum(len(recent) for recent in self.trades.values())
+            pending = len(self._needs_backfill)
+
+        return {
+            'running': self.is_running,
+            'timeframe': self.timeframe,
+            'symbols': len(self.symbols),
+            'subscribed': len(self._subscribed),
+            'pending_backfill': pending,
+            'buffered_candles': buffered,
+            'buffered_trades': trades,
+            **self.stats
+        }
+
+
+__all__ = ['MarketDataStream', 'BYBIT_INTERVALS', 'INTERVAL_MS']
@@ -24,10 +24,13 @@ import threading
 import websocket
 import aiohttp
 import random
+import weakref
 from typing import Optional, Dict, Any, List, Callable, Union
 from datetime import datetime
 from dataclasses import dataclass
 
+from .rate_limiter import get_rate_limiter
+
 logger = logging.getLogger(__name__)
 
 # Безопасные импорты
@@ -47,6 +50,16 @@ class BybitCredentials:
     testnet: bool = True
     recv_window: int = 5000
 
+class _LoopSession:
+    """HTTP сессия и примитивы asyncio одного цикла событий"""
+
+    __slots__ = ('session', 'lock', 'semaphores')
+
+    def __init__(self):
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.lock = asyncio.Lock()
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+
 @dataclass
 class BybitEndpoints:
     """Эндпоинты Bybit API"""
@@ -143,10 +156,10 @@ class BybitWebSocketManager:
                         # Подписываемся на каналы после успешной аутентификации
                         subscribe_msg = {
                             "op": "subscribe",
-                            "args": ["position", "order", "wallet"]
+                            "args": ["position", "order", "execution", "wallet"]
                         }
                         ws.send(json.dumps(subscribe_msg))
-                        logger.info("📡 Подписка на position, order, wallet")
+                        logger.info("📡 Подписка на position, order, execution, wallet")
                     
                     # Передаем сообщение в callback
                     if callback:
@@ -352,6 +365,27 @@ class BybitWebSocketManager:
             logger.error(f"❌ Ошибка подписки: {e}")
             return False
     
+    def unsubscribe(self, channel: str, topics: List[str], ws_type: str = 'public'):
+        """Отписка от каналов"""
+        if ws_type not in self.connections or not self.ws_connected.get(ws_type):
+            return False
+        
+        ws = self.connections[ws_type]
+        
+        try:
+            for topic in topics:
+                unsubscribe_msg = {
+                    "op": "unsubscribe",
+                    "args": [f"{channel}.{topic}"] if topic else [channel]
+                }
+                ws.send(json.dumps(unsubscribe_msg))
+                logger.info(f"📴 Отписка от {channel}.{topic if topic else ''}")
+            
+            return True
+        except Exception as e:
+            logger.error(f"❌ Ошибка отписки: {e}")
+            return False
+    
     def _schedule_reconnect(self, ws_type: str):
         """Планирование переподключения с учетом rate limiting"""
         attempts = self.reconnect_attempts.get(ws_type, 0)
@@ -508,6 +542,40 @@ class BybitClientV5:
             'last_update': {}
         }
         
+        # Постоянная HTTP сессия (keep-alive, пул соединений, DNS кэш).
+        # Сессия, блокировка и семафоры привязаны к циклу событий, поэтому
+        # хранятся отдельно для каждого цикла (веб-обработчики и синхронный
+        # запуск/остановка менеджера работают в своих циклах)
+        self._loop_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopSession]" = \
+            weakref.WeakKeyDictionary()
+        self._loop_sessions_lock = threading.Lock()
+        self.http_pool_limit = 50
+        self.http_pool_limit_per_host = 30
+        self.http_keepalive_timeout = 30
+        self.http_dns_cache_ttl = 300
+        self.http_request_timeout = 15
+        
+        # Ограничение параллельных запросов по группам эндпоинтов
+        self.endpoint_concurrency = {
+            'market': 20,
+            'order': 5,
+            'position': 5,
+            'account': 3,
+            'default': 5
+        }
+
+        # Общий ограничитель запросов (лимиты Bybit по весам эндпоинтов)
+        self.rate_limiter = get_rate_limiter()
+        
+        # Статистика соединений
+        self.connection_stats = {
+            'sessions_created': 0,
+            'connections_created': 0,
+            'connections_reused': 0,
+            'dns_cache_hits': 0,
+            'dns_cache_misses': 0
+        }
+        
         # Настройка эндпоинтов
         if testnet:
             self.endpoints = BybitEndpoints(
@@ -530,6 +598,9 @@ class BybitClientV5:
     async def initialize(self) -> bool:
         """Инициализация клиента"""
         try:
+            # Открываем постоянную HTTP сессию
+            await self._ensure_session()
+            
             # Настройка CCXT exchange
             self.exchange = ccxt.bybit({
                 'apiKey': self.credentials.api_key,
@@ -563,15 +634,139 @@ class BybitClientV5:
             logger.error(f"❌ Ошибка инициализации: {e}")
             return False
 
+    # ================== HTTP SESSION ==================
+
+    def _loop_session(self) -> _LoopSession:
+        """Ресурсы HTTP текущего цикла событий (создаются при первом обращении)"""
+        loop = asyncio.get_running_loop()
+        with self._loop_sessions_lock:
+            state = self._loop_sessions.get(loop)
+            if state is None:
+                state = self._loop_sessions[loop] = _LoopSession()
+            return state
+
+    async def _ensure_session(self) -> aiohttp.ClientSession:
+        """Получение постоянной HTTP сессии (одна на цикл событий)"""
+        state = self._loop_session()
+        if state.session and not state.session.closed:
+            return state.session
+        
+        async with state.lock:
+            if state.session and not state.session.closed:
+                return state.session
+            
+            connector = aiohttp.TCPConnector(
+                limit=self.http_pool_limit,
+                limit_per_host=self.http_pool_limit_per_host,
+                ttl_dns_cache=self.http_dns_cache_ttl,
+                use_dns_cache=True,
+                keepalive_timeout=self.http_keepalive_timeout,
+                enable_cleanup_closed=True
+            )
+            
+            state.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.http_request_timeout),
+                trace_configs=[self._create_trace_config()]
+            )
+            self.connection_stats['sessions_created'] += 1
+            logger.info("🔗 HTTP сессия Bybit открыта (keep-alive, пул соединений)")
+            
+            return state.session
+
+    def _create_trace_config(self) -> aiohttp.TraceConfig:
+        """Трассировка соединений для статистики переиспользования"""
+        stats = self.connection_stats
+        
+        async def on_connection_create_end(session, ctx, params):
+            stats['connections_created'] += 1
+        
+        async def on_connection_reuseconn(session, ctx, params):
+            stats['connections_reused'] += 1
+        
+        async def on_dns_cache_hit(session, ctx, params):
+            stats['dns_cache_hits'] += 1
+        
+        async def on_dns_cache_miss(session, ctx, params):
+            stats['dns_cache_misses'] += 1
+        
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace_config
+
+    def _get_endpoint_semaphore(self, endpoint: str) -> asyncio.Semaphore:
+        """Семафор для группы эндпоинтов (/v5/<группа>/...) в текущем цикле"""
+        parts = endpoint.strip('/').split('/')
+        group = parts[1] if len(parts) > 1 else 'default'
+        if group not in self.endpoint_concurrency:
+            group = 'default'
+        
+        semaphores = self._loop_session().semaphores
+        semaphore = semaphores.get(group)
+        if semaphore is None:
+            semaphore = semaphores[group] = asyncio.Semaphore(self.endpoint_concurrency[group])
+        return semaphore
+
+    def _take_sessions(self) -> List[tuple]:
+        """Забирает открытые сессии всех циклов: [(цикл, сессия)]"""
+        with self._loop_sessions_lock:
+            sessions = []
+            for loop, state in list(self._loop_sessions.items()):
+                if state.session and not state.session.closed:
+                    sessions.append((loop, state.session))
+                state.session = None
+            return sessions
+
+    @staticmethod
+    def _close_in_loop(loop: asyncio.AbstractEventLoop, session: aiohttp.ClientSession) -> bool:
+        """
+        Закрытие сессии в ее собственном цикле (вызывается не из него)
+        
+        Returns:
+            True, если закрытие запущено или выполнено
+        """
+        if loop.is_closed():
+            # Цикл уже закрыт - закрыть сессию корректно нельзя
+            return False
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+            return True
+        try:
+            asyncio.get_running_loop()
+            # Нельзя запустить чужой цикл внутри работающего
+            return False
+        except RuntimeError:
+            loop.run_until_complete(session.close())
+            return True
+
+    async def close_session(self):
+        """Закрытие постоянных HTTP сессий (текущего и других циклов)"""
+        current = asyncio.get_running_loop()
+        for loop, session in self._take_sessions():
+            if loop is current:
+                await session.close()
+            elif not self._close_in_loop(loop, session):
+                logger.warning("⚠️ HTTP сессия Bybit другого цикла не закрыта (цикл недоступен)")
+                continue
+            logger.info("🔌 HTTP сессия Bybit закрыта")
+
     # ================== HTTP API METHODS ==================
 
     async def _make_request(self, method: str, endpoint: str, params: dict = None) -> dict:
         """Универсальный метод для HTTP запросов к API"""
         try:
-            timestamp = str(int(time.time() * 1000))
             url = f"{self.endpoints.rest_base}{endpoint}"
+            session = await self._ensure_session()
             
-            async with aiohttp.ClientSession() as session:
+            async with self._get_endpoint_semaphore(endpoint):
+                await self.rate_limiter.acquire(endpoint)
+                
+                # Подпись формируем после ожидания семафора, чтобы не истек recv_window
+                timestamp = str(int(time.time() * 1000))
+                
                 if method == 'GET':
                     # Для GET запросов параметры в query string
                     query_string = ""
@@ -862,14 +1057,24 @@ class BybitClientV5:
             return None
 
     async def get_klines(self, category: str, symbol: str, 
-                        interval: str, limit: int = 200) -> dict:
-        """Получение исторических данных (свечей)"""
+                        interval: str, limit: int = 200,
+                        start: Optional[int] = None, end: Optional[int] = None) -> dict:
+        """
+        Получение исторических данных (свечей)
+
+        start/end - границы по времени открытия свечи в мс (включительно);
+        Bybit отдает не более limit (до 1000) свечей от новых к старым.
+        """
         params = {
             "category": category,
             "symbol": symbol,
             "interval": interval,
             "limit": limit
         }
+        if start is not None:
+            params["start"] = int(start)
+        if end is not None:
+            params["end"] = int(end)
         return await self._make_request('GET', '/v5/market/kline', params)
 
     async def get_orderbook(self, category: str, symbol: str, 
@@ -955,6 +1160,20 @@ class BybitClientV5:
             return False
         return self.ws_manager.subscribe("orderbook", [f"{depth}.{symbol}"], "public")
 
+    def subscribe_kline(self, symbol: str, interval: str = "5"):
+        """Подписка на свечи"""
+        if not self.ws_manager:
+            logger.error("❌ WebSocket менеджер не доступен")
+            return False
+        return self.ws_manager.subscribe("kline", [f"{interval}.{symbol}"], "public")
+
+    def subscribe_trades(self, symbol: str):
+        """Подписка на публичные сделки"""
+        if not self.ws_manager:
+            logger.error("❌ WebSocket менеджер не доступен")
+            return False
+        return self.ws_manager.subscribe("publicTrade", [symbol], "public")
+
     # ================== UTILITY METHODS ==================
 
     async def get_balance(self, coin: str = 'USDT') -> float:
@@ -982,13 +1201,43 @@ class BybitClientV5:
                 'balance': len(self.cache.get('balance', {})),
                 'positions': len(self.cache.get('positions', {})),
                 'tickers': len(self.cache.get('tickers', {}))
-            }
+            },
+            'connections': self._get_connection_stats(),
+            'rate_limiter': self.rate_limiter.get_stats()
         }
 
+    def _get_connection_stats(self) -> dict:
+        """Статистика пула HTTP соединений"""
+        stats = dict(self.connection_stats)
+        opened = stats['connections_created'] + stats['connections_reused']
+        stats['reuse_rate'] = (stats['connections_reused'] / max(opened, 1)) * 100
+        with self._loop_sessions_lock:
+            open_sessions = sum(1 for state in self._loop_sessions.values()
+                                if state.session and not state.session.closed)
+        stats['session_open'] = open_sessions > 0
+        stats['open_sessions'] = open_sessions
+        stats['endpoint_limits'] = dict(self.endpoint_concurrency)
+        return stats
+
     def cleanup(self):
         """Очистка ресурсов"""
         if self.ws_manager:
             self.ws_manager.disconnect()
+        
+        # Закрываем HTTP сессии - каждую в ее собственном цикле
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        for loop, session in self._take_sessions():
+            try:
+                if loop is current:
+                    current.create_task(session.close())
+                elif not self._close_in_loop(loop, session):
+                    logger.warning("⚠️ Не удалось закрыть HTTP сессию: цикл событий недоступен")
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось закрыть HTTP сессию: {e}")
+        
         logger.info("🧹 BybitClientV5 очищен")
 
 # ================== FACTORY FUNCTIONS ==================
@@ -13,6 +13,7 @@
 """
 
 import asyncio
+import bisect
 import logging
 import time
 import threading
@@ -21,6 +22,8 @@ from datetime import datetime, timedelta
 from dataclasses import dataclass
 import pandas as pd
 
+from .order_tracker import get_order_tracker
+
 try:
     from .bybit_client_v5 import BybitClientV5, create_bybit_client_from_env, BybitAPIError
     V5_AVAILABLE = True
@@ -88,8 +91,13 @@ class BybitWebSocketHandler:
             'ticker': [],
             'orderbook': [],
             'trade': [],
-            'execution': []
+            'execution': [],
+            'kline': []
         }
+        # Локальные стаканы {symbol: {'b': (levels, keys), 'a': (levels, keys)}}:
+        # levels - {key: [price, size]}, keys - отсортированные ключи уровней
+        # (для bids ключ - минус цена, лучший уровень всегда первый)
+        self._orderbooks = {}
         
     def add_callback(self, event_type: str, callback: Callable):
         """Добавление callback для события"""
@@ -128,7 +136,9 @@ class BybitWebSocketHandler:
             if 'tickers' in topic:
                 self._handle_ticker_update(data)
             elif 'orderbook' in topic:
-                self._handle_orderbook_update(data)
+                self._handle_orderbook_update(data, message.get('type', 'snapshot'))
+            elif topic.startswith('kline'):
+                self._handle_kline_update(topic, data)
             elif 'publicTrade' in topic:
                 self._handle_trade_update(data)
                 
@@ -255,13 +265,17 @@ class BybitWebSocketHandler:
     def _handle_ticker_update(self, data):
         """Обработка обновления тикера"""
         try:
-            if isinstance(data, list):
-                for ticker in data:
-                    symbol = ticker.get('symbol')
-                    if symbol:
-                        self.integration_manager.cache['market_info'][symbol] = ticker
-                        
-                self.integration_manager.cache['last_update']['tickers'] = time.time()
+            market_info = self.integration_manager.cache['market_info']
+            tickers = data if isinstance(data, list) else [data]
+            for ticker in tickers:
+                symbol = ticker.get('symbol')
+                if symbol:
+                    # Bybit присылает snapshot, затем только изменившиеся поля (delta)
+                    merged = dict(market_info.get(symbol, {}))
+                    merged.update(ticker)
+                    market_info[symbol] = merged
+                    
+            self.integration_manager.cache['last_update']['tickers'] = time.time()
                 
             # Вызываем callbacks
             for callback in self.callbacks['ticker']:
@@ -273,30 +287,77 @@ class BybitWebSocketHandler:
         except Exception as e:
             logger.error(f"❌ Ошибка в _handle_ticker_update: {e}")
     
-    def _handle_orderbook_update(self, data):
-        """Обработка обновления стакана"""
+    def _handle_orderbook_update(self, data, update_type: str = 'snapshot'):
+        """Обработка обновления стакана (snapshot + delta)"""
         try:
             symbol = data.get('s')
-            if symbol:
-                orderbook_data = {
-                    'symbol': symbol,
-                    'bids': data.get('b', []),
-                    'asks': data.get('a', []),
-                    'timestamp': data.get('ts', int(time.time() * 1000))
-                }
-                
-                self.integration_manager.cache['market_info'][f"{symbol}_orderbook"] = orderbook_data
+            if not symbol:
+                return
+            
+            book = self._orderbooks.get(symbol)
+            if update_type == 'snapshot' or book is None:
+                book = {'b': ({}, []), 'a': ({}, [])}
+                self._orderbooks[symbol] = book
+            
+            # Применяем изменения: размер "0" означает удаление уровня.
+            # Порядок поддерживается вставкой через bisect - O(log n) поиск
+            # на уровень вместо пересортировки всего стакана на каждую delta
+            for side, sign in (('b', -1.0), ('a', 1.0)):
+                levels, keys = book[side]
+                for price, size in data.get(side, []):
+                    key = sign * float(price)
+                    if float(size) == 0:
+                        if levels.pop(key, None) is not None:
+                            del keys[bisect.bisect_left(keys, key)]
+                    else:
+                        if key not in levels:
+                            bisect.insort(keys, key)
+                        levels[key] = [price, size]
+            
+            bid_levels, bid_keys = book['b']
+            ask_levels, ask_keys = book['a']
+            orderbook_data = {
+                'symbol': symbol,
+                'bids': [list(bid_levels[key]) for key in bid_keys],
+                'asks': [list(ask_levels[key]) for key in ask_keys],
+                'timestamp': data.get('ts', int(time.time() * 1000))
+            }
+            
+            self.integration_manager.cache['market_info'][f"{symbol}_orderbook"] = orderbook_data
                 
             # Вызываем callbacks
             for callback in self.callbacks['orderbook']:
                 try:
-                    callback(data)
+                    callback(orderbook_data)
                 except Exception as e:
                     logger.error(f"❌ Ошибка в orderbook callback: {e}")
                     
         except Exception as e:
             logger.error(f"❌ Ошибка в _handle_orderbook_update: {e}")
     
+    def _handle_kline_update(self, topic: str, data):
+        """Обработка обновления свечей (topic: kline.<interval>.<symbol>)"""
+        try:
+            parts = topic.split('.')
+            if len(parts) < 3:
+                return
+            interval, symbol = parts[1], parts[2]
+            
+            klines = data if isinstance(data, list) else [data]
+            for kline in klines:
+                kline['symbol'] = symbol
+                kline.setdefault('interval', interval)
+            
+            # Вызываем callbacks
+            for callback in self.callbacks['kline']:
+                try:
+                    callback(klines)
+                except Exception as e:
+                    logger.error(f"❌ Ошибка в kline callback: {e}")
+                    
+        except Exception as e:
+            logger.error(f"❌ Ошибка в _handle_kline_update: {e}")
+    
     def _handle_trade_update(self, data):
         """Обработка обновления сделок"""
         try:
@@ -321,6 +382,8 @@ class BybitIntegrationManager:
         # WebSocket состояние
         self.ws_connected = {'private': False, 'public': False}
         self.ws_handler = BybitWebSocketHandler(self)
+        # Исполнение ордеров OrderExecutionEngine отслеживается по этому потоку
+        get_order_tracker().attach(self.ws_handler)
         
         # Кэширование данных
         self.cache = {
@@ -980,6 +1043,7 @@ class BybitIntegrationManager:
             
             # Очищаем V5 клиент
             if self.v5_client:
+                await self.v5_client.close_session()
                 self.v5_client.cleanup()
             
             logger.info("🧹 BybitIntegrationManager очищен")
@@ -7,8 +7,12 @@ ORDER EXECUTION ENGINE - Центральный торговый движок И
 ✅ Безопасный импорт с try/except
 ✅ Fallback для отсутствующих компонентов
 ✅ Полная совместимость с существующим кодом
+✅ Исполнение ордеров по событиям приватного WebSocket (REST - запасной путь)
+✅ Очередь исполнения: N воркеров, приоритет по уверенности, один ордер на символ
 """
 import asyncio
+import itertools
+import time
 from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
 from dataclasses import dataclass
@@ -76,6 +80,13 @@ except ImportError:
         percentage: float
         value: float
 
+from .order_tracker import get_order_tracker, Histogram
+
+# Границы корзин гистограмм исполнения
+FILL_LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2000, 5000, 10000)
+SLIPPAGE_BUCKETS_BPS = (1, 2, 5, 10, 20, 50, 100)
+QUEUE_WAIT_BUCKETS_MS = (1, 10, 50, 100, 500, 1000, 5000, 30000)
+
 class ExecutionStatus(Enum):
     """Статусы исполнения"""
     PENDING = "pending"
@@ -112,6 +123,18 @@ class ExecutionResult:
     error_message: Optional[str] = None
     execution_time: Optional[datetime] = None
 
+@dataclass(eq=False)
+class _ExecutionJob:
+    """Сигнал в очереди исполнения и ожидающие его результат вызовы"""
+    signal: TradingSignal
+    strategy_name: str
+    market_conditions: Dict[str, Any]
+    enqueued_at: float
+    waiters: List[asyncio.Future]
+    seq: int = -1           # Номер актуальной записи в очереди
+    started: bool = False
+    coalesced: int = 0
+
 class OrderExecutionEngine:
     """
     Центральный движок исполнения торговых операций
@@ -141,10 +164,26 @@ class OrderExecutionEngine:
         self.position_manager = get_position_manager()
         
         self.max_concurrent_executions = max_concurrent_executions
-        self.execution_queue: asyncio.Queue = asyncio.Queue()
+        # (-уверенность, порядковый номер, задание): сильные сигналы первыми, при равенстве - FIFO
+        self.execution_queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
         self.active_executions: Dict[str, ExecutionRequest] = {}
         self.execution_history: List[ExecutionResult] = []
         
+        # Очередь исполнения (очередь и воркеры принадлежат циклу _loop)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._workers: List[asyncio.Task] = []
+        self._sequence = itertools.count()
+        self._queued_jobs: set = set()                          # задания в очереди
+        self._pending_jobs: Dict[str, _ExecutionJob] = {}      # символ -> последнее задание в очереди
+        self._deferred_jobs: Dict[str, List[_ExecutionJob]] = {}  # ждут завершения ордера по символу
+        self.queue_wait_histogram = Histogram(QUEUE_WAIT_BUCKETS_MS)
+        self.queue_stats = {
+            'enqueued': 0,
+            'coalesced': 0,
+            'deferred': 0,
+            'max_depth': 0
+        }
+        
         # Статистика
         self.total_executions = 0
         self.successful_executions = 0
@@ -160,6 +199,18 @@ class OrderExecutionEngine:
             'max_position_correlation': 0.7  # Максимальная корреляция с другими позициями
         }
         
+        # Ожидание исполнения: WebSocket, затем опрос REST до max_fill_wait
+        self.order_tracker = get_order_tracker()
+        self.fill_settings = {
+            'ws_fill_timeout': 2.0,     # Сколько ждать итог по WebSocket
+            'poll_interval': 0.25,      # Первый интервал опроса REST (удваивается)
+            'max_poll_interval': 2.0,
+            'max_fill_wait': 10.0       # Общий лимит ожидания исполнения
+        }
+        self.fill_latency_histogram = Histogram(FILL_LATENCY_BUCKETS_MS)
+        self.slippage_histogram = Histogram(SLIPPAGE_BUCKETS_BPS)
+        self.fill_sources = {'order_response': 0, 'websocket': 0, 'rest': 0, 'timeout': 0}
+        
         logger.info(
             "🏭 OrderExecutionEngine инициализирован",
             category='execution',
@@ -174,6 +225,244 @@ class OrderExecutionEngine:
         """
         Основной метод исполнения торгового сигнала
         
+        Сигнал ставится в очередь исполнения; результат возвращается, когда
+        воркер его обработает. Повторный сигнал того же направления по
+        символу, еще не взятый воркером, объединяется с ожидающим: оба
+        вызова получают один результат, исполняется сигнал с большей
+        уверенностью.
+        """
+        self._ensure_workers()
+        
+        future = asyncio.get_running_loop().create_future()
+        job = self._pending_jobs.get(signal.symbol)
+        
+        if job is not None and not job.started and job.signal.action == signal.action:
+            job.waiters.append(future)
+            job.coalesced += 1
+            self.queue_stats['coalesced'] += 1
+            if signal.confidence > job.signal.confidence:
+                job.signal = signal
+                job.strategy_name = strategy_name
+                job.market_conditions = market_conditions
+                # Новый приоритет; старая запись очереди пропускается воркером
+                self._enqueue(job)
+        else:
+            job = _ExecutionJob(
+                signal=signal,
+                strategy_name=strategy_name,
+                market_conditions=market_conditions,
+                enqueued_at=time.monotonic(),
+                waiters=[future]
+            )
+            self.queue_stats['enqueued'] += 1
+            self._enqueue(job)
+            self.queue_stats['max_depth'] = max(self.queue_stats['max_depth'], self.queue_depth)
+        
+        return await future
+    
+    # =================================================================
+    # ОЧЕРЕДЬ ИСПОЛНЕНИЯ
+    # =================================================================
+    
+    @property
+    def queue_depth(self) -> int:
+        """Сигналы, ожидающие исполнения (в очереди и отложенные по символу)"""
+        return len(self._queued_jobs) + sum(len(jobs) for jobs in self._deferred_jobs.values())
+    
+    def _enqueue(self, job: _ExecutionJob):
+        job.seq = next(self._sequence)
+        self._queued_jobs.add(job)
+        self._pending_jobs[job.signal.symbol] = job
+        self.execution_queue.put_nowait((-job.signal.confidence, job.seq, job))
+    
+    def _dequeue(self, job: _ExecutionJob):
+        self._queued_jobs.discard(job)
+        if self._pending_jobs.get(job.signal.symbol) is job:
+            del self._pending_jobs[job.signal.symbol]
+    
+    def _ensure_workers(self):
+        """
+        Запуск воркеров в текущем цикле (при первом сигнале или после остановки)
+        
+        Движок - глобальный объект, а менеджер и веб-обработчики создают
+        новые циклы событий (start/stop, async_handler). Очередь и воркеры
+        привязаны к циклу, поэтому при вызове из другого цикла они
+        пересоздаются, а задания прежнего цикла отклоняются.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            if self._loop is not None:
+                logger.warning("🔄 Очередь исполнения перепривязана к новому циклу событий",
+                               category='execution')
+                self._release_loop("Execution queue moved to another event loop")
+            self._loop = loop
+        
+        self._workers = [task for task in self._workers if not task.done()]
+        for worker_id in range(len(self._workers), self.max_concurrent_executions):
+            self._workers.append(asyncio.create_task(
+                self._execution_worker(worker_id, self.execution_queue),
+                name=f"execution-worker-{worker_id}"
+            ))
+    
+    async def stop_workers(self):
+        """Остановка воркеров; ожидающие сигналы отклоняются"""
+        if self._loop is not asyncio.get_running_loop():
+            # Воркеры живут в другом цикле - отменяем их там, не дожидаясь
+            if self._loop is not None:
+                self._release_loop("Execution queue stopped")
+                self._loop = None
+            return
+        
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        
+        for job in self._drain_jobs():
+            self._finish_job(job, self._rejected_result(job, "Execution queue stopped"))
+    
+    def _drain_jobs(self) -> List[_ExecutionJob]:
+        """Забирает все ожидающие задания; очередь заменяется пустой"""
+        jobs = list(self._queued_jobs)
+        for deferred in self._deferred_jobs.values():
+            jobs.extend(deferred)
+        self._queued_jobs.clear()
+        self._pending_jobs.clear()
+        self._deferred_jobs.clear()
+        self.execution_queue = asyncio.PriorityQueue()
+        return jobs
+    
+    def _release_loop(self, reason: str):
+        """
+        Отвязка очереди от прежнего цикла (вызывается из другого цикла)
+        
+        Воркеры отменяются, а ожидающие задания отклоняются в цикле-владельце
+        их future. Если тот цикл уже закрыт, его задачи и future мертвы.
+        """
+        old_loop, workers = self._loop, self._workers
+        self._workers = []
+        jobs = self._drain_jobs()
+        self.active_executions.clear()
+        
+        for task in workers:
+            self._call_in_loop(old_loop, task.cancel)
+        for job in jobs:
+            self._call_in_loop(old_loop, self._finish_job, job, self._rejected_result(job, reason))
+    
+    @staticmethod
+    def _call_in_loop(loop: asyncio.AbstractEventLoop, callback, *args):
+        """Вызов в цикле loop: потокобезопасно, если он выполняется в другом потоке"""
+        if loop.is_closed():
+            return
+        if loop.is_running():
+            loop.call_soon_threadsafe(callback, *args)
+        else:
+            callback(*args)
+    
+    async def _execution_worker(self, worker_id: int, queue: asyncio.PriorityQueue):
+        """Воркер: берет сигналы по приоритету, по символу - строго по одному"""
+        while True:
+            _, seq, job = await queue.get()
+            try:
+                symbol = job.signal.symbol
+                # Устаревшая запись после повышения приоритета или уже взятое задание
+                if job.started or seq != job.seq or job not in self._queued_jobs:
+                    continue
+                
+                self._dequeue(job)
+                if symbol in self.active_executions:
+                    # По символу уже исполняется ордер - ждем его завершения
+                    self._deferred_jobs.setdefault(symbol, []).append(job)
+                    self.queue_stats['deferred'] += 1
+                    continue
+                
+                await self._run_job(job)
+                
+            except Exception as e:
+                logger.error(f"❌ Ошибка воркера исполнения {worker_id}: {e}", category='execution')
+            finally:
+                queue.task_done()
+    
+    async def _run_job(self, job: _ExecutionJob):
+        symbol = job.signal.symbol
+        job.started = True
+        
+        self.queue_wait_histogram.observe((time.monotonic() - job.enqueued_at) * 1000)
+        self.active_executions[symbol] = ExecutionRequest(
+            signal=job.signal,
+            strategy_name=job.strategy_name,
+            confidence=job.signal.confidence,
+            market_conditions=job.market_conditions,
+            risk_params={}
+        )
+        
+        result = None
+        try:
+            result = await self._process_signal(job.signal, job.strategy_name, job.market_conditions)
+        except asyncio.CancelledError:
+            result = self._rejected_result(job, "Execution worker cancelled")
+            raise
+        except Exception as e:
+            result = self._rejected_result(job, str(e), ExecutionStatus.FAILED)
+        finally:
+            self._finish_job(job, result)
+            # После перепривязки к другому циклу состояние очереди уже не наше
+            if asyncio.get_running_loop() is self._loop:
+                self.active_executions.pop(symbol, None)
+                self._release_symbol(symbol)
+    
+    def _release_symbol(self, symbol: str):
+        """Следующий отложенный сигнал по символу возвращается в очередь"""
+        deferred = self._deferred_jobs.get(symbol)
+        if not deferred:
+            return
+        
+        job = deferred.pop(0)
+        if not deferred:
+            del self._deferred_jobs[symbol]
+        
+        pending = self._pending_jobs.get(symbol)
+        if pending is not None and pending.signal.action == job.signal.action:
+            # Пока ждали, пришел такой же сигнал - объединяем
+            pending.waiters.extend(job.waiters)
+            pending.coalesced += 1 + job.coalesced
+            pending.enqueued_at = min(pending.enqueued_at, job.enqueued_at)
+            self.queue_stats['coalesced'] += 1
+            if job.signal.confidence > pending.signal.confidence:
+                pending.signal = job.signal
+                pending.strategy_name = job.strategy_name
+                pending.market_conditions = job.market_conditions
+                self._enqueue(pending)
+            return
+        
+        self._enqueue(job)
+    
+    @staticmethod
+    def _finish_job(job: _ExecutionJob, result: ExecutionResult):
+        for waiter in job.waiters:
+            if not waiter.done():
+                waiter.set_result(result)
+    
+    @staticmethod
+    def _rejected_result(job: _ExecutionJob, reason: str,
+                         status: ExecutionStatus = ExecutionStatus.REJECTED) -> ExecutionResult:
+        return ExecutionResult(
+            request=ExecutionRequest(
+                signal=job.signal,
+                strategy_name=job.strategy_name,
+                confidence=job.signal.confidence,
+                market_conditions=job.market_conditions,
+                risk_params={}
+            ),
+            status=status,
+            error_message=reason
+        )
+    
+    async def _process_signal(self, signal: TradingSignal, strategy_name: str,
+                              market_conditions: Dict[str, Any]) -> ExecutionResult:
+        """
+        Исполнение сигнала воркером очереди
+        
         Полный пайплайн:
         1. Валидация сигнала через риск-менеджер
         2. Расчет оптимального размера позиции
@@ -411,6 +700,7 @@ class OrderExecutionEngine:
             side = 'buy' if request.signal.action in ['BUY', 'LONG'] else 'sell'
             
             # Размещаем ордер
+            sent_at = time.monotonic()
             order_result = await self.exchange.create_order(
                 symbol=request.signal.symbol,
                 type='market',  # Пока только рыночные ордера
@@ -420,22 +710,19 @@ class OrderExecutionEngine:
             )
             
             if order_result and order_result.get('id'):
-                # Ждем исполнения ордера
-                await asyncio.sleep(1)  # Небольшая задержка
-                
-                # Проверяем статус ордера
-                order_status = await self.exchange.fetch_order(
-                    order_result['id'], 
-                    request.signal.symbol
-                )
+                order_status = await self._wait_for_fill(order_result, request.signal.symbol, sent_at)
+                executed_quantity = float(order_status.get('filled') or 0)
                 
-                if order_status.get('status') == 'closed':
-                    executed_price = float(order_status.get('average', request.signal.price))
-                    executed_quantity = float(order_status.get('filled', request.quantity))
+                # Частично исполненный и отмененный рыночный ордер тоже открыл позицию
+                if order_status.get('status') == 'closed' or executed_quantity > 0:
+                    executed_price = float(order_status.get('average') or request.signal.price)
                     
                     # Рассчитываем проскальзывание
                     slippage = abs(executed_price - request.signal.price) / request.signal.price
                     
+                    self.fill_latency_histogram.observe((time.monotonic() - sent_at) * 1000)
+                    self.slippage_histogram.observe(slippage * 10000)
+                    
                     return ExecutionResult(
                         request=request,
                         status=ExecutionStatus.COMPLETED,
@@ -467,6 +754,67 @@ class OrderExecutionEngine:
                 error_message=str(e)
             )
     
+    async def _wait_for_fill(self, order_result: Dict[str, Any], symbol: str,
+                             sent_at: float) -> Dict[str, Any]:
+        """
+        Ожидание итогового статуса ордера
+        
+        1. Ответ create_order уже итоговый - используем его
+        2. Future трекера, разрешаемый событиями order/execution WebSocket
+        3. Опрос fetch_order с растущим интервалом до max_fill_wait
+        """
+        order_id = order_result['id']
+        if order_result.get('status') in ('closed', 'canceled', 'rejected'):
+            self.fill_sources['order_response'] += 1
+            return order_result
+        
+        settings = self.fill_settings
+        deadline = sent_at + settings['max_fill_wait']
+        last_status = order_result
+        
+        try:
+            if self.order_tracker.is_attached:
+                self.order_tracker.track(order_id, symbol)
+                ws_timeout = min(settings['ws_fill_timeout'], max(0.0, deadline - time.monotonic()))
+                status = await self.order_tracker.wait(order_id, ws_timeout)
+                if status is not None:
+                    self.fill_sources['websocket'] += 1
+                    return status
+                logger.warning(
+                    f"⚠️ Нет итога ордера {order_id} по WebSocket за {ws_timeout:.1f}с, опрос REST",
+                    category='execution'
+                )
+            
+            interval = settings['poll_interval']
+            while True:
+                last_status = await self.exchange.fetch_order(order_id, symbol)
+                if last_status.get('status') in ('closed', 'canceled', 'rejected'):
+                    self.fill_sources['rest'] += 1
+                    return last_status
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                
+                # Итог мог прийти по WebSocket, пока ждали ответ REST
+                if self.order_tracker.is_attached:
+                    status = await self.order_tracker.wait(order_id, min(interval, remaining))
+                    if status is not None:
+                        self.fill_sources['websocket'] += 1
+                        return status
+                else:
+                    await asyncio.sleep(min(interval, remaining))
+                interval = min(interval * 2, settings['max_poll_interval'])
+            
+            self.fill_sources['timeout'] += 1
+            partial = self.order_tracker.snapshot(order_id)
+            if partial and float(partial.get('filled') or 0) > float(last_status.get('filled') or 0):
+                return partial
+            return last_status
+            
+        finally:
+            self.order_tracker.forget(order_id)
+    
     async def _save_trade_to_db(self, result: ExecutionResult):
         """Сохранение сделки в базу данных"""
         
@@ -551,13 +899,28 @@ class OrderExecutionEngine:
     def get_execution_stats(self) -> Dict[str, Any]:
         """Получение статистики исполнений"""
         
+        fill_stats = {
+            'fill_latency_ms': self.fill_latency_histogram.to_dict(),
+            'slippage_bps': self.slippage_histogram.to_dict(),
+            'fill_sources': dict(self.fill_sources),
+            'order_tracker': self.order_tracker.get_stats(),
+            'queue': {
+                **self.queue_stats,
+                'depth': self.queue_depth,
+                'active': len(self.active_executions),
+                'workers': sum(1 for task in self._workers if not task.done()),
+                'wait_ms': self.queue_wait_histogram.to_dict()
+            }
+        }
+        
         if self.total_executions == 0:
             return {
                 'total_executions': 0,
                 'success_rate': 0.0,
                 'failure_rate': 0.0,
                 'avg_execution_time_seconds': 0.0,
-                'emergency_stop': self.emergency_stop
+                'emergency_stop': self.emergency_stop,
+                **fill_stats
             }
         
         success_rate = self.successful_executions / self.total_executions
@@ -570,7 +933,8 @@ class OrderExecutionEngine:
             'success_rate': success_rate,
             'failure_rate': failure_rate,
             'avg_execution_time_seconds': self.average_execution_time,
-            'emergency_stop': self.emergency_stop
+            'emergency_stop': self.emergency_stop,
+            **fill_stats
         }
     
     def activate_emergency_stop(self, reason: str = "Manual activation"):
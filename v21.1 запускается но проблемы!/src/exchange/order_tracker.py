@@ -0,0 +1,337 @@
+"""
+Отслеживание исполнения ордеров по приватному WebSocket
+Файл: src/exchange/order_tracker.py
+
+OrderTracker держит future на каждый отслеживаемый ордер и разрешает
+его по событиям топиков order и execution приватного потока Bybit V5.
+События приходят из потока WebSocket, future разрешается в цикле
+asyncio, который ждет ордер (call_soon_threadsafe).
+
+Событие может прийти раньше, чем create_order вернет id ордера, - такие
+события буферизуются и применяются при вызове track().
+
+Результат приведен к виду ответа fetch_order (ccxt):
+    {'id', 'symbol', 'status': 'closed'|'canceled'|'rejected'|'open',
+     'filled', 'average', 'fills', 'source': 'websocket'|'rest'}
+"""
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# orderStatus Bybit V5 -> статус ccxt
+FINAL_ORDER_STATUSES = {
+    'Filled': 'closed',
+    'Cancelled': 'canceled',
+    'PartiallyFilledCanceled': 'canceled',
+    'Deactivated': 'canceled',
+    'Rejected': 'rejected'
+}
+
+# Сколько событий неизвестных ордеров держать и сколько секунд
+MAX_EARLY_ORDERS = 1000
+EARLY_EVENT_TTL = 60.0
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными границами корзин
+
+    counts[i] - значения <= bounds[i], последняя корзина - все, что больше.
+    """
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Верхняя граница корзины, в которую попадает q-квантиль (0..1)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for position, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.bounds[position] if position < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"<={bound:g}" for bound in self.bounds] + [f">{self.bounds[-1]:g}"]
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(0.5),
+            'p90': self.percentile(0.9),
+            'p99': self.percentile(0.99),
+            'buckets': dict(zip(labels, self.counts))
+        }
+
+
+class _TrackedOrder:
+    """Состояние отслеживаемого ордера (меняется под блокировкой трекера)"""
+
+    __slots__ = ('order_id', 'symbol', 'loop', 'future', 'exec_ids', 'resolved',
+                 'filled', 'notional', 'order_status', 'cum_qty', 'avg_price', 'leaves_qty')
+
+    def __init__(self, order_id: str, symbol: Optional[str], loop: asyncio.AbstractEventLoop):
+        self.order_id = order_id
+        self.symbol = symbol
+        self.loop = loop
+        self.future: asyncio.Future = loop.create_future()
+        self.exec_ids = set()
+        # Итог уже отправлен в цикл (future разрешится позже, call_soon_threadsafe)
+        self.resolved = False
+        self.filled = 0.0
+        self.notional = 0.0
+        self.order_status: Optional[str] = None
+        self.cum_qty: Optional[float] = None
+        self.avg_price: Optional[float] = None
+        self.leaves_qty: Optional[float] = None
+
+    def result(self, status: str) -> Dict[str, Any]:
+        # Берем источник с большим исполненным объемом: событие order
+        # может отставать от execution и наоборот
+        if self.cum_qty is not None and self.avg_price and self.cum_qty >= self.filled:
+            filled, average = self.cum_qty, self.avg_price
+        else:
+            filled = self.filled
+            average = self.notional / self.filled if self.filled else None
+        return {
+            'id': self.order_id,
+            'symbol': self.symbol,
+            'status': status,
+            'filled': filled,
+            'average': average,
+            'fills': len(self.exec_ids),
+            'source': 'websocket'
+        }
+
+
+def _float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+class OrderTracker:
+    """
+    Реестр ордеров, ожидающих исполнения по WebSocket
+    """
+
+    def __init__(self):
+        self._orders: Dict[str, _TrackedOrder] = {}
+        self._early: "OrderedDict[str, List[tuple]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sources = 0
+
+        self.stats = {
+            'order_events': 0,
+            'execution_events': 0,
+            'early_events': 0,
+            'resolved': 0
+        }
+
+    # =================================================================
+    # ПОДКЛЮЧЕНИЕ К WEBSOCKET
+    # =================================================================
+
+    def attach(self, ws_handler) -> bool:
+        """Подписывается на order/execution у BybitWebSocketHandler"""
+        try:
+            ws_handler.add_callback('order', self.on_order)
+            ws_handler.add_callback('execution', self.on_execution)
+            with self._lock:
+                self._sources += 1
+            logger.info("📡 OrderTracker подключен к приватному WebSocket")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Ошибка подключения OrderTracker к WebSocket: {e}")
+            return False
+
+    @property
+    def is_attached(self) -> bool:
+        return self._sources > 0
+
+    # =================================================================
+    # ОТСЛЕЖИВАНИЕ
+    # =================================================================
+
+    def track(self, order_id: str, symbol: Optional[str] = None) -> asyncio.Future:
+        """
+        Начинает отслеживание ордера и возвращает future с итогом
+
+        Вызывается из цикла asyncio; буферизованные события применяются сразу.
+        Ордер остается в реестре до forget().
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            tracked = self._orders.get(order_id)
+            if tracked is None:
+                tracked = self._orders[order_id] = _TrackedOrder(order_id, symbol, loop)
+                for kind, event, _ in self._early.pop(order_id, []):
+                    self._apply(tracked, kind, event)
+            return tracked.future
+
+    async def wait(self, order_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Итог ордера или None, если за timeout итоговое событие не пришло"""
+        with self._lock:
+            tracked = self._orders.get(order_id)
+        if tracked is None:
+            return None
+        try:
+            return await asyncio.wait_for(asyncio.shield(tracked.future), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def snapshot(self, order_id: str) -> Optional[Dict[str, Any]]:
+        """Текущее (возможно частичное) состояние ордера"""
+        with self._lock:
+            tracked = self._orders.get(order_id)
+            return tracked.result('open') if tracked is not None else None
+
+    def forget(self, order_id: str):
+        """Прекращает отслеживание ордера (ожидающий future отменяется)"""
+        with self._lock:
+            tracked = self._orders.pop(order_id, None)
+            pending = tracked is not None and not tracked.resolved
+        if pending:
+            tracked.loop.call_soon_threadsafe(self._cancel, tracked.future)
+
+    # =================================================================
+    # СОБЫТИЯ WEBSOCKET (поток WebSocket)
+    # =================================================================
+
+    def on_order(self, order: Dict[str, Any]):
+        self._dispatch('order', order)
+
+    def on_execution(self, execution: Dict[str, Any]):
+        self._dispatch('execution', execution)
+
+    def _dispatch(self, kind: str, event: Dict[str, Any]):
+        order_id = event.get('orderId')
+        if not order_id:
+            return
+
+        with self._lock:
+            self.stats[f'{kind}_events'] += 1
+            tracked = self._orders.get(order_id)
+            if tracked is not None:
+                self._apply(tracked, kind, event)
+                return
+
+            # Ордер еще не зарегистрирован (create_order не вернул ответ)
+            self.stats['early_events'] += 1
+            self._early.setdefault(order_id, []).append((kind, event, time.monotonic()))
+            self._early.move_to_end(order_id)
+            self._prune_early()
+
+    def _prune_early(self):
+        deadline = time.monotonic() - EARLY_EVENT_TTL
+        while self._early:
+            order_id, events = next(iter(self._early.items()))
+            if len(self._early) <= MAX_EARLY_ORDERS and events[-1][2] >= deadline:
+                break
+            self._early.popitem(last=False)
+
+    def _apply(self, tracked: _TrackedOrder, kind: str, event: Dict[str, Any]):
+        """Применяет событие к ордеру (под блокировкой)"""
+        if tracked.resolved:
+            return
+
+        if kind == 'execution':
+            exec_id = event.get('execId')
+            if exec_id in tracked.exec_ids:
+                return
+            tracked.exec_ids.add(exec_id)
+            qty = _float(event.get('execQty')) or 0.0
+            price = _float(event.get('execPrice')) or 0.0
+            tracked.filled += qty
+            tracked.notional += qty * price
+            leaves_qty = _float(event.get('leavesQty'))
+            if leaves_qty is not None:
+                tracked.leaves_qty = leaves_qty
+            if tracked.leaves_qty == 0 and tracked.filled > 0:
+                self._resolve(tracked, 'closed')
+            return
+
+        tracked.order_status = event.get('orderStatus')
+        tracked.cum_qty = _float(event.get('cumExecQty'))
+        tracked.avg_price = _float(event.get('avgPrice'))
+        tracked.leaves_qty = _float(event.get('leavesQty'))
+        if not tracked.symbol:
+            tracked.symbol = event.get('symbol')
+
+        status = FINAL_ORDER_STATUSES.get(tracked.order_status)
+        if status:
+            self._resolve(tracked, status)
+
+    def _resolve(self, tracked: _TrackedOrder, status: str):
+        """Фиксирует итог ордера (под блокировкой) - ровно один раз"""
+        if tracked.resolved:
+            return
+        tracked.resolved = True
+        self.stats['resolved'] += 1
+        tracked.loop.call_soon_threadsafe(self._set_result, tracked.future, tracked.result(status))
+
+    @staticmethod
+    def _set_result(future: asyncio.Future, result: Dict[str, Any]):
+        if not future.done():
+            future.set_result(result)
+
+    @staticmethod
+    def _cancel(future: asyncio.Future):
+        if not future.done():
+            future.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                'attached': self._sources > 0,
+                'tracked_orders': len(self._orders),
+                'early_orders': len(self._early)
+            }
+
+
+# =================================================================
+# ГЛОБАЛЬНЫЙ ЭКЗЕМПЛЯР
+# =================================================================
+
+order_tracker = None
+
+
+def get_order_tracker() -> OrderTracker:
+    """Получить общий трекер ордеров"""
+    global order_tracker
+
+    if order_tracker is None:
+        order_tracker = OrderTracker()
+
+    return order_tracker
+
+
+__all__ = [
+    'OrderTracker',
+    'Histogram',
+    'get_order_tracker'
+]
@@ -8,13 +8,17 @@ POSITION MANAGER - Управление торговыми позициями
 ✅ Трейлинг стопы для максимизации прибыли
 ✅ Экстренное закрытие при критических условиях
 ✅ Обновление PnL в реальном времени
+✅ Цены всех позиций одним запросом (или из потока тикеров), запись в БД пакетами
 """
 import asyncio
+import time
 from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 import logging
 
+from sqlalchemy import bindparam, func
+
 from ..core.database import SessionLocal
 from ..core.models import Trade, TradeStatus, OrderSide
 from ..logging.smart_logger import get_logger
@@ -75,6 +79,20 @@ class PositionManager:
         self.is_running = False
         self.positions: Dict[str, PositionInfo] = {}
         self.active_trades: Dict[int, Trade] = {}
+        self._trades_by_symbol: Dict[str, Trade] = {}
+        self.trailing_settings: Dict[str, float] = {}  # символ -> дистанция трейлинга, %
+        
+        # Цены из потока тикеров: символ -> (цена, time.monotonic())
+        self.live_prices: Dict[str, Tuple[float, float]] = {}
+        self.max_live_price_age = 5.0
+        
+        self.refresh_stats = {
+            'cycles': 0,
+            'ticker_requests': 0,
+            'stream_prices': 0,
+            'db_statements': 0,
+            'last_refresh_seconds': 0.0
+        }
         
         # Настройки риск-менеджмента
         self.max_slippage_percent = 0.5  # Максимальное проскальзывание
@@ -147,31 +165,47 @@ class PositionManager:
     async def _update_positions(self):
         """Обновление информации о позициях с биржи"""
         try:
+            started = time.perf_counter()
+            
             # Получаем позиции с биржи
             exchange_positions = await self.exchange.fetch_positions()
+            open_positions = [pos for pos in exchange_positions if pos.size > 0]  # Только открытые позиции
             
-            # Обновляем наш кэш
-            self.positions.clear()
+            # Цены всех символов одним запросом
+            prices = await self._fetch_prices([pos.symbol for pos in open_positions])
             
-            for pos in exchange_positions:
-                if pos.size > 0:  # Только открытые позиции
-                    symbol = pos.symbol
-                    
-                    # Получаем текущую цену
-                    ticker = await self.exchange.fetch_ticker(symbol)
-                    current_price = ticker['last']
-                    
-                    position_info = PositionInfo(
-                        symbol=symbol,
-                        side=pos.side,
-                        size=pos.size,
-                        entry_price=pos.entry_price,
-                        current_price=current_price,
-                        unrealized_pnl=pos.unrealized_pnl,
-                        unrealized_pnl_percent=pos.percentage
-                    )
-                    
-                    self.positions[symbol] = position_info
+            previous = self.positions
+            self.positions = {}
+            
+            for pos in open_positions:
+                symbol = pos.symbol
+                current_price = prices.get(symbol)
+                if current_price is None:
+                    if symbol not in previous:
+                        logger.warning(f"⚠️ Нет цены для {symbol}, позиция пропущена", category='position')
+                        continue
+                    # Цены нет в этом цикле - оставляем последнюю известную
+                    current_price = previous[symbol].current_price
+                
+                position_info = PositionInfo(
+                    symbol=symbol,
+                    side=pos.side,
+                    size=pos.size,
+                    entry_price=pos.entry_price,
+                    current_price=current_price,
+                    unrealized_pnl=pos.unrealized_pnl,
+                    unrealized_pnl_percent=pos.percentage
+                )
+                
+                # Экстремумы цены нужны трейлинг стопу между циклами
+                if symbol in previous:
+                    position_info.max_price = previous[symbol].max_price
+                    position_info.min_price = previous[symbol].min_price
+                
+                self.positions[symbol] = position_info
+            
+            self.refresh_stats['cycles'] += 1
+            self.refresh_stats['last_refresh_seconds'] = time.perf_counter() - started
             
             if self.positions:
                 logger.debug(
@@ -183,6 +217,76 @@ class PositionManager:
         except Exception as e:
             logger.error(f"❌ Ошибка обновления позиций: {e}")
     
+    async def _fetch_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """
+        Текущие цены символов
+        
+        Свежие цены берутся из потока тикеров, остальные - одним запросом
+        UnifiedExchangeClient.fetch_tickers (Bybit get_tickers по категории
+        без symbol). Если клиент не умеет fetch_tickers, тикеры
+        запрашиваются параллельно.
+        """
+        prices: Dict[str, float] = {}
+        now = time.monotonic()
+        
+        for symbol in symbols:
+            live = self.live_prices.get(symbol)
+            if live and now - live[1] <= self.max_live_price_age:
+                prices[symbol] = live[0]
+        self.refresh_stats['stream_prices'] += len(prices)
+        
+        missing = [symbol for symbol in symbols if symbol not in prices]
+        if not missing:
+            return prices
+        
+        if hasattr(self.exchange, 'fetch_tickers'):
+            self.refresh_stats['ticker_requests'] += 1
+            tickers = await self.exchange.fetch_tickers(missing)
+        else:
+            self.refresh_stats['ticker_requests'] += len(missing)
+            results = await asyncio.gather(
+                *[self.exchange.fetch_ticker(symbol) for symbol in missing],
+                return_exceptions=True
+            )
+            tickers = {}
+            for symbol, result in zip(missing, results):
+                if isinstance(result, Exception):
+                    logger.error(f"❌ Ошибка получения тикера {symbol}: {result}")
+                else:
+                    tickers[symbol] = result
+        
+        for symbol in missing:
+            ticker = (tickers or {}).get(symbol)
+            if ticker and ticker.get('last') is not None:
+                prices[symbol] = float(ticker['last'])
+        
+        return prices
+    
+    def attach_ticker_stream(self, ws_handler) -> bool:
+        """
+        Подписка на поток тикеров BybitWebSocketHandler (цены без REST)
+        
+        Подключается BotManager вместе с MarketDataStream, который подписан
+        на tickers.<symbol> активных пар. Цены остальных символов позиций
+        берутся через fetch_tickers.
+        """
+        try:
+            ws_handler.add_callback('ticker', self._on_ticker)
+            return True
+        except Exception as e:
+            logger.error(f"❌ Ошибка подписки на поток тикеров: {e}")
+            return False
+    
+    def _on_ticker(self, data):
+        """Обновление цены из сообщения tickers (поток WebSocket)"""
+        received_at = time.monotonic()
+        for ticker in data if isinstance(data, list) else [data]:
+            symbol = ticker.get('symbol')
+            last_price = ticker.get('lastPrice')
+            # delta-сообщения могут не содержать lastPrice
+            if symbol and last_price not in (None, ''):
+                self.live_prices[symbol] = (float(last_price), received_at)
+    
     async def _load_active_trades(self):
         """Загрузка активных сделок из БД"""
         db = SessionLocal()
@@ -192,16 +296,24 @@ class PositionManager:
             ).all()
             
             self.active_trades.clear()
+            self._trades_by_symbol.clear()
             for trade in active_trades:
                 self.active_trades[trade.id] = trade
+                self._trades_by_symbol.setdefault(trade.symbol, trade)
                 
                 # Добавляем информацию о stop-loss/take-profit к позициям
                 if trade.symbol in self.positions:
                     position = self.positions[trade.symbol]
                     position.stop_loss = trade.stop_loss
                     position.take_profit = trade.take_profit
-                    position.trailing_stop = trade.trailing_stop or False
-                    position.trailing_distance = trade.trailing_distance
+                    # В модели Trade нет колонок трейлинга - настройки хранятся в менеджере
+                    position.trailing_distance = self.trailing_settings.get(trade.symbol)
+                    position.trailing_stop = position.trailing_distance is not None
+            
+            # Настройки трейлинга закрытых сделок больше не нужны
+            for symbol in list(self.trailing_settings):
+                if symbol not in self._trades_by_symbol:
+                    del self.trailing_settings[symbol]
             
         finally:
             db.close()
@@ -278,7 +390,9 @@ class PositionManager:
             await self._update_trades_in_db(updates)
     
     async def _update_trailing_stops(self):
-        """Обновление трейлинг стопов"""
+        """Обновление трейлинг стопов (новые стопы пишутся в БД одним пакетом)"""
+        stop_updates: List[Tuple[int, float]] = []
+        
         for symbol, position in self.positions.items():
             if not position.trailing_stop or not position.trailing_distance:
                 continue
@@ -299,8 +413,7 @@ class PositionManager:
                         if not position.stop_loss or new_stop > position.stop_loss:
                             position.stop_loss = new_stop
                             
-                            # Обновляем в БД
-                            await self._update_trade_stop_loss(trade.id, new_stop)
+                            stop_updates.append((trade.id, new_stop))
                             
                             logger.info(
                                 f"📈 Трейлинг стоп обновлен для {symbol}",
@@ -320,8 +433,7 @@ class PositionManager:
                         if not position.stop_loss or new_stop < position.stop_loss:
                             position.stop_loss = new_stop
                             
-                            # Обновляем в БД
-                            await self._update_trade_stop_loss(trade.id, new_stop)
+                            stop_updates.append((trade.id, new_stop))
                             
                             logger.info(
                                 f"📉 Трейлинг стоп обновлен для {symbol}",
@@ -333,6 +445,9 @@ class PositionManager:
                             
             except Exception as e:
                 logger.error(f"❌ Ошибка обновления трейлинг стопа для {symbol}: {e}")
+        
+        if stop_updates:
+            await self._update_trade_stop_losses(stop_updates)
     
     async def _check_partial_close(self):
         """Проверка условий для частичного закрытия позиций"""
@@ -398,24 +513,40 @@ class PositionManager:
             logger.error(f"❌ Ошибка проверки экстренных условий: {e}")
     
     async def _update_trades_pnl(self):
-        """Обновление PnL сделок в БД"""
+        """Обновление PnL сделок в БД (один UPDATE ... executemany на цикл)"""
         if not self.positions:
             return
         
+        now = datetime.utcnow()
+        rows = []
+        for symbol, position in self.positions.items():
+            trade = self._get_trade_by_symbol(symbol)
+            if trade:
+                rows.append({
+                    'trade_id': trade.id,
+                    'profit_loss': position.unrealized_pnl,
+                    'profit_loss_percent': position.unrealized_pnl_percent,
+                    'updated_at': now
+                })
+        
+        if not rows:
+            return
+        
+        table = Trade.__table__
+        stmt = table.update().where(table.c.id == bindparam('trade_id')).values(
+            profit_loss=bindparam('profit_loss'),
+            profit_loss_percent=bindparam('profit_loss_percent'),
+            updated_at=bindparam('updated_at')
+        )
+        
         db = SessionLocal()
         try:
-            for symbol, position in self.positions.items():
-                trade = self._get_trade_by_symbol(symbol)
-                if trade:
-                    trade.current_price = position.current_price
-                    trade.unrealized_pnl = position.unrealized_pnl
-                    trade.updated_at = datetime.utcnow()
-                    
-                    db.merge(trade)
-            
+            db.execute(stmt, rows)
             db.commit()
+            self.refresh_stats['db_statements'] += 1
             
         except Exception as e:
+            db.rollback()
             logger.error(f"❌ Ошибка обновления PnL в БД: {e}")
         finally:
             db.close()
@@ -452,10 +583,7 @@ class PositionManager:
     
     def _get_trade_by_symbol(self, symbol: str) -> Optional[Trade]:
         """Получение сделки по символу"""
-        for trade in self.active_trades.values():
-            if trade.symbol == symbol:
-                return trade
-        return None
+        return self._trades_by_symbol.get(symbol)
     
     def _get_trade_id_by_symbol(self, symbol: str) -> Optional[int]:
         """Получение ID сделки по символу"""
@@ -464,15 +592,28 @@ class PositionManager:
     
     async def _update_trade_stop_loss(self, trade_id: int, new_stop_loss: float):
         """Обновление stop-loss сделки в БД"""
+        await self._update_trade_stop_losses([(trade_id, new_stop_loss)])
+    
+    async def _update_trade_stop_losses(self, stop_updates: List[Tuple[int, float]]):
+        """Обновление stop-loss нескольких сделок одним executemany"""
+        now = datetime.utcnow()
+        table = Trade.__table__
+        stmt = table.update().where(table.c.id == bindparam('trade_id')).values(
+            stop_loss=bindparam('stop_loss'),
+            updated_at=bindparam('updated_at')
+        )
+        
         db = SessionLocal()
         try:
-            trade = db.query(Trade).filter(Trade.id == trade_id).first()
-            if trade:
-                trade.stop_loss = new_stop_loss
-                trade.updated_at = datetime.utcnow()
-                db.commit()
+            db.execute(stmt, [
+                {'trade_id': trade_id, 'stop_loss': stop_loss, 'updated_at': now}
+                for trade_id, stop_loss in stop_updates
+            ])
+            db.commit()
+            self.refresh_stats['db_statements'] += 1
                 
         except Exception as e:
+            db.rollback()
             logger.error(f"❌ Ошибка обновления stop-loss: {e}")
         finally:
             db.close()
@@ -497,30 +638,51 @@ class PositionManager:
             db.close()
     
     async def _update_trades_in_db(self, updates: List[TradeUpdate]):
-        """Обновление сделок в БД"""
+        """
+        Обновление сделок в БД одним UPDATE ... executemany
+        
+        exit_price/profit пишутся в close_price/profit_loss; пустые значения
+        не затирают существующие (COALESCE). Колонки для exit_reason в
+        модели нет - причина только логируется.
+        """
+        now = datetime.utcnow()
+        rows = [
+            {
+                'trade_id': update.trade_id,
+                'status': getattr(update.status, 'value', update.status),
+                'close_price': update.exit_price or None,
+                'profit_loss': update.profit,
+                'close_time': now,
+                'updated_at': now
+            }
+            for update in updates if update.trade_id is not None
+        ]
+        if not rows:
+            return
+        
+        table = Trade.__table__
+        stmt = table.update().where(table.c.id == bindparam('trade_id')).values(
+            status=bindparam('status'),
+            close_price=func.coalesce(bindparam('close_price'), table.c.close_price),
+            profit_loss=func.coalesce(bindparam('profit_loss'), table.c.profit_loss),
+            close_time=bindparam('close_time'),
+            updated_at=bindparam('updated_at')
+        )
+        
         db = SessionLocal()
         try:
-            for update in updates:
-                trade = db.query(Trade).filter(Trade.id == update.trade_id).first()
-                if trade:
-                    trade.status = update.status
-                    if update.exit_price:
-                        trade.exit_price = update.exit_price
-                    if update.profit is not None:
-                        trade.profit = update.profit
-                    if update.exit_reason:
-                        trade.exit_reason = update.exit_reason
-                    trade.closed_at = datetime.utcnow()
-                    trade.updated_at = datetime.utcnow()
-            
+            db.execute(stmt, rows)
             db.commit()
+            self.refresh_stats['db_statements'] += 1
             
             logger.info(
-                f"✅ Обновлено сделок в БД: {len(updates)}",
-                category='position'
+                f"✅ Обновлено сделок в БД: {len(rows)}",
+                category='position',
+                reasons=sorted({update.exit_reason for update in updates if update.exit_reason})
             )
             
         except Exception as e:
+            db.rollback()
             logger.error(f"❌ Ошибка обновления сделок в БД: {e}")
         finally:
             db.close()
@@ -605,32 +767,23 @@ class PositionManager:
                 logger.error(f"❌ Сделка для {symbol} не найдена")
                 return False
             
-            # Обновляем в БД
-            db = SessionLocal()
-            try:
-                trade.trailing_stop = True
-                trade.trailing_distance = trailing_distance_percent
-                trade.updated_at = datetime.utcnow()
-                db.merge(trade)
-                db.commit()
-                
-                # Обновляем в позиции
-                if symbol in self.positions:
-                    self.positions[symbol].trailing_stop = True
-                    self.positions[symbol].trailing_distance = trailing_distance_percent
-                
-                logger.info(
-                    f"✅ Трейлинг стоп установлен для {symbol}: {trailing_distance_percent}%",
-                    category='position',
-                    symbol=symbol,
-                    trailing_distance=trailing_distance_percent
-                )
-                
-                return True
-                
-            finally:
-                db.close()
-                
+            # В модели Trade нет колонок трейлинга - настройка живет в менеджере
+            self.trailing_settings[symbol] = trailing_distance_percent
+            
+            # Обновляем в позиции
+            if symbol in self.positions:
+                self.positions[symbol].trailing_stop = True
+                self.positions[symbol].trailing_distance = trailing_distance_percent
+            
+            logger.info(
+                f"✅ Трейлинг стоп установлен для {symbol}: {trailing_distance_percent}%",
+                category='position',
+                symbol=symbol,
+                trailing_distance=trailing_distance_percent
+            )
+            
+            return True
+            
         except Exception as e:
             logger.error(f"❌ Ошибка установки трейлинг стопа для {symbol}: {e}")
             return False
@@ -0,0 +1,208 @@
+"""
+Асинхронный ограничитель запросов (token bucket) для Bybit API v5
+Файл: src/exchange/rate_limiter.py
+
+Моделирует лимиты Bybit:
+- IP лимит: 600 запросов за 5 секунд на все HTTP эндпоинты
+- UID лимиты отдельных эндпоинтов (создание/отмена ордеров, позиции, баланс)
+
+Один общий экземпляр используется всеми компонентами, поэтому
+параллельные запросы автоматически укладываются в бюджет биржи.
+Ограничитель не привязан к циклу событий: токены резервируются под
+threading.Lock, ожидание - обычный asyncio.sleep в цикле вызывающего.
+"""
+import asyncio
+import threading
+import time
+import logging
+from typing import Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Доля официального лимита, которую разрешаем использовать (запас)
+SAFETY_FACTOR = 0.8
+
+# IP лимит Bybit: 600 запросов / 5 секунд
+IP_LIMIT = (600, 5.0)
+
+# UID лимиты эндпоинтов: путь -> (запросов, окно в секундах)
+ENDPOINT_LIMITS: Dict[str, Tuple[int, float]] = {
+    '/v5/order/create': (10, 1.0),
+    '/v5/order/amend': (10, 1.0),
+    '/v5/order/cancel': (10, 1.0),
+    '/v5/order/cancel-all': (10, 1.0),
+    '/v5/order/realtime': (50, 1.0),
+    '/v5/order/history': (50, 1.0),
+    '/v5/position/list': (50, 1.0),
+    '/v5/position/set-leverage': (10, 1.0),
+    '/v5/position/trading-stop': (10, 1.0),
+    '/v5/account/wallet-balance': (50, 1.0),
+}
+
+# Вес одного полного обновления рыночных данных символа
+# (тикер + стакан + сделки + свечи в DataCollector.collect_market_data)
+SYMBOL_REFRESH_WEIGHT = 4
+
+
+class TokenBucket:
+    """
+    Асинхронный token bucket
+
+    Запрос сразу резервирует токены (запас может уйти в минус) и ждет,
+    пока долг не покроется пополнением. Резервы выдаются по порядку
+    вызовов, поэтому очередь остается FIFO без asyncio.Lock, и один
+    bucket можно использовать из нескольких циклов событий и потоков.
+    """
+
+    def __init__(self, rate: float, capacity: float, name: str = 'bucket'):
+        """
+        Args:
+            rate: Скорость пополнения (токенов в секунду)
+            capacity: Максимальный запас токенов (размер всплеска)
+            name: Имя для логов и статистики
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.name = name
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+        # Статистика
+        self.acquired = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+
+    def _refill(self):
+        """Пополнение токенов по прошедшему времени"""
+        now = time.monotonic()
+        elapsed = now - self.last_refill
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.last_refill = now
+
+    async def acquire(self, weight: float = 1.0) -> float:
+        """
+        Получение токенов (ожидает при нехватке)
+
+        Returns:
+            Время ожидания в секундах
+        """
+        weight = min(weight, self.capacity)
+
+        with self._lock:
+            self._refill()
+            self.tokens -= weight
+            waited = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.acquired += 1
+            if waited > 0:
+                self.throttled += 1
+                self.total_wait += waited
+
+        # Отмена во время ожидания не возвращает резерв - бюджет не превышается
+        if waited > 0:
+            await asyncio.sleep(waited)
+        return waited
+
+    def available(self) -> float:
+        """Текущий запас токенов (отрицательный - долг ожидающих запросов)"""
+        with self._lock:
+            self._refill()
+            return self.tokens
+
+    def get_stats(self) -> dict:
+        """Статистика bucket"""
+        return {
+            'rate': self.rate,
+            'capacity': self.capacity,
+            'available': round(self.available(), 2),
+            'acquired': self.acquired,
+            'throttled': self.throttled,
+            'total_wait': round(self.total_wait, 3)
+        }
+
+
+class BybitRateLimiter:
+    """Ограничитель запросов с учетом весов эндпоинтов Bybit"""
+
+    def __init__(self, safety_factor: float = SAFETY_FACTOR):
+        self.safety_factor = safety_factor
+
+        requests, window = IP_LIMIT
+        self.ip_bucket = TokenBucket(
+            rate=requests / window * safety_factor,
+            capacity=requests / window * safety_factor,
+            name='ip'
+        )
+        self.endpoint_buckets: Dict[str, TokenBucket] = {}
+        for endpoint, (requests, window) in ENDPOINT_LIMITS.items():
+            rate = max(requests / window * safety_factor, 1.0)
+            self.endpoint_buckets[endpoint] = TokenBucket(rate=rate, capacity=rate, name=endpoint)
+
+        logger.info(f"✅ BybitRateLimiter инициализирован "
+                    f"(IP: {self.ip_bucket.rate:.0f} req/s, эндпоинтов: {len(self.endpoint_buckets)})")
+
+    async def acquire(self, endpoint: str = '', weight: float = 1.0) -> float:
+        """
+        Ожидание бюджета для запроса к эндпоинту
+
+        Args:
+            endpoint: Путь эндпоинта (например '/v5/market/kline')
+            weight: Количество запросов, которое резервируется
+
+        Returns:
+            Суммарное время ожидания в секундах
+        """
+        waited = 0.0
+        bucket = self.endpoint_buckets.get(endpoint)
+        if bucket:
+            waited += await bucket.acquire(weight)
+        waited += await self.ip_bucket.acquire(weight)
+        return waited
+
+    def max_concurrency(self, endpoint: str = '', weight: float = 1.0) -> int:
+        """
+        Сколько задач с данным весом можно запустить одновременно,
+        не выходя за бюджет одного окна пополнения
+        """
+        capacity = self.ip_bucket.capacity
+        bucket = self.endpoint_buckets.get(endpoint)
+        if bucket:
+            capacity = min(capacity, bucket.capacity)
+        return max(1, int(capacity // max(weight, 1.0)))
+
+    def get_stats(self) -> dict:
+        """Статистика ограничителя"""
+        return {
+            'ip': self.ip_bucket.get_stats(),
+            'endpoints': {
+                endpoint: bucket.get_stats()
+                for endpoint, bucket in self.endpoint_buckets.items()
+                if bucket.acquired
+            }
+        }
+
+
+# =================================================================
+# ГЛОБАЛЬНЫЕ ФУНКЦИИ
+# =================================================================
+
+# Глобальный экземпляр
+rate_limiter = None
+
+def get_rate_limiter() -> BybitRateLimiter:
+    """Получить общий экземпляр ограничителя запросов"""
+    global rate_limiter
+
+    if rate_limiter is None:
+        rate_limiter = BybitRateLimiter()
+
+    return rate_limiter
+
+# Экспорты
+__all__ = [
+    'TokenBucket',
+    'BybitRateLimiter',
+    'get_rate_limiter',
+    'SYMBOL_REFRESH_WEIGHT'
+]
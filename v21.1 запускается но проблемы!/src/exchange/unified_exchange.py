@@ -186,6 +186,7 @@ class UnifiedExchangeClient(BaseExchangeClient):
         self.connection_attempts = 0
         self.max_connection_attempts = 3
         self._session = None
+        self._v5_client = None  # BybitClientV5 для пакетных запросов (создается по требованию)
         self._setup_connection_pool()
         
         
@@ -510,6 +511,10 @@ class UnifiedExchangeClient(BaseExchangeClient):
         Из: real_client.py
         """
         try:
+            if self._v5_client:
+                await self._v5_client.close_session()
+                self._v5_client = None
+            
             if self.exchange:
                 # CCXT не требует явного закрытия, но обнуляем переменные
                 self.exchange = None
@@ -610,6 +615,80 @@ class UnifiedExchangeClient(BaseExchangeClient):
             logger.error(f"❌ Ошибка получения тикера {symbol}: {e}")
             return {'error': str(e)}
     
+    async def fetch_tickers(self, symbols: Optional[List[str]] = None,
+                            category: str = 'linear') -> Dict[str, Dict[str, Any]]:
+        """
+        Тикеры всех символов категории одним запросом
+        
+        Bybit V5 /v5/market/tickers без symbol (BybitClientV5.get_tickers),
+        запрос проходит через общий лимитер клиента V5.
+        
+        Args:
+            symbols: Нужные символы в формате Bybit ('BTCUSDT'); None - все
+            category: Категория Bybit ('linear', 'spot', ...)
+            
+        Returns:
+            {symbol: тикер в формате fetch_ticker ('last', 'bid', 'ask', ...)}
+        """
+        client = self._get_v5_client()
+        if client is None:
+            return {}
+        
+        try:
+            response = await client.get_tickers(category)
+        except Exception as e:
+            logger.error(f"❌ Ошибка получения тикеров {category}: {e}")
+            return {}
+        
+        if response.get('retCode') != 0:
+            logger.warning(f"⚠️ Bybit get_tickers: {response.get('retMsg')}")
+            return {}
+        
+        wanted = set(symbols) if symbols is not None else None
+        tickers = {}
+        for item in response.get('result', {}).get('list', []):
+            symbol = item.get('symbol')
+            if symbol and (wanted is None or symbol in wanted):
+                tickers[symbol] = self._format_v5_ticker(item)
+        
+        return tickers
+    
+    def _get_v5_client(self):
+        """Клиент Bybit V5 (создается при первом пакетном запросе)"""
+        if self.current_exchange != 'bybit':
+            return None
+        
+        if self._v5_client is None:
+            try:
+                from .bybit_client_v5 import create_bybit_client_from_env
+                self._v5_client = create_bybit_client_from_env()
+            except Exception as e:
+                logger.error(f"❌ Клиент Bybit V5 недоступен: {e}")
+                return None
+        
+        return self._v5_client
+    
+    @staticmethod
+    def _format_v5_ticker(item: Dict[str, Any]) -> Dict[str, Any]:
+        """Тикер Bybit V5 -> формат fetch_ticker"""
+        def number(key: str) -> Optional[float]:
+            value = item.get(key)
+            return float(value) if value not in (None, '') else None
+        
+        change = number('price24hPcnt')
+        return {
+            'symbol': item.get('symbol'),
+            'last': number('lastPrice'),
+            'bid': number('bid1Price'),
+            'ask': number('ask1Price'),
+            'baseVolume': number('volume24h'),
+            'quoteVolume': number('turnover24h'),
+            'percentage': change * 100 if change is not None else None,
+            'high': number('highPrice24h'),
+            'low': number('lowPrice24h'),
+            'timestamp': int(time.time() * 1000)
+        }
+    
     async def get_order_book(self, symbol: str, limit: int = 20) -> Dict[str, Any]:
         """
         Получение стакана заявок
@@ -16,6 +16,17 @@ from .unified_indicators import (
     LINEARREG, LINEARREG_ANGLE, LINEARREG_SLOPE,
     STDDEV, TSF, VAR, USE_TALIB, HAS_PANDAS_TA
 )
+from .incremental import (
+    IncrementalIndicator, IncrementalIndicatorSet, INCREMENTAL_INDICATORS,
+    IncrementalSMA, IncrementalEMA, IncrementalRSI, IncrementalMACD,
+    IncrementalBBANDS, IncrementalROC, IncrementalATR, IncrementalSTOCH,
+    IncrementalWILLR, IncrementalADX, IncrementalOBV, IncrementalMFI
+)
+from .batch import (
+    BATCH_INDICATORS, stack_series, stack_market_data, unstack_row,
+    compute_batch, latest
+)
+from .memo import IndicatorMemo, IndicatorContext, get_indicator_memo
 
 # Алиасы для совместимости
 TechnicalIndicators = UnifiedIndicators
@@ -33,5 +44,12 @@ __all__ = [
     'CDL3WHITESOLDIERS', 'CDL3BLACKCROWS', 'CDL3INSIDE',
     'AVGPRICE', 'MEDPRICE', 'TYPPRICE', 'WCLPRICE',
     'LINEARREG', 'LINEARREG_ANGLE', 'LINEARREG_SLOPE',
-    'STDDEV', 'TSF', 'VAR', 'USE_TALIB', 'HAS_PANDAS_TA'
+    'STDDEV', 'TSF', 'VAR', 'USE_TALIB', 'HAS_PANDAS_TA',
+    'IncrementalIndicator', 'IncrementalIndicatorSet', 'INCREMENTAL_INDICATORS',
+    'IncrementalSMA', 'IncrementalEMA', 'IncrementalRSI', 'IncrementalMACD',
+    'IncrementalBBANDS', 'IncrementalROC', 'IncrementalATR', 'IncrementalSTOCH',
+    'IncrementalWILLR', 'IncrementalADX', 'IncrementalOBV', 'IncrementalMFI',
+    'BATCH_INDICATORS', 'stack_series', 'stack_market_data', 'unstack_row',
+    'compute_batch', 'latest',
+    'IndicatorMemo', 'IndicatorContext', 'get_indicator_memo'
 ]
\ No newline at end of file
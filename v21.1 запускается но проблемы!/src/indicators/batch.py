@@ -0,0 +1,144 @@
+"""
+Пакетный расчет индикаторов для многих символов
+Файл: src/indicators/batch.py
+
+Ряды символов складываются в матрицу (символы × бары), выровненную
+по последнему бару; короткие ряды дополняются NaN слева. Ядра NumPy
+считают по последней оси, поэтому каждый индикатор для всех символов -
+один векторный проход вместо отдельного pandas-конвейера на символ.
+
+Значения совпадают с ручными формулами unified_indicators для каждого
+ряда по отдельности (TA-Lib работает только с 1-D и здесь не используется).
+"""
+import logging
+from typing import Dict, Optional, Tuple, List, Union, Sequence, Mapping
+
+import numpy as np
+import pandas as pd
+
+from . import numpy_kernels as kernels
+
+logger = logging.getLogger(__name__)
+
+ArrayLike = Union[pd.Series, np.ndarray, Sequence[float]]
+
+CANDLE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+# Индикатор -> (ядро, входные колонки)
+BATCH_INDICATORS = {
+    'sma': (kernels.SMA, ('close',)),
+    'ema': (kernels.EMA, ('close',)),
+    'rsi': (kernels.RSI, ('close',)),
+    'macd': (kernels.MACD, ('close',)),
+    'bbands': (kernels.BBANDS, ('close',)),
+    'roc': (kernels.ROC, ('close',)),
+    'stddev': (kernels.STDDEV, ('close',)),
+    'atr': (kernels.ATR, ('high', 'low', 'close')),
+    'stoch': (kernels.STOCH, ('high', 'low', 'close')),
+    'adx': (kernels.ADX, ('high', 'low', 'close')),
+    'cci': (kernels.CCI, ('high', 'low', 'close')),
+    'willr': (kernels.WILLR, ('high', 'low', 'close')),
+    'obv': (kernels.OBV, ('close', 'volume')),
+    'mfi': (kernels.MFI, ('high', 'low', 'close', 'volume')),
+}
+
+
+# =================================================================
+# ПОДГОТОВКА МАТРИЦ
+# =================================================================
+
+def stack_series(series: Sequence[ArrayLike], length: Optional[int] = None) -> np.ndarray:
+    """
+    Матрица (ряды × бары), выровненная по последнему бару
+
+    Args:
+        series: Ряды разной длины
+        length: Сколько последних баров брать (по умолчанию - длина самого длинного)
+    """
+    arrays = [np.asarray(s, dtype=np.float64) for s in series]
+    if length is None:
+        length = max((len(a) for a in arrays), default=0)
+
+    matrix = np.full((len(arrays), length), np.nan)
+    for row, values in enumerate(arrays):
+        tail = values[-length:] if length else values[:0]
+        if len(tail):
+            matrix[row, length - len(tail):] = tail
+    return matrix
+
+
+def stack_market_data(market_data: Mapping[str, Mapping[str, ArrayLike]],
+                      fields: Sequence[str] = CANDLE_FIELDS,
+                      length: Optional[int] = None) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    """
+    Колонки свечей многих символов -> матрицы по полям
+
+    Args:
+        market_data: {symbol: {'close': [...], 'volume': [...], ...}}
+        fields: Какие поля складывать
+        length: Сколько последних баров брать
+
+    Returns:
+        (список символов в порядке строк, {поле: матрица})
+    """
+    symbols = list(market_data)
+    matrices = {
+        field: stack_series([market_data[symbol][field] for symbol in symbols], length)
+        for field in fields
+    }
+    return symbols, matrices
+
+
+def unstack_row(matrix: np.ndarray, row: int, length: int) -> np.ndarray:
+    """Ряд символа без выравнивающих NaN (последние length баров)"""
+    return matrix[row, matrix.shape[-1] - length:] if length else matrix[row, :0]
+
+
+# =================================================================
+# РАСЧЕТ
+# =================================================================
+
+def compute_batch(matrices: Mapping[str, np.ndarray],
+                  spec: Mapping[str, Tuple]) -> Dict[str, Union[np.ndarray, Tuple[np.ndarray, ...]]]:
+    """
+    Расчет набора индикаторов для всех строк матриц
+
+    Args:
+        matrices: {'close': (N × L), 'high': ..., ...}
+        spec: {имя: (индикатор, параметры[, входные колонки])}, как в
+              IncrementalIndicatorSet, например {'rsi_14': ('rsi', {'timeperiod': 14})}
+              или {'volume_sma': ('sma', {'timeperiod': 20}, ('volume',))}
+
+    Returns:
+        {имя: матрица (N × L) или кортеж матриц для MACD/BBANDS/STOCH}
+    """
+    results = {}
+    for name, (kind, params, *columns) in spec.items():
+        if kind not in BATCH_INDICATORS:
+            raise ValueError(f"Неизвестный индикатор: {kind}")
+        kernel, inputs = BATCH_INDICATORS[kind]
+        inputs = columns[0] if columns else inputs
+        results[name] = kernel(*(matrices[column] for column in inputs), **params)
+    return results
+
+
+def latest(results: Mapping[str, Union[np.ndarray, Tuple[np.ndarray, ...]]],
+           offset: int = 1) -> Dict[str, Union[np.ndarray, Tuple[np.ndarray, ...]]]:
+    """Значения на баре -offset для всех символов (вектор длины N)"""
+    values = {}
+    for name, result in results.items():
+        if isinstance(result, tuple):
+            values[name] = tuple(component[..., -offset] for component in result)
+        else:
+            values[name] = result[..., -offset]
+    return values
+
+
+__all__ = [
+    'BATCH_INDICATORS',
+    'stack_series',
+    'stack_market_data',
+    'unstack_row',
+    'compute_batch',
+    'latest'
+]
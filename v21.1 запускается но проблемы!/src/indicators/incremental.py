@@ -0,0 +1,889 @@
+"""
+Инкрементальные (потоковые) индикаторы
+Файл: src/indicators/incremental.py
+
+Каждый индикатор хранит свое состояние и пересчитывается за O(1)
+на новый закрытый бар вместо полного пересчета серии.
+
+Значения совпадают с batch-функциями из unified_indicators в той же
+конфигурации. Режим задает параметр talib_compat (по умолчанию USE_TALIB):
+
+- talib_compat=False - как ручные реализации: простые скользящие средние
+  в RSI/ATR/ADX, EMA от первого значения (MACD - ewm(span, adjust=True)),
+  выборочное std (ddof=1) в BBANDS, NaN при нулевом диапазоне STOCH/WILLR.
+- talib_compat=True - как TA-Lib: сглаживание Уайлдера с затравкой
+  простым средним в RSI/ATR/ADX, EMA/MACD с затравкой SMA, std генеральной
+  совокупности (ddof=0) в BBANDS, 0 при нулевом диапазоне, тот же прогрев
+  (NaN до lookback TA-Lib).
+
+Ручные реализации и TA-Lib расходятся на прогреве и по сглаживанию
+(Уайлдер против простого среднего), поэтому между режимами значения
+RSI/ATR/ADX/MACD/BBANDS отличаются и после прогрева. SMA/ROC/OBV
+одинаковы в обоих режимах.
+"""
+import math
+import logging
+from collections import deque
+from typing import Dict, Any, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .unified_indicators import USE_TALIB
+
+logger = logging.getLogger(__name__)
+
+NAN = float('nan')
+
+# Как часто (в барах) окно с дисперсией пересчитывает ее точно по значениям
+RECENTER_INTERVAL = 1024
+
+
+def _talib_compat(value: Optional[bool]) -> bool:
+    """Режим совместимости с TA-Lib (None - как batch-функции сейчас)"""
+    return USE_TALIB if value is None else bool(value)
+
+
+def _is_zero(value: float) -> bool:
+    """Проверка на ноль с допуском TA_IS_ZERO из TA-Lib"""
+    return -1e-14 < value < 1e-14
+
+
+# =================================================================
+# ВСПОМОГАТЕЛЬНЫЕ ОКНА
+# =================================================================
+
+class _RollingWindow:
+    """
+    Скользящая сумма (и дисперсия) за окно фиксированной длины
+
+    Как pandas rolling(window) с min_periods=window: пока окно не заполнено
+    или в нем есть NaN - результат NaN. Дисперсия ведется обновлениями
+    Уэлфорда (добавление/удаление значения), а не через sumsq - sum^2/n,
+    которая на длинных рядах с большим уровнем цены теряет точность.
+    Значения берутся относительно сдвига (уровня цены), а раз в
+    RECENTER_INTERVAL баров окно пересчитывается точно и сдвиг переносится
+    в его среднее - ошибка округления не накапливается.
+    """
+
+    def __init__(self, period: int, track_variance: bool = False):
+        if period < 1:
+            raise ValueError("period должен быть >= 1")
+        self.period = period
+        self.track_variance = track_variance
+        self.reset()
+
+    def reset(self):
+        self._values = deque()
+        self._sum = 0.0
+        self._count = 0
+        self._shift: Optional[float] = None
+        self._mean = 0.0        # среднее относительно _shift
+        self._m2 = 0.0
+        self._nans = 0
+        self._pushes = 0
+
+    def push(self, value: float):
+        if len(self._values) == self.period:
+            self._remove(self._values.popleft())
+        self._values.append(value)
+        self._add(value)
+        self._pushes += 1
+        if self.track_variance and self._pushes % RECENTER_INTERVAL == 0:
+            self._recenter()
+
+    def _recenter(self):
+        """Точный пересчет суммы, среднего и M2 по значениям окна"""
+        values = [value for value in self._values if not math.isnan(value)]
+        self._count = len(values)
+        self._sum = math.fsum(values)
+        if not self._count:
+            self._shift, self._mean, self._m2 = None, 0.0, 0.0
+            return
+        self._shift = self._sum / self._count
+        self._mean = math.fsum(value - self._shift for value in values) / self._count
+        self._m2 = math.fsum((value - self._shift - self._mean) ** 2 for value in values)
+
+    def _add(self, value: float):
+        if math.isnan(value):
+            self._nans += 1
+            return
+        self._sum += value
+        self._count += 1
+        if self.track_variance:
+            if self._shift is None:
+                self._shift = value
+            value -= self._shift
+            delta = value - self._mean
+            self._mean += delta / self._count
+            self._m2 += delta * (value - self._mean)
+
+    def _remove(self, value: float):
+        if math.isnan(value):
+            self._nans -= 1
+            return
+        self._sum -= value
+        self._count -= 1
+        if self.track_variance:
+            if self._count == 0:
+                self._shift, self._mean, self._m2 = None, 0.0, 0.0
+                return
+            value -= self._shift
+            delta = value - self._mean
+            self._mean -= delta / self._count
+            self._m2 -= delta * (value - self._mean)
+
+    @property
+    def ready(self) -> bool:
+        return len(self._values) == self.period and self._nans == 0
+
+    def sum(self) -> float:
+        return self._sum if self.ready else NAN
+
+    def mean(self) -> float:
+        return self._sum / self.period if self.ready else NAN
+
+    def std(self, ddof: int = 1) -> float:
+        """Стандартное отклонение (ddof=1 - выборочное, как pandas; 0 - как TA-Lib)"""
+        if not self.ready or self.period <= ddof:
+            return NAN
+        return math.sqrt(max(self._m2, 0.0) / (self.period - ddof))
+
+
+class _RollingExtremum:
+    """Скользящий максимум/минимум за O(1) амортизированно (монотонная очередь)"""
+
+    def __init__(self, period: int, mode: str = 'max'):
+        if mode not in ('max', 'min'):
+            raise ValueError("mode должен быть 'max' или 'min'")
+        self.period = period
+        self.mode = mode
+        self.reset()
+
+    def reset(self):
+        self._queue = deque()   # (index, value)
+        self._index = 0
+
+    def push(self, value: float):
+        if self.mode == 'max':
+            while self._queue and self._queue[-1][1] <= value:
+                self._queue.pop()
+        else:
+            while self._queue and self._queue[-1][1] >= value:
+                self._queue.pop()
+
+        self._queue.append((self._index, value))
+        if self._queue[0][0] <= self._index - self.period:
+            self._queue.popleft()
+        self._index += 1
+
+    @property
+    def ready(self) -> bool:
+        return self._index >= self.period
+
+    def value(self) -> float:
+        return self._queue[0][1] if self.ready else NAN
+
+
+# =================================================================
+# БАЗОВЫЙ КЛАСС
+# =================================================================
+
+class IncrementalIndicator:
+    """
+    Базовый класс потокового индикатора
+
+    - update(...): добавить закрытый бар и получить новое значение
+    - value: последнее значение (NaN пока идет прогрев)
+    - run(...): прогнать массивы целиком (прогрев из истории)
+    """
+
+    # Имена входных колонок свечи, которые принимает update()
+    inputs: Tuple[str, ...] = ('close',)
+
+    def __init__(self):
+        self.value: Any = NAN
+        self.bars = 0
+
+    def update(self, *args: float) -> Any:
+        raise NotImplementedError
+
+    def reset(self):
+        raise NotImplementedError
+
+    @property
+    def ready(self) -> bool:
+        value = self.value
+        if isinstance(value, tuple):
+            return not any(math.isnan(v) for v in value)
+        return not math.isnan(value)
+
+    def update_candle(self, candle: Dict[str, Any]) -> Any:
+        """Обновление из словаря свечи {'open': ..., 'close': ...}"""
+        return self.update(*(float(candle[name]) for name in self.inputs))
+
+    def run(self, *series: Union[pd.Series, np.ndarray]) -> Union[np.ndarray, Tuple[np.ndarray, ...]]:
+        """
+        Прогон серий через индикатор (продолжает текущее состояние)
+
+        Returns:
+            Массив значений (или кортеж массивов для многокомпонентных)
+        """
+        columns = [np.asarray(s, dtype=np.float64) for s in series]
+        results = [self.update(*row) for row in zip(*columns)]
+        if results and isinstance(results[0], tuple):
+            return tuple(np.array(values, dtype=np.float64) for values in zip(*results))
+        return np.array(results, dtype=np.float64)
+
+
+# =================================================================
+# ИНДИКАТОРЫ ПО ЦЕНЕ ЗАКРЫТИЯ
+# =================================================================
+
+class IncrementalSMA(IncrementalIndicator):
+    """Simple Moving Average (как SMA)"""
+
+    def __init__(self, timeperiod: int = 30):
+        super().__init__()
+        self.timeperiod = timeperiod
+        self._window = _RollingWindow(timeperiod)
+
+    def update(self, close: float) -> float:
+        self._window.push(close)
+        self.bars += 1
+        self.value = self._window.mean()
+        return self.value
+
+    def reset(self):
+        self.__init__(self.timeperiod)
+
+
+class IncrementalEMA(IncrementalIndicator):
+    """
+    Exponential Moving Average
+
+    adjust=False - как ручная EMA() (рекурсивная формула, старт с первого значения)
+    adjust=True - как pandas ewm(span).mean() в ручной реализации MACD
+    talib_compat=True - как TA-Lib: первое значение на баре timeperiod-1
+    равно SMA первых timeperiod значений (adjust не учитывается)
+    """
+
+    def __init__(self, timeperiod: int = 30, adjust: bool = False,
+                 talib_compat: Optional[bool] = None):
+        super().__init__()
+        self.timeperiod = timeperiod
+        self.adjust = adjust
+        self.talib_compat = _talib_compat(talib_compat)
+        self.alpha = 2.0 / (timeperiod + 1)
+        self._numerator = 0.0
+        self._denominator = 0.0
+
+    def update(self, close: float) -> float:
+        decay = 1.0 - self.alpha
+        if self.talib_compat:
+            if self.bars < self.timeperiod:
+                # Затравка: сумма первых timeperiod значений
+                self._numerator += close
+                self.value = self._numerator / self.timeperiod if self.bars == self.timeperiod - 1 else NAN
+            else:
+                self.value = (close - self.value) * self.alpha + self.value
+        elif self.adjust:
+            self._numerator = self._numerator * decay + close
+            self._denominator = self._denominator * decay + 1.0
+            self.value = self._numerator / self._denominator
+        elif self.bars == 0:
+            self.value = close
+        else:
+            self.value = self.value * decay + close * self.alpha
+        self.bars += 1
+        return self.value
+
+    def reset(self):
+        self.__init__(self.timeperiod, self.adjust, self.talib_compat)
+
+
+class IncrementalRSI(IncrementalIndicator):
+    """
+    Relative Strength Index
+
+    Ручной режим - простое среднее приростов/потерь за окно (как RSI без TA-Lib).
+    talib_compat - сглаживание Уайлдера, затравка средним первых timeperiod
+    изменений, первое значение на баре timeperiod (как talib.RSI).
+    """
+
+    def __init__(self, timeperiod: int = 14, talib_compat: Optional[bool] = None):
+        super().__init__()
+        self.timeperiod = timeperiod
+        self.talib_compat = _talib_compat(talib_compat)
+        self._gains = _RollingWindow(timeperiod)
+        self._losses = _RollingWindow(timeperiod)
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+        self._prev_close: Optional[float] = None
+
+    def update(self, close: float) -> float:
+        if self.talib_compat:
+            return self._update_wilder(close)
+
+        # Первый бар дает нулевые прирост и потерю (как delta.where(...) в batch)
+        delta = 0.0 if self._prev_close is None else close - self._prev_close
+        self._prev_close = close
+
+        self._gains.push(delta if delta > 0 else 0.0)
+        self._losses.push(-delta if delta < 0 else 0.0)
+        self.bars += 1
+
+        gain = self._gains.mean()
+        loss = self._losses.mean()
+        if math.isnan(gain) or math.isnan(loss):
+            self.value = NAN
+        elif loss == 0:
+            self.value = NAN if gain == 0 else 100.0
+        else:
+            self.value = 100.0 - 100.0 / (1.0 + gain / loss)
+        return self.value
+
+    def _update_wilder(self, close: float) -> float:
+        period = self.timeperiod
+        prev_close, self._prev_close = self._prev_close, close
+        self.bars += 1
+        if prev_close is None:
+            self.value = NAN
+            return self.value
+
+        delta = close - prev_close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        changes = self.bars - 1
+        if changes < period:
+            self._avg_gain += gain
+            self._avg_loss += loss
+            self.value = NAN
+            return self.value
+        if changes == period:
+            self._avg_gain = (self._avg_gain + gain) / period
+            self._avg_loss = (self._avg_loss + loss) / period
+        else:
+            self._avg_gain = (self._avg_gain * (period - 1) + gain) / period
+            self._avg_loss = (self._avg_loss * (period - 1) + loss) / period
+
+        total = self._avg_gain + self._avg_loss
+        self.value = 0.0 if _is_zero(total) else 100.0 * (self._avg_gain / total)
+        return self.value
+
+    def reset(self):
+        self.__init__(self.timeperiod, self.talib_compat)
+
+
+class IncrementalMACD(IncrementalIndicator):
+    """
+    MACD: (macd, signal, histogram)
+
+    Ручной режим - как ручная реализация MACD (ewm(span, adjust=True)).
+    talib_compat - как talib.MACD: EMA с затравкой SMA, быстрая EMA
+    начинается так, чтобы ее первое значение пришлось на бар slowperiod-1,
+    все три ряда - NaN до бара slowperiod + signalperiod - 2.
+    """
+
+    def __init__(self, fastperiod: int = 12, slowperiod: int = 26, signalperiod: int = 9,
+                 talib_compat: Optional[bool] = None):
+        super().__init__()
+        self.fastperiod = fastperiod
+        self.slowperiod = slowperiod
+        self.signalperiod = signalperiod
+        self.talib_compat = _talib_compat(talib_compat)
+        adjust = not self.talib_compat
+        self._fast = IncrementalEMA(fastperiod, adjust=adjust, talib_compat=self.talib_compat)
+        self._slow = IncrementalEMA(slowperiod, adjust=adjust, talib_compat=self.talib_compat)
+        self._signal = IncrementalEMA(signalperiod, adjust=adjust, talib_compat=self.talib_compat)
+        self.value = (NAN, NAN, NAN)
+
+    def update(self, close: float) -> Tuple[float, float, float]:
+        if self.talib_compat:
+            return self._update_talib(close)
+
+        macd = self._fast.update(close) - self._slow.update(close)
+        signal = self._signal.update(macd)
+        self.bars += 1
+        self.value = (macd, signal, macd - signal)
+        return self.value
+
+    def _update_talib(self, close: float) -> Tuple[float, float, float]:
+        slow = self._slow.update(close)
+        if self.bars >= self.slowperiod - self.fastperiod:
+            fast = self._fast.update(close)
+        else:
+            fast = NAN
+        self.bars += 1
+
+        if math.isnan(slow) or math.isnan(fast):
+            self.value = (NAN, NAN, NAN)
+            return self.value
+
+        macd = fast - slow
+        signal = self._signal.update(macd)
+        self.value = (NAN, NAN, NAN) if math.isnan(signal) else (macd, signal, macd - signal)
+        return self.value
+
+    def reset(self):
+        self.__init__(self.fastperiod, self.slowperiod, self.signalperiod, self.talib_compat)
+
+
+class IncrementalBBANDS(IncrementalIndicator):
+    """
+    Bollinger Bands: (upper, middle, lower), как BBANDS
+
+    Ручной режим - выборочное std (ddof=1, pandas rolling.std),
+    talib_compat - std генеральной совокупности (ddof=0, как talib.BBANDS).
+    """
+
+    def __init__(self, timeperiod: int = 20, nbdevup: float = 2, nbdevdn: float = 2,
+                 talib_compat: Optional[bool] = None):
+        super().__init__()
+        self.timeperiod = timeperiod
+        self.nbdevup = nbdevup
+        self.nbdevdn = nbdevdn
+        self.talib_compat = _talib_compat(talib_compat)
+        self._ddof = 0 if self.talib_compat else 1
+        self._window = _RollingWindow(timeperiod, track_variance=True)
+        self.value = (NAN, NAN, NAN)
+
+    def update(self, close: float) -> Tuple[float, float, float]:
+        self._window.push(close)
+        self.bars += 1
+        middle = self._window.mean()
+        std = self._window.std(self._ddof)
+        self.value = (middle + std * self.nbdevup, middle, middle - std * self.nbdevdn)
+        return self.value
+
+    def reset(self):
+        self.__init__(self.timeperiod, self.nbdevup, self.nbdevdn, self.talib_compat)
+
+
+class IncrementalROC(IncrementalIndicator):
+    """Rate of Change в процентах, как ROC"""
+
+    def __init__(self, timeperiod: int = 10):
+        super().__init__()
+        self.timeperiod = timeperiod
+        self._history = deque(maxlen=timeperiod + 1)
+
+    def update(self, close: float) -> float:
+        self._history.append(close)
+        self.bars += 1
+        if len(self._history) <= self.timeperiod or self._history[0] == 0:
+            self.value = NAN
+        else:
+            self.value = (close / self._history[0] - 1.0) * 100
+        return self.value
+
+    def reset(self):
+        self.__init__(self.timeperiod)
+
+
+# =================================================================
+# ИНДИКАТОРЫ ПО HIGH/LOW/CLOSE/VOLUME
+# =================================================================
+
+class IncrementalATR(IncrementalIndicator):
+    """
+    Average True Range
+
+    Ручной режим - простое среднее TR (TR первого бара = high - low).
+    talib_compat - сглаживание Уайлдера, затравка средним TR баров
+    1..timeperiod, первое значение на баре timeperiod (как talib.ATR).
+    """
+
+    inputs = ('high', 'low', 'close')
+
+    def __init__(self, timeperiod: int = 14, talib_compat: Optional[bool] = None):
+        super().__init__()
+        self.timeperiod = timeperiod
+        self.talib_compat = _talib_compat(talib_compat)
+        self._window = _RollingWindow(timeperiod)
+        self._total = 0.0
+        self._prev_close: Optional[float] = None
+
+    def update(self, high: float, low: float, close: float) -> float:
+        true_range = high - low
+        prev_close, self._prev_close = self._prev_close, close
+        if prev_close is not None:
+            true_range = max(true_range, abs(high - prev_close), abs(low - prev_close))
+        self.bars += 1
+
+        if self.talib_compat:
+            self.value = self._update_wilder(true_range, prev_close is None)
+            return self.value
+
+        self._window.push(true_range)
+        self.value = self._window.mean()
+        return self.value
+
+    def _update_wilder(self, true_range: float, first_bar: bool) -> float:
+        period = self.timeperiod
+        if first_bar:
+            # У первого бара TA-Lib не считает TR
+            return NAN
+        if period <= 1:
+            return true_range
+        ranges = self.bars - 1
+        if ranges < period:
+            self._total += true_range
+            return NAN
+        if ranges == period:
+            return (self._total + true_range) / period
+        return (self.value * (period - 1) + true_range) / period
+
+    def reset(self):
+        self.__init__(self.timeperiod, self.talib_compat)
+
+
+class IncrementalSTOCH(IncrementalIndicator):
+    """
+    Stochastic Oscillator: (slowk, slowd), как STOCH
+
+    talib_compat - fastk = 0 при нулевом диапазоне, slowk тоже NaN,
+    пока не готов slowd (как talib.STOCH).
+    """
+
+    inputs = ('high', 'low', 'close')
+
+    def __init__(self, fastk_period: int = 5, slowk_period: int = 3, slowd_period: int = 3,
+                 talib_compat: Optional[bool] = None):
+        super().__init__()
+        self.fastk_period = fastk_period
+        self.slowk_period = slowk_period
+        self.slowd_period = slowd_period
+        self.talib_compat = _talib_compat(talib_compat)
+        self._highest = _RollingExtremum(fastk_period, 'max')
+        self._lowest = _RollingExtremum(fastk_period, 'min')
+        self._slowk = _RollingWindow(slowk_period)
+        self._slowd = _RollingWindow(slowd_period)
+        self.value = (NAN, NAN)
+
+    def update(self, high: float, low: float, close: float) -> Tuple[float, float]:
+        self._highest.push(high)
+        self._lowest.push(low)
+        highest_high = self._highest.value()
+        lowest_low = self._lowest.value()
+
+        price_range = highest_high - lowest_low
+        if price_range:
+            fastk = 100 * (close - lowest_low) / price_range
+        else:
+            fastk = 0.0 if self.talib_compat and not math.isnan(price_range) else NAN
+
+        self._slowk.push(fastk)
+        slowk = self._slowk.mean()
+        self._slowd.push(slowk)
+        slowd = self._slowd.mean()
+        self.bars += 1
+        if self.talib_compat and math.isnan(slowd):
+            slowk = NAN
+        self.value = (slowk, slowd)
+        return self.value
+
+    def reset(self):
+        self.__init__(self.fastk_period, self.slowk_period, self.slowd_period, self.talib_compat)
+
+
+class IncrementalWILLR(IncrementalIndicator):
+    """Williams %R, как WILLR (talib_compat - 0 при нулевом диапазоне)"""
+
+    inputs = ('high', 'low', 'close')
+
+    def __init__(self, timeperiod: int = 14, talib_compat: Optional[bool] = None):
+        super().__init__()
+        self.timeperiod = timeperiod
+        self.talib_compat = _talib_compat(talib_compat)
+        self._highest = _RollingExtremum(timeperiod, 'max')
+        self._lowest = _RollingExtremum(timeperiod, 'min')
+
+    def update(self, high: float, low: float, close: float) -> float:
+        self._highest.push(high)
+        self._lowest.push(low)
+        highest_high = self._highest.value()
+        price_range = highest_high - self._lowest.value()
+        self.bars += 1
+        if price_range:
+            self.value = -100 * (highest_high - close) / price_range
+        else:
+            self.value = 0.0 if self.talib_compat and not math.isnan(price_range) else NAN
+        return self.value
+
+    def reset(self):
+        self.__init__(self.timeperiod, self.talib_compat)
+
+
+class IncrementalADX(IncrementalIndicator):
+    """
+    Average Directional Index
+
+    Ручной режим - простые средние TR/DM/DX (как ручная реализация ADX).
+    talib_compat - как talib.ADX: суммы TR/DM сглаживаются по Уайлдеру
+    (затравка - сумма первых timeperiod-1 значений), первый ADX - среднее
+    DX следующих timeperiod баров, дальше сглаживание Уайлдера; первое
+    значение на баре 2 * timeperiod - 1.
+    """
+
+    inputs = ('high', 'low', 'close')
+
+    def __init__(self, timeperiod: int = 14, talib_compat: Optional[bool] = None):
+        super().__init__()
+        self.timeperiod = timeperiod
+        self.talib_compat = _talib_compat(talib_compat)
+        self._tr = _RollingWindow(timeperiod)
+        self._dm_plus = _RollingWindow(timeperiod)
+        self._dm_minus = _RollingWindow(timeperiod)
+        self._dx = _RollingWindow(timeperiod)
+        self._prev: Optional[Tuple[float, float, float]] = None
+        # Состояние режима TA-Lib: суммы Уайлдера и накопленный DX
+        self._sum_tr = 0.0
+        self._sum_dm_plus = 0.0
+        self._sum_dm_minus = 0.0
+        self._sum_dx = 0.0
+        self.plus_di = NAN
+        self.minus_di = NAN
+
+    def update(self, high: float, low: float, close: float) -> float:
+        if self.talib_compat:
+            return self._update_wilder(high, low, close)
+
+        if self._prev is None:
+            # У первого бара нет предыдущего close - TR не определен
+            true_range, dm_plus, dm_minus = NAN, 0.0, 0.0
+        else:
+            prev_high, prev_low, prev_close = self._prev
+            true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+            up_move = high - prev_high
+            down_move = prev_low - low
+            dm_plus = max(up_move, 0.0) if up_move > down_move else 0.0
+            dm_minus = max(down_move, 0.0) if down_move > up_move else 0.0
+        self._prev = (high, low, close)
+
+        self._tr.push(true_range)
+        self._dm_plus.push(dm_plus)
+        self._dm_minus.push(dm_minus)
+
+        atr = self._tr.mean()
+        if math.isnan(atr) or atr == 0:
+            self.plus_di = self.minus_di = NAN
+        else:
+            self.plus_di = 100 * self._dm_plus.mean() / atr
+            self.minus_di = 100 * self._dm_minus.mean() / atr
+
+        di_sum = self.plus_di + self.minus_di
+        dx = 100 * abs(self.plus_di - self.minus_di) / di_sum if di_sum else NAN
+
+        self._dx.push(dx)
+        self.bars += 1
+        self.value = self._dx.mean()
+        return self.value
+
+    def _update_wilder(self, high: float, low: float, close: float) -> float:
+        period = self.timeperiod
+        prev, self._prev = self._prev, (high, low, close)
+        self.bars += 1
+        if prev is None:
+            self.value = NAN
+            return self.value
+
+        prev_high, prev_low, prev_close = prev
+        true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        diff_plus = high - prev_high
+        diff_minus = prev_low - low
+        dm_plus = dm_minus = 0.0
+        if diff_minus > 0 and diff_plus < diff_minus:
+            dm_minus = diff_minus
+        elif diff_plus > 0 and diff_plus > diff_minus:
+            dm_plus = diff_plus
+
+        step = self.bars - 1
+        if step < period:
+            # Затравка: первые timeperiod-1 изменений просто суммируются
+            self._sum_tr += true_range
+            self._sum_dm_plus += dm_plus
+            self._sum_dm_minus += dm_minus
+            self.value = NAN
+            return self.value
+
+        self._sum_dm_minus = self._sum_dm_minus - self._sum_dm_minus / period + dm_minus
+        self._sum_dm_plus = self._sum_dm_plus - self._sum_dm_plus / period + dm_plus
+        self._sum_tr = self._sum_tr - self._sum_tr / period + true_range
+
+        dx = NAN
+        if not _is_zero(self._sum_tr):
+            self.minus_di = 100.0 * (self._sum_dm_minus / self._sum_tr)
+            self.plus_di = 100.0 * (self._sum_dm_plus / self._sum_tr)
+            di_sum = self.minus_di + self.plus_di
+            if not _is_zero(di_sum):
+                dx = 100.0 * (abs(self.minus_di - self.plus_di) / di_sum)
+
+        if step < 2 * period - 1:
+            # Первый ADX - среднее DX за timeperiod баров
+            if not math.isnan(dx):
+                self._sum_dx += dx
+            self.value = NAN
+        elif step == 2 * period - 1:
+            if not math.isnan(dx):
+                self._sum_dx += dx
+            self.value = self._sum_dx / period
+        elif not math.isnan(dx):
+            self.value = (self.value * (period - 1) + dx) / period
+        return self.value
+
+    def reset(self):
+        self.__init__(self.timeperiod, self.talib_compat)
+
+
+class IncrementalOBV(IncrementalIndicator):
+    """On Balance Volume, как OBV"""
+
+    inputs = ('close', 'volume')
+
+    def __init__(self):
+        super().__init__()
+        self._prev_close: Optional[float] = None
+
+    def update(self, close: float, volume: float) -> float:
+        if self._prev_close is None:
+            self.value = volume
+        elif close > self._prev_close:
+            self.value += volume
+        elif close < self._prev_close:
+            self.value -= volume
+        self._prev_close = close
+        self.bars += 1
+        return self.value
+
+    def reset(self):
+        self.__init__()
+
+
+class IncrementalMFI(IncrementalIndicator):
+    """
+    Money Flow Index, как MFI
+
+    talib_compat - первое значение на баре timeperiod (у первого бара нет
+    изменения типичной цены), 0 при суммарном потоке < 1 (как talib.MFI).
+    """
+
+    inputs = ('high', 'low', 'close', 'volume')
+
+    def __init__(self, timeperiod: int = 14, talib_compat: Optional[bool] = None):
+        super().__init__()
+        self.timeperiod = timeperiod
+        self.talib_compat = _talib_compat(talib_compat)
+        self._positive = _RollingWindow(timeperiod)
+        self._negative = _RollingWindow(timeperiod)
+        self._prev_typical: Optional[float] = None
+
+    def update(self, high: float, low: float, close: float, volume: float) -> float:
+        typical = (high + low + close) / 3
+        money_flow = typical * volume
+        prev = self._prev_typical
+        self._prev_typical = typical
+
+        self._positive.push(money_flow if prev is not None and typical > prev else 0.0)
+        self._negative.push(money_flow if prev is not None and typical < prev else 0.0)
+        self.bars += 1
+
+        positive = self._positive.sum()
+        negative = self._negative.sum()
+        if math.isnan(positive) or math.isnan(negative):
+            self.value = NAN
+        elif self.talib_compat:
+            total = positive + negative
+            if self.bars <= self.timeperiod:
+                self.value = NAN
+            else:
+                self.value = 0.0 if total < 1.0 else 100.0 * (positive / total)
+        elif negative == 0:
+            self.value = NAN if positive == 0 else 100.0
+        else:
+            self.value = 100.0 - 100.0 / (1.0 + positive / negative)
+        return self.value
+
+    def reset(self):
+        self.__init__(self.timeperiod, self.talib_compat)
+
+
+# =================================================================
+# НАБОР ИНДИКАТОРОВ ДЛЯ СИМВОЛА
+# =================================================================
+
+INCREMENTAL_INDICATORS = {
+    'sma': IncrementalSMA,
+    'ema': IncrementalEMA,
+    'rsi': IncrementalRSI,
+    'macd': IncrementalMACD,
+    'bbands': IncrementalBBANDS,
+    'roc': IncrementalROC,
+    'atr': IncrementalATR,
+    'stoch': IncrementalSTOCH,
+    'willr': IncrementalWILLR,
+    'adx': IncrementalADX,
+    'obv': IncrementalOBV,
+    'mfi': IncrementalMFI,
+}
+
+
+class IncrementalIndicatorSet:
+    """
+    Набор потоковых индикаторов одного символа
+
+    Пример:
+        indicators = IncrementalIndicatorSet({
+            'rsi_14': ('rsi', {'timeperiod': 14}),
+            'macd': ('macd', {}),
+        })
+        indicators.warmup(candles_df)
+        values = indicators.update_candle(closed_candle)
+    """
+
+    def __init__(self, spec: Dict[str, Tuple[str, Dict[str, Any]]]):
+        self.indicators: Dict[str, IncrementalIndicator] = {}
+        for name, (kind, params) in spec.items():
+            if kind not in INCREMENTAL_INDICATORS:
+                raise ValueError(f"Неизвестный индикатор: {kind}")
+            self.indicators[name] = INCREMENTAL_INDICATORS[kind](**params)
+        self.last_timestamp: Optional[int] = None
+
+    def update_candle(self, candle: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Обновление всех индикаторов закрытой свечой
+
+        Повтор уже учтенного timestamp игнорируется (состояние не меняется).
+        """
+        timestamp = candle.get('timestamp')
+        if timestamp is not None and self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            return self.values()
+
+        for indicator in self.indicators.values():
+            indicator.update_candle(candle)
+        self.last_timestamp = timestamp
+        return self.values()
+
+    def warmup(self, data: Union[pd.DataFrame, Dict[str, np.ndarray]]):
+        """Прогрев состояния по истории (DataFrame или колонки NumPy)"""
+        for indicator in self.indicators.values():
+            indicator.run(*(data[name] for name in indicator.inputs))
+        if 'timestamp' in data and len(data['timestamp']):
+            self.last_timestamp = int(np.asarray(data['timestamp'])[-1])
+
+    def values(self) -> Dict[str, Any]:
+        return {name: indicator.value for name, indicator in self.indicators.items()}
+
+    def reset(self):
+        for indicator in self.indicators.values():
+            indicator.reset()
+        self.last_timestamp = None
+
+
+__all__ = [
+    'IncrementalIndicator',
+    'IncrementalSMA', 'IncrementalEMA', 'IncrementalRSI', 'IncrementalMACD',
+    'IncrementalBBANDS', 'IncrementalROC', 'IncrementalATR', 'IncrementalSTOCH',
+    'IncrementalWILLR', 'IncrementalADX', 'IncrementalOBV', 'IncrementalMFI',
+    'IncrementalIndicatorSet', 'INCREMENTAL_INDICATORS'
+]
@@ -0,0 +1,265 @@
+"""
+Общий кэш индикаторов текущего бара для всех стратегий
+Файл: src/indicators/memo.py
+
+Стратегии и StrategySelector в одном цикле считают одни и те же
+индикаторы по одному и тому же DataFrame. IndicatorMemo выдает контекст
+на (symbol, timeframe, бар): каждая пара (индикатор, параметры) внутри
+контекста считается один раз и дальше отдается из кэша.
+
+Бар определяется длиной DataFrame, первым и последним индексом и
+значениями OHLCV последней строки - обновление незакрытой свечи дает
+новый контекст. symbol и timeframe берутся из аргументов или df.attrs.
+
+Формулы совпадают с ручными расчетами стратегий (rolling-среднее для
+RSI/ATR, ewm(span) для EMA/MACD, ROC как в ta), поэтому значения не меняются.
+Возвращаемые Series общие для всех потребителей - их нельзя менять на месте.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def bar_key(df: pd.DataFrame) -> Tuple:
+    """Признаки бара: длина, границы индекса и последняя строка OHLCV"""
+    if df is None or len(df) == 0:
+        return (0,)
+    last = tuple(
+        float(df[field].iat[-1]) if field in df.columns else None
+        for field in BAR_FIELDS
+    )
+    return (len(df), df.index[0], df.index[-1], last)
+
+
+class IndicatorContext:
+    """
+    Индикаторы одного бара
+    """
+
+    def __init__(self, memo: 'IndicatorMemo', df: pd.DataFrame):
+        self._memo = memo
+        self.df = df
+        self._values: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, params: Tuple, compute: Callable[[], Any]) -> Any:
+        """Значение (name, params), при промахе - compute()"""
+        key = (name, params)
+        with self._lock:
+            if key in self._values:
+                self._memo._record_hit(name)
+                return self._values[key]
+
+        started = time.perf_counter()
+        value = compute()
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            # Параллельный расчет того же ключа - оставляем первый результат
+            value = self._values.setdefault(key, value)
+        self._memo._record_miss(name, elapsed)
+        return value
+
+    # =================================================================
+    # ИНДИКАТОРЫ (формулы как в стратегиях)
+    # =================================================================
+
+    def sma(self, period: int, column: str = 'close') -> pd.Series:
+        return self.get('sma', (period, column), lambda: self.df[column].rolling(period).mean())
+
+    def rolling_std(self, period: int, column: str = 'close') -> pd.Series:
+        return self.get('rolling_std', (period, column), lambda: self.df[column].rolling(period).std())
+
+    def ema(self, span: int, column: str = 'close') -> pd.Series:
+        return self.get('ema', (span, column), lambda: self.df[column].ewm(span=span).mean())
+
+    def gain_loss(self, period: int) -> Tuple[pd.Series, pd.Series]:
+        """Средние приросты и потери close за period (rolling-среднее)"""
+        def compute():
+            delta = self.df['close'].diff()
+            gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+            loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+            return gain, loss
+        return self.get('gain_loss', (period,), compute)
+
+    def rsi(self, period: int = 14) -> pd.Series:
+        """RSI на rolling-средних (NaN на прогреве)"""
+        def compute():
+            gain, loss = self.gain_loss(period)
+            rs = gain / loss
+            return 100 - (100 / (1 + rs))
+        return self.get('rsi', (period,), compute)
+
+    def roc(self, period: int = 10, column: str = 'close') -> pd.Series:
+        """Rate of Change в процентах за period баров"""
+        def compute():
+            previous = self.df[column].shift(period)
+            return (self.df[column] - previous) / previous * 100
+        return self.get('roc', (period, column), compute)
+
+    def true_range(self) -> pd.Series:
+        def compute():
+            df = self.df
+            high_low = df['high'] - df['low']
+            high_close = np.abs(df['high'] - df['close'].shift())
+            low_close = np.abs(df['low'] - df['close'].shift())
+            return pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+        return self.get('true_range', (), compute)
+
+    def atr(self, period: int = 14) -> pd.Series:
+        """ATR как rolling-среднее true range"""
+        return self.get('atr', (period,), lambda: self.true_range().rolling(window=period).mean())
+
+    def bbands(self, period: int = 20, std_dev: float = 2) -> Tuple[pd.Series, pd.Series, pd.Series]:
+        """(upper, middle, lower)"""
+        def compute():
+            sma = self.sma(period)
+            std = self.rolling_std(period)
+            return sma + (std * std_dev), sma, sma - (std * std_dev)
+        return self.get('bbands', (period, std_dev), compute)
+
+    def macd(self, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[pd.Series, pd.Series, pd.Series]:
+        """(macd, signal, histogram)"""
+        def compute():
+            macd_line = self.ema(fast) - self.ema(slow)
+            signal_line = macd_line.ewm(span=signal).mean()
+            return macd_line, signal_line, macd_line - signal_line
+        return self.get('macd', (fast, slow, signal), compute)
+
+    def stoch(self, k_period: int = 14, d_period: int = 3) -> Tuple[pd.Series, pd.Series]:
+        """(%K, %D)"""
+        def compute():
+            df = self.df
+            low_min = df['low'].rolling(window=k_period).min()
+            high_max = df['high'].rolling(window=k_period).max()
+            k_percent = 100 * ((df['close'] - low_min) / (high_max - low_min))
+            return k_percent, k_percent.rolling(window=d_period).mean()
+        return self.get('stoch', (k_period, d_period), compute)
+
+    def obv(self) -> pd.Series:
+        df = self.df
+        return self.get('obv', (), lambda: (df['volume'] * (~df['close'].diff().le(0) * 2 - 1)).cumsum())
+
+
+class IndicatorMemo:
+    """
+    Реестр контекстов индикаторов по (symbol, timeframe, бар) с LRU
+    """
+
+    def __init__(self, max_contexts: int = 256):
+        """
+        Args:
+            max_contexts: Сколько контекстов держать (на символ/таймфрейм нужен один)
+        """
+        self.max_contexts = max_contexts
+        self._contexts: "OrderedDict[Tuple, IndicatorContext]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'contexts': 0,
+            'compute_seconds': 0.0,
+            'saved_seconds': 0.0
+        }
+        self._by_indicator: Dict[str, Dict[str, float]] = {}
+
+    def context(self, df: pd.DataFrame, symbol: Optional[str] = None,
+                timeframe: Optional[str] = None) -> IndicatorContext:
+        """Контекст бара для df (создается при первом обращении)"""
+        attrs = getattr(df, 'attrs', {}) or {}
+        key = (
+            symbol if symbol is not None else attrs.get('symbol'),
+            timeframe if timeframe is not None else attrs.get('timeframe'),
+            bar_key(df)
+        )
+
+        with self._lock:
+            context = self._contexts.get(key)
+            if context is not None:
+                self._contexts.move_to_end(key)
+                return context
+
+            context = IndicatorContext(self, df)
+            self._contexts[key] = context
+            self.stats['contexts'] += 1
+            while len(self._contexts) > self.max_contexts:
+                self._contexts.popitem(last=False)
+            return context
+
+    def clear(self):
+        with self._lock:
+            self._contexts.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика попаданий (общая и по индикаторам)"""
+        with self._lock:
+            stats = dict(self.stats)
+            lookups = stats['hits'] + stats['misses']
+            stats.update({
+                'active_contexts': len(self._contexts),
+                'hit_rate': stats['hits'] / lookups if lookups else 0.0,
+                'by_indicator': {name: dict(values) for name, values in self._by_indicator.items()}
+            })
+            return stats
+
+    # =================================================================
+    # СЧЕТЧИКИ
+    # =================================================================
+
+    def _indicator_stats(self, name: str) -> Dict[str, float]:
+        stats = self._by_indicator.get(name)
+        if stats is None:
+            stats = self._by_indicator[name] = {'hits': 0, 'misses': 0, 'seconds': 0.0}
+        return stats
+
+    def _record_hit(self, name: str):
+        with self._lock:
+            stats = self._indicator_stats(name)
+            stats['hits'] += 1
+            self.stats['hits'] += 1
+            # Экономия - среднее время расчета этого индикатора
+            if stats['misses']:
+                self.stats['saved_seconds'] += stats['seconds'] / stats['misses']
+
+    def _record_miss(self, name: str, elapsed: float):
+        with self._lock:
+            stats = self._indicator_stats(name)
+            stats['misses'] += 1
+            stats['seconds'] += elapsed
+            self.stats['misses'] += 1
+            self.stats['compute_seconds'] += elapsed
+
+
+# =================================================================
+# ГЛОБАЛЬНЫЙ ЭКЗЕМПЛЯР
+# =================================================================
+
+indicator_memo = None
+
+
+def get_indicator_memo() -> IndicatorMemo:
+    """Получить общий кэш индикаторов"""
+    global indicator_memo
+
+    if indicator_memo is None:
+        indicator_memo = IndicatorMemo()
+
+    return indicator_memo
+
+
+__all__ = [
+    'IndicatorMemo',
+    'IndicatorContext',
+    'get_indicator_memo',
+    'bar_key'
+]
@@ -0,0 +1,521 @@
+"""
+Ядра индикаторов на NumPy для режима без TA-Lib
+Файл: src/indicators/numpy_kernels.py
+
+Те же сигнатуры и та же семантика NaN, что и у pandas-реализаций
+в unified_indicators (rolling с min_periods=window, ewm(span),
+обработка первого бара). Временные pd.Series/pd.DataFrame не создаются:
+скользящие окна считаются сдвинутыми срезами массива, рекурсия EMA -
+блочно через cumsum (или циклом Numba, если он установлен).
+
+Все ядра считают по последней оси: матрица (символы × бары) обрабатывается
+за один проход (см. indicators/batch.py), NaN в начале ряда считаются
+выравниванием - ряд начинается с первого значения.
+
+Функции-заглушки (PLUS_DI, AROON, BOP, CDLHAMMER...) в unified_indicators
+уже работают на NumPy и здесь не дублируются.
+
+Запуск замера задержек:
+    python -m src.indicators.numpy_kernels
+"""
+import math
+import time
+import logging
+from typing import Dict, Any, Optional, Tuple, List, Union, Callable
+
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+logger = logging.getLogger(__name__)
+
+ArrayLike = Union[pd.Series, np.ndarray]
+
+# Максимальный разброс множителей внутри блока EMA (защита от переполнения)
+_EWM_BLOCK_RANGE = 1e100
+
+
+# =================================================================
+# БАЗОВЫЕ ОПЕРАЦИИ
+# =================================================================
+
+def _as_float(values: ArrayLike) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+
+def _shift(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    """Сдвиг вперед по последней оси с NaN в начале (как Series.shift)"""
+    result = np.full_like(values, np.nan)
+    n = values.shape[-1]
+    if periods < n:
+        result[..., periods:] = values[..., :n - periods]
+    return result
+
+
+def _leading_nan(values: np.ndarray) -> np.ndarray:
+    """Маска NaN до первого значения ряда (выравнивание рядов разной длины)"""
+    return np.cumsum(~np.isnan(values), axis=-1) == 0
+
+
+def _window_slices(values: np.ndarray, window: int):
+    """Сдвинутые непрерывные срезы окна: k-й срез - k-й элемент каждого окна"""
+    count = values.shape[-1] - window + 1
+    return (values[..., offset:offset + count] for offset in range(window))
+
+
+def _rolling(values: np.ndarray, window: int, reducer: Callable[[np.ndarray, int], np.ndarray]) -> np.ndarray:
+    """
+    Скользящая агрегация по последней оси с NaN в начале (min_periods=window)
+
+    reducer получает массив и длину окна и возвращает значения для полных
+    окон. Окна обходятся сдвинутыми срезами (window векторных проходов по
+    непрерывной памяти), поэтому NaN внутри окна дает NaN, как в pandas.
+    """
+    result = np.full(values.shape, np.nan)
+    if 0 < window <= values.shape[-1]:
+        result[..., window - 1:] = reducer(values, window)
+    return result
+
+
+def _window_reduce(values: np.ndarray, window: int, ufunc: np.ufunc) -> np.ndarray:
+    slices = _window_slices(values, window)
+    acc = next(slices).copy()
+    for chunk in slices:
+        ufunc(acc, chunk, out=acc)
+    return acc
+
+
+def _window_mean(values: np.ndarray, window: int) -> np.ndarray:
+    return _window_reduce(values, window, np.add) / window
+
+
+def _window_var(values: np.ndarray, window: int, mean: Optional[np.ndarray] = None) -> np.ndarray:
+    """Выборочная дисперсия (ddof=1) в два прохода - без потери точности"""
+    if mean is None:
+        mean = _window_mean(values, window)
+    acc = np.zeros_like(mean)
+    for chunk in _window_slices(values, window):
+        acc += (chunk - mean) ** 2
+    return acc / (window - 1) if window > 1 else np.full_like(mean, np.nan)
+
+
+def _window_mad(values: np.ndarray, window: int) -> np.ndarray:
+    """Среднее абсолютное отклонение от среднего окна"""
+    mean = _window_mean(values, window)
+    acc = np.zeros_like(mean)
+    for chunk in _window_slices(values, window):
+        acc += np.abs(chunk - mean)
+    return acc / window
+
+
+def _rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    return _rolling(values, window, _window_mean)
+
+
+def _rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    return _rolling(values, window, lambda v, w: _window_reduce(v, w, np.add))
+
+
+def _rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    return np.sqrt(_rolling_var(values, window))
+
+
+def _rolling_var(values: np.ndarray, window: int) -> np.ndarray:
+    return _rolling(values, window, _window_var)
+
+
+def _rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    return _rolling(values, window, lambda v, w: _window_reduce(v, w, np.maximum))
+
+
+def _rolling_min(values: np.ndarray, window: int) -> np.ndarray:
+    return _rolling(values, window, lambda v, w: _window_reduce(v, w, np.minimum))
+
+
+if HAS_NUMBA:
+    @njit(cache=True)
+    def _linear_recurrence_numba(values, decay, gain, state):
+        result = np.empty_like(values)
+        for row in range(values.shape[0]):
+            current = state[row]
+            for i in range(values.shape[1]):
+                current = decay * current + gain * values[row, i]
+                result[row, i] = current
+        return result
+
+
+def _linear_recurrence(values: np.ndarray, decay: float, gain: float,
+                       state: Union[float, np.ndarray]) -> np.ndarray:
+    """
+    y[t] = decay * y[t-1] + gain * x[t], y[-1] = state (по последней оси)
+
+    Без Numba считается блоками: внутри блока
+    y[j] = decay^(j+1) * (state + gain * cumsum(x / decay^(i+1))),
+    длина блока ограничена так, чтобы множители не переполнялись.
+    """
+    state = np.broadcast_to(np.asarray(state, dtype=np.float64), values.shape[:-1])
+    if HAS_NUMBA:
+        rows = values.reshape(-1, values.shape[-1])
+        result = _linear_recurrence_numba(rows, decay, gain, state.reshape(-1).copy())
+        return result.reshape(values.shape)
+
+    n = values.shape[-1]
+    result = np.empty(values.shape)
+    if n == 0:
+        return result
+    if decay == 0:
+        return gain * values
+
+    block = max(1, min(n, int(math.log(_EWM_BLOCK_RANGE) / -math.log(decay))))
+    powers = decay ** np.arange(1, block + 1)
+    for start in range(0, n, block):
+        chunk = values[..., start:start + block]
+        size = chunk.shape[-1]
+        scale = powers[:size]
+        result[..., start:start + size] = scale * (state[..., None] + gain * np.cumsum(chunk / scale, axis=-1))
+        state = result[..., start + size - 1]
+    return result
+
+
+def _ewm_mean(values: np.ndarray, span: int, adjust: bool) -> np.ndarray:
+    """
+    Аналог pd.Series(values).ewm(span=span, adjust=adjust).mean() по последней оси
+
+    NaN в начале ряда пропускаются (ряд стартует с первого значения),
+    ряды с пропусками внутри считаются через pandas.
+    """
+    n = values.shape[-1]
+    if n == 0:
+        return values.copy()
+
+    leading = _leading_nan(values)
+    gaps = np.isnan(values) & ~leading
+    if gaps.any():
+        # Веса pandas при пропусках сложнее рекурсии - оставляем эталон
+        rows = values.reshape(-1, n)
+        result = np.array([pd.Series(row).ewm(span=span, adjust=adjust).mean().values for row in rows])
+        return result.reshape(values.shape)
+
+    alpha = 2.0 / (span + 1)
+    decay = 1.0 - alpha
+    first = np.argmin(leading, axis=-1)  # Индекс первого значения ряда
+
+    if not adjust:
+        # Отклонение от первого значения: y[-1] = x[first] дает y[first] = x[first]
+        base = np.take_along_axis(values, first[..., None], axis=-1)
+        deviations = np.where(leading, 0.0, values - base)
+        result = _linear_recurrence(deviations, decay, alpha, 0.0) + base
+    else:
+        numerator = _linear_recurrence(np.where(leading, 0.0, values), decay, 1.0, 0.0)
+
+        # Сумма весов (1 - decay^(k+1)) / alpha, k - номер бара от начала ряда;
+        # дальше decay^k < eps и она постоянна
+        head = int(math.log(np.finfo(float).eps) / math.log(decay)) + 1 if decay > 0 else 1
+        steps = np.clip(np.arange(1, n + 1) - first[..., None], 0, head)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = numerator / ((1.0 - decay ** steps) / alpha)
+
+    result[leading] = np.nan
+    return result
+
+
+# =================================================================
+# ИНДИКАТОРЫ
+# =================================================================
+
+def SMA(series: ArrayLike, timeperiod: int = 30) -> np.ndarray:
+    """Simple Moving Average"""
+    return _rolling_mean(_as_float(series), timeperiod)
+
+
+def EMA(series: ArrayLike, timeperiod: int = 30) -> np.ndarray:
+    """Exponential Moving Average"""
+    return _ewm_mean(_as_float(series), timeperiod, adjust=False)
+
+
+def RSI(series: ArrayLike, timeperiod: int = 14) -> np.ndarray:
+    """Relative Strength Index"""
+    prices = _as_float(series)
+    delta = prices - _shift(prices)
+    # Первый бар дает нули (как delta.where(...)), выравнивающие NaN сохраняются
+    leading = _leading_nan(prices)
+    gain = _rolling_mean(np.where(leading, np.nan, np.where(delta > 0, delta, 0.0)), timeperiod)
+    loss = _rolling_mean(np.where(leading, np.nan, np.where(delta < 0, -delta, 0.0)), timeperiod)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = gain / loss
+        return 100 - (100 / (1 + rs))
+
+
+def BBANDS(series: ArrayLike,
+           timeperiod: int = 20,
+           nbdevup: int = 2,
+           nbdevdn: int = 2,
+           matype: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Bollinger Bands"""
+    prices = _as_float(series)
+    sma = _rolling_mean(prices, timeperiod)
+    # Среднее окна считается один раз и для полосы, и для дисперсии
+    std = _rolling(prices, timeperiod, lambda v, w: np.sqrt(_window_var(v, w, sma[..., w - 1:])))
+    return sma + std * nbdevup, sma, sma - std * nbdevdn
+
+
+def MACD(series: ArrayLike,
+         fastperiod: int = 12,
+         slowperiod: int = 26,
+         signalperiod: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Moving Average Convergence Divergence"""
+    prices = _as_float(series)
+    macd = _ewm_mean(prices, fastperiod, adjust=True) - _ewm_mean(prices, slowperiod, adjust=True)
+    signal = _ewm_mean(macd, signalperiod, adjust=True)
+    return macd, signal, macd - signal
+
+
+def _true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """TR с пропуском NaN (как concat(...).max(axis=1))"""
+    prev_close = _shift(close)
+    with np.errstate(invalid='ignore'):
+        return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def ATR(high: ArrayLike,
+        low: ArrayLike,
+        close: ArrayLike,
+        timeperiod: int = 14) -> np.ndarray:
+    """Average True Range"""
+    return _rolling_mean(_true_range(_as_float(high), _as_float(low), _as_float(close)), timeperiod)
+
+
+def STOCH(high: ArrayLike,
+          low: ArrayLike,
+          close: ArrayLike,
+          fastk_period: int = 5,
+          slowk_period: int = 3,
+          slowd_period: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+    """Stochastic Oscillator"""
+    high, low, close = _as_float(high), _as_float(low), _as_float(close)
+    lowest_low = _rolling_min(low, fastk_period)
+    highest_high = _rolling_max(high, fastk_period)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k_percent = 100 * ((close - lowest_low) / (highest_high - lowest_low))
+    k_percent = _rolling_mean(k_percent, slowk_period)
+    d_percent = _rolling_mean(k_percent, slowd_period)
+    return k_percent, d_percent
+
+
+def ADX(high: ArrayLike,
+        low: ArrayLike,
+        close: ArrayLike,
+        timeperiod: int = 14) -> np.ndarray:
+    """Average Directional Movement Index"""
+    high, low, close = _as_float(high), _as_float(low), _as_float(close)
+    prev_close = _shift(close)
+
+    # np.maximum распространяет NaN: у первого бара TR не определен
+    tr = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+    up_move = high - _shift(high)
+    down_move = _shift(low) - low
+    with np.errstate(invalid='ignore'):
+        dm_plus = np.where(up_move > down_move, np.maximum(up_move, 0), 0.0)
+        dm_minus = np.where(down_move > up_move, np.maximum(down_move, 0), 0.0)
+
+    atr = _rolling_mean(tr, timeperiod)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        di_plus = 100 * (_rolling_mean(dm_plus, timeperiod) / atr)
+        di_minus = 100 * (_rolling_mean(dm_minus, timeperiod) / atr)
+        dx = 100 * np.abs(di_plus - di_minus) / (di_plus + di_minus)
+    return _rolling_mean(dx, timeperiod)
+
+
+def ROC(series: ArrayLike, timeperiod: int = 10) -> np.ndarray:
+    """Rate of Change"""
+    prices = _as_float(series)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (prices / _shift(prices, timeperiod) - 1) * 100
+
+
+def OBV(close: ArrayLike, volume: ArrayLike) -> np.ndarray:
+    """On Balance Volume"""
+    close, volume = _as_float(close), _as_float(volume)
+    if close.shape[-1] == 0:
+        return close.copy()
+
+    delta = close - _shift(close)
+    changes = np.where(delta > 0, volume, np.where(delta < 0, -volume, 0.0))
+
+    # Ряд начинается с объема первого бара (NaN в начале - выравнивание рядов)
+    leading = _leading_nan(close)
+    first = np.diff(leading, axis=-1, prepend=True)
+    changes = np.where(first, volume, np.where(leading, 0.0, changes))
+
+    result = np.cumsum(changes, axis=-1)
+    result[leading] = np.nan
+    return result
+
+
+def CCI(high: ArrayLike,
+        low: ArrayLike,
+        close: ArrayLike,
+        timeperiod: int = 14) -> np.ndarray:
+    """Commodity Channel Index"""
+    typical_price = (_as_float(high) + _as_float(low) + _as_float(close)) / 3
+    sma = _rolling_mean(typical_price, timeperiod)
+    mad = _rolling(typical_price, timeperiod, _window_mad)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (typical_price - sma) / (0.015 * mad)
+
+
+def WILLR(high: ArrayLike,
+          low: ArrayLike,
+          close: ArrayLike,
+          timeperiod: int = 14) -> np.ndarray:
+    """Williams %R"""
+    high, low, close = _as_float(high), _as_float(low), _as_float(close)
+    highest_high = _rolling_max(high, timeperiod)
+    lowest_low = _rolling_min(low, timeperiod)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return -100 * ((highest_high - close) / (highest_high - lowest_low))
+
+
+def MFI(high: ArrayLike,
+        low: ArrayLike,
+        close: ArrayLike,
+        volume: ArrayLike,
+        timeperiod: int = 14) -> np.ndarray:
+    """Money Flow Index"""
+    typical_price = (_as_float(high) + _as_float(low) + _as_float(close)) / 3
+    money_flow = typical_price * _as_float(volume)
+    prev_typical = _shift(typical_price)
+    leading = _leading_nan(typical_price)
+
+    positive_flow = np.where(leading, np.nan, np.where(typical_price > prev_typical, money_flow, 0.0))
+    negative_flow = np.where(leading, np.nan, np.where(typical_price < prev_typical, money_flow, 0.0))
+    positive_flow = _rolling_sum(positive_flow, timeperiod)
+    negative_flow = _rolling_sum(negative_flow, timeperiod)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        money_ratio = positive_flow / negative_flow
+        return 100 - (100 / (1 + money_ratio))
+
+
+def HT_TRENDLINE(series: ArrayLike) -> np.ndarray:
+    """Hilbert Transform - Instantaneous Trendline (упрощенно: SMA 20)"""
+    return _rolling_mean(_as_float(series), 20)
+
+
+def LINEARREG(series: ArrayLike, timeperiod: int = 14) -> np.ndarray:
+    """Linear Regression (упрощенно: SMA)"""
+    return _rolling_mean(_as_float(series), timeperiod)
+
+
+def TSF(series: ArrayLike, timeperiod: int = 14) -> np.ndarray:
+    """Time Series Forecast (упрощенно: SMA)"""
+    return _rolling_mean(_as_float(series), timeperiod)
+
+
+def STDDEV(series: ArrayLike, timeperiod: int = 5, nbdev: int = 1) -> np.ndarray:
+    """Standard Deviation (выборочное, nbdev не применяется - как pandas-версия)"""
+    return _rolling_std(_as_float(series), timeperiod)
+
+
+def VAR(series: ArrayLike, timeperiod: int = 5, nbdev: int = 1) -> np.ndarray:
+    """Variance (выборочная, как pandas-версия)"""
+    return _rolling_var(_as_float(series), timeperiod)
+
+
+# Функции, которые заменяют pandas-реализации при USE_TALIB = False
+KERNELS: Dict[str, Callable] = {
+    'SMA': SMA, 'EMA': EMA, 'RSI': RSI, 'BBANDS': BBANDS, 'MACD': MACD,
+    'ATR': ATR, 'STOCH': STOCH, 'ADX': ADX, 'ROC': ROC, 'OBV': OBV,
+    'CCI': CCI, 'WILLR': WILLR, 'MFI': MFI, 'HT_TRENDLINE': HT_TRENDLINE,
+    'LINEARREG': LINEARREG, 'TSF': TSF, 'STDDEV': STDDEV, 'VAR': VAR,
+}
+
+
+# =================================================================
+# ЗАМЕР ЗАДЕРЖЕК
+# =================================================================
+
+def _benchmark_inputs(size: int, seed: int = 42) -> Dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, size))
+    return {
+        'series': close,
+        'close': close,
+        'high': close + rng.random(size),
+        'low': close - rng.random(size),
+        'volume': rng.random(size) * 1000,
+    }
+
+
+def _time_call(func: Callable, args: List[np.ndarray], repeat: int) -> float:
+    """Минимальное время вызова в миллисекундах"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def benchmark(sizes: Tuple[int, ...] = (1_000, 10_000, 100_000),
+              names: Optional[List[str]] = None,
+              repeat: int = 5) -> List[Dict[str, Any]]:
+    """
+    Задержка одного вызова: ядро NumPy vs pandas-реализация vs TA-Lib
+
+    Returns:
+        Список строк {'indicator', 'bars', 'numpy_ms', 'pandas_ms', 'talib_ms'}
+    """
+    import inspect
+    import importlib
+
+    # Атрибут пакета unified_indicators - экземпляр класса, берем сам модуль
+    indicators_module = importlib.import_module('.unified_indicators', __package__)
+
+    try:
+        import talib
+    except ImportError:
+        talib = None
+
+    fallbacks = indicators_module.PANDAS_FALLBACKS
+    rows = []
+    for size in sizes:
+        inputs = _benchmark_inputs(size)
+        for name in names or list(KERNELS):
+            kernel = KERNELS[name]
+            params = [p for p in inspect.signature(kernel).parameters.values() if p.default is p.empty]
+            args = [inputs[p.name] for p in params]
+
+            row = {'indicator': name, 'bars': size, 'numpy_ms': _time_call(kernel, args, repeat)}
+
+            # pandas-ветка обертки выполняется только при USE_TALIB = False
+            use_talib = indicators_module.USE_TALIB
+            indicators_module.USE_TALIB = False
+            try:
+                row['pandas_ms'] = _time_call(fallbacks[name], args, repeat)
+            finally:
+                indicators_module.USE_TALIB = use_talib
+
+            row['talib_ms'] = _time_call(getattr(talib, name), args, repeat) if talib else None
+            rows.append(row)
+    return rows
+
+
+if __name__ == "__main__":
+    print(f"Numba: {HAS_NUMBA}")
+    print(f"{'indicator':<14}{'bars':>8}{'numpy, ms':>12}{'pandas, ms':>12}{'talib, ms':>12}")
+    for row in benchmark():
+        talib_ms = f"{row['talib_ms']:.3f}" if row['talib_ms'] is not None else '-'
+        print(f"{row['indicator']:<14}{row['bars']:>8}{row['numpy_ms']:>12.3f}"
+              f"{row['pandas_ms']:>12.3f}{talib_ms:>12}")
+
+
+__all__ = list(KERNELS) + ['KERNELS', 'HAS_NUMBA', 'benchmark']
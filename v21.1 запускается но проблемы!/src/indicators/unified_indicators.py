@@ -549,6 +549,22 @@ def CDL3INSIDE(open: Union[pd.Series, np.ndarray],
     else:
         return np.zeros_like(close, dtype=int)
 
+# ===== NUMPY ЯДРА ДЛЯ РЕЖИМА БЕЗ TA-LIB =====
+
+# pandas-реализации остаются эталоном для сравнения и замеров
+PANDAS_FALLBACKS = {
+    name: globals()[name] for name in (
+        'SMA', 'EMA', 'RSI', 'BBANDS', 'MACD', 'ATR', 'STOCH', 'ADX', 'ROC', 'OBV',
+        'CCI', 'WILLR', 'MFI', 'HT_TRENDLINE', 'LINEARREG', 'TSF', 'STDDEV', 'VAR'
+    )
+}
+
+if not USE_TALIB:
+    # Без TA-Lib экспортируемые функции заменяются ядрами NumPy
+    # (те же сигнатуры и NaN, без временных pd.Series/DataFrame)
+    from .numpy_kernels import KERNELS as _NUMPY_KERNELS
+    globals().update(_NUMPY_KERNELS)
+
 # ===== ОСНОВНОЙ КЛАСС ТЕХНИЧЕСКИХ ИНДИКАТОРОВ =====
 
 class UnifiedIndicators:
@@ -781,6 +797,20 @@ class UnifiedIndicators:
         typical_price = (high + low + close) / 3
         return (typical_price * volume).cumsum() / volume.cumsum()
     
+    # === Потоковые индикаторы ===
+    def incremental(self, kind: str, **params):
+        """
+        Создать потоковый индикатор (O(1) на новый бар)
+        
+        Args:
+            kind: 'sma', 'ema', 'rsi', 'macd', 'bbands', 'atr', 'stoch', 'adx', 'obv', 'mfi'...
+            **params: Параметры как у batch-функции (timeperiod и т.д.)
+        """
+        from .incremental import INCREMENTAL_INDICATORS
+        if kind not in INCREMENTAL_INDICATORS:
+            raise ValueError(f"Неизвестный индикатор: {kind}")
+        return INCREMENTAL_INDICATORS[kind](**params)
+    
     # === Utility Methods ===
     def get_available_indicators(self) -> List[str]:
         """Получить список доступных индикаторов"""
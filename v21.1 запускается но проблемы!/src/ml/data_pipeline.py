@@ -6,17 +6,112 @@ import numpy as np
 import pandas as pd
 from typing import Dict, List, Tuple, Optional, Any, Union
 from datetime import datetime, timedelta
+import os
 import asyncio
+import time
 from collections import defaultdict
 import json
+from numpy.lib.stride_tricks import sliding_window_view
 
 from sqlalchemy import and_, or_, func
 from sqlalchemy.orm import Session
 
 from ..core.database import SessionLocal
-from ..core.models import Trade, Signal, MarketData
+from ..core.models import Trade, Signal
+from ..data.candle_loader import get_candle_loader, to_frame
 from ..logging.smart_logger import SmartLogger
 from .features.feature_engineering import FeatureEngineering
+from .dataset_store import save_dataset, open_dataset, dataset_size
+
+
+# Порог среднего изменения цены для меток направления (±0.2%)
+LABEL_CHANGE_THRESHOLD = 0.002
+
+
+# =================================================================
+# ВЕКТОРНЫЕ МЕТКИ И ПОСЛЕДОВАТЕЛЬНОСТИ
+# =================================================================
+
+def _window_means(close: np.ndarray, window: int, positions: np.ndarray) -> np.ndarray:
+    """
+    Точное среднее close[i+1 : i+window+1] для позиций i
+    
+    Сумма окна считается так же, как Series.mean (NaN пропускаются),
+    поэтому результат побитово совпадает с pandas.
+    """
+    windows = sliding_window_view(close[1:], window)[positions]
+    missing = np.isnan(windows)
+    counts = window - missing.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(missing, 0.0, windows).sum(axis=1) / counts
+
+
+def forward_mean_change(close: np.ndarray, window: int) -> np.ndarray:
+    """
+    Среднее относительное изменение цены за следующие window баров
+    
+    Средние окон берутся по разности обратных кумулятивных сумм - O(n).
+    Окна рядом с порогом меток, а также окна с NaN пересчитываются
+    точно, чтобы метки не зависели от ошибки округления кумулятивной суммы.
+    
+    Returns:
+        Массив длины len(close) - window
+    """
+    count = len(close) - window
+    if count <= 0:
+        return np.empty(0)
+    
+    # Сдвиг к среднему уменьшает величину сумм, а с ней и ошибку округления
+    center = np.nanmean(close) if np.isfinite(close).any() else 0.0
+    
+    # reverse_cumsum[j] = (close[j] - center) + ... + (close[n-1] - center)
+    reverse_cumsum = np.cumsum((close - center)[::-1])[::-1]
+    tail = np.append(reverse_cumsum, 0.0)
+    future_sum = tail[1:count + 1] - tail[window + 1:window + 1 + count]
+    
+    current = close[:count]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        change = (future_sum / window + center - current) / current
+    
+    # Погрешность кумулятивной суммы на порядки меньше этой полосы
+    suspect = ~np.isfinite(change) | (
+        np.abs(np.abs(change) - LABEL_CHANGE_THRESHOLD) < 1e-6
+    )
+    if suspect.any():
+        positions = np.flatnonzero(suspect)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            change[positions] = (_window_means(close, window, positions) - current[positions]) \
+                / current[positions]
+    
+    return change
+
+
+def direction_labels(close: np.ndarray, window: int) -> np.ndarray:
+    """Метки направления: 0 - down, 1 - neutral, 2 - up; последние window баров - neutral"""
+    change = forward_mean_change(close, window)
+    labels = np.ones(len(close), dtype=np.int64)
+    labels[:len(change)][change < -LABEL_CHANGE_THRESHOLD] = 0
+    labels[:len(change)][change > LABEL_CHANGE_THRESHOLD] = 2
+    return labels
+
+
+def forward_pct_change(close: np.ndarray, window: int) -> np.ndarray:
+    """Изменение цены через window баров в процентах; последние window баров - 0.0"""
+    count = max(len(close) - window, 0)
+    values = np.zeros(len(close))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        values[:count] = (close[window:window + count] - close[:count]) / close[:count] * 100
+    return values
+
+
+def time_series_windows(values: np.ndarray, sequence_length: int) -> np.ndarray:
+    """Окна values[i:i+L] для i < len(values) - L, массив (N, L, признаки)"""
+    count = len(values) - sequence_length
+    if count <= 0:
+        return np.array([])
+    
+    windows = sliding_window_view(values, sequence_length, axis=0)[:count]
+    return np.ascontiguousarray(np.swapaxes(windows, 1, 2))
 
 
 class DataPipeline:
@@ -24,9 +119,18 @@ class DataPipeline:
     Централизованный pipeline для подготовки данных
     """
     
-    def __init__(self, symbols: List[str], timeframes: List[str] = ['5m', '15m', '1h', '4h']):
+    def __init__(self, symbols: List[str], timeframes: List[str] = ['5m', '15m', '1h', '4h'],
+                 exchange_client=None):
+        """
+        Args:
+            symbols: Торговые пары
+            timeframes: Таймфреймы
+            exchange_client: Клиент Bybit для догрузки свечей в candles, если
+                             общий CandleBackfillService еще не создан ботом
+        """
         self.symbols = symbols
         self.timeframes = timeframes
+        self.exchange_client = exchange_client
         self.feature_engineering = FeatureEngineering()
         self.logger = SmartLogger(__name__)
         
@@ -49,11 +153,55 @@ class DataPipeline:
             'missing_data_threshold': 0.1  # максимум 10% пропущенных данных
         }
         
+    async def sync_candles(self, symbols: List[str], timeframes: List[str]) -> bool:
+        """
+        Догружает в таблицу candles свечи после последней загруженной
+        
+        Используется общий CandleBackfillService (его создает бот при старте)
+        или сервис по exchange_client пайплайна. Без них таблица заполняется
+        только ботом или scripts/sync_candles.py.
+        
+        Returns:
+            True, если синхронизация выполнена
+        """
+        # Импорт здесь: офлайн-обучению без клиента биржи модули биржи не нужны
+        from ..data import candle_backfill
+        
+        service = candle_backfill.candle_backfill_service
+        if service is None and self.exchange_client is not None:
+            service = candle_backfill.get_candle_backfill_service(self.exchange_client)
+        
+        if service is None:
+            self.logger.warning(
+                "Свечи не синхронизированы: нет CandleBackfillService и exchange_client, "
+                "данные candles могут быть устаревшими (scripts/sync_candles.py)",
+                category='data'
+            )
+            return False
+        
+        try:
+            result = await service.sync_tail(symbols, timeframes)
+            self.logger.info(
+                f"Синхронизировано {result['candles']} свечей перед загрузкой",
+                category='data',
+                candles=result['candles']
+            )
+            return True
+        except Exception as e:
+            self.logger.error(
+                f"Ошибка синхронизации свечей: {str(e)}",
+                category='data'
+            )
+            return False
+    
     async def fetch_market_data(self, symbol: str, timeframe: str, 
                                start_date: Optional[datetime] = None,
                                end_date: Optional[datetime] = None) -> pd.DataFrame:
         """
-        Загружает рыночные данные из БД
+        Загружает свечи из таблицы candles
+        
+        Повторные запросы отдаются из кэша CandleLoader; из БД читаются
+        только свечи, появившиеся после последней загруженной.
         
         Args:
             symbol: Торговая пара
@@ -66,31 +214,12 @@ class DataPipeline:
         """
         cache_key = f"{symbol}_{timeframe}"
         
-        # Проверяем кеш
-        if cache_key in self.cache['market_data']:
-            last_update = self.cache['last_update'].get(cache_key, datetime.min)
-            if (datetime.now() - last_update).seconds < 300:  # 5 минут
-                return self.cache['market_data'][cache_key]
-        
-        db = SessionLocal()
         try:
-            query = db.query(MarketData).filter(
-                and_(
-                    MarketData.symbol == symbol,
-                    MarketData.timeframe == timeframe
-                )
-            )
-            
-            if start_date:
-                query = query.filter(MarketData.timestamp >= start_date)
-            if end_date:
-                query = query.filter(MarketData.timestamp <= end_date)
-            
-            query = query.order_by(MarketData.timestamp.asc())
-            
-            data = query.all()
+            # Загрузчик держит серию в памяти и догружает только новые свечи
+            loader = get_candle_loader()
+            series = await asyncio.to_thread(loader.load, symbol, timeframe, start_date, end_date)
             
-            if not data:
+            if not len(series['timestamp']):
                 self.logger.warning(
                     f"Нет данных для {symbol} {timeframe}",
                     category='data',
@@ -99,17 +228,7 @@ class DataPipeline:
                 )
                 return pd.DataFrame()
             
-            # Преобразуем в DataFrame
-            df = pd.DataFrame([{
-                'timestamp': d.timestamp,
-                'open': d.open,
-                'high': d.high,
-                'low': d.low,
-                'close': d.close,
-                'volume': d.volume
-            } for d in data])
-            
-            df.set_index('timestamp', inplace=True)
+            df = to_frame(series)
             
             # Кешируем
             self.cache['market_data'][cache_key] = df
@@ -132,8 +251,6 @@ class DataPipeline:
                 error=str(e)
             )
             return pd.DataFrame()
-        finally:
-            db.close()
     
     def clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -294,43 +411,16 @@ class DataPipeline:
         Returns:
             Series с метками
         """
+        close = market_data['close'].to_numpy(dtype=np.float64)
+        window = self.params['label_window']
+        
         if label_type == 'classification':
-            # Метки для классификации направления
-            labels = []
-            
-            for i in range(len(market_data) - self.params['label_window']):
-                current_price = market_data.iloc[i]['close']
-                future_prices = market_data.iloc[i+1:i+self.params['label_window']+1]['close']
-                
-                # Среднее изменение цены
-                avg_change = (future_prices.mean() - current_price) / current_price
-                
-                # Классификация: 0 - down, 1 - neutral, 2 - up
-                if avg_change < -0.002:  # < -0.2%
-                    labels.append(0)
-                elif avg_change > 0.002:  # > 0.2%
-                    labels.append(2)
-                else:
-                    labels.append(1)
-            
-            # Дополняем последние значения
-            for _ in range(self.params['label_window']):
-                labels.append(1)  # neutral
+            # Метки для классификации направления по среднему изменению цены
+            labels = direction_labels(close, window)
                 
         elif label_type == 'regression':
             # Метки для регрессии (процентное изменение)
-            labels = []
-            
-            for i in range(len(market_data) - self.params['label_window']):
-                current_price = market_data.iloc[i]['close']
-                future_price = market_data.iloc[i + self.params['label_window']]['close']
-                
-                pct_change = (future_price - current_price) / current_price * 100
-                labels.append(pct_change)
-            
-            # Дополняем последние значения
-            for _ in range(self.params['label_window']):
-                labels.append(0.0)
+            labels = forward_pct_change(close, window)
         
         return pd.Series(labels, index=market_data.index)
     
@@ -358,6 +448,9 @@ class DataPipeline:
             'metadata': {}
         }
         
+        # candles заполняется только синхронизацией - догружаем хвост до чтения
+        await self.sync_candles(symbols, timeframes)
+        
         for symbol in symbols:
             all_data['features'][symbol] = {}
             all_data['labels'][symbol] = {}
@@ -532,18 +625,8 @@ class DataPipeline:
         Returns:
             3D массив последовательностей и соответствующие метки
         """
-        sequences = []
-        sequence_labels = []
-        
-        for i in range(len(features) - sequence_length):
-            seq = features.iloc[i:i+sequence_length].values
-            label = labels.iloc[i+sequence_length]
-            
-            sequences.append(seq)
-            sequence_labels.append(label)
-        
-        X = np.array(sequences)
-        y = np.array(sequence_labels)
+        X = time_series_windows(features.values, sequence_length)
+        y = labels.iloc[sequence_length:len(features)].to_numpy() if len(X) else np.array([])
         
         self.logger.info(
             f"Создано последовательностей: {X.shape}",
@@ -664,44 +747,52 @@ class DataPipeline:
         return report
     
     def save_prepared_data(self, data: Dict[str, Any], path: str):
-        """Сохраняет подготовленные данные"""
-        # Преобразуем DataFrame в словари для сериализации
-        serializable_data = {
-            'features': {},
-            'labels': {},
-            'metadata': data['metadata']
-        }
-        
-        for symbol in data['features']:
-            serializable_data['features'][symbol] = {}
-            serializable_data['labels'][symbol] = {}
-            
-            for timeframe in data['features'][symbol]:
-                serializable_data['features'][symbol][timeframe] = {
-                    split: df.to_dict() 
-                    for split, df in data['features'][symbol][timeframe].items()
-                }
-                
-                serializable_data['labels'][symbol][timeframe] = {
-                    label_type: {
-                        split: labels.tolist()
-                        for split, labels in label_data.items()
-                    }
-                    for label_type, label_data in data['labels'][symbol][timeframe].items()
-                }
+        """
+        Сохраняет подготовленные данные в колоночном формате
         
-        # Сохраняем
-        import joblib
-        joblib.dump(serializable_data, path)
+        path - каталог с manifest.json и массивами .npy (см. dataset_store)
+        """
+        manifest = save_dataset(data, path)
         
         self.logger.info(
             f"Данные сохранены: {path}",
             category='data',
-            size_mb=os.path.getsize(path) / 1024 / 1024
+            datasets=sum(len(timeframes) for timeframes in manifest['datasets'].values()),
+            size_mb=dataset_size(path) / 1024 / 1024
         )
     
-    def load_prepared_data(self, path: str) -> Dict[str, Any]:
-        """Загружает подготовленные данные"""
+    def load_prepared_data(self, path: str,
+                           symbols: Optional[List[str]] = None,
+                           timeframes: Optional[List[str]] = None,
+                           columns: Optional[List[str]] = None,
+                           splits: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Загружает подготовленные данные
+        
+        Массивы отображаются в память и читаются при обращении; symbols,
+        timeframes, columns и splits ограничивают загружаемое подмножество.
+        Файл прежнего формата (joblib) загружается целиком.
+        """
+        if os.path.isfile(path):
+            return self._load_joblib_prepared_data(path)
+        
+        restored_data = open_dataset(path).load(
+            symbols=symbols,
+            timeframes=timeframes,
+            columns=columns,
+            splits=splits
+        )
+        
+        self.logger.info(
+            f"Данные загружены: {path}",
+            category='data',
+            symbols=list(restored_data['features'])
+        )
+        
+        return restored_data
+    
+    def _load_joblib_prepared_data(self, path: str) -> Dict[str, Any]:
+        """Загружает данные прежнего формата (вложенные словари в joblib)"""
         import joblib
         data = joblib.load(path)
         
@@ -735,4 +826,81 @@ class DataPipeline:
             category='data'
         )
         
-        return restored_data
\ No newline at end of file
+        return restored_data
+
+
+# =================================================================
+# ЗАМЕР СКОРОСТИ
+# =================================================================
+
+def _loop_labels(close: pd.Series, window: int, label_type: str) -> List[float]:
+    """Прежний покадровый расчет меток - эталон для benchmark"""
+    labels = []
+    for i in range(len(close) - window):
+        current_price = close.iloc[i]
+        if label_type == 'classification':
+            avg_change = (close.iloc[i + 1:i + window + 1].mean() - current_price) / current_price
+            labels.append(0 if avg_change < -0.002 else 2 if avg_change > 0.002 else 1)
+        else:
+            labels.append((close.iloc[i + window] - current_price) / current_price * 100)
+    return labels + [1 if label_type == 'classification' else 0.0] * window
+
+
+def benchmark(size: int = 500_000, window: int = 20, sequence_length: int = 20,
+              n_features: int = 10, loop_sample: int = 20_000, seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    Векторные метки и последовательности против прежних циклов
+    
+    Цикл меряется на первых loop_sample барах и экстраполируется на size
+    (на 500k баров он идет минуты); векторная версия считается целиком,
+    совпадение проверяется на общем префиксе.
+    """
+    rng = np.random.default_rng(seed)
+    close = pd.Series(100 + np.cumsum(rng.normal(0, 0.1, size)))
+    features = pd.DataFrame(rng.normal(size=(size, n_features)))
+    sample = min(loop_sample, size)
+    rows = []
+    
+    for label_type, vectorized in (('classification', direction_labels),
+                                   ('regression', forward_pct_change)):
+        started = time.perf_counter()
+        fast = vectorized(close.to_numpy(), window)
+        fast_s = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        slow = _loop_labels(close.iloc[:sample], window, label_type)
+        loop_s = (time.perf_counter() - started) * size / sample
+        
+        prefix = sample - window
+        rows.append({
+            'task': f'labels/{label_type}',
+            'bars': size,
+            'vectorized_s': fast_s,
+            'loop_s_estimated': loop_s,
+            'identical': np.array_equal(fast[:prefix], np.array(slow[:prefix]))
+        })
+    
+    started = time.perf_counter()
+    X = time_series_windows(features.to_numpy(), sequence_length)
+    fast_s = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    X_loop = np.array([features.iloc[i:i + sequence_length].values
+                       for i in range(sample - sequence_length)])
+    loop_s = (time.perf_counter() - started) * size / sample
+    
+    rows.append({
+        'task': 'sequences',
+        'bars': size,
+        'vectorized_s': fast_s,
+        'loop_s_estimated': loop_s,
+        'identical': np.array_equal(X[:len(X_loop)], X_loop)
+    })
+    return rows
+
+
+if __name__ == "__main__":
+    print(f"{'task':<26}{'bars':>9}{'vectorized, s':>15}{'loop, s (est.)':>16}{'identical':>11}")
+    for row in benchmark():
+        print(f"{row['task']:<26}{row['bars']:>9}{row['vectorized_s']:>15.3f}"
+              f"{row['loop_s_estimated']:>16.1f}{str(row['identical']):>11}")
@@ -0,0 +1,329 @@
+"""
+Колоночное хранилище подготовленных датасетов
+Файл: src/ml/dataset_store.py
+
+Датасет - каталог с manifest.json и файлами .npy. Признаки каждого
+сплита лежат блоками по типу данных в порядке Fortran (колонка подряд),
+метки - одномерными массивами. Загрузка отображает файлы в память
+(mmap, copy-on-write), поэтому чтение идет только для тех символов,
+таймфреймов, сплитов и колонок, к которым реально обращаются.
+
+Структура manifest.json:
+    {'format': 'columnar-npy', 'version': 1, 'metadata': {...},
+     'datasets': {symbol: {timeframe: {
+         'features': {split: {'rows', 'columns', 'blocks', 'index'}},
+         'labels': {label_type: {split: {'file', 'dtype', 'index'}}}}}}}
+"""
+import os
+import re
+import json
+import shutil
+import logging
+from typing import Dict, Any, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+FORMAT_NAME = 'columnar-npy'
+FORMAT_VERSION = 1
+
+
+def _safe_name(name: Any) -> str:
+    """Имя для пути к файлу"""
+    return re.sub(r'[^\w.-]', '_', str(name))
+
+
+def dataset_size(path: str) -> int:
+    """Размер датасета на диске в байтах"""
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path) for name in files
+    )
+
+
+# =================================================================
+# ЗАПИСЬ
+# =================================================================
+
+def _write_array(root: str, relative: str, values: np.ndarray) -> str:
+    target = os.path.join(root, relative)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    np.save(target, values, allow_pickle=values.dtype == object)
+    return relative
+
+
+def _write_index(root: str, relative: str, index: pd.Index) -> Dict[str, Any]:
+    """Индекс -> описание для манифеста (RangeIndex хранится без файла)"""
+    if isinstance(index, pd.RangeIndex):
+        return {'kind': 'range', 'start': index.start, 'stop': index.stop,
+                'step': index.step, 'name': index.name}
+
+    if isinstance(index, pd.DatetimeIndex):
+        return {
+            'kind': 'datetime',
+            'file': _write_array(root, relative, index.asi8),
+            'unit': getattr(index, 'unit', 'ns'),
+            'tz': str(index.tz) if index.tz is not None else None,
+            'name': index.name
+        }
+
+    return {'kind': 'array', 'file': _write_array(root, relative, index.to_numpy()),
+            'name': index.name}
+
+
+def _write_frame(root: str, prefix: str, frame: pd.DataFrame) -> Dict[str, Any]:
+    """Признаки сплита: блок на каждый тип данных"""
+    blocks = []
+    dtypes = [np.asarray(frame.iloc[:0, position]).dtype for position in range(frame.shape[1])]
+
+    for block_no, dtype in enumerate(dict.fromkeys(dtypes)):
+        positions = [position for position, column_dtype in enumerate(dtypes) if column_dtype == dtype]
+        values = np.asfortranarray(frame.iloc[:, positions].to_numpy(dtype=dtype))
+        blocks.append({
+            'file': _write_array(root, f"{prefix}_block{block_no}.npy", values),
+            'dtype': dtype.str if dtype != object else 'object',
+            'columns': positions
+        })
+
+    return {
+        'rows': len(frame),
+        'columns': list(frame.columns),
+        'blocks': blocks,
+        'index': _write_index(root, f"{prefix}_index.npy", frame.index)
+    }
+
+
+def save_dataset(data: Dict[str, Any], path: str) -> Dict[str, Any]:
+    """
+    Сохраняет результат DataPipeline.prepare_training_data в каталог path
+
+    Запись идет во временный каталог, который затем подменяет path,
+    поэтому читатели не видят частично записанный датасет.
+
+    Returns:
+        Манифест
+    """
+    tmp_path = f"{path.rstrip(os.sep)}.tmp"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+
+    datasets = {}
+    try:
+        for symbol, timeframes in data['features'].items():
+            for timeframe, splits in timeframes.items():
+                base = f"{_safe_name(symbol)}/{_safe_name(timeframe)}"
+                entry = {'features': {}, 'labels': {}}
+
+                for split, frame in splits.items():
+                    entry['features'][split] = _write_frame(tmp_path, f"{base}/features_{_safe_name(split)}", frame)
+
+                label_sets = data.get('labels', {}).get(symbol, {}).get(timeframe, {})
+                for label_type, label_splits in label_sets.items():
+                    entry['labels'][label_type] = {}
+                    for split, labels in label_splits.items():
+                        stem = f"{base}/labels_{_safe_name(label_type)}_{_safe_name(split)}"
+                        features_spec = entry['features'].get(split)
+
+                        # Метки обычно выровнены с признаками - индекс не дублируем
+                        if features_spec is not None and labels.index.equals(splits[split].index):
+                            index_spec = features_spec['index']
+                        else:
+                            index_spec = _write_index(tmp_path, f"{stem}_index.npy", labels.index)
+
+                        values = labels.to_numpy()
+                        entry['labels'][label_type][split] = {
+                            'file': _write_array(tmp_path, f"{stem}.npy", values),
+                            'dtype': values.dtype.str if values.dtype != object else 'object',
+                            'name': labels.name,
+                            'index': index_spec
+                        }
+
+                datasets.setdefault(symbol, {})[timeframe] = entry
+
+        manifest = {
+            'format': FORMAT_NAME,
+            'version': FORMAT_VERSION,
+            'metadata': data.get('metadata', {}),
+            'datasets': datasets
+        }
+        with open(os.path.join(tmp_path, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2, default=str)
+
+        # Подмена каталога: старая версия удаляется после переименования новой
+        old_path = f"{path.rstrip(os.sep)}.old"
+        if os.path.exists(path):
+            if os.path.exists(old_path):
+                shutil.rmtree(old_path)
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        if os.path.exists(old_path):
+            shutil.rmtree(old_path)
+
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    return manifest
+
+
+# =================================================================
+# ЧТЕНИЕ
+# =================================================================
+
+class PreparedDataset:
+    """
+    Датасет на диске; массивы отображаются в память при обращении
+    """
+
+    def __init__(self, path: str, mmap: bool = True):
+        self.path = path
+        self.mmap_mode = 'c' if mmap else None
+
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+
+        if self.manifest.get('format') != FORMAT_NAME:
+            raise ValueError(f"Неизвестный формат датасета: {self.manifest.get('format')}")
+
+        self.metadata = self.manifest.get('metadata', {})
+        self._datasets = self.manifest['datasets']
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._datasets)
+
+    def timeframes(self, symbol: str) -> List[str]:
+        return list(self._datasets.get(symbol, {}))
+
+    def columns(self, symbol: str, timeframe: str, split: str = 'train') -> List[Any]:
+        return list(self._datasets[symbol][timeframe]['features'][split]['columns'])
+
+    def _array(self, relative: str, dtype: str) -> np.ndarray:
+        if dtype == 'object':
+            return np.load(os.path.join(self.path, relative), allow_pickle=True)
+        return np.load(os.path.join(self.path, relative), mmap_mode=self.mmap_mode)
+
+    def _index(self, spec: Dict[str, Any]) -> pd.Index:
+        if spec['kind'] == 'range':
+            return pd.RangeIndex(spec['start'], spec['stop'], spec['step'], name=spec['name'])
+
+        values = np.load(os.path.join(self.path, spec['file']), allow_pickle=spec['kind'] == 'array')
+        if spec['kind'] == 'datetime':
+            index = pd.DatetimeIndex(values.view(f"M8[{spec['unit']}]"), name=spec['name'])
+            return index.tz_localize('UTC').tz_convert(spec['tz']) if spec['tz'] else index
+        return pd.Index(values, name=spec['name'])
+
+    def features(self, symbol: str, timeframe: str, split: str,
+                 columns: Optional[Sequence[Any]] = None) -> pd.DataFrame:
+        """
+        Признаки сплита
+
+        Args:
+            columns: Нужные колонки (по умолчанию все); читаются только их страницы
+        """
+        spec = self._datasets[symbol][timeframe]['features'][split]
+        all_columns = spec['columns']
+        wanted = list(all_columns) if columns is None else list(columns)
+
+        missing = [column for column in wanted if column not in all_columns]
+        if missing:
+            raise KeyError(f"Нет колонок в {symbol} {timeframe} {split}: {missing}")
+
+        position_of = {column: position for position, column in enumerate(all_columns)}
+        wanted_positions = {position_of[column] for column in wanted}
+        index = self._index(spec['index'])
+
+        frames = []
+        for block in spec['blocks']:
+            selected = [(offset, position) for offset, position in enumerate(block['columns'])
+                        if position in wanted_positions]
+            if not selected:
+                continue
+
+            values = self._array(block['file'], block['dtype'])
+            if len(selected) < len(block['columns']):
+                values = values[:, [offset for offset, _ in selected]]
+
+            frames.append(pd.DataFrame(
+                values,
+                index=index,
+                columns=[all_columns[position] for _, position in selected],
+                copy=False
+            ))
+
+        if not frames:
+            return pd.DataFrame(index=index)
+
+        frame = frames[0] if len(frames) == 1 else pd.concat(frames, axis=1)
+        return frame if list(frame.columns) == wanted else frame[wanted]
+
+    def labels(self, symbol: str, timeframe: str, label_type: str, split: str) -> pd.Series:
+        """Метки сплита"""
+        spec = self._datasets[symbol][timeframe]['labels'][label_type][split]
+        return pd.Series(
+            self._array(spec['file'], spec['dtype']),
+            index=self._index(spec['index']),
+            name=spec.get('name'),
+            copy=False
+        )
+
+    def load(self, symbols: Optional[Sequence[str]] = None,
+             timeframes: Optional[Sequence[str]] = None,
+             columns: Optional[Sequence[Any]] = None,
+             splits: Optional[Sequence[str]] = None,
+             label_types: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Вложенный словарь как у prepare_training_data для выбранного подмножества
+
+        DataFrame и Series построены поверх отображенных файлов: данные
+        подгружаются с диска при первом обращении к значениям.
+        """
+        result = {'features': {}, 'labels': {}, 'metadata': self.metadata}
+
+        for symbol in symbols or self.symbols:
+            if symbol not in self._datasets:
+                continue
+            result['features'][symbol] = {}
+            result['labels'][symbol] = {}
+
+            for timeframe in timeframes or self.timeframes(symbol):
+                entry = self._datasets[symbol].get(timeframe)
+                if entry is None:
+                    continue
+
+                result['features'][symbol][timeframe] = {
+                    split: self.features(symbol, timeframe, split, columns)
+                    for split in entry['features'] if splits is None or split in splits
+                }
+                result['labels'][symbol][timeframe] = {
+                    label_type: {
+                        split: self.labels(symbol, timeframe, label_type, split)
+                        for split in label_splits if splits is None or split in splits
+                    }
+                    for label_type, label_splits in entry['labels'].items()
+                    if label_types is None or label_type in label_types
+                }
+
+        return result
+
+
+def open_dataset(path: str, mmap: bool = True) -> PreparedDataset:
+    """Открывает датасет, сохраненный save_dataset"""
+    return PreparedDataset(path, mmap=mmap)
+
+
+def is_dataset(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+
+__all__ = [
+    'PreparedDataset',
+    'save_dataset',
+    'open_dataset',
+    'is_dataset',
+    'dataset_size'
+]
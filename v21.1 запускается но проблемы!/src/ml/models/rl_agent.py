@@ -11,7 +11,7 @@ Trading RL Agent для обучения с подкреплением - БАЗ
 
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Optional, Tuple, Any, Union
+from typing import Dict, List, Optional, Tuple, Any, Union, Sequence
 from datetime import datetime, timedelta
 import pickle
 import json
@@ -20,7 +20,6 @@ import logging
 from dataclasses import dataclass
 from enum import Enum
 import random
-from collections import deque
 
 
 # Безопасные импорты
@@ -81,16 +80,52 @@ class TradingReward:
     risk_penalty: float
     transaction_cost: float
 
+# Рыночная часть состояния: (колонка, значение по умолчанию, масштаб, сдвиг)
+MARKET_FEATURES = (
+    ('close', 0.0, 100.0, 0.0),          # Нормализованная цена
+    ('volume', 0.0, 1000000.0, 0.0),     # Нормализованный объем
+    ('rsi', 50.0, 100.0, 0.0),           # RSI [0,1]
+    ('macd', 0.0, 200.0, 100.0),         # MACD нормализованный
+    ('bb_position', 0.5, 1.0, 0.0)       # BB позиция [0,1]
+)
+
+STATE_SIZE = len(MARKET_FEATURES) + 3
+
+
+def _market_observations(data: pd.DataFrame, dtype=np.float64) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Рыночная часть наблюдений для всех баров и цены закрытия
+    
+    Returns:
+        (матрица (бары × 5), цены close float64)
+    """
+    observations = np.empty((len(data), len(MARKET_FEATURES)), dtype=dtype)
+    for column, (name, default, scale, shift) in enumerate(MARKET_FEATURES):
+        if name in data.columns:
+            values = data[name].to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            values = np.full(len(data), default)
+        observations[:, column] = (values + shift) / scale
+    
+    prices = data['close'].to_numpy(dtype=np.float64) if 'close' in data.columns \
+        else np.zeros(len(data))
+    return observations, prices
+
+
 class TradingEnvironment:
     """
     Торговое окружение для RL агента
+    
+    Наблюдения рынка считаются один раз при создании, шаг - обращение
+    по индексу; история хранится в заранее выделенных массивах.
     """
     
     def __init__(self, 
                  data: pd.DataFrame,
                  initial_balance: float = 10000.0,
                  transaction_cost: float = 0.001,
-                 max_position_size: float = 1.0):
+                 max_position_size: float = 1.0,
+                 dtype=np.float64):
         """
         Инициализация торгового окружения
         
@@ -99,12 +134,18 @@ class TradingEnvironment:
             initial_balance: Начальный баланс
             transaction_cost: Комиссия за сделку
             max_position_size: Максимальный размер позиции
+            dtype: Тип матрицы наблюдений (float32 экономит память, но
+                   округление состояний может расходиться с float64)
         """
         self.data = data.copy()
         self.initial_balance = initial_balance
         self.transaction_cost = transaction_cost
         self.max_position_size = max_position_size
         
+        # Наблюдения и цены по барам
+        self.observations, self.prices = _market_observations(self.data, dtype)
+        self.n_steps = len(self.data)
+        
         # Состояние окружения
         self.current_step = 0
         self.balance = initial_balance
@@ -113,12 +154,25 @@ class TradingEnvironment:
         self.winning_trades = 0
         
         # История
-        self.portfolio_history = []
-        self.action_history = []
-        self.reward_history = []
+        self._portfolio = np.empty(max(self.n_steps - 1, 0))
+        self._actions = np.empty(max(self.n_steps - 1, 0), dtype=np.int64)
+        self._rewards = np.empty(max(self.n_steps - 1, 0))
+        self._history_size = 0
         
         logger.info("✅ TradingEnvironment инициализирован")
     
+    @property
+    def portfolio_history(self) -> np.ndarray:
+        return self._portfolio[:self._history_size]
+    
+    @property
+    def action_history(self) -> np.ndarray:
+        return self._actions[:self._history_size]
+    
+    @property
+    def reward_history(self) -> np.ndarray:
+        return self._rewards[:self._history_size]
+    
     def reset(self) -> np.ndarray:
         """Сброс окружения к начальному состоянию"""
         self.current_step = 0
@@ -127,30 +181,21 @@ class TradingEnvironment:
         self.total_trades = 0
         self.winning_trades = 0
         
-        self.portfolio_history = []
-        self.action_history = []
-        self.reward_history = []
+        self._history_size = 0
         
         return self._get_state()
     
     def _get_state(self) -> np.ndarray:
         """Получение текущего состояния"""
-        if self.current_step >= len(self.data):
-            return np.zeros(8)  # Пустое состояние
-        
-        row = self.data.iloc[self.current_step]
+        if self.current_step >= self.n_steps:
+            return np.zeros(STATE_SIZE)  # Пустое состояние
         
         # Нормализуем состояние
-        state = np.array([
-            row.get('close', 0) / 100.0,  # Нормализованная цена
-            row.get('volume', 0) / 1000000.0,  # Нормализованный объем
-            row.get('rsi', 50) / 100.0,  # RSI [0,1]
-            (row.get('macd', 0) + 100) / 200.0,  # MACD нормализованный
-            row.get('bb_position', 0.5),  # BB позиция [0,1]
-            self.balance / self.initial_balance,  # Нормализованный баланс
-            self.position / self.max_position_size,  # Нормализованная позиция
-            self.current_step / len(self.data)  # Временная позиция
-        ])
+        state = np.empty(STATE_SIZE)
+        state[:-3] = self.observations[self.current_step]
+        state[-3] = self.balance / self.initial_balance  # Нормализованный баланс
+        state[-2] = self.position / self.max_position_size  # Нормализованная позиция
+        state[-1] = self.current_step / self.n_steps  # Временная позиция
         
         return state
     
@@ -164,11 +209,11 @@ class TradingEnvironment:
         Returns:
             Tuple: (new_state, reward, done, info)
         """
-        if self.current_step >= len(self.data) - 1:
+        if self.current_step >= self.n_steps - 1:
             return self._get_state(), 0.0, True, {}
         
-        current_price = self.data.iloc[self.current_step]['close']
-        next_price = self.data.iloc[self.current_step + 1]['close']
+        current_price = self.prices[self.current_step]
+        next_price = self.prices[self.current_step + 1]
         
         # Выполняем действие
         reward = self._execute_action(action, current_price, next_price)
@@ -178,12 +223,13 @@ class TradingEnvironment:
         
         # Записываем историю
         portfolio_value = self.balance + self.position * next_price
-        self.portfolio_history.append(portfolio_value)
-        self.action_history.append(action)
-        self.reward_history.append(reward)
+        self._portfolio[self._history_size] = portfolio_value
+        self._actions[self._history_size] = action
+        self._rewards[self._history_size] = reward
+        self._history_size += 1
         
         # Проверяем завершение эпизода
-        done = (self.current_step >= len(self.data) - 1) or (portfolio_value <= 0)
+        done = (self.current_step >= self.n_steps - 1) or (portfolio_value <= 0)
         
         info = {
             'portfolio_value': portfolio_value,
@@ -249,6 +295,352 @@ class TradingEnvironment:
         
         return reward
 
+class VectorizedTradingEnvironment:
+    """
+    K торговых окружений, шагающих синхронно
+    
+    Окружения - отрезки одного ряда с разными стартовыми смещениями или
+    ряды разных символов, обрезанные до общей длины. Правила сделок и
+    наград совпадают с TradingEnvironment, но считаются массивами
+    сразу для всех K окружений.
+    """
+    
+    def __init__(self,
+                 data: Union[pd.DataFrame, Sequence[pd.DataFrame]],
+                 n_envs: int = 4,
+                 start_offsets: Optional[Sequence[int]] = None,
+                 episode_length: Optional[int] = None,
+                 initial_balance: float = 10000.0,
+                 transaction_cost: float = 0.001,
+                 max_position_size: float = 1.0,
+                 dtype=np.float64):
+        """
+        Args:
+            data: Один DataFrame (окружения - его отрезки) или список DataFrame по символам
+            n_envs: Количество отрезков одного ряда
+            start_offsets: Стартовые бары отрезков (по умолчанию ряд делится
+                           на n_envs последовательных частей)
+            episode_length: Баров в эпизоде (по умолчанию максимально возможное)
+        """
+        self.initial_balance = initial_balance
+        self.transaction_cost = transaction_cost
+        self.max_position_size = max_position_size
+        
+        if isinstance(data, pd.DataFrame):
+            observations, prices = _market_observations(data, dtype)
+            if start_offsets is None:
+                chunk = len(data) // n_envs
+                start_offsets = [k * chunk for k in range(n_envs)]
+                length = episode_length or chunk
+            else:
+                length = episode_length or len(data) - max(start_offsets)
+            segments = [(observations[offset:offset + length], prices[offset:offset + length])
+                        for offset in start_offsets]
+        else:
+            segments = [_market_observations(frame, dtype) for frame in data]
+            length = min(len(frame_prices) for _, frame_prices in segments)
+            length = min(length, episode_length or length)
+            segments = [(obs[:length], frame_prices[:length]) for obs, frame_prices in segments]
+        
+        if length < 2:
+            raise ValueError(f"Недостаточно данных для эпизода: {length} баров")
+        
+        self.n_envs = len(segments)
+        self.n_steps = length
+        self.observations = np.stack([obs for obs, _ in segments])       # (K, L, 5)
+        self.prices = np.stack([frame_prices for _, frame_prices in segments])  # (K, L)
+        self._env_index = np.arange(self.n_envs)
+        
+        self.reset()
+        
+        logger.info(f"✅ VectorizedTradingEnvironment инициализирован: {self.n_envs} окружений по {length} баров")
+    
+    def reset(self) -> np.ndarray:
+        """Сброс всех окружений, состояния (K, 8)"""
+        self.current_step = 0
+        self.balance = np.full(self.n_envs, float(self.initial_balance))
+        self.position = np.zeros(self.n_envs)
+        self.total_trades = np.zeros(self.n_envs, dtype=np.int64)
+        self.winning_trades = np.zeros(self.n_envs, dtype=np.int64)
+        self.active = np.ones(self.n_envs, dtype=bool)
+        self.portfolio_value = self.balance.copy()
+        
+        return self._get_states()
+    
+    def _get_states(self) -> np.ndarray:
+        """Состояния всех окружений"""
+        states = np.empty((self.n_envs, STATE_SIZE))
+        states[:, :-3] = self.observations[:, min(self.current_step, self.n_steps - 1)]
+        states[:, -3] = self.balance / self.initial_balance
+        states[:, -2] = self.position / self.max_position_size
+        states[:, -1] = self.current_step / self.n_steps
+        return states
+    
+    def step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Шаг всех окружений
+        
+        Завершенные окружения (баланс исчерпан) больше не меняются
+        и получают нулевую награду.
+        
+        Returns:
+            (states (K, 8), rewards (K,), dones (K,), info с массивами по окружениям)
+        """
+        rewards = np.zeros(self.n_envs)
+        
+        if self.current_step < self.n_steps - 1:
+            actions = np.asarray(actions)
+            current_price = self.prices[:, self.current_step]
+            next_price = self.prices[:, self.current_step + 1]
+            
+            rewards = self._execute_actions(actions, current_price, next_price)
+            self.current_step += 1
+            
+            self.portfolio_value = np.where(
+                self.active, self.balance + self.position * next_price, self.portfolio_value
+            )
+            self.active &= self.portfolio_value > 0
+        
+        dones = ~self.active | (self.current_step >= self.n_steps - 1)
+        
+        info = {
+            'portfolio_value': self.portfolio_value,
+            'balance': self.balance,
+            'position': self.position,
+            'total_trades': self.total_trades,
+            'win_rate': self.winning_trades / np.maximum(self.total_trades, 1)
+        }
+        
+        return self._get_states(), rewards, dones, info
+    
+    def _execute_actions(self, actions: np.ndarray, current_price: np.ndarray,
+                         next_price: np.ndarray) -> np.ndarray:
+        """Торговые действия всех активных окружений (правила TradingEnvironment)"""
+        active = self.active
+        price_change = (next_price - current_price) / current_price
+        
+        # Покупка
+        buy = active & (actions == int(TradingAction.BUY)) & (self.position < self.max_position_size)
+        buy_size = np.minimum(0.1, self.max_position_size - self.position)
+        cost = buy_size * current_price * (1 + self.transaction_cost)
+        bought = buy & (self.balance >= cost)
+        
+        # Продажа
+        sell = active & (actions == int(TradingAction.SELL)) & (self.position > 0)
+        sell_size = np.minimum(0.1, self.position)
+        revenue = sell_size * current_price * (1 - self.transaction_cost)
+        
+        self.balance = np.where(bought, self.balance - cost,
+                                np.where(sell, self.balance + revenue, self.balance))
+        self.position = np.where(bought, self.position + buy_size,
+                                 np.where(sell, self.position - sell_size, self.position))
+        self.total_trades += bought | sell
+        self.winning_trades += (bought & (price_change > 0)) | (sell & (price_change < 0))
+        
+        # Награда за прибыльную покупку/продажу, штраф за бездействие
+        rewards = np.where(
+            buy, np.where(bought, buy_size * price_change * 100, 0.0),
+            np.where(sell, sell_size * (-price_change) * 100, -0.01)
+        )
+        
+        # Дополнительные штрафы/награды
+        portfolio_value = self.balance + self.position * next_price
+        rewards = rewards - np.where(portfolio_value < self.initial_balance * 0.9, 1.0, 0.0)
+        rewards = rewards + np.where(portfolio_value > self.initial_balance * 1.1, 0.5, 0.0)
+        
+        return np.where(active, rewards, 0.0)
+
+
+# =================================================================
+# Q-ТАБЛИЦА И БУФЕР ОПЫТА
+# =================================================================
+
+class QTable:
+    """
+    Q-таблица на массиве NumPy
+    
+    Состояние кодируется целыми бинами round(state * 10^decimals) - те же
+    ячейки, что и у прежнего ключа str(np.round(state, 1).tolist()).
+    Словарь отображает байты бинов в номер строки массива Q-значений,
+    массив растет удвоением.
+    """
+    
+    # Бины для нечисловых компонент состояния
+    NAN_BIN = np.iinfo(np.int64).min
+    POS_INF_BIN = np.iinfo(np.int64).max
+    NEG_INF_BIN = np.iinfo(np.int64).min + 1
+    MAX_BIN = 2 ** 62
+    
+    def __init__(self, state_size: int, action_size: int,
+                 decimals: int = 1, capacity: int = 1024):
+        self.state_size = state_size
+        self.action_size = action_size
+        self.decimals = decimals
+        self._scale = 10.0 ** decimals
+        
+        self._index: Dict[bytes, int] = {}
+        self._bins = np.zeros((capacity, state_size), dtype=np.int64)
+        self._q = np.zeros((capacity, action_size), dtype=np.float64)
+        self.size = 0
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def __contains__(self, state) -> bool:
+        return self.encode(state).tobytes() in self._index
+    
+    @property
+    def values(self) -> np.ndarray:
+        """Q-значения известных состояний (представление, меняется на месте)"""
+        return self._q[:self.size]
+    
+    def encode(self, states) -> np.ndarray:
+        """Состояния (S,) или (N, S) -> целочисленные бины той же формы"""
+        scaled = np.asarray(states, dtype=np.float64) * self._scale
+        with np.errstate(invalid='ignore'):
+            bins = np.rint(np.clip(scaled, -self.MAX_BIN, self.MAX_BIN)).astype(np.int64)
+        if not np.isfinite(scaled).all():
+            bins[np.isnan(scaled)] = self.NAN_BIN
+            bins[scaled == np.inf] = self.POS_INF_BIN
+            bins[scaled == -np.inf] = self.NEG_INF_BIN
+        return bins
+    
+    def index(self, state, create: bool = True) -> int:
+        """Строка состояния; новое состояние добавляется с нулевыми Q (или -1 при create=False)"""
+        bins = self.encode(state)
+        row = self._index.get(bins.tobytes())
+        if row is None:
+            if not create:
+                return -1
+            row = self._add(bins)
+        return row
+    
+    def indices(self, states, create: bool = True) -> np.ndarray:
+        """Строки для пачки состояний (N, S)"""
+        bins = self.encode(states)
+        rows = np.empty(len(bins), dtype=np.int64)
+        for i, row_bins in enumerate(bins):
+            row = self._index.get(row_bins.tobytes())
+            if row is None:
+                row = self._add(row_bins) if create else -1
+            rows[i] = row
+        return rows
+    
+    def get(self, state) -> Optional[np.ndarray]:
+        """Q-значения состояния или None, если оно не встречалось"""
+        row = self.index(state, create=False)
+        return self._q[row] if row >= 0 else None
+    
+    def _add(self, bins: np.ndarray) -> int:
+        if self.size == len(self._q):
+            grow = max(len(self._q), 1)
+            self._bins = np.concatenate([self._bins, np.zeros((grow, self.state_size), dtype=np.int64)])
+            self._q = np.concatenate([self._q, np.zeros((grow, self.action_size))])
+        row = self.size
+        self._bins[row] = bins
+        self._q[row] = 0.0
+        self._index[bins.tobytes()] = row
+        self.size += 1
+        return row
+    
+    # =================================================================
+    # СОХРАНЕНИЕ
+    # =================================================================
+    
+    def to_arrays(self) -> Dict[str, Any]:
+        """Компактный формат для сохранения"""
+        return {
+            'decimals': self.decimals,
+            'bins': self._bins[:self.size].copy(),
+            'values': self._q[:self.size].copy()
+        }
+    
+    @classmethod
+    def from_arrays(cls, data: Dict[str, Any]) -> 'QTable':
+        bins = np.asarray(data['bins'], dtype=np.int64)
+        values = np.asarray(data['values'], dtype=np.float64)
+        table = cls(bins.shape[1], values.shape[1], data.get('decimals', 1), max(len(bins), 1))
+        for row_bins, q_values in zip(bins, values):
+            table._q[table._add(row_bins)] = q_values
+        return table
+    
+    @classmethod
+    def from_dict(cls, q_table: Dict[str, Any], state_size: int,
+                  action_size: int) -> 'QTable':
+        """Миграция прежнего формата {str(np.round(state, 1).tolist()): Q}"""
+        table = cls(state_size, action_size, capacity=max(len(q_table), 1))
+        for key, q_values in q_table.items():
+            literal = key.replace('nan', 'NaN').replace('-inf', '-Infinity').replace('inf', 'Infinity')
+            row = table.index(json.loads(literal))
+            table._q[row] = np.asarray(q_values, dtype=np.float64)
+        return table
+    
+    def to_dict(self) -> Dict[str, np.ndarray]:
+        """Экспорт в прежний формат словаря"""
+        states = np.round(self._bins[:self.size] / self._scale, self.decimals)
+        return {str(state.tolist()): self._q[row].copy() for row, state in enumerate(states)}
+
+
+class ReplayBuffer:
+    """
+    Кольцевой буфер опыта на структурированном массиве
+    
+    Хранит номера строк Q-таблицы вместо векторов состояний,
+    поэтому при замене Q-таблицы буфер нужно очистить.
+    """
+    
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=[
+            ('state', np.int64),
+            ('action', np.int64),
+            ('reward', np.float64),
+            ('next_state', np.int64),
+            ('done', np.bool_)
+        ])
+        self._start = 0
+        self._size = 0
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def append(self, state: int, action: int, reward: float, next_state: int, done: bool):
+        position = (self._start + self._size) % self.capacity
+        self._data[position] = (state, action, reward, next_state, done)
+        if self._size < self.capacity:
+            self._size += 1
+        else:
+            self._start = (self._start + 1) % self.capacity
+    
+    def extend(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+               next_states: np.ndarray, dones: np.ndarray):
+        """Пачка переходов (например, от K окружений за один шаг)"""
+        count = min(len(states), self.capacity)
+        if count == 0:
+            return
+        
+        positions = (self._start + self._size + np.arange(count)) % self.capacity
+        self._data['state'][positions] = states[-count:]
+        self._data['action'][positions] = actions[-count:]
+        self._data['reward'][positions] = rewards[-count:]
+        self._data['next_state'][positions] = next_states[-count:]
+        self._data['done'][positions] = dones[-count:]
+        
+        overflow = max(self._size + count - self.capacity, 0)
+        self._size = min(self._size + count, self.capacity)
+        self._start = (self._start + overflow) % self.capacity
+    
+    def sample(self, batch_size: int) -> np.ndarray:
+        """Случайная выборка без повторов (порядок - от старых записей к новым)"""
+        picks = np.fromiter(random.sample(range(self._size), min(batch_size, self._size)),
+                            dtype=np.int64)
+        return self._data[(self._start + picks) % self.capacity]
+    
+    def clear(self):
+        self._start = 0
+        self._size = 0
+
+
 class TradingRLAgent:
     """
     ✅ ИСПРАВЛЕННЫЙ: RL агент для торговли с использованием Q-Learning
@@ -288,10 +680,10 @@ class TradingRLAgent:
         self.gamma = gamma
         
         # Q-table для простого Q-Learning
-        self.q_table = {}
+        self.q_table = QTable(state_size, action_size)
         
         # Буфер опыта
-        self.memory = deque(maxlen=memory_size)
+        self.memory = ReplayBuffer(memory_size)
         
         # Метрики
         self.training_history = []
@@ -299,12 +691,6 @@ class TradingRLAgent:
         
         logger.info("✅ TradingRLAgent инициализирован")
     
-    def _discretize_state(self, state: np.ndarray) -> str:
-        """Дискретизация состояния для Q-table"""
-        # Простая дискретизация: округляем до 1 знака после запятой
-        discretized = np.round(state, 1)
-        return str(discretized.tolist())
-    
     def get_action(self, state: np.ndarray, training: bool = True) -> int:
         """
         Выбор действия на основе epsilon-greedy стратегии
@@ -316,49 +702,52 @@ class TradingRLAgent:
         Returns:
             Выбранное действие (0, 1, 2)
         """
-        state_key = self._discretize_state(state)
-        
-        # Инициализируем Q-значения для нового состояния
-        if state_key not in self.q_table:
-            self.q_table[state_key] = np.zeros(self.action_size)
-        
-        # Epsilon-greedy выбор действия
+        # Новое состояние получает нулевые Q-значения
+        return self._select_action(self.q_table.index(state), training)
+    
+    def _select_action(self, row: int, training: bool) -> int:
+        """Epsilon-greedy выбор действия по строке Q-таблицы"""
         if training and random.random() < self.epsilon:
             return random.randint(0, self.action_size - 1)
         else:
-            return np.argmax(self.q_table[state_key])
+            return int(np.argmax(self.q_table.values[row]))
+    
+    def _select_actions(self, rows: np.ndarray, training: bool) -> np.ndarray:
+        """Epsilon-greedy выбор действий для пачки строк Q-таблицы"""
+        actions = self.q_table.values[rows].argmax(axis=1)
+        if training:
+            explore = np.random.random(len(rows)) < self.epsilon
+            actions = np.where(explore, np.random.randint(0, self.action_size, len(rows)), actions)
+        return actions
     
     def remember(self, state: np.ndarray, action: int, reward: float, 
                  next_state: np.ndarray, done: bool):
         """Запоминание опыта"""
-        self.memory.append((state, action, reward, next_state, done))
+        self.memory.append(
+            self.q_table.index(state), action, reward, self.q_table.index(next_state), done
+        )
     
     def replay(self, batch_size: int = 32):
-        """Обучение на батче из буфера опыта"""
+        """
+        Обучение на батче из буфера опыта
+        
+        Все цели считаются по Q-значениям до обновления, повторы пары
+        (состояние, действие) в батче складываются.
+        """
         if len(self.memory) < batch_size:
             return
         
         # Выбираем случайный батч
-        batch = random.sample(self.memory, min(batch_size, len(self.memory)))
+        batch = self.memory.sample(batch_size)
+        q_values = self.q_table.values
         
-        for state, action, reward, next_state, done in batch:
-            state_key = self._discretize_state(state)
-            next_state_key = self._discretize_state(next_state)
-            
-            # Инициализируем Q-значения если нужно
-            if state_key not in self.q_table:
-                self.q_table[state_key] = np.zeros(self.action_size)
-            if next_state_key not in self.q_table:
-                self.q_table[next_state_key] = np.zeros(self.action_size)
-            
-            # Q-Learning обновление
-            target = reward
-            if not done:
-                target += self.gamma * np.max(self.q_table[next_state_key])
-            
-            # Обновляем Q-значение
-            current_q = self.q_table[state_key][action]
-            self.q_table[state_key][action] = current_q + self.learning_rate * (target - current_q)
+        # Q-Learning обновление
+        targets = batch['reward'] + np.where(
+            batch['done'], 0.0, self.gamma * q_values[batch['next_state']].max(axis=1)
+        )
+        current_q = q_values[batch['state'], batch['action']]
+        np.add.at(q_values, (batch['state'], batch['action']),
+                  self.learning_rate * (targets - current_q))
         
         # Уменьшаем epsilon
         if self.epsilon > self.epsilon_min:
@@ -368,7 +757,8 @@ class TradingRLAgent:
               data: pd.DataFrame,
               episodes: int = 100,
               max_steps_per_episode: int = None,
-              validation_split: float = 0.2) -> Dict[str, Any]:
+              validation_split: float = 0.2,
+              n_envs: int = 1) -> Dict[str, Any]:
         """
         Обучение RL агента
         
@@ -377,6 +767,9 @@ class TradingRLAgent:
             episodes: Количество эпизодов обучения
             max_steps_per_episode: Максимальное количество шагов за эпизод
             validation_split: Доля данных для валидации
+            n_envs: Окружений, шагающих синхронно (при > 1 обучающие данные
+                    делятся на n_envs последовательных отрезков, а батч replay
+                    растет пропорционально)
             
         Returns:
             Результаты обучения
@@ -390,40 +783,27 @@ class TradingRLAgent:
             val_data = data.iloc[split_idx:].copy()
             
             # Создаем окружение
-            env = TradingEnvironment(train_data)
+            if n_envs > 1:
+                env = VectorizedTradingEnvironment(train_data, n_envs=n_envs)
+                run_episode = self._run_vectorized_episode
+            else:
+                env = TradingEnvironment(train_data)
+                run_episode = self._run_episode
             
             # Метрики обучения
             episode_rewards = []
             episode_portfolio_values = []
             
-            max_steps = max_steps_per_episode or len(train_data) - 1
+            max_steps = max_steps_per_episode or env.n_steps - 1
             
             for episode in range(episodes):
-                state = env.reset()
-                episode_reward = 0
-                
-                for step in range(max_steps):
-                    # Выбираем действие
-                    action = self.get_action(state, training=True)
-                    
-                    # Выполняем действие
-                    next_state, reward, done, info = env.step(action)
-                    
-                    # Запоминаем опыт
-                    self.remember(state, action, reward, next_state, done)
-                    
-                    episode_reward += reward
-                    state = next_state
-                    
-                    if done:
-                        break
+                episode_reward, final_portfolio = run_episode(env, max_steps)
                 
                 # Обучаем агента
-                self.replay()
+                self.replay(32 * max(n_envs, 1))
                 
                 # Записываем метрики
                 episode_rewards.append(episode_reward)
-                final_portfolio = info.get('portfolio_value', env.initial_balance)
                 episode_portfolio_values.append(final_portfolio)
                 
                 # Логируем прогресс
@@ -469,6 +849,56 @@ class TradingRLAgent:
             logger.error(f"❌ Ошибка обучения RL агента: {e}")
             return {'success': False, 'error': str(e)}
     
+    def _run_episode(self, env: TradingEnvironment, max_steps: int) -> Tuple[float, float]:
+        """Эпизод в одном окружении: (суммарная награда, итоговая стоимость портфеля)"""
+        row = self.q_table.index(env.reset())
+        episode_reward = 0
+        info = {}
+        
+        for step in range(max_steps):
+            # Выбираем действие
+            action = self._select_action(row, training=True)
+            
+            # Выполняем действие
+            next_state, reward, done, info = env.step(action)
+            next_row = self.q_table.index(next_state)
+            
+            # Запоминаем опыт
+            self.memory.append(row, action, reward, next_row, done)
+            
+            episode_reward += reward
+            row = next_row
+            
+            if done:
+                break
+        
+        return episode_reward, info.get('portfolio_value', env.initial_balance)
+    
+    def _run_vectorized_episode(self, env: 'VectorizedTradingEnvironment',
+                                max_steps: int) -> Tuple[float, float]:
+        """Эпизод в K окружениях: средние по окружениям награда и стоимость портфеля"""
+        rows = self.q_table.indices(env.reset())
+        episode_reward = 0.0
+        
+        for step in range(max_steps):
+            actions = self._select_actions(rows, training=True)
+            active = env.active.copy()
+            
+            next_states, rewards, dones, info = env.step(actions)
+            next_rows = self.q_table.indices(next_states)
+            
+            # Опыт только окружений, которые еще не завершились
+            self.memory.extend(rows[active], actions[active], rewards[active],
+                               next_rows[active], dones[active])
+            
+            episode_reward += float(rewards.sum()) / env.n_envs
+            rows = next_rows
+            
+            if dones.all():
+                break
+        
+        return episode_reward, float(env.portfolio_value.mean())
+    
     def _validate(self, val_data: pd.DataFrame) -> Dict[str, Any]:
         """Валидация агента на отложенных данных"""
         try:
@@ -550,9 +980,9 @@ class TradingRLAgent:
             action = self.get_action(state_array, training=False)
             
             # Получаем Q-значения
-            state_key = self._discretize_state(state_array)
-            if state_key in self.q_table:
-                q_values = self.q_table[state_key].tolist()
+            state_q = self.q_table.get(state_array)
+            if state_q is not None:
+                q_values = state_q.tolist()
                 confidence = max(q_values) / (sum(q_values) + 1e-8)
             else:
                 q_values = [0.33, 0.34, 0.33]
@@ -565,7 +995,7 @@ class TradingRLAgent:
                 'action_name': action_names[action],
                 'confidence': confidence,
                 'q_values': q_values,
-                'state_known': state_key in self.q_table,
+                'state_known': state_q is not None,
                 'timestamp': datetime.now().isoformat()
             }
             
@@ -582,7 +1012,8 @@ class TradingRLAgent:
         """Сохранение модели"""
         try:
             model_data = {
-                'q_table': self.q_table,
+                'format_version': 2,
+                'q_table': self.q_table.to_arrays(),
                 'state_size': self.state_size,
                 'action_size': self.action_size,
                 'learning_rate': self.learning_rate,
@@ -609,9 +1040,17 @@ class TradingRLAgent:
             with open(filepath, 'rb') as f:
                 model_data = pickle.load(f)
             
-            self.q_table = model_data['q_table']
             self.state_size = model_data['state_size']
             self.action_size = model_data['action_size']
+            
+            # Файлы до format_version 2 хранят Q-table словарем строковых ключей
+            if model_data.get('format_version', 1) >= 2:
+                self.q_table = QTable.from_arrays(model_data['q_table'])
+            else:
+                self.q_table = QTable.from_dict(
+                    model_data['q_table'], self.state_size, self.action_size
+                )
+            self.memory.clear()
             self.learning_rate = model_data['learning_rate']
             self.epsilon = model_data['epsilon']
             self.epsilon_decay = model_data['epsilon_decay']
@@ -642,7 +1081,10 @@ class TradingRLAgent:
 # ✅ ЭКСПОРТ
 __all__ = [
     'TradingRLAgent',
+    'QTable',
+    'ReplayBuffer',
     'TradingEnvironment',
+    'VectorizedTradingEnvironment',
     'TradingAction',
     'TradingState',
     'TradingReward'
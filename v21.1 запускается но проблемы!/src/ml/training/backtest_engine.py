@@ -0,0 +1,427 @@
+"""
+Векторное ядро бэктеста на массивах NumPy
+Файл: src/ml/training/backtest_engine.py
+
+Цены и колонки предсказаний извлекаются из DataFrame один раз, после чего
+событийный цикл идет по плоским массивам: открытые позиции хранятся как
+индексы в таблице сделок (структура массивов), а участки без позиций и без
+сигналов пропускаются целиком. При наличии Numba цикл компилируется.
+
+Семантика полностью повторяет Backtester.run_backtest: порядок проверок
+SL -> TP -> трейлинг, учет комиссии при каждом закрытии и то, что закрытые
+по развороту сигнала позиции остаются в списке открытых до SL/TP или конца
+теста. Поэтому результаты побитово совпадают с циклом по iloc.
+"""
+import logging
+from typing import Dict, Any
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# Коды сигналов
+SIGNAL_HOLD = 0
+SIGNAL_BUY = 1
+SIGNAL_SELL = -1
+
+# Стороны сделки
+SIDE_LONG = 1
+SIDE_SHORT = -1
+
+# Причины закрытия (индекс в EXIT_REASONS)
+EXIT_NONE = 0
+EXIT_STOP_LOSS = 1
+EXIT_TAKE_PROFIT = 2
+EXIT_SIGNAL_REVERSAL = 3
+EXIT_END_OF_BACKTEST = 4
+
+EXIT_REASONS = (None, 'stop_loss', 'take_profit', 'signal_reversal', 'end_of_backtest')
+
+# Колонки таблицы сделок (float64)
+TRADE_FIELDS = (
+    'entry_price', 'position_size', 'stop_loss', 'take_profit',
+    'exit_price', 'profit', 'profit_percent', 'commission_paid',
+    'max_profit', 'max_loss'
+)
+(F_ENTRY, F_SIZE, F_SL, F_TP, F_EXIT, F_PROFIT, F_PROFIT_PCT,
+ F_COMMISSION, F_MAX_PROFIT, F_MAX_LOSS) = range(len(TRADE_FIELDS))
+N_TRADE_FIELDS = len(TRADE_FIELDS)
+
+# Целочисленные колонки: бар входа, бар выхода, сторона, причина, SL/TP заданы (не None)
+(I_ENTRY_BAR, I_EXIT_BAR, I_SIDE, I_REASON, I_HAS_SL, I_HAS_TP) = range(6)
+N_FLAG_FIELDS = 6
+
+
+# =================================================================
+# ЯДРО
+# =================================================================
+
+def _close(trades, flags, t, price, bar, reason, slippage, commission):
+    """Закрытие сделки t (как Backtester._close_position)"""
+    if flags[t, I_SIDE] == SIDE_LONG:
+        exit_price = price * (1 - slippage)
+    else:
+        exit_price = price * (1 + slippage)
+
+    flags[t, I_EXIT_BAR] = bar
+    flags[t, I_REASON] = reason
+    trades[t, F_EXIT] = exit_price
+
+    size = trades[t, F_SIZE]
+    if flags[t, I_SIDE] == SIDE_LONG:
+        profit = size * (exit_price / trades[t, F_ENTRY] - 1)
+    else:
+        profit = size * (1 - exit_price / trades[t, F_ENTRY])
+
+    trades[t, F_COMMISSION] += size * commission
+    profit -= trades[t, F_COMMISSION]
+    trades[t, F_PROFIT] = profit
+    trades[t, F_PROFIT_PCT] = (profit / size) * 100
+
+
+def _open(trades, flags, t, side, bar, price, size, sl_percent, tp_percent,
+          slippage, commission, use_stop_loss, use_take_profit):
+    """Открытие сделки t (как Backtester._open_position)"""
+    trades[t, F_COMMISSION] = size * commission
+    if side == SIDE_LONG:
+        entry_price = price * (1 + slippage)
+        stop_loss = entry_price * (1 - sl_percent / 100)
+        take_profit = entry_price * (1 + tp_percent / 100)
+    else:
+        entry_price = price * (1 - slippage)
+        stop_loss = entry_price * (1 + sl_percent / 100)
+        take_profit = entry_price * (1 - tp_percent / 100)
+
+    trades[t, F_ENTRY] = entry_price
+    trades[t, F_SIZE] = size
+    trades[t, F_SL] = stop_loss if use_stop_loss else np.nan
+    trades[t, F_TP] = take_profit if use_take_profit else np.nan
+    trades[t, F_MAX_PROFIT] = 0.0
+    trades[t, F_MAX_LOSS] = 0.0
+    flags[t, I_ENTRY_BAR] = bar
+    flags[t, I_EXIT_BAR] = -1
+    flags[t, I_SIDE] = side
+    flags[t, I_REASON] = EXIT_NONE
+    flags[t, I_HAS_SL] = 1 if use_stop_loss else 0
+    flags[t, I_HAS_TP] = 1 if use_take_profit else 0
+
+
+def _simulate(close, high, low, signals, confidence, tp_percent, sl_percent,
+              next_signal, initial_balance, commission, slippage,
+              max_position_size, use_leverage, leverage, risk_per_trade,
+              max_open_positions, enable_shorting, use_stop_loss,
+              use_take_profit, trailing_stop, trailing_stop_distance):
+    """
+    Событийный цикл по массивам
+
+    Returns:
+        (equity, trades, flags, order) - кривая капитала, таблицы сделок
+        и номера сделок в порядке попадания в список закрытых
+    """
+    n_bars = len(close)
+    n_predictions = len(signals)
+
+    capacity = 1
+    for i in range(1, min(n_bars, n_predictions)):
+        if signals[i] != SIGNAL_HOLD:
+            capacity += 1
+
+    trades = np.zeros((capacity, N_TRADE_FIELDS))
+    flags = np.zeros((capacity, N_FLAG_FIELDS), dtype=np.int64)
+    order = np.empty(capacity, dtype=np.int64)
+    n_closed = 0
+    n_trades = 0
+
+    open_ids = np.empty(capacity, dtype=np.int64)
+    keep = np.empty(capacity, dtype=np.int64)
+    closed = np.empty(capacity, dtype=np.int64)
+    n_open = 0
+
+    balance = initial_balance
+    equity = np.empty(max(n_bars, 1))
+    equity[0] = balance
+
+    i = 1
+    while i < n_bars:
+        # Без позиций капитал = баланс до следующего сигнала
+        if n_open == 0:
+            # При балансе <= 0 размер позиции <= 0 - входов больше не будет
+            if balance <= 0 and max_position_size >= 0 and (not use_leverage or leverage >= 0):
+                for k in range(i, n_bars):
+                    equity[k] = balance
+                break
+            target = next_signal[i] if i < n_predictions else n_bars
+            if target > i:
+                for k in range(i, min(target, n_bars)):
+                    equity[k] = balance
+                i = target
+                continue
+
+        price = close[i]
+        bar_high = high[i]
+        bar_low = low[i]
+
+        # Проверяем открытые позиции
+        n_keep = 0
+        n_hit = 0
+        for k in range(n_open):
+            t = open_ids[k]
+            side = flags[t, I_SIDE]
+
+            stop_loss = trades[t, F_SL]
+            if use_stop_loss and flags[t, I_HAS_SL] == 1 and stop_loss != 0:
+                if (side == SIDE_LONG and bar_low <= stop_loss) or \
+                   (side == SIDE_SHORT and bar_high >= stop_loss):
+                    _close(trades, flags, t, stop_loss, i, EXIT_STOP_LOSS, slippage, commission)
+                    closed[n_hit] = t
+                    n_hit += 1
+                    continue
+
+            take_profit = trades[t, F_TP]
+            if use_take_profit and flags[t, I_HAS_TP] == 1 and take_profit != 0:
+                if (side == SIDE_LONG and bar_high >= take_profit) or \
+                   (side == SIDE_SHORT and bar_low <= take_profit):
+                    _close(trades, flags, t, take_profit, i, EXIT_TAKE_PROFIT, slippage, commission)
+                    closed[n_hit] = t
+                    n_hit += 1
+                    continue
+
+            entry_price = trades[t, F_ENTRY]
+            if side == SIDE_LONG:
+                current_profit = (price - entry_price) / entry_price
+            else:
+                current_profit = (entry_price - price) / entry_price
+
+            # max()/min() Python: второй аргумент берется только при строгом сравнении
+            if current_profit > trades[t, F_MAX_PROFIT]:
+                trades[t, F_MAX_PROFIT] = current_profit
+            if current_profit < trades[t, F_MAX_LOSS]:
+                trades[t, F_MAX_LOSS] = current_profit
+
+            if trailing_stop and current_profit > trailing_stop_distance:
+                has_stop = flags[t, I_HAS_SL] == 1 and stop_loss != 0
+                if side == SIDE_LONG:
+                    new_stop = price * (1 - trailing_stop_distance)
+                    if not has_stop or new_stop > stop_loss:
+                        trades[t, F_SL] = new_stop
+                else:
+                    new_stop = price * (1 + trailing_stop_distance)
+                    if not has_stop or new_stop < stop_loss:
+                        trades[t, F_SL] = new_stop
+                flags[t, I_HAS_SL] = 1
+
+            keep[n_keep] = t
+            n_keep += 1
+
+        # Удаляем закрытые позиции (в обратном порядке, как pop с конца)
+        for k in range(n_hit - 1, -1, -1):
+            t = closed[k]
+            order[n_closed] = t
+            n_closed += 1
+            balance += trades[t, F_PROFIT]
+        if n_hit:
+            for k in range(n_keep):
+                open_ids[k] = keep[k]
+            n_open = n_keep
+
+        # Сигналы на вход
+        if n_open < max_open_positions and i < n_predictions:
+            signal = signals[i]
+            conf = confidence[i]
+            sl_pct = sl_percent[i]
+
+            position_size = balance * risk_per_trade / (sl_pct / 100)
+            position_size *= 0.5 + conf * 0.5
+            max_position = balance * max_position_size
+            if max_position < position_size:
+                position_size = max_position
+            if use_leverage:
+                position_size *= leverage
+
+            side = 0
+            if signal == SIGNAL_BUY and position_size > 0:
+                side = SIDE_LONG
+            elif signal == SIGNAL_SELL and enable_shorting and position_size > 0:
+                side = SIDE_SHORT
+
+            if side != 0:
+                if enable_shorting:
+                    # Разворот: позиции закрываются, но остаются в списке открытых
+                    for k in range(n_open):
+                        t = open_ids[k]
+                        if flags[t, I_SIDE] == -side:
+                            _close(trades, flags, t, price, i, EXIT_SIGNAL_REVERSAL,
+                                   slippage, commission)
+
+                t = n_trades
+                n_trades += 1
+                _open(trades, flags, t, side, i, price, position_size, sl_pct,
+                      tp_percent[i], slippage, commission, use_stop_loss, use_take_profit)
+                open_ids[n_open] = t
+                n_open += 1
+                balance -= trades[t, F_SIZE] + trades[t, F_COMMISSION]
+
+        # Капитал с учетом открытых позиций
+        current_equity = balance
+        for k in range(n_open):
+            t = open_ids[k]
+            if flags[t, I_SIDE] == SIDE_LONG:
+                current_equity += trades[t, F_SIZE] * (price / trades[t, F_ENTRY])
+            else:
+                current_equity += trades[t, F_SIZE] * (2 - price / trades[t, F_ENTRY])
+        equity[i] = current_equity
+        i += 1
+
+    # Закрываем все открытые позиции
+    final_price = close[n_bars - 1]
+    for k in range(n_open):
+        t = open_ids[k]
+        _close(trades, flags, t, final_price, n_bars - 1, EXIT_END_OF_BACKTEST,
+               slippage, commission)
+        order[n_closed] = t
+        n_closed += 1
+
+    return equity[:n_bars], trades[:n_trades], flags[:n_trades], order[:n_closed]
+
+
+if HAS_NUMBA:
+    _close = njit(cache=True, error_model='numpy')(_close)
+    _open = njit(cache=True, error_model='numpy')(_open)
+    _simulate = njit(cache=True, error_model='numpy')(_simulate)
+
+
+# Порядок массивов на входе _simulate
+SIMULATE_INPUTS = ('close', 'high', 'low', 'signals', 'confidence',
+                   'tp_percent', 'sl_percent', 'next_signal')
+
+
+# =================================================================
+# ПОДГОТОВКА ДАННЫХ
+# =================================================================
+
+def _prediction_column(predictions: pd.DataFrame, column: str, default: float) -> np.ndarray:
+    """Числовая колонка предсказаний (значение по умолчанию, если колонки нет)"""
+    if column not in predictions.columns:
+        return np.full(len(predictions), default, dtype=np.float64)
+    return predictions[column].to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def extract_arrays(market_data: pd.DataFrame, predictions: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Однократное извлечение массивов из DataFrame
+
+    Returns:
+        {'close', 'high', 'low', 'signals', 'confidence', 'tp_percent',
+         'sl_percent', 'next_signal'}
+    """
+    if 'signal' in predictions.columns:
+        raw = predictions['signal'].to_numpy(dtype=object)
+        signals = np.where(raw == 'buy', SIGNAL_BUY,
+                           np.where(raw == 'sell', SIGNAL_SELL, SIGNAL_HOLD)).astype(np.int8)
+    else:
+        signals = np.zeros(len(predictions), dtype=np.int8)
+
+    # Ближайший бар с сигналом начиная с i (для пропуска пустых участков)
+    n = len(signals)
+    positions = np.where(signals != SIGNAL_HOLD, np.arange(n), n)
+    next_signal = np.minimum.accumulate(positions[::-1])[::-1].astype(np.int64) if n else \
+        np.empty(0, dtype=np.int64)
+
+    return {
+        'close': market_data['close'].to_numpy(dtype=np.float64),
+        'high': market_data['high'].to_numpy(dtype=np.float64),
+        'low': market_data['low'].to_numpy(dtype=np.float64),
+        'signals': signals,
+        'confidence': _prediction_column(predictions, 'confidence', 0.0),
+        'tp_percent': _prediction_column(predictions, 'take_profit_percent', 2.0),
+        'sl_percent': _prediction_column(predictions, 'stop_loss_percent', 1.0),
+        'next_signal': next_signal,
+    }
+
+
+def simulate(arrays: Dict[str, np.ndarray], config: Any) -> Dict[str, np.ndarray]:
+    """
+    Прогон ядра по заранее извлеченным массивам
+
+    Args:
+        arrays: Результат extract_arrays
+        config: BacktestConfig
+
+    Returns:
+        {'equity', 'trades', 'flags', 'order'}
+    """
+    inputs = [arrays[name] for name in SIMULATE_INPUTS]
+    if not HAS_NUMBA:
+        # Без компиляции поэлементный доступ к list заметно быстрее, чем к ndarray.
+        # sl_percent остается ndarray: деление на 0 дает inf, как у скаляров NumPy в run_backtest
+        inputs = [values if name == 'sl_percent' else np.asarray(values).tolist()
+                  for name, values in zip(SIMULATE_INPUTS, inputs)]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        equity, trades, flags, order = _simulate(
+            *inputs,
+            float(config.initial_balance), float(config.commission), float(config.slippage),
+            float(config.max_position_size), bool(config.use_leverage), float(config.leverage),
+            float(config.risk_per_trade), int(config.max_open_positions),
+            bool(config.enable_shorting), bool(config.use_stop_loss),
+            bool(config.use_take_profit), bool(config.trailing_stop),
+            float(config.trailing_stop_distance)
+        )
+    return {'equity': equity, 'trades': trades, 'flags': flags, 'order': order}
+
+
+def trade_records(state: Dict[str, np.ndarray], index: pd.Index,
+                  predictions: pd.DataFrame) -> list:
+    """
+    Закрытые сделки в порядке закрытия в виде словарей полей Trade
+
+    Args:
+        state: Результат simulate
+        index: Индекс market_data (время баров)
+        predictions: Предсказания (для strategy и ml_confidence)
+    """
+    trades, flags = state['trades'], state['flags']
+    has_strategy = 'strategy' in predictions.columns
+    has_confidence = 'confidence' in predictions.columns
+
+    records = []
+    for t in state['order'].tolist():
+        row = trades[t]
+        entry_bar, exit_bar = int(flags[t, I_ENTRY_BAR]), int(flags[t, I_EXIT_BAR])
+        entry_time, exit_time = index[entry_bar], index[exit_bar]
+        records.append({
+            'entry_time': entry_time,
+            'entry_price': float(row[F_ENTRY]),
+            'position_size': float(row[F_SIZE]),
+            'side': 'long' if flags[t, I_SIDE] == SIDE_LONG else 'short',
+            'stop_loss': float(row[F_SL]) if flags[t, I_HAS_SL] else None,
+            'take_profit': float(row[F_TP]) if flags[t, I_HAS_TP] else None,
+            'exit_time': exit_time,
+            'exit_price': float(row[F_EXIT]),
+            'profit': float(row[F_PROFIT]),
+            'profit_percent': float(row[F_PROFIT_PCT]),
+            'commission_paid': float(row[F_COMMISSION]),
+            'exit_reason': EXIT_REASONS[int(flags[t, I_REASON])],
+            'ml_confidence': predictions['confidence'].iloc[entry_bar] if has_confidence else 0.0,
+            'strategy': predictions['strategy'].iloc[entry_bar] if has_strategy else 'unknown',
+            'max_profit': float(row[F_MAX_PROFIT]),
+            'max_loss': float(row[F_MAX_LOSS]),
+            'duration': exit_time - entry_time,
+        })
+    return records
+
+
+__all__ = [
+    'HAS_NUMBA',
+    'EXIT_REASONS',
+    'extract_arrays',
+    'simulate',
+    'trade_records'
+]
@@ -8,7 +8,11 @@ from typing import Dict, List, Tuple, Optional, Any, Callable
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 import json
+import os
+import time
+import tempfile
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -16,9 +20,10 @@ from scipy import stats
 
 from ...logging.smart_logger import SmartLogger
 from ...core.database import SessionLocal
-from ..models.classifier import DirectionClassifier
+from ..models.direction_classifier import DirectionClassifier
 from ..models.regressor import PriceLevelRegressor
 from ..strategy_selector import MLStrategySelector
+from . import backtest_engine
 
 
 @dataclass
@@ -105,6 +110,60 @@ class BacktestResult:
     strategy_performance: Dict[str, Dict] = field(default_factory=dict)
 
 
+# =================================================================
+# ПРОЦЕССЫ WALK-FORWARD
+# =================================================================
+
+# Открытые в процессе memmap-массивы (путь -> массив)
+_shared_arrays: Dict[str, np.ndarray] = {}
+
+
+def _shared_array(path: str) -> np.ndarray:
+    """Массив из .npy, отображенный в память (открывается один раз на процесс)"""
+    if path not in _shared_arrays:
+        _shared_arrays[path] = np.load(path, mmap_mode='r')
+    return _shared_arrays[path]
+
+
+def _window_predictions(index: pd.Index, seed: List[int]) -> pd.DataFrame:
+    """
+    Предсказания для тестового окна walk-forward
+    
+    Заглушка ансамбля: в реальности здесь должны быть предсказания от ML
+    моделей. Генератор задается зерном окна, поэтому предсказания не
+    зависят от того, в каком процессе и в каком порядке считается окно.
+    """
+    rng = np.random.default_rng(seed)
+    predictions = pd.DataFrame(index=index)
+    predictions['signal'] = rng.choice(['buy', 'sell', 'hold'], size=len(index))
+    predictions['confidence'] = rng.uniform(0.5, 1.0, size=len(index))
+    predictions['take_profit_percent'] = rng.uniform(1.0, 3.0, size=len(index))
+    predictions['stop_loss_percent'] = rng.uniform(0.5, 1.5, size=len(index))
+    predictions['strategy'] = 'ml_ensemble'
+    return predictions
+
+
+def _run_walk_forward_window(config: BacktestConfig, data_path: str, index_path: str,
+                             columns: List[str], tz: Optional[str],
+                             test_start: int, test_end: int,
+                             seed: List[int]) -> Tuple[BacktestResult, float]:
+    """Предсказания и бэктест одного тестового окна в процессе пула"""
+    started = time.perf_counter()
+    
+    index = pd.DatetimeIndex(_shared_array(index_path)[test_start:test_end])
+    if tz:
+        index = index.tz_localize('UTC').tz_convert(tz)
+    test_market = pd.DataFrame(
+        np.array(_shared_array(data_path)[test_start:test_end]), index=index, columns=columns
+    )
+    
+    predictions = _window_predictions(index, seed)
+    result = Backtester(config).run_backtest_vectorized(
+        test_market, pd.DataFrame(index=index), predictions
+    )
+    return result, time.perf_counter() - started
+
+
 class Backtester:
     """
     Класс для бэктестинга ML стратегий
@@ -142,17 +201,9 @@ class Backtester:
         )
         
         # Фильтруем по датам
-        if start_date:
-            mask = market_data.index >= start_date
-            market_data = market_data[mask]
-            features = features[mask]
-            predictions = predictions[mask]
-        
-        if end_date:
-            mask = market_data.index <= end_date
-            market_data = market_data[mask]
-            features = features[mask]
-            predictions = predictions[mask]
+        market_data, features, predictions = self._filter_period(
+            market_data, features, predictions, start_date, end_date
+        )
         
         # Инициализация
         balance = self.config.initial_balance
@@ -298,6 +349,76 @@ class Backtester:
         
         return result
     
+    def run_backtest_vectorized(self,
+                               market_data: pd.DataFrame,
+                               features: pd.DataFrame,
+                               predictions: pd.DataFrame,
+                               start_date: Optional[datetime] = None,
+                               end_date: Optional[datetime] = None) -> BacktestResult:
+        """
+        Бэктест на массивах NumPy (см. backtest_engine)
+        
+        Результат идентичен run_backtest, но цены и предсказания извлекаются
+        один раз, а цикл идет по массивам (с Numba - компилируется).
+        Для длинных историй это секунды вместо минут.
+        
+        Args:
+            market_data: OHLCV данные
+            features: Признаки для ML моделей
+            predictions: Предсказания ML моделей
+            start_date: Начальная дата
+            end_date: Конечная дата
+            
+        Returns:
+            Результаты бэктестинга
+        """
+        self.logger.info(
+            "Запуск векторного бэктестинга",
+            category='backtest',
+            start_date=start_date,
+            end_date=end_date,
+            total_bars=len(market_data),
+            numba=backtest_engine.HAS_NUMBA
+        )
+        
+        market_data, features, predictions = self._filter_period(
+            market_data, features, predictions, start_date, end_date
+        )
+        
+        arrays = backtest_engine.extract_arrays(market_data, predictions)
+        state = backtest_engine.simulate(arrays, self.config)
+        
+        trades = [Trade(**record) for record in
+                  backtest_engine.trade_records(state, market_data.index, predictions)]
+        
+        result = self._calculate_results(trades, state['equity'].tolist(), market_data)
+        
+        self.logger.info(
+            f"Бэктест завершен: Return={result.total_return_percent:.2f}%, "
+            f"Trades={result.total_trades}, WinRate={result.win_rate:.2f}%",
+            category='backtest'
+        )
+        
+        return result
+    
+    def _filter_period(self, market_data: pd.DataFrame, features: pd.DataFrame,
+                       predictions: pd.DataFrame, start_date: Optional[datetime],
+                       end_date: Optional[datetime]) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """Фильтрует данные, признаки и предсказания по датам"""
+        if start_date:
+            mask = market_data.index >= start_date
+            market_data = market_data[mask]
+            features = features[mask]
+            predictions = predictions[mask]
+        
+        if end_date:
+            mask = market_data.index <= end_date
+            market_data = market_data[mask]
+            features = features[mask]
+            predictions = predictions[mask]
+        
+        return market_data, features, predictions
+    
     def _open_position(self, side: str, entry_time: datetime, entry_price: float,
                       position_size: float, sl_percent: float, tp_percent: float,
                       confidence: float, strategy: str) -> Trade:
@@ -483,7 +604,8 @@ class Backtester:
                                 ml_models: Dict[str, Any],
                                 window_size: int = 252,  # 1 год
                                 step_size: int = 21,     # 1 месяц
-                                retrain_frequency: int = 63) -> Dict[str, Any]:
+                                retrain_frequency: int = 63,
+                                n_workers: int = 1) -> Dict[str, Any]:
         """
         Walk-forward анализ для проверки устойчивости стратегии
         
@@ -494,19 +616,30 @@ class Backtester:
             window_size: Размер окна обучения
             step_size: Шаг сдвига окна
             retrain_frequency: Частота переобучения модели
+            n_workers: Число процессов для тестовых окон (1 - последовательно)
             
         Returns:
             Результаты walk-forward анализа
+        
+        Предсказания и бэктест окна считаются в процессе пула; в задачу
+        уходят только границы окна и зерно его генератора. Переобучение
+        остается в родительском процессе и пока не выполняется (в цикле
+        только точка, где должен быть model.train): чтобы распараллелить
+        настоящее обучение, модели и признаки нужно передавать в процессы
+        так же, как цены (memmap), а не сериализовать на каждое окно.
         """
         self.logger.info(
             "Запуск walk-forward анализа",
             category='backtest',
             window_size=window_size,
-            step_size=step_size
+            step_size=step_size,
+            n_workers=n_workers
         )
         
-        results = []
+        windows = []
         periods = []
+        # Зерна окон: предсказания воспроизводимы при любом n_workers
+        base_seed = int(np.random.randint(0, 2**31 - 1))
         
         for start_idx in range(0, len(market_data) - window_size - step_size, step_size):
             # Определяем периоды
@@ -521,7 +654,6 @@ class Backtester:
             
             # Данные для тестирования
             test_market = market_data.iloc[test_start:test_end]
-            test_features = features.iloc[test_start:test_end]
             
             # Переобучаем модели если необходимо
             if start_idx % retrain_frequency == 0:
@@ -534,21 +666,8 @@ class Backtester:
                         # Здесь должен быть код обучения модели
                         # model.train(train_features, train_labels)
             
-            # Получаем предсказания для тестового периода
-            predictions = pd.DataFrame(index=test_features.index)
-            
-            # Заглушка для предсказаний
-            # В реальности здесь должны быть предсказания от ML моделей
-            predictions['signal'] = np.random.choice(['buy', 'sell', 'hold'], size=len(test_features))
-            predictions['confidence'] = np.random.uniform(0.5, 1.0, size=len(test_features))
-            predictions['take_profit_percent'] = np.random.uniform(1.0, 3.0, size=len(test_features))
-            predictions['stop_loss_percent'] = np.random.uniform(0.5, 1.5, size=len(test_features))
-            predictions['strategy'] = 'ml_ensemble'
-            
-            # Запускаем бэктест на тестовом периоде
-            period_result = self.run_backtest(test_market, test_features, predictions)
-            
-            results.append(period_result)
+            # Предсказания для тестового периода строятся там, где считается окно
+            windows.append((test_start, test_end, [base_seed, len(windows)]))
             periods.append({
                 'train_start': train_market.index[0],
                 'train_end': train_market.index[-1],
@@ -556,13 +675,77 @@ class Backtester:
                 'test_end': test_market.index[-1]
             })
         
+        # Запускаем бэктесты на тестовых периодах. Оба пути используют
+        # run_backtest_vectorized, чтобы результат не зависел от n_workers
+        if n_workers > 1 and len(windows) > 1:
+            results, timings = self._run_windows_parallel(market_data, windows, n_workers)
+        else:
+            results, timings = [], []
+            for test_start, test_end, seed in windows:
+                started = time.perf_counter()
+                predictions = _window_predictions(market_data.index[test_start:test_end], seed)
+                results.append(self.run_backtest_vectorized(
+                    market_data.iloc[test_start:test_end],
+                    features.iloc[test_start:test_end],
+                    predictions
+                ))
+                timings.append(time.perf_counter() - started)
+        
         # Анализируем результаты
-        analysis = self._analyze_walk_forward_results(results, periods)
+        analysis = self._analyze_walk_forward_results(results, periods, timings)
         
         return analysis
     
+    def _run_windows_parallel(self, market_data: pd.DataFrame,
+                              windows: List[Tuple[int, int, List[int]]],
+                              n_workers: int) -> Tuple[List[BacktestResult], List[float]]:
+        """
+        Параллельный прогон тестовых окон walk-forward
+        
+        OHLCV и индекс времени сохраняются в .npy и открываются в процессах
+        через memmap, так что в задачу уходят только границы окна и зерно
+        его предсказаний. Результаты собираются по номеру окна.
+        
+        Returns:
+            (результаты, время окна в секундах) в порядке окон
+        """
+        columns = [c for c in ('open', 'high', 'low', 'close', 'volume') if c in market_data.columns]
+        index = market_data.index
+        tz = str(index.tz) if getattr(index, 'tz', None) is not None else None
+        
+        results: Dict[int, BacktestResult] = {}
+        timings: Dict[int, float] = {}
+        
+        with tempfile.TemporaryDirectory(prefix='walk_forward_') as shared_dir:
+            data_path = os.path.join(shared_dir, 'ohlcv.npy')
+            index_path = os.path.join(shared_dir, 'index.npy')
+            np.save(data_path, market_data[columns].to_numpy(dtype=np.float64))
+            np.save(index_path, np.asarray(index.tz_convert('UTC').tz_localize(None) if tz else index,
+                                           dtype='datetime64[ns]'))
+            
+            self.logger.info(
+                f"Walk-forward: {len(windows)} окон на {n_workers} процессах",
+                category='backtest'
+            )
+            
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                futures = {
+                    executor.submit(
+                        _run_walk_forward_window, self.config, data_path, index_path,
+                        columns, tz, test_start, test_end, seed
+                    ): window_id
+                    for window_id, (test_start, test_end, seed) in enumerate(windows)
+                }
+                for future in as_completed(futures):
+                    window_id = futures[future]
+                    results[window_id], timings[window_id] = future.result()
+        
+        order = sorted(results)
+        return [results[i] for i in order], [timings[i] for i in order]
+    
     def _analyze_walk_forward_results(self, results: List[BacktestResult],
-                                    periods: List[Dict]) -> Dict[str, Any]:
+                                    periods: List[Dict],
+                                    timings: Optional[List[float]] = None) -> Dict[str, Any]:
         """Анализирует результаты walk-forward тестирования"""
         analysis = {
             'total_periods': len(results),
@@ -618,6 +801,16 @@ class Backtester:
                 'max_dd': result.max_drawdown_percent
             })
         
+        # Время прогона окон
+        if timings:
+            for period_result, elapsed in zip(analysis['period_results'], timings):
+                period_result['elapsed_seconds'] = elapsed
+            analysis['timing'] = {
+                'total_seconds': float(np.sum(timings)),
+                'mean_seconds': float(np.mean(timings)),
+                'max_seconds': float(np.max(timings))
+            }
+        
         return analysis
     
     def plot_backtest_results(self, result: BacktestResult, save_path: Optional[str] = None):
@@ -0,0 +1,228 @@
+"""
+Кэш матриц признаков для подбора гиперпараметров
+Файл: src/ml/training/feature_cache.py
+
+Ключ записи - отпечаток данных (blake2b по индексу, колонкам и значениям)
+плюс параметры построения признаков. Trial'ы Optuna, меняющие только
+гиперпараметры модели, получают готовые матрицы вместо повторного
+extract_features на каждом фолде.
+
+Память ограничена в байтах (LRU). При заданном spill_dir вытесняемые
+записи сбрасываются на диск и поднимаются обратно при следующем обращении.
+"""
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def fingerprint(data: Any) -> str:
+    """Отпечаток содержимого DataFrame/Series/массива"""
+    digest = hashlib.blake2b(digest_size=16)
+
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        digest.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+        if isinstance(data, pd.DataFrame):
+            digest.update(repr(list(data.columns)).encode())
+            digest.update(repr([str(dtype) for dtype in data.dtypes]).encode())
+    else:
+        array = np.ascontiguousarray(data)
+        digest.update(str(array.dtype).encode())
+        digest.update(repr(array.shape).encode())
+        digest.update(array.tobytes())
+
+    return digest.hexdigest()
+
+
+def _nbytes(value: Any) -> int:
+    """Оценка занимаемой памяти"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum()) if isinstance(value, pd.DataFrame) \
+            else int(value.memory_usage(deep=True))
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(item) for item in value)
+    if isinstance(value, dict):
+        return sum(_nbytes(item) for item in value.values())
+    return 64
+
+
+class FeatureCache:
+    """
+    LRU-кэш признаков с ограничением по памяти и сбросом на диск
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024, spill_dir: Optional[str] = None):
+        """
+        Args:
+            max_bytes: Лимит памяти под записи
+            spill_dir: Каталог для вытесненных записей (None - просто удалять)
+        """
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._compute_seconds: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+
+        self.stats = {
+            'hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'spilled': 0,
+            'compute_seconds': 0.0,
+            'saved_seconds': 0.0
+        }
+
+    # =================================================================
+    # КЛЮЧИ
+    # =================================================================
+
+    @staticmethod
+    def make_key(data_fingerprint: str, namespace: str, params: Mapping[str, Any]) -> str:
+        """Ключ записи: отпечаток данных + тип записи + параметры"""
+        encoded = json.dumps(dict(params), sort_keys=True, default=str)
+        digest = hashlib.blake2b(f"{data_fingerprint}|{namespace}|{encoded}".encode(), digest_size=16)
+        return digest.hexdigest()
+
+    # =================================================================
+    # ДОСТУП
+    # =================================================================
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        """
+        Возвращает запись по ключу, при промахе вычисляет и сохраняет
+
+        Возвращаемые массивы общие для всех обращений - их нельзя менять на месте.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                self.stats['saved_seconds'] += self._compute_seconds.get(key, 0.0)
+                return self._entries[key]
+
+        value = self._load_spilled(key)
+        if value is not None:
+            with self._lock:
+                self.stats['disk_hits'] += 1
+                self.stats['saved_seconds'] += self._compute_seconds.get(key, 0.0)
+                self._store(key, value)
+            return value
+
+        started = time.perf_counter()
+        value = compute()
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.stats['misses'] += 1
+            self.stats['compute_seconds'] += elapsed
+            self._compute_seconds[key] = elapsed
+            self._store(key, value)
+        return value
+
+    def clear(self):
+        """Очищает память и каталог сброса"""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._compute_seconds.clear()
+            self.current_bytes = 0
+
+            if self.spill_dir and os.path.isdir(self.spill_dir):
+                for name in os.listdir(self.spill_dir):
+                    if name.endswith('.pkl'):
+                        try:
+                            os.remove(os.path.join(self.spill_dir, name))
+                        except OSError:
+                            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика кэша"""
+        with self._lock:
+            stats = dict(self.stats)
+            lookups = stats['hits'] + stats['disk_hits'] + stats['misses']
+            stats.update({
+                'entries': len(self._entries),
+                'memory_mb': self.current_bytes / (1024 * 1024),
+                'hit_rate': (stats['hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+            })
+            return stats
+
+    # =================================================================
+    # ВНУТРЕННЕЕ
+    # =================================================================
+
+    def _store(self, key: str, value: Any):
+        """Кладет запись в память и вытесняет старые сверх лимита (под блокировкой)"""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+
+        size = _nbytes(value)
+        self._entries[key] = value
+        self._sizes[key] = size
+        self.current_bytes += size
+
+        # Последнюю добавленную запись не вытесняем, даже если она одна больше лимита
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            old_key, old_value = self._entries.popitem(last=False)
+            self.current_bytes -= self._sizes.pop(old_key)
+            self.stats['evictions'] += 1
+            self._spill(old_key, old_value)
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, f"{key}.pkl")
+
+    def _spill(self, key: str, value: Any):
+        """Сбрасывает вытесненную запись на диск"""
+        if not self.spill_dir:
+            return
+
+        path = self._spill_path(key)
+        if os.path.exists(path):
+            return
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            self.stats['spilled'] += 1
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _load_spilled(self, key: str) -> Optional[Any]:
+        """Поднимает запись с диска"""
+        if not self.spill_dir:
+            return None
+
+        path = self._spill_path(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            return None
+
+
+__all__ = [
+    'FeatureCache',
+    'fingerprint'
+]
@@ -0,0 +1,418 @@
+"""
+Пакетный бэктест по сетке параметров
+Файл: src/ml/training/grid_backtest.py
+
+Перебирает тысячи комбинаций параметров стратегии и BacktestConfig на одних
+и тех же ценах за один запуск:
+
+- индикаторы считаются один раз на уникальный набор параметров
+  (IndicatorCache), например RSI(14) общий для всех порогов RSI;
+- сигналы стратегии строятся векторно по всему ряду сразу;
+- каждая комбинация прогоняется ядром backtest_engine без DataFrame и Trade;
+- при n_workers > 1 группы комбинаций считаются в процессах.
+
+Результат - DataFrame, отсортированный по выбранной метрике.
+"""
+import itertools
+import logging
+import time
+from dataclasses import fields, replace
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple, Callable, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+try:
+    from ta.momentum import RSIIndicator, ROCIndicator
+    from ta.trend import EMAIndicator
+    from ta.volatility import AverageTrueRange
+    TA_AVAILABLE = True
+except ImportError:
+    TA_AVAILABLE = False
+
+from ...indicators.batch import BATCH_INDICATORS
+from ...indicators.memo import IndicatorContext, IndicatorMemo
+from . import backtest_engine
+from .backtester import BacktestConfig
+
+logger = logging.getLogger(__name__)
+
+MARKET_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+# =================================================================
+# КЭШ ИНДИКАТОРОВ
+# =================================================================
+
+class IndicatorCache:
+    """
+    Индикаторы по ценам одного инструмента, посчитанные один раз
+
+    Ключ - (индикатор, параметры, входные колонки), поэтому комбинации
+    сетки с одинаковым периодом используют один и тот же массив.
+    """
+
+    def __init__(self, market_data: pd.DataFrame):
+        self.market_data = market_data
+        self.arrays = {
+            column: market_data[column].to_numpy(dtype=np.float64)
+            for column in MARKET_COLUMNS if column in market_data.columns
+        }
+        self._cache: Dict[Tuple, Any] = {}
+        self._context: Optional[IndicatorContext] = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def context(self) -> IndicatorContext:
+        """
+        Контекст индикаторов стратегий по всему ряду
+
+        Формулы те же, что стратегии берут из общего кэша (pandas/ta),
+        поэтому значения на каждом баре совпадают с живым расчетом.
+        """
+        if self._context is None:
+            self._context = IndicatorMemo(max_contexts=1).context(self.market_data)
+        return self._context
+
+    def get(self, kind: str, columns: Optional[Sequence[str]] = None, **params) -> Any:
+        """
+        Индикатор по всему ряду
+
+        Args:
+            kind: Имя из BATCH_INDICATORS ('rsi', 'ema', 'atr', ...)
+            columns: Входные колонки вместо стандартных (например ('volume',))
+            **params: Параметры ядра (timeperiod=14, ...)
+        """
+        kernel, inputs = BATCH_INDICATORS[kind]
+        inputs = tuple(columns) if columns else inputs
+        key = (kind, inputs, tuple(sorted(params.items())))
+
+        if key in self._cache:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._cache[key] = kernel(*(self.arrays[column] for column in inputs), **params)
+        return self._cache[key]
+
+
+# =================================================================
+# ВЕКТОРНЫЕ СИГНАЛЫ СТРАТЕГИЙ
+# =================================================================
+
+# Параметры MomentumStrategy (ключи конфигурации и значения по умолчанию)
+MOMENTUM_DEFAULTS = {
+    'rsi_period': 14,
+    'ema_fast': 9,
+    'ema_slow': 21,
+    'roc_period': 10,
+    'atr_period': 14,
+    'min_momentum_score': 0.6,
+    'rsi_bullish': 60,
+    'rsi_bearish': 40,
+    'rsi_overbought': 80,
+    'rsi_oversold': 20,
+    'roc_bullish': 2.0,
+    'roc_bearish': -2.0,
+    'volume_ratio_threshold': 1.5,
+    'atr_multiplier_stop': 2.0,
+    'atr_multiplier_take': 3.0,
+    'min_periods': 50,
+}
+
+
+def momentum_indicators(cache: IndicatorCache, params: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    Индикаторы MomentumStrategy на каждом баре
+
+    Повторяет _calculate_indicators в той же конфигурации: при установленной
+    библиотеке ta - ее EMA/RSI/ROC/ATR (сглаживание Уайлдера), иначе ручные
+    формулы IndicatorContext. Ядра numpy_kernels здесь не подходят: их RSI
+    и ATR - rolling-средние, а EMA без adjust, и решения на порогах расходятся.
+    """
+    p = {**MOMENTUM_DEFAULTS, **params}
+    ctx = cache.context
+    df = ctx.df
+
+    if TA_AVAILABLE:
+        def ema(span):
+            return ctx.get('ta_ema', (span,), lambda: EMAIndicator(close=df['close'], window=span).ema_indicator())
+
+        rsi = ctx.get('ta_rsi', (p['rsi_period'],),
+                      lambda: RSIIndicator(close=df['close'], window=p['rsi_period']).rsi())
+        roc = ctx.get('ta_roc', (p['roc_period'],),
+                      lambda: ROCIndicator(close=df['close'], window=p['roc_period']).roc())
+        atr = ctx.get('ta_atr', (p['atr_period'],), lambda: AverageTrueRange(
+            high=df['high'], low=df['low'], close=df['close'], window=p['atr_period']).average_true_range())
+    else:
+        ema = ctx.ema
+        rsi = ctx.rsi(p['rsi_period'])
+        # Ручная ROC считается только при len(df) > roc_period, до этого 0
+        roc = ctx.roc(p['roc_period']).where(np.arange(len(df)) >= p['roc_period'], 0.0)
+        atr = ctx.atr(p['atr_period'])
+
+    if 'volume' in df.columns:
+        avg_volume = ctx.sma(20, 'volume').to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            volume_ratio = np.where(avg_volume > 0, cache.arrays['volume'] / avg_volume, 1.0)
+    else:
+        volume_ratio = np.ones(len(df))
+
+    return {
+        'ema_fast': ema(p['ema_fast']).to_numpy(),
+        'ema_slow': ema(p['ema_slow']).to_numpy(),
+        'rsi': rsi.to_numpy(),
+        'roc': roc.to_numpy(),
+        'atr': atr.to_numpy(),
+        'volume_ratio': volume_ratio,
+    }
+
+
+def momentum_signals(cache: IndicatorCache, params: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    Сигналы MomentumStrategy на каждом баре
+
+    Повторяет _analyze_momentum и _make_decision на индикаторах
+    momentum_indicators: оценка EMA/RSI/ROC/объема, фильтр перекупленности,
+    ATR-уровни, проверка R/R и расчет уверенности. Бары до min_periods -
+    HOLD, как validate_dataframe (проверка на моковые данные не повторяется).
+
+    Returns:
+        {'signals', 'confidence', 'tp_percent', 'sl_percent'} для backtest_engine
+    """
+    p = {**MOMENTUM_DEFAULTS, **params}
+    close = cache.arrays['close']
+
+    indicators = momentum_indicators(cache, p)
+    ema_fast, ema_slow = indicators['ema_fast'], indicators['ema_slow']
+    rsi, roc, atr = indicators['rsi'], indicators['roc'], indicators['atr']
+    volume_ratio = indicators['volume_ratio']
+
+    # Оценка momentum
+    ema_bullish = ema_fast > ema_slow
+    bullish = np.where(ema_bullish, 0.3, 0.0)
+    bearish = np.where(ema_bullish, 0.0, 0.3)
+
+    bullish += np.where(rsi > p['rsi_bullish'], 0.2, 0.0)
+    bearish += np.where(~(rsi > p['rsi_bullish']) & (rsi < p['rsi_bearish']), 0.2, 0.0)
+
+    bullish += np.where(roc > p['roc_bullish'], 0.25, 0.0)
+    bearish += np.where(~(roc > p['roc_bullish']) & (roc < p['roc_bearish']), 0.25, 0.0)
+
+    volume_confirms = volume_ratio > p['volume_ratio_threshold']
+    bullish_leads = bullish > bearish
+    bullish += np.where(volume_confirms & bullish_leads, 0.15, 0.0)
+    bearish += np.where(volume_confirms & ~bullish_leads, 0.15, 0.0)
+
+    is_bullish = (bullish > bearish) & (bullish > 0.5)
+    is_bearish = ~is_bullish & (bearish > bullish) & (bearish > 0.5)
+    strength = np.where(is_bullish, bullish, np.where(is_bearish, bearish, np.maximum(bullish, bearish)))
+
+    # Решение
+    signals = np.where(is_bullish, backtest_engine.SIGNAL_BUY,
+                       np.where(is_bearish, backtest_engine.SIGNAL_SELL, backtest_engine.SIGNAL_HOLD))
+    signals[:max(p['min_periods'] - 1, 0)] = backtest_engine.SIGNAL_HOLD
+    signals[strength < p['min_momentum_score']] = backtest_engine.SIGNAL_HOLD
+    signals[(signals == backtest_engine.SIGNAL_BUY) & (rsi > p['rsi_overbought'])] = backtest_engine.SIGNAL_HOLD
+    signals[(signals == backtest_engine.SIGNAL_SELL) & (rsi < p['rsi_oversold'])] = backtest_engine.SIGNAL_HOLD
+
+    # ATR-уровни (calculate_stop_loss / calculate_take_profit)
+    atr_multiplier = np.where(strength > 0.7, p['atr_multiplier_stop'] + 0.5, p['atr_multiplier_stop'])
+    tp_multiplier = np.where(strength > 0.8, p['atr_multiplier_take'] + 1.0, p['atr_multiplier_take'])
+    stop_distance = atr * atr_multiplier
+    take_distance = atr * tp_multiplier
+
+    is_buy = signals == backtest_engine.SIGNAL_BUY
+    risk = np.where(is_buy, np.minimum(stop_distance, close), stop_distance)
+    reward = np.where(is_buy, take_distance, np.minimum(take_distance, close))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        risk_reward = np.where(risk > 0, reward / risk, 0.0)
+
+    min_rr = np.where(strength > 0.7, 1.5, 2.0)
+    signals[risk_reward < min_rr] = backtest_engine.SIGNAL_HOLD
+
+    # Уверенность
+    confidence = strength + np.where(volume_ratio > 1.5, 0.05, 0.0)
+    confidence += np.where(risk_reward > 3.0, 0.05, 0.0)
+    confidence -= np.where((rsi > 75) | (rsi < 25), 0.1, 0.0)
+    confidence = np.clip(confidence, 0.1, 0.95)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sl_percent = risk / close * 100
+        tp_percent = reward / close * 100
+
+    return {
+        'signals': signals.astype(np.int8),
+        'confidence': confidence,
+        'tp_percent': tp_percent,
+        'sl_percent': sl_percent,
+    }
+
+
+SIGNAL_BUILDERS: Dict[str, Callable[[IndicatorCache, Mapping[str, Any]], Dict[str, np.ndarray]]] = {
+    'momentum': momentum_signals,
+}
+
+
+# =================================================================
+# МЕТРИКИ
+# =================================================================
+
+def summarize(state: Dict[str, np.ndarray], config: BacktestConfig) -> Dict[str, float]:
+    """Основные метрики прогона (как в Backtester._calculate_results)"""
+    profits = state['trades'][state['order'], backtest_engine.F_PROFIT].tolist()
+    equity = state['equity']
+
+    gross_profit = sum(p for p in profits if p > 0)
+    gross_loss = sum(p for p in profits if p < 0)
+    winning = sum(1 for p in profits if p > 0)
+    losing = sum(1 for p in profits if p < 0)
+    total_return = sum(profits)
+
+    running_max = np.maximum.accumulate(equity)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdown = (equity - running_max) / running_max
+        returns = equity[1:] / equity[:-1] - 1
+    returns = returns[np.isfinite(returns)]
+    max_drawdown = float(np.nanmin(drawdown)) if len(drawdown) else 0.0
+
+    sharpe = 0.0
+    if len(returns) > 1:
+        std = returns.std(ddof=1)
+        sharpe = float(np.sqrt(252) * returns.mean() / std) if std > 0 else 0.0
+
+    return {
+        'total_trades': len(profits),
+        'win_rate': winning / len(profits) * 100 if profits else 0.0,
+        'total_return': total_return,
+        'total_return_percent': total_return / config.initial_balance * 100,
+        'profit_factor': abs(gross_profit / gross_loss) if losing else 0.0,
+        'max_drawdown_percent': max_drawdown * 100,
+        'sharpe_ratio': sharpe,
+        'final_equity': float(equity[-1]) if len(equity) else config.initial_balance,
+    }
+
+
+# =================================================================
+# ПЕРЕБОР
+# =================================================================
+
+def expand_grid(param_grid: Mapping[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """{'rsi_period': [7, 14], 'ema_fast': [5, 9]} -> список всех комбинаций"""
+    names = list(param_grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(param_grid[n] for n in names))]
+
+
+def _evaluate_group(market_data: pd.DataFrame, strategy: str, config: BacktestConfig,
+                    groups: List[Tuple[Dict[str, Any], List[Tuple[int, Dict[str, Any]]]]]) -> List[Dict[str, Any]]:
+    """
+    Прогон групп комбинаций с одинаковыми параметрами стратегии
+
+    Сигналы строятся один раз на группу, затем ядро прогоняется для каждого
+    варианта BacktestConfig.
+    """
+    build_signals = SIGNAL_BUILDERS[strategy]
+    cache = IndicatorCache(market_data)
+    base_arrays = {
+        'close': cache.arrays['close'],
+        'high': cache.arrays['high'],
+        'low': cache.arrays['low'],
+    }
+
+    rows = []
+    for strategy_params, config_variants in groups:
+        arrays = {**base_arrays, **build_signals(cache, strategy_params)}
+        n = len(arrays['signals'])
+        positions = np.where(arrays['signals'] != backtest_engine.SIGNAL_HOLD, np.arange(n), n)
+        arrays['next_signal'] = np.minimum.accumulate(positions[::-1])[::-1].astype(np.int64)
+
+        for combination_id, config_params in config_variants:
+            run_config = replace(config, **config_params) if config_params else config
+            state = backtest_engine.simulate(arrays, run_config)
+            rows.append({'combination': combination_id, **strategy_params, **config_params,
+                         **summarize(state, run_config)})
+    return rows
+
+
+def run_grid_backtest(market_data: pd.DataFrame,
+                      param_grid: Mapping[str, Sequence[Any]],
+                      strategy: str = 'momentum',
+                      config: Optional[BacktestConfig] = None,
+                      rank_by: str = 'sharpe_ratio',
+                      ascending: bool = False,
+                      n_workers: int = 1) -> pd.DataFrame:
+    """
+    Бэктест всех комбинаций сетки на одних ценах
+
+    Args:
+        market_data: OHLCV данные
+        param_grid: {параметр: значения}. Поля BacktestConfig (например
+                    trailing_stop_distance) меняют конфигурацию, остальные
+                    передаются стратегии (rsi_period, rsi_bullish,
+                    atr_multiplier_stop, ...)
+        strategy: Ключ SIGNAL_BUILDERS
+        config: Базовая конфигурация бэктеста
+        rank_by: Метрика для сортировки
+        ascending: Направление сортировки
+        n_workers: Число процессов (1 - в текущем процессе)
+
+    Returns:
+        DataFrame: rank (1 - лучший), номер комбинации в сетке, параметры, метрики
+    """
+    if strategy not in SIGNAL_BUILDERS:
+        raise ValueError(f"Неизвестная стратегия для перебора: {strategy}")
+
+    config = config or BacktestConfig()
+    config_fields = {f.name for f in fields(BacktestConfig)}
+    combinations = expand_grid(param_grid)
+
+    # Группируем по параметрам стратегии: сигналы строятся один раз на группу
+    grouped: Dict[Tuple, Tuple[Dict[str, Any], List[Tuple[int, Dict[str, Any]]]]] = {}
+    for combination_id, combination in enumerate(combinations):
+        strategy_params = {k: v for k, v in combination.items() if k not in config_fields}
+        config_params = {k: v for k, v in combination.items() if k in config_fields}
+        key = tuple(sorted(strategy_params.items()))
+        grouped.setdefault(key, (strategy_params, []))[1].append((combination_id, config_params))
+    groups = list(grouped.values())
+
+    logger.info(
+        f"📊 Перебор {len(combinations)} комбинаций ({len(groups)} наборов сигналов) "
+        f"на {len(market_data)} барах, процессов: {n_workers}"
+    )
+    started = time.perf_counter()
+
+    if n_workers > 1 and len(groups) > 1:
+        chunks = [groups[i::n_workers] for i in range(n_workers) if groups[i::n_workers]]
+        columns = [c for c in MARKET_COLUMNS if c in market_data.columns]
+        prices = market_data[columns]
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            parts = list(executor.map(
+                _evaluate_group, [prices] * len(chunks), [strategy] * len(chunks),
+                [config] * len(chunks), chunks
+            ))
+        rows = [row for part in parts for row in part]
+    else:
+        rows = _evaluate_group(market_data, strategy, config, groups)
+
+    # Порядок строк не зависит от разбиения по процессам
+    rows.sort(key=lambda row: row['combination'])
+    results = pd.DataFrame(rows)
+    if not results.empty:
+        results = results.sort_values(rank_by, ascending=ascending, kind='mergesort').reset_index(drop=True)
+        results.insert(0, 'rank', np.arange(1, len(results) + 1))
+
+    logger.info(f"✅ Перебор завершен за {time.perf_counter() - started:.2f} с")
+    return results
+
+
+__all__ = [
+    'IndicatorCache',
+    'MOMENTUM_DEFAULTS',
+    'SIGNAL_BUILDERS',
+    'momentum_indicators',
+    'momentum_signals',
+    'summarize',
+    'expand_grid',
+    'run_grid_backtest'
+]
@@ -7,8 +7,11 @@ import numpy as np
 import pandas as pd
 from typing import Dict, Any, List, Tuple, Optional, Callable
 from datetime import datetime, timedelta
+import os
 import json
+import time
 import asyncio
+import multiprocessing
 from concurrent.futures import ProcessPoolExecutor
 import joblib
 
@@ -22,19 +25,29 @@ from ..models.regressor import PriceLevelRegressor
 from ..features.feature_engineering import FeatureEngineer
 from .trainer import MLTrainer
 from .backtester import MLBacktester
+from .feature_cache import FeatureCache, fingerprint
 from ...core.database import SessionLocal
 from ...logging.smart_logger import SmartLogger
 
 
 logger = SmartLogger(__name__)
 
+# Каталог результатов и хранилищ исследований
+OPTIMIZATION_DIR = 'models/optimization'
+
 
 class HyperparameterOptimizer:
     """
     Оптимизатор гиперпараметров с использованием Optuna
     """
     
-    def __init__(self, model_type: str = 'classifier'):
+    # Параметры, от которых зависит матрица признаков
+    FEATURE_PARAMS = ('rsi_period', 'macd_fast', 'macd_slow', 'bb_period', 'atr_period')
+    
+    def __init__(self, model_type: str = 'classifier',
+                 feature_cache: Optional[FeatureCache] = None,
+                 feature_cache_mb: int = 512,
+                 feature_cache_dir: Optional[str] = None):
         self.model_type = model_type
         self.study = None
         self.best_params = None
@@ -43,6 +56,7 @@ class HyperparameterOptimizer:
         # Настройки оптимизации
         self.n_trials = 100
         self.n_jobs = 4
+        self.n_workers = 1  # Процессы, выполняющие trial'ы одного исследования
         self.timeout = 3600  # 1 час
         
         # Настройки валидации
@@ -51,6 +65,13 @@ class HyperparameterOptimizer:
         
         # Пул процессов для параллельной оптимизации
         self.executor = ProcessPoolExecutor(max_workers=self.n_jobs)
+        
+        # Кэш признаков: trial'ы с теми же параметрами признаков не пересчитывают их
+        self.use_feature_cache = True
+        self.feature_cache = feature_cache or FeatureCache(
+            max_bytes=feature_cache_mb * 1024 * 1024,
+            spill_dir=feature_cache_dir
+        )
     
     def get_search_space(self, trial: optuna.Trial) -> Dict[str, Any]:
         """
@@ -170,6 +191,8 @@ class HyperparameterOptimizer:
         """
         Целевая функция для оптимизации
         """
+        trial_start = time.perf_counter()
+        
         try:
             # Получаем гиперпараметры
             params = self.get_search_space(trial)
@@ -185,19 +208,17 @@ class HyperparameterOptimizer:
             tscv = TimeSeriesSplit(n_splits=self.n_splits)
             scores = []
             
+            # Извлекаем признаки с оптимизированными параметрами
+            feature_params = {k: v for k, v in params.items() if k in self.FEATURE_PARAMS}
+            
+            # Обновляем параметры feature engineer
+            for param, value in feature_params.items():
+                setattr(feature_engineer, param, value)
+            
             for train_idx, val_idx in tscv.split(data):
                 train_data = data.iloc[train_idx]
                 val_data = data.iloc[val_idx]
                 
-                # Извлекаем признаки с оптимизированными параметрами
-                feature_params = {k: v for k, v in params.items() 
-                                if k in ['rsi_period', 'macd_fast', 'macd_slow', 
-                                        'bb_period', 'atr_period']}
-                
-                # Обновляем параметры feature engineer
-                for param, value in feature_params.items():
-                    setattr(feature_engineer, param, value)
-                
                 # Подготавливаем данные
                 X_train, y_train = self._prepare_data(train_data, feature_engineer, params)
                 X_val, y_val = self._prepare_data(val_data, feature_engineer, params)
@@ -214,6 +235,16 @@ class HyperparameterOptimizer:
                 del model
                 if self.model_type == 'neural_network':
                     K.clear_session()
+                
+                # Промежуточный score для отсечения бесперспективных trial'ов
+                trial.report(float(np.mean(scores)), step=len(scores) - 1)
+                if trial.should_prune():
+                    logger.info(
+                        f"Trial #{trial.number} отсечен после фолда {len(scores)}",
+                        category='ml',
+                        score=float(np.mean(scores))
+                    )
+                    raise optuna.TrialPruned()
             
             # Средний score по всем фолдам
             avg_score = np.mean(scores)
@@ -223,6 +254,7 @@ class HyperparameterOptimizer:
                 'trial': trial.number,
                 'params': params,
                 'score': avg_score,
+                'duration': time.perf_counter() - trial_start,
                 'timestamp': datetime.utcnow()
             })
             
@@ -235,6 +267,8 @@ class HyperparameterOptimizer:
             
             return avg_score
             
+        except optuna.TrialPruned:
+            raise
         except Exception as e:
             logger.error(
                 f"Ошибка в trial #{trial.number}: {str(e)}",
@@ -246,27 +280,58 @@ class HyperparameterOptimizer:
     def _prepare_data(self, data: pd.DataFrame, feature_engineer: FeatureEngineer,
                      params: Dict) -> Tuple[np.ndarray, np.ndarray]:
         """Подготовка данных для обучения"""
+        feature_key_params = {k: params[k] for k in self.FEATURE_PARAMS if k in params}
+        feature_key_params.update({
+            'engineer': type(feature_engineer).__name__,
+            'include_volume': params.get('use_volume_features', True),
+            'include_market': params.get('use_market_features', True)
+        })
+        
         # Извлекаем признаки
-        features = feature_engineer.extract_features(
-            data,
-            include_volume=params.get('use_volume_features', True),
-            include_market=params.get('use_market_features', True)
-        )
+        def build_features():
+            return feature_engineer.extract_features(
+                data,
+                include_volume=feature_key_params['include_volume'],
+                include_market=feature_key_params['include_market']
+            )
         
         # Создаем целевую переменную
         if self.model_type in ['classifier', 'xgboost']:
-            min_change = params.get('min_price_change', 0.002)
-            y = feature_engineer.create_labels(
-                data,
-                min_price_change=min_change,
-                horizon=params.get('prediction_horizon', 5)
-            )
+            target_kind = 'labels'
+            target_key_params = {
+                'min_price_change': params.get('min_price_change', 0.002),
+                'horizon': params.get('prediction_horizon', 5)
+            }
+            
+            def build_target():
+                return feature_engineer.create_labels(
+                    data,
+                    min_price_change=target_key_params['min_price_change'],
+                    horizon=target_key_params['horizon']
+                )
         else:
             # Для регрессора - предсказываем уровни цен
-            y = feature_engineer.create_price_targets(
-                data,
-                horizon=params.get('prediction_horizon', 5)
+            target_kind = 'price_targets'
+            target_key_params = {'horizon': params.get('prediction_horizon', 5)}
+            
+            def build_target():
+                return feature_engineer.create_price_targets(
+                    data,
+                    horizon=target_key_params['horizon']
+                )
+        
+        if self.use_feature_cache:
+            data_key = fingerprint(data)
+            cache = self.feature_cache
+            features = cache.get_or_compute(
+                cache.make_key(data_key, 'features', feature_key_params), build_features
+            )
+            y = cache.get_or_compute(
+                cache.make_key(data_key, target_kind, target_key_params), build_target
             )
+        else:
+            features = build_features()
+            y = build_target()
         
         # Убираем NaN
         mask = ~(np.isnan(features).any(axis=1) | np.isnan(y))
@@ -444,34 +509,104 @@ class HyperparameterOptimizer:
             y_pred = model.predict(X_val)
             return -mean_absolute_error(y_val, y_pred)
     
+    def _create_pruner(self, pruner: Optional[str]) -> optuna.pruners.BasePruner:
+        """
+        Отсечение trial'ов по промежуточным score фолдов
+        
+        По умолчанию выключено: score ранних фолдов TimeSeriesSplit
+        обучены на меньшей истории и плохо предсказывают итог, так что
+        median/hyperband включаются явно.
+        """
+        if pruner == 'median':
+            return optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=1)
+        if pruner == 'hyperband':
+            return optuna.pruners.HyperbandPruner(
+                min_resource=1,
+                max_resource=self.n_splits,
+                reduction_factor=3
+            )
+        if pruner in (None, 'none', 'nop'):
+            return optuna.pruners.NopPruner()
+        raise ValueError(f"Unknown pruner: {pruner}")
+    
     async def optimize(self, data: pd.DataFrame, feature_engineer: FeatureEngineer,
-                      n_trials: Optional[int] = None) -> Dict[str, Any]:
+                      n_trials: Optional[int] = None, n_workers: Optional[int] = None,
+                      storage: Optional[str] = None, study_name: Optional[str] = None,
+                      pruner: Optional[str] = 'none') -> Dict[str, Any]:
         """
         Запускает процесс оптимизации
+        
+        При n_workers > 1 или заданном storage trial'ы выполняют процессы пула:
+        все они работают с одним исследованием в общем хранилище и берут
+        trial'ы по очереди, event loop при этом свободен.
+        
+        Args:
+            n_workers: Процессы оптимизации (по умолчанию self.n_workers)
+            storage: 'sqlite:///...', путь к .db (SQLite) или к журнал-файлу
+            study_name: Имя исследования в хранилище (существующее продолжается)
+            pruner: 'none' (по умолчанию), 'median' или 'hyperband'
         """
+        n_trials = n_trials or self.n_trials
+        n_workers = max(1, int(n_workers or self.n_workers))
+        use_processes = n_workers > 1 or storage is not None
+        
         logger.info(
             f"Запуск оптимизации гиперпараметров для {self.model_type}",
             category='ml',
-            n_trials=n_trials or self.n_trials
+            n_trials=n_trials,
+            workers=n_workers if use_processes else 0,
+            pruner=pruner
         )
         
-        # Создаем исследование Optuna
-        self.study = optuna.create_study(
-            direction='maximize',
-            sampler=optuna.samplers.TPESampler(seed=42),
-            pruner=optuna.pruners.MedianPruner(
-                n_startup_trials=10,
-                n_warmup_steps=5
+        cache_before = self.feature_cache.get_stats()
+        started = time.perf_counter()
+        
+        if use_processes:
+            study_name = study_name or (
+                f"{self.model_type}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
             )
-        )
+            storage = storage or os.path.join(OPTIMIZATION_DIR, f"{study_name}.log")
+            
+            # Создаем исследование в хранилище, процессы к нему подключаются
+            self.study = optuna.create_study(
+                study_name=study_name,
+                storage=_create_storage(storage),
+                direction='maximize',
+                sampler=optuna.samplers.TPESampler(seed=42),
+                pruner=self._create_pruner(pruner),
+                load_if_exists=True
+            )
+            trials_before = len(self.study.trials)
+            
+            cache_stats = await self._run_study_workers(
+                data, feature_engineer, n_trials, n_workers, storage, study_name, pruner
+            )
+            
+            # Перечитываем исследование с результатами всех процессов
+            self.study = optuna.load_study(
+                study_name=study_name, storage=_create_storage(storage)
+            )
+            n_run_trials = len(self.study.trials) - trials_before
+        else:
+            # Создаем исследование Optuna
+            self.study = optuna.create_study(
+                direction='maximize',
+                sampler=optuna.samplers.TPESampler(seed=42),
+                pruner=self._create_pruner(pruner)
+            )
+            
+            # Оптимизация
+            self.study.optimize(
+                lambda trial: self.objective(trial, data, feature_engineer),
+                n_trials=n_trials,
+                timeout=self.timeout,
+                n_jobs=1  # Параллелизм внутри objective
+            )
+            
+            cache_stats = _cache_delta(cache_before, self.feature_cache.get_stats())
+            n_run_trials = len(self.study.trials)
         
-        # Оптимизация
-        self.study.optimize(
-            lambda trial: self.objective(trial, data, feature_engineer),
-            n_trials=n_trials or self.n_trials,
-            timeout=self.timeout,
-            n_jobs=1  # Параллелизм внутри objective
-        )
+        elapsed = time.perf_counter() - started
         
         # Сохраняем лучшие параметры
         self.best_params = self.study.best_params
@@ -482,7 +617,11 @@ class HyperparameterOptimizer:
             'best_score': self.study.best_value,
             'n_trials': len(self.study.trials),
             'optimization_history': self.optimization_history,
-            'feature_importance': self._analyze_feature_importance()
+            'feature_importance': self._analyze_feature_importance(),
+            'n_pruned': len([t for t in self.study.trials
+                             if t.state == optuna.trial.TrialState.PRUNED]),
+            'n_workers': n_workers if use_processes else 0,
+            'timing': self._timing_stats(n_run_trials, elapsed, cache_stats)
         }
         
         # Сохраняем результаты
@@ -492,11 +631,94 @@ class HyperparameterOptimizer:
             "Оптимизация завершена",
             category='ml',
             best_score=self.study.best_value,
-            best_params=self.best_params
+            best_params=self.best_params,
+            trials_per_minute=results['timing']['trials_per_minute']
         )
         
         return results
     
+    async def _run_study_workers(self, data: pd.DataFrame, feature_engineer: FeatureEngineer,
+                                 n_trials: int, n_workers: int, storage: str,
+                                 study_name: str, pruner: Optional[str]) -> Dict[str, Any]:
+        """
+        Выполняет trial'ы исследования в пуле процессов
+        
+        Returns:
+            Суммарная статистика кэшей признаков процессов
+        """
+        base, extra = divmod(n_trials, n_workers)
+        shares = [base + (1 if i < extra else 0) for i in range(n_workers)]
+        settings = {
+            'n_splits': self.n_splits,
+            'timeout': self.timeout,
+            'use_feature_cache': self.use_feature_cache,
+            'feature_cache_mb': self.feature_cache.max_bytes // (1024 * 1024),
+            'feature_cache_dir': self.feature_cache.spill_dir
+        }
+        
+        loop = asyncio.get_running_loop()
+        executor = ProcessPoolExecutor(
+            max_workers=n_workers,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+        
+        async def run_worker(worker_id: int, worker_trials: int) -> Optional[Dict[str, Any]]:
+            try:
+                return await loop.run_in_executor(
+                    executor, _run_study_worker, self.model_type, settings, storage,
+                    study_name, pruner, worker_id, worker_trials, data, feature_engineer
+                )
+            except Exception as e:
+                logger.error(
+                    f"Ошибка процесса оптимизации #{worker_id}: {e}",
+                    category='ml',
+                    model_type=self.model_type
+                )
+                return None
+        
+        try:
+            worker_results = await asyncio.gather(*(
+                run_worker(worker_id, share)
+                for worker_id, share in enumerate(shares) if share > 0
+            ))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        cache_stats = _cache_delta({}, {})
+        for result in filter(None, worker_results):
+            self.optimization_history.extend(result['history'])
+            for key, value in result['feature_cache'].items():
+                cache_stats[key] += value
+        
+        self.optimization_history.sort(key=lambda record: record['trial'])
+        return cache_stats
+    
+    def _timing_stats(self, n_trials: int, elapsed: float,
+                      cache_stats: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Скорость оптимизации и эффект кэша признаков за прогон
+        
+        trials_per_minute_uncached - оценка без кэша: к фактическому времени
+        добавляется время расчета, сэкономленное попаданиями в кэш.
+        """
+        saved = cache_stats['saved_seconds']
+        hits, misses = cache_stats['hits'], cache_stats['misses']
+        
+        def per_minute(seconds: float) -> float:
+            return n_trials * 60.0 / seconds if seconds > 0 else 0.0
+        
+        return {
+            'elapsed_seconds': elapsed,
+            'avg_trial_seconds': elapsed / n_trials if n_trials else 0.0,
+            'trials_per_minute': per_minute(elapsed),
+            'trials_per_minute_uncached': per_minute(elapsed + saved),
+            'feature_cache': {
+                'enabled': self.use_feature_cache,
+                'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+                **cache_stats
+            }
+        }
+    
     def _analyze_feature_importance(self) -> Dict[str, float]:
         """Анализирует важность гиперпараметров"""
         if not self.study:
@@ -515,7 +737,7 @@ class HyperparameterOptimizer:
             timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
             filename = f"optimization_{self.model_type}_{timestamp}.json"
             
-            with open(f"models/optimization/{filename}", 'w') as f:
+            with open(os.path.join(OPTIMIZATION_DIR, filename), 'w') as f:
                 json.dump(results, f, indent=2, default=str)
             
             # Обновляем БД с лучшими параметрами
@@ -663,32 +885,46 @@ class AutoOptimizer:
     Автоматический оптимизатор для всех типов моделей
     """
     
-    def __init__(self):
+    def __init__(self, feature_cache_mb: int = 1024, feature_cache_dir: Optional[str] = None):
+        # Общий кэш: признаки одних данных одинаковы для всех типов моделей
+        self.feature_cache = FeatureCache(
+            max_bytes=feature_cache_mb * 1024 * 1024,
+            spill_dir=feature_cache_dir
+        )
         self.optimizers = {
-            'classifier': HyperparameterOptimizer('classifier'),
-            'regressor': HyperparameterOptimizer('regressor'),
-            'xgboost': HyperparameterOptimizer('xgboost')
+            'classifier': HyperparameterOptimizer('classifier', feature_cache=self.feature_cache),
+            'regressor': HyperparameterOptimizer('regressor', feature_cache=self.feature_cache),
+            'xgboost': HyperparameterOptimizer('xgboost', feature_cache=self.feature_cache)
         }
         self.results = {}
     
     async def optimize_all(self, data: pd.DataFrame,
                           feature_engineer: FeatureEngineer,
-                          n_trials_per_model: int = 50):
+                          n_trials_per_model: int = 50,
+                          n_workers: int = 1,
+                          storage: Optional[str] = None):
         """
         Оптимизирует все модели
+        
+        При n_workers > 1 типы моделей оптимизируются одновременно: процессы
+        делятся между ними поровну, исследования хранятся в одном хранилище
+        под своими именами.
         """
+        concurrent = n_workers > 1
+        
         logger.info(
             "Запуск полной оптимизации всех моделей",
             category='ml',
-            models=list(self.optimizers.keys())
+            models=list(self.optimizers.keys()),
+            workers=n_workers
         )
         
-        for model_type, optimizer in self.optimizers.items():
+        async def run_model(model_type: str, optimizer: HyperparameterOptimizer, **kwargs):
             logger.info(f"Оптимизация {model_type}")
             
             try:
                 result = await optimizer.optimize(
-                    data, feature_engineer, n_trials_per_model
+                    data, feature_engineer, n_trials_per_model, **kwargs
                 )
                 self.results[model_type] = result
                 
@@ -699,6 +935,24 @@ class AutoOptimizer:
                 )
                 self.results[model_type] = {'error': str(e)}
         
+        if concurrent:
+            timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+            storage = storage or os.path.join(OPTIMIZATION_DIR, f"auto_{timestamp}.log")
+            workers_per_model = max(1, n_workers // len(self.optimizers))
+            
+            await asyncio.gather(*(
+                run_model(
+                    model_type, optimizer,
+                    n_workers=workers_per_model,
+                    storage=storage,
+                    study_name=f"{model_type}_{timestamp}"
+                )
+                for model_type, optimizer in self.optimizers.items()
+            ))
+        else:
+            for model_type, optimizer in self.optimizers.items():
+                await run_model(model_type, optimizer, storage=storage)
+        
         # Выбираем лучшую модель
         best_model = self._select_best_model()
         
@@ -745,4 +999,84 @@ class AutoOptimizer:
         
         return pd.DataFrame(comparison_data).sort_values(
             'best_score', ascending=False
-        )
\ No newline at end of file
+        )
+
+
+# =================================================================
+# ПРОЦЕССЫ ОПТИМИЗАЦИИ
+# =================================================================
+
+def _create_storage(storage: str):
+    """
+    Хранилище исследования, общее для процессов
+    
+    'sqlite:///...' или путь к .db - SQLite (RDB), иначе журнал-файл:
+    он не требует сервера и безопасен при записи из нескольких процессов.
+    """
+    if storage.startswith('sqlite:///'):
+        return storage
+    
+    directory = os.path.dirname(storage)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    if storage.endswith('.db'):
+        return f"sqlite:///{storage}"
+    
+    journal = optuna.storages.journal if hasattr(optuna.storages, 'journal') else None
+    if journal is not None and hasattr(journal, 'JournalFileBackend'):
+        backend = journal.JournalFileBackend(storage)
+    else:
+        backend = optuna.storages.JournalFileStorage(storage)  # optuna < 4.0
+    return optuna.storages.JournalStorage(backend)
+
+
+def _cache_delta(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """Статистика кэша признаков за прогон"""
+    delta = {
+        'hits': after.get('hits', 0) + after.get('disk_hits', 0)
+                - before.get('hits', 0) - before.get('disk_hits', 0),
+        'misses': after.get('misses', 0) - before.get('misses', 0),
+        'compute_seconds': after.get('compute_seconds', 0.0) - before.get('compute_seconds', 0.0),
+        'saved_seconds': after.get('saved_seconds', 0.0) - before.get('saved_seconds', 0.0)
+    }
+    delta.update({
+        'entries': after.get('entries', 0),
+        'memory_mb': after.get('memory_mb', 0.0)
+    })
+    return delta
+
+
+def _run_study_worker(model_type: str, settings: Dict[str, Any], storage: str,
+                      study_name: str, pruner: Optional[str], worker_id: int,
+                      n_trials: int, data: pd.DataFrame,
+                      feature_engineer: FeatureEngineer) -> Dict[str, Any]:
+    """Процесс пула: выполняет свою долю trial'ов общего исследования"""
+    optimizer = HyperparameterOptimizer(
+        model_type,
+        feature_cache_mb=settings['feature_cache_mb'],
+        feature_cache_dir=settings['feature_cache_dir']
+    )
+    optimizer.n_splits = settings['n_splits']
+    optimizer.use_feature_cache = settings['use_feature_cache']
+    
+    # Свой seed сэмплера, чтобы процессы не предлагали одинаковые точки
+    study = optuna.load_study(
+        study_name=study_name,
+        storage=_create_storage(storage),
+        sampler=optuna.samplers.TPESampler(seed=42 + worker_id),
+        pruner=optimizer._create_pruner(pruner)
+    )
+    
+    cache_before = optimizer.feature_cache.get_stats()
+    study.optimize(
+        lambda trial: optimizer.objective(trial, data, feature_engineer),
+        n_trials=n_trials,
+        timeout=settings['timeout']
+    )
+    
+    return {
+        'worker': worker_id,
+        'history': optimizer.optimization_history,
+        'feature_cache': _cache_delta(cache_before, optimizer.feature_cache.get_stats())
+    }
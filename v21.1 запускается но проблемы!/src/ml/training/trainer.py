@@ -5,10 +5,14 @@
 Объединяет полную функциональность с практической реализацией
 """
 import asyncio
+import copy
+import hashlib
+import os
+import multiprocessing
 import numpy as np
 import pandas as pd
 import pickle
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, List, Tuple, Optional, Any, Union
 from datetime import datetime, timedelta
 from sklearn.model_selection import train_test_split, TimeSeriesSplit
 from sklearn.metrics import (
@@ -18,6 +22,12 @@ from sklearn.metrics import (
 from sklearn.ensemble import RandomForestClassifier
 import json
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 from sqlalchemy.orm import Session
 from ...core.database import SessionLocal
@@ -54,13 +64,31 @@ class EnsembleModel:
         # Нормализуем веса
         total_weight = sum(self.weights)
         self.weights = [w / total_weight for w in self.weights]
+        
+        # Результат последнего прохода (ключ входа, результат)
+        self._last_inference = None
     
-    def predict_proba(self, X):
-        """Предсказание вероятностей с взвешенным усреднением"""
-        predictions = []
-        model_names = list(self.models.keys())
+    def __getstate__(self):
+        # Кэш предсказаний не сохраняем вместе с моделью
+        state = self.__dict__.copy()
+        state['_last_inference'] = None
+        return state
+    
+    @staticmethod
+    def _input_key(X) -> Optional[Tuple]:
+        """Ключ кэша по содержимому входа (None - не кэшировать)"""
+        values = X.values if isinstance(X, pd.DataFrame) else X
+        if not isinstance(values, np.ndarray) or values.dtype == object:
+            return None
+        columns = tuple(X.columns) if isinstance(X, pd.DataFrame) else None
+        digest = hashlib.blake2b(np.ascontiguousarray(values).tobytes(), digest_size=16).digest()
+        return values.shape, values.dtype.str, columns, digest
+    
+    def _member_probabilities(self, X) -> Dict[str, np.ndarray]:
+        """Вероятности каждой модели ансамбля (без весов)"""
+        members = {}
         
-        for i, (name, model) in enumerate(self.models.items()):
+        for name, model in self.models.items():
             try:
                 if hasattr(model, 'predict_proba'):
                     pred = model.predict_proba(X)
@@ -72,27 +100,66 @@ class EnsembleModel:
                     for j, cls in enumerate(unique_classes):
                         pred[pred_classes == cls, j] = 1.0
                 
-                predictions.append(pred * self.weights[i])
+                members[name] = pred
             except Exception as e:
                 # Если модель сломана, пропускаем её
                 continue
         
-        if not predictions:
+        return members
+    
+    def infer(self, X) -> Dict[str, Any]:
+        """
+        Один проход по моделям ансамбля
+        
+        Каждая модель вызывается один раз; классы, уверенность и вклады
+        моделей выводятся из этих вероятностей. Повторный вызов с тем же
+        входом (predict -> predict_proba -> get_confidence) берет результат из кэша.
+        
+        Returns:
+            {'proba': взвешенные вероятности (N × классы),
+             'classes': -1/0/1, 'confidence': max вероятность,
+             'members': {модель: вероятности},
+             'contributions': {модель: вклад в вероятность выбранного класса}}
+        """
+        key = self._input_key(X)
+        cached = getattr(self, '_last_inference', None)
+        if key is not None and cached is not None and cached[0] == key:
+            return cached[1]
+        
+        members = self._member_probabilities(X)
+        if not members:
             raise ValueError("Все модели в ансамбле недоступны")
         
         # Суммируем взвешенные предсказания
-        ensemble_pred = np.sum(predictions, axis=0)
-        return ensemble_pred
+        weights = dict(zip(self.models, self.weights))
+        weighted = {name: proba * weights[name] for name, proba in members.items()}
+        proba = np.sum(list(weighted.values()), axis=0)
+        
+        best = np.argmax(proba, axis=1)
+        rows = np.arange(len(best))
+        result = {
+            'proba': proba,
+            'classes': best - 1,  # Возвращаем -1, 0, 1
+            'confidence': np.max(proba, axis=1),
+            'members': members,
+            'contributions': {name: values[rows, best] for name, values in weighted.items()}
+        }
+        
+        if key is not None:
+            self._last_inference = (key, result)
+        return result
+    
+    def predict_proba(self, X):
+        """Предсказание вероятностей с взвешенным усреднением"""
+        return self.infer(X)['proba']
     
     def predict(self, X):
         """Предсказание классов"""
-        proba = self.predict_proba(X)
-        return np.argmax(proba, axis=1) - 1  # Возвращаем -1, 0, 1
+        return self.infer(X)['classes']
     
     def get_confidence(self, X):
         """Получение уверенности предсказания"""
-        proba = self.predict_proba(X)
-        return np.max(proba, axis=1)
+        return self.infer(X)['confidence']
 
 
 class MLTrainer:
@@ -121,7 +188,9 @@ class MLTrainer:
             'symbols': [],
             'timeframes': ['5m', '15m', '1h'],
             'target_periods': 5,  # Предсказываем на 5 периодов вперед
-            'lookback_periods': 2000
+            'lookback_periods': 2000,
+            'n_workers': Config.ML_TRAINING_WORKERS,  # Процессы для train_all_models
+            'worker_memory_limit_mb': Config.ML_TRAINING_MEMORY_LIMIT_MB
         }
         
         # История обучения
@@ -340,9 +409,12 @@ class MLTrainer:
                 }
             }
             
+            # Пишем во временный файл и заменяем: читатели не увидят недописанную модель
             model_path = self.models_dir / f"{symbol}_{timeframe}_model.pkl"
-            with open(model_path, 'wb') as f:
+            tmp_path = model_path.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp_path, 'wb') as f:
                 pickle.dump(model_data, f)
+            os.replace(tmp_path, model_path)
             
             # Сохраняем в память
             self.models[f"{symbol}_{timeframe}"] = ensemble
@@ -407,30 +479,58 @@ class MLTrainer:
             }
     
     async def train_all_models(self) -> Dict[str, Any]:
-        """Обучает модели для всех символов"""
-        self.logger.info("🚀 Начинаем массовое обучение моделей", category='ml')
+        """
+        Обучает модели для всех символов
         
-        all_results = {}
-        successful_models = 0
+        Каждый символ обучается в отдельном процессе пула (n_workers,
+        лимит памяти worker_memory_limit_mb), event loop при этом свободен.
+        Готовая модель подменяется в self.models одним присваиванием, как
+        только ее задача завершилась.
+        """
+        symbols = list(self.training_config['symbols'])
+        timeframe = '5m'
+        n_workers = max(1, int(self.training_config.get('n_workers') or 1))
+        memory_limit_mb = self.training_config.get('worker_memory_limit_mb')
         
-        for symbol in self.training_config['symbols']:
+        self.logger.info(
+            "🚀 Начинаем массовое обучение моделей",
+            category='ml',
+            workers=n_workers,
+            memory_limit_mb=memory_limit_mb
+        )
+        
+        loop = asyncio.get_running_loop()
+        executor = ProcessPoolExecutor(
+            max_workers=n_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_training_worker,
+            initargs=(memory_limit_mb,)
+        )
+        training_config = dict(self.training_config)
+        model_configs = self._worker_model_configs(n_workers)
+        
+        async def run_job(symbol: str) -> Tuple[str, Dict[str, Any]]:
             try:
-                result = await self.train_symbol_model(symbol)
-                all_results[symbol] = result
-                
+                result = await loop.run_in_executor(
+                    executor, _train_symbol_job, symbol, timeframe, training_config, model_configs
+                )
                 if result.get('success'):
-                    successful_models += 1
-                
-                # Небольшая пауза между обучениями
-                await asyncio.sleep(1)
-                
+                    await self._install_model(symbol, timeframe, result['model_path'])
             except Exception as e:
                 self.logger.error(
                     f"Критическая ошибка обучения для {symbol}: {e}",
                     category='ml',
                     symbol=symbol
                 )
-                all_results[symbol] = {'success': False, 'error': str(e)}
+                result = {'success': False, 'error': str(e)}
+            return symbol, result
+        
+        try:
+            all_results = dict(await asyncio.gather(*(run_job(symbol) for symbol in symbols)))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        successful_models = sum(1 for result in all_results.values() if result.get('success'))
         
         # Общая статистика
         total_symbols = len(self.training_config['symbols'])
@@ -460,43 +560,128 @@ class MLTrainer:
         
         return summary
     
+    def _worker_model_configs(self, n_workers: int) -> Dict[str, Any]:
+        """Конфигурации моделей для процессов: потоки RF делятся между процессами"""
+        model_configs = copy.deepcopy(self.model_configs)
+        rf_params = model_configs['random_forest']['params']
+        if rf_params.get('n_jobs') == -1:
+            rf_params['n_jobs'] = max(1, (os.cpu_count() or 1) // n_workers)
+        return model_configs
+    
+    async def _install_model(self, symbol: str, timeframe: str, model_path: str):
+        """Загружает обученную в процессе модель и подменяет ее в self.models"""
+        def load():
+            with open(model_path, 'rb') as f:
+                return pickle.load(f)
+        
+        model_data = await asyncio.to_thread(load)
+        # Одно присваивание: предсказания видят либо старую, либо новую модель целиком
+        self.models[f"{symbol}_{timeframe}"] = model_data['ensemble']
+    
+    def _get_model(self, symbol: str, timeframe: str = '5m',
+                   use_ensemble: bool = True) -> Tuple[Optional[Any], Optional[str]]:
+        """
+        Модель символа из памяти или с диска
+        
+        Returns:
+            (модель, None) или (None, текст ошибки)
+        """
+        model_key = f"{symbol}_{timeframe}"
+        
+        # Попытка загрузки из памяти
+        if model_key not in self.models:
+            # Загрузка с диска
+            model_path = self.models_dir / f"{symbol}_{timeframe}_model.pkl"
+            if not model_path.exists():
+                return None, f'Модель для {symbol} не найдена. Требуется обучение.'
+            
+            with open(model_path, 'rb') as f:
+                model_data = pickle.load(f)
+            
+            model_to_use = model_data['ensemble'] if use_ensemble else model_data['best_single']
+            self.models[model_key] = model_to_use
+            
+            # Проверяем возраст модели
+            training_date = datetime.fromisoformat(model_data['training_date'])
+            model_age_hours = (datetime.utcnow() - training_date).total_seconds() / 3600
+            
+            if model_age_hours > self.training_config['retrain_interval_hours']:
+                self.logger.warning(
+                    f"Модель для {symbol} устарела",
+                    category='ml',
+                    symbol=symbol,
+                    age_hours=model_age_hours
+                )
+        
+        return self.models[model_key], None
+    
+    @staticmethod
+    def _infer(model, X) -> Dict[str, Any]:
+        """Классы, вероятности и уверенность за один проход модели"""
+        if hasattr(model, 'infer'):
+            return model.infer(X)
+        
+        proba = np.asarray(model.predict_proba(X))
+        model_classes = getattr(model, 'classes_', None)
+        if model_classes is not None:
+            classes = np.asarray(model_classes)[np.argmax(proba, axis=1)]
+        else:
+            classes = np.asarray(model.predict(X))
+        confidence = model.get_confidence(X) if hasattr(model, 'get_confidence') else np.max(proba, axis=1)
+        
+        return {'proba': proba, 'classes': classes, 'confidence': confidence,
+                'members': {}, 'contributions': {}}
+    
+    def _format_prediction(self, symbol: str, outputs: Dict[str, Any], row: int,
+                           use_ensemble: bool) -> Dict[str, Any]:
+        """Результат предсказания для строки row из выхода _infer"""
+        prediction = outputs['classes'][row]
+        prediction_proba = outputs['proba'][row]
+        confidence = outputs['confidence'][row]
+        
+        # Интерпретация
+        direction_map = {-1: 'SELL', 0: 'HOLD', 1: 'BUY'}
+        direction = direction_map.get(prediction, 'HOLD')
+        
+        result = {
+            'success': True,
+            'symbol': symbol,
+            'direction': direction,
+            'confidence': float(confidence),
+            'prediction_value': int(prediction),
+            'probabilities': {
+                'bearish': float(prediction_proba[0]) if len(prediction_proba) > 0 else 0.0,
+                'neutral': float(prediction_proba[1]) if len(prediction_proba) > 1 else 0.0,
+                'bullish': float(prediction_proba[2]) if len(prediction_proba) > 2 else 0.0
+            },
+            'model_contributions': {
+                name: float(values[row]) for name, values in outputs['contributions'].items()
+            },
+            'model_type': 'ensemble' if use_ensemble else 'single',
+            'timestamp': datetime.utcnow().isoformat()
+        }
+        
+        # Логируем важные предсказания
+        if confidence > 0.7:
+            self.logger.info(
+                f"Сильный сигнал ML для {symbol}",
+                category='ml',
+                symbol=symbol,
+                direction=direction,
+                confidence=f"{confidence:.3f}"
+            )
+        
+        return result
+    
     async def predict(self, symbol: str, current_data: Optional[pd.DataFrame] = None,
                      timeframe: str = '5m', use_ensemble: bool = True) -> Dict[str, Any]:
         """
         Получение предсказания от обученной модели
         """
         try:
-            model_key = f"{symbol}_{timeframe}"
-            
-            # Попытка загрузки из памяти
-            if model_key not in self.models:
-                # Загрузка с диска
-                model_path = self.models_dir / f"{symbol}_{timeframe}_model.pkl"
-                if not model_path.exists():
-                    return {
-                        'success': False,
-                        'error': f'Модель для {symbol} не найдена. Требуется обучение.'
-                    }
-                
-                with open(model_path, 'rb') as f:
-                    model_data = pickle.load(f)
-                
-                model_to_use = model_data['ensemble'] if use_ensemble else model_data['best_single']
-                self.models[model_key] = model_to_use
-                
-                # Проверяем возраст модели
-                training_date = datetime.fromisoformat(model_data['training_date'])
-                model_age_hours = (datetime.utcnow() - training_date).total_seconds() / 3600
-                
-                if model_age_hours > self.training_config['retrain_interval_hours']:
-                    self.logger.warning(
-                        f"Модель для {symbol} устарела",
-                        category='ml',
-                        symbol=symbol,
-                        age_hours=model_age_hours
-                    )
-            
-            model = self.models[model_key]
+            model, error = self._get_model(symbol, timeframe, use_ensemble)
+            if model is None:
+                return {'success': False, 'error': error}
             
             # Подготовка данных для предсказания
             if current_data is None:
@@ -515,41 +700,9 @@ class MLTrainer:
             else:
                 X = current_data.values
             
-            # Предсказание
-            prediction = model.predict(X)[0]
-            prediction_proba = model.predict_proba(X)[0]
-            confidence = model.get_confidence(X)[0] if hasattr(model, 'get_confidence') else max(prediction_proba)
-            
-            # Интерпретация
-            direction_map = {-1: 'SELL', 0: 'HOLD', 1: 'BUY'}
-            direction = direction_map.get(prediction, 'HOLD')
-            
-            result = {
-                'success': True,
-                'symbol': symbol,
-                'direction': direction,
-                'confidence': float(confidence),
-                'prediction_value': int(prediction),
-                'probabilities': {
-                    'bearish': float(prediction_proba[0]) if len(prediction_proba) > 0 else 0.0,
-                    'neutral': float(prediction_proba[1]) if len(prediction_proba) > 1 else 0.0,
-                    'bullish': float(prediction_proba[2]) if len(prediction_proba) > 2 else 0.0
-                },
-                'model_type': 'ensemble' if use_ensemble else 'single',
-                'timestamp': datetime.utcnow().isoformat()
-            }
-            
-            # Логируем важные предсказания
-            if confidence > 0.7:
-                self.logger.info(
-                    f"Сильный сигнал ML для {symbol}",
-                    category='ml',
-                    symbol=symbol,
-                    direction=direction,
-                    confidence=f"{confidence:.3f}"
-                )
-            
-            return result
+            # Предсказание (один проход по моделям)
+            outputs = self._infer(model, X)
+            return self._format_prediction(symbol, outputs, 0, use_ensemble)
             
         except Exception as e:
             self.logger.error(
@@ -560,6 +713,63 @@ class MLTrainer:
             )
             return {'success': False, 'error': str(e)}
     
+    async def predict_batch(self, features: Dict[str, Union[pd.DataFrame, np.ndarray]],
+                            timeframe: str = '5m', use_ensemble: bool = True) -> Dict[str, Dict[str, Any]]:
+        """
+        Предсказания для списка символов за один вызов
+        
+        Строки группируются по объекту модели: символы с общей моделью
+        складываются в одну матрицу и модель вызывается один раз на группу.
+        Модели обучаются отдельно на каждый символ ({symbol}_{timeframe}),
+        поэтому сейчас группа - это, как правило, один символ, и выигрыш
+        дает только один проход ансамбля на символ (_infer). Пакетирование
+        между символами заработает, если один объект модели зарегистрирован
+        в self.models под несколькими ключами (общая модель для пар).
+        
+        Args:
+            features: {symbol: признаки}; берется последняя строка
+            timeframe: Таймфрейм моделей
+            use_ensemble: Ансамбль или лучшая одиночная модель
+            
+        Returns:
+            {symbol: результат как у predict} в порядке features
+        """
+        results = {}
+        groups = {}  # id(model) -> (модель, символы, строки); модели посимвольные
+        
+        for symbol, data in features.items():
+            try:
+                model, error = self._get_model(symbol, timeframe, use_ensemble)
+                if model is None:
+                    results[symbol] = {'success': False, 'error': error}
+                    continue
+                
+                X = data.values if isinstance(data, pd.DataFrame) else np.asarray(data)
+                X = X.reshape(1, -1) if X.ndim == 1 else X[-1:]
+                
+                _, symbols, rows = groups.setdefault(id(model), (model, [], []))
+                symbols.append(symbol)
+                rows.append(X)
+            except Exception as e:
+                results[symbol] = {'success': False, 'error': str(e)}
+        
+        for model, symbols, rows in groups.values():
+            try:
+                outputs = self._infer(model, np.vstack(rows))
+                for row, symbol in enumerate(symbols):
+                    results[symbol] = self._format_prediction(symbol, outputs, row, use_ensemble)
+            except Exception as e:
+                self.logger.error(
+                    f"❌ Ошибка пакетного предсказания: {e}",
+                    category='ml',
+                    symbols=symbols,
+                    error=str(e)
+                )
+                for symbol in symbols:
+                    results[symbol] = {'success': False, 'error': str(e)}
+        
+        return {symbol: results[symbol] for symbol in features}
+    
     async def generate_symbol_report(self, symbol: str, timeframe: str, 
                                    results: Dict, model_data: Dict):
         """Генерирует отчет по обучению символа"""
@@ -713,6 +923,40 @@ class MLTrainer:
         return sorted(models, key=lambda x: x.get('age_hours', float('inf')))
 
 
+# =================================================================
+# ПРОЦЕССЫ ОБУЧЕНИЯ
+# =================================================================
+
+def _init_training_worker(memory_limit_mb: Optional[int]):
+    """
+    Инициализация процесса обучения: лимит памяти данных (по умолчанию выключен)
+    
+    Ограничивается RLIMIT_DATA, а не RLIMIT_AS: потоки BLAS/OpenMP и
+    mmap библиотек резервируют гигабайты виртуального адресного
+    пространства, и лимит на него ломает обучение задолго до реальной
+    нехватки памяти.
+    """
+    if not memory_limit_mb or resource is None:
+        return
+    limit = int(memory_limit_mb) * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+    except (ValueError, OSError) as e:
+        SmartLogger(__name__).warning(
+            f"⚠️ Не удалось установить лимит памяти {memory_limit_mb} МБ: {e}",
+            category='ml'
+        )
+
+
+def _train_symbol_job(symbol: str, timeframe: str, training_config: Dict[str, Any],
+                      model_configs: Dict[str, Any]) -> Dict[str, Any]:
+    """Обучение модели символа в процессе пула (модель сохраняется на диск)"""
+    trainer = MLTrainer()
+    trainer.training_config.update(training_config)
+    trainer.model_configs = model_configs
+    return asyncio.run(trainer.train_symbol_model(symbol, timeframe))
+
+
 # Глобальный экземпляр тренера
 ml_trainer = MLTrainer()
 
@@ -14,6 +14,7 @@ import asyncio
 logger = logging.getLogger(__name__)
 
 from ..common.types import UnifiedTradingSignal as TradingSignal
+from ..indicators.memo import get_indicator_memo, IndicatorContext
 
 class BaseStrategy(ABC):
     """
@@ -435,6 +436,15 @@ class BaseStrategy(ABC):
         except:
             return 0, 0
 
+    def indicator_context(self, df: pd.DataFrame, symbol: Optional[str] = None) -> IndicatorContext:
+        """
+        Общий для всех стратегий кэш индикаторов текущего бара df
+        
+        Одинаковые (индикатор, параметры) считаются один раз за бар,
+        сколько бы стратегий их ни запросили.
+        """
+        return get_indicator_memo().context(df, symbol)
+
     async def calculate_enhanced_indicators(self, df: pd.DataFrame) -> dict:
         """
         Расчет расширенного набора индикаторов
@@ -442,50 +452,39 @@ class BaseStrategy(ABC):
         indicators = {}
         
         try:
+            ctx = self.indicator_context(df)
+            
             # Базовые индикаторы
-            indicators['sma_20'] = df['close'].rolling(20).mean()
-            indicators['sma_50'] = df['close'].rolling(50).mean()
-            indicators['sma_200'] = df['close'].rolling(200).mean()
-            indicators['ema_12'] = df['close'].ewm(span=12).mean()
-            indicators['ema_26'] = df['close'].ewm(span=26).mean()
+            indicators['sma_20'] = ctx.sma(20)
+            indicators['sma_50'] = ctx.sma(50)
+            indicators['sma_200'] = ctx.sma(200)
+            indicators['ema_12'] = ctx.ema(12)
+            indicators['ema_26'] = ctx.ema(26)
             
             # RSI
-            indicators['rsi'] = self.calculate_rsi_series(df['close'])
-            indicators['rsi_sma'] = indicators['rsi'].rolling(14).mean()
+            indicators['rsi'] = ctx.get('rsi_filled', (14,), lambda: ctx.rsi(14).fillna(50))
+            indicators['rsi_sma'] = ctx.get('rsi_filled_sma', (14, 14), lambda: indicators['rsi'].rolling(14).mean())
             
             # MACD
-            indicators['macd'] = indicators['ema_12'] - indicators['ema_26']
-            indicators['macd_signal'] = indicators['macd'].ewm(span=9).mean()
-            indicators['macd_hist'] = indicators['macd'] - indicators['macd_signal']
+            indicators['macd'], indicators['macd_signal'], indicators['macd_hist'] = ctx.macd(12, 26, 9)
             
             # Bollinger Bands
-            bb_sma = df['close'].rolling(20).mean()
-            bb_std = df['close'].rolling(20).std()
-            indicators['bb_upper'] = bb_sma + (bb_std * 2)
-            indicators['bb_lower'] = bb_sma - (bb_std * 2)
+            indicators['bb_upper'], _, indicators['bb_lower'] = ctx.bbands(20, 2)
             indicators['bb_width'] = indicators['bb_upper'] - indicators['bb_lower']
             
             # ATR (Average True Range)
-            high_low = df['high'] - df['low']
-            high_close = (df['high'] - df['close'].shift()).abs()
-            low_close = (df['low'] - df['close'].shift()).abs()
-            true_range = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-            indicators['atr'] = true_range.rolling(14).mean()
+            indicators['atr'] = ctx.atr(14)
             
             # Stochastic
-            low_14 = df['low'].rolling(14).min()
-            high_14 = df['high'].rolling(14).max()
-            indicators['stoch_k'] = 100 * ((df['close'] - low_14) / (high_14 - low_14))
-            indicators['stoch_d'] = indicators['stoch_k'].rolling(3).mean()
+            indicators['stoch_k'], indicators['stoch_d'] = ctx.stoch(14, 3)
             
             # Volume indicators
-            indicators['volume_sma'] = df['volume'].rolling(20).mean()
+            indicators['volume_sma'] = ctx.sma(20, 'volume')
             indicators['volume_ratio'] = df['volume'] / indicators['volume_sma']
             
             # OBV (On Balance Volume)
-            obv = (df['volume'] * (~df['close'].diff().le(0) * 2 - 1)).cumsum()
-            indicators['obv'] = obv
-            indicators['obv_sma'] = obv.rolling(20).mean()
+            indicators['obv'] = ctx.obv()
+            indicators['obv_sma'] = ctx.get('obv_sma', (20,), lambda: indicators['obv'].rolling(20).mean())
             
             # Сохраняем индикаторы в экземпляре класса
             self.indicators = indicators
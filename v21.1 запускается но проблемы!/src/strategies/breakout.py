@@ -5,7 +5,6 @@
 """
 
 import pandas as pd
-import numpy as np
 from typing import Dict, Optional, List, Tuple
 import logging
 
@@ -148,39 +147,42 @@ class BreakoutStrategy(BaseStrategy):
             indicators = {}
             current_price = float(df['close'].iloc[-1])
             indicators['current_price'] = current_price
+            ctx = self.indicator_context(df)
             
             if TA_AVAILABLE:
                 # RSI для определения моментума
-                rsi = RSIIndicator(df['close'], window=14)
-                indicators['rsi'] = float(rsi.rsi().iloc[-1])
+                rsi = ctx.get('ta_rsi', (14,), lambda: RSIIndicator(df['close'], window=14).rsi())
+                indicators['rsi'] = float(rsi.iloc[-1])
                 
                 # ADX для силы тренда
-                adx = ADXIndicator(df['high'], df['low'], df['close'])
+                adx = ctx.get('ta_adx', (14,), lambda: ADXIndicator(df['high'], df['low'], df['close']))
                 indicators['adx'] = float(adx.adx().iloc[-1])
                 indicators['adx_pos'] = float(adx.adx_pos().iloc[-1])
                 indicators['adx_neg'] = float(adx.adx_neg().iloc[-1])
                 
                 # EMA для определения общего тренда
-                ema_20 = EMAIndicator(df['close'], window=20)
-                ema_50 = EMAIndicator(df['close'], window=50)
-                indicators['ema_20'] = float(ema_20.ema_indicator().iloc[-1])
-                indicators['ema_50'] = float(ema_50.ema_indicator().iloc[-1])
+                ema_20 = ctx.get('ta_ema', (20,), lambda: EMAIndicator(df['close'], window=20).ema_indicator())
+                ema_50 = ctx.get('ta_ema', (50,), lambda: EMAIndicator(df['close'], window=50).ema_indicator())
+                indicators['ema_20'] = float(ema_20.iloc[-1])
+                indicators['ema_50'] = float(ema_50.iloc[-1])
                 
                 # ATR для волатильности
-                atr = AverageTrueRange(df['high'], df['low'], df['close'])
-                indicators['atr'] = float(atr.average_true_range().iloc[-1])
+                atr = ctx.get('ta_atr', (14,), lambda: AverageTrueRange(
+                    df['high'], df['low'], df['close']).average_true_range())
+                indicators['atr'] = float(atr.iloc[-1])
                 
                 # OBV для объемного анализа (если есть объем)
                 if 'volume' in df.columns:
-                    obv = OnBalanceVolumeIndicator(df['close'], df['volume'])
-                    indicators['obv'] = float(obv.on_balance_volume().iloc[-1])
-                    indicators['obv_trend'] = self._calculate_obv_trend(obv.on_balance_volume())
+                    obv = ctx.get('ta_obv', (), lambda: OnBalanceVolumeIndicator(
+                        df['close'], df['volume']).on_balance_volume())
+                    indicators['obv'] = float(obv.iloc[-1])
+                    indicators['obv_trend'] = self._calculate_obv_trend(obv)
                 
             else:
                 # Базовые вычисления без TA-Lib
-                indicators['rsi'] = self._calculate_rsi(df['close'])
-                indicators['ema_20'] = df['close'].ewm(span=20).mean().iloc[-1]
-                indicators['ema_50'] = df['close'].ewm(span=50).mean().iloc[-1]
+                indicators['rsi'] = self._calculate_rsi(df)
+                indicators['ema_20'] = ctx.ema(20).iloc[-1]
+                indicators['ema_50'] = ctx.ema(50).iloc[-1]
                 indicators['atr'] = self._calculate_atr(df)
                 indicators['adx'] = 30.0  # Предполагаем средний ADX
                 indicators['adx_pos'] = 25.0
@@ -188,7 +190,7 @@ class BreakoutStrategy(BaseStrategy):
             
             # Анализ объема
             if 'volume' in df.columns:
-                volume_ma = df['volume'].rolling(20).mean()
+                volume_ma = ctx.sma(20, 'volume')
                 current_volume = df['volume'].iloc[-1]
                 indicators['volume_ratio'] = current_volume / volume_ma.iloc[-1]
                 indicators['average_volume'] = float(volume_ma.iloc[-1])
@@ -435,21 +437,12 @@ class BreakoutStrategy(BaseStrategy):
         else:
             return 'NEUTRAL'
     
-    def _calculate_rsi(self, prices, period=14):
+    def _calculate_rsi(self, df, period=14):
         """RSI без TA-Lib"""
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
+        rsi = self.indicator_context(df).rsi(period)
         return float(rsi.iloc[-1]) if not rsi.empty else 50.0
     
     def _calculate_atr(self, df, period=14):
         """ATR без TA-Lib"""
-        high_low = df['high'] - df['low']
-        high_close = np.abs(df['high'] - df['close'].shift())
-        low_close = np.abs(df['low'] - df['close'].shift())
-        
-        tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-        atr = tr.rolling(window=period).mean()
+        atr = self.indicator_context(df).atr(period)
         return float(atr.iloc[-1]) if not atr.empty else 0.01
\ No newline at end of file
@@ -89,14 +89,17 @@ class MeanReversionStrategy(BaseStrategy):
             indicators = {}
             current_price = float(df['close'].iloc[-1])
             indicators['current_price'] = current_price
+            ctx = self.indicator_context(df)
             
             if TA_AVAILABLE:
                 # RSI
-                rsi = RSIIndicator(df['close'], window=self.rsi_period)
-                indicators['rsi'] = float(rsi.rsi().iloc[-1])
+                rsi = ctx.get('ta_rsi', (self.rsi_period,),
+                              lambda: RSIIndicator(df['close'], window=self.rsi_period).rsi())
+                indicators['rsi'] = float(rsi.iloc[-1])
                 
                 # Bollinger Bands
-                bb = BollingerBands(df['close'], window=self.bb_period, window_dev=self.bb_std)
+                bb = ctx.get('ta_bbands', (self.bb_period, self.bb_std),
+                             lambda: BollingerBands(df['close'], window=self.bb_period, window_dev=self.bb_std))
                 indicators['bb_upper'] = float(bb.bollinger_hband().iloc[-1])
                 indicators['bb_lower'] = float(bb.bollinger_lband().iloc[-1])
                 indicators['bb_middle'] = float(bb.bollinger_mavg().iloc[-1])
@@ -104,17 +107,19 @@ class MeanReversionStrategy(BaseStrategy):
                 indicators['bb_width'] = float(bb.bollinger_wband().iloc[-1])
                 
                 # EMA
-                ema = EMAIndicator(df['close'], window=self.ema_period)
-                indicators['ema'] = float(ema.ema_indicator().iloc[-1])
+                ema = ctx.get('ta_ema', (self.ema_period,),
+                              lambda: EMAIndicator(df['close'], window=self.ema_period).ema_indicator())
+                indicators['ema'] = float(ema.iloc[-1])
                 
                 # ATR
-                atr = AverageTrueRange(df['high'], df['low'], df['close'])
-                indicators['atr'] = float(atr.average_true_range().iloc[-1])
+                atr = ctx.get('ta_atr', (14,), lambda: AverageTrueRange(
+                    df['high'], df['low'], df['close']).average_true_range())
+                indicators['atr'] = float(atr.iloc[-1])
                 
             else:
                 # Базовые вычисления без TA-Lib
-                indicators['rsi'] = self._calculate_rsi(df['close'])
-                bb_upper, bb_middle, bb_lower = self._calculate_bollinger_bands(df['close'])
+                indicators['rsi'] = self._calculate_rsi(df)
+                bb_upper, bb_middle, bb_lower = self._calculate_bollinger_bands(df)
                 indicators['bb_upper'] = bb_upper
                 indicators['bb_lower'] = bb_lower
                 indicators['bb_middle'] = bb_middle
@@ -127,7 +132,7 @@ class MeanReversionStrategy(BaseStrategy):
                     indicators['bb_percent'] = 0.5
                     
                 indicators['bb_width'] = bb_range / bb_middle if bb_middle > 0 else 0
-                indicators['ema'] = df['close'].ewm(span=self.ema_period).mean().iloc[-1]
+                indicators['ema'] = ctx.ema(self.ema_period).iloc[-1]
                 indicators['atr'] = self._calculate_atr(df)
             
             # Дополнительные вычисления
@@ -292,29 +297,17 @@ class MeanReversionStrategy(BaseStrategy):
             return TradingSignal('WAIT', 0, 0, reason=f'Ошибка решения: {e}')
     
     # Вспомогательные методы для расчетов без TA-Lib
-    def _calculate_rsi(self, prices, period=14):
+    def _calculate_rsi(self, df, period=14):
         """RSI без TA-Lib"""
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
+        rsi = self.indicator_context(df).rsi(period)
         return float(rsi.iloc[-1]) if not rsi.empty else 50.0
     
-    def _calculate_bollinger_bands(self, prices, period=20, std_dev=2):
+    def _calculate_bollinger_bands(self, df, period=20, std_dev=2):
         """Bollinger Bands без TA-Lib"""
-        sma = prices.rolling(window=period).mean()
-        std = prices.rolling(window=period).std()
-        upper = sma + (std * std_dev)
-        lower = sma - (std * std_dev)
+        upper, sma, lower = self.indicator_context(df).bbands(period, std_dev)
         return float(upper.iloc[-1]), float(sma.iloc[-1]), float(lower.iloc[-1])
     
     def _calculate_atr(self, df, period=14):
         """ATR без TA-Lib"""
-        high_low = df['high'] - df['low']
-        high_close = np.abs(df['high'] - df['close'].shift())
-        low_close = np.abs(df['low'] - df['close'].shift())
-        
-        tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-        atr = tr.rolling(window=period).mean()
+        atr = self.indicator_context(df).atr(period)
         return float(atr.iloc[-1]) if not atr.empty else 0.01
\ No newline at end of file
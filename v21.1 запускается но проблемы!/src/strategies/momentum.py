@@ -4,6 +4,7 @@ Momentum стратегия - ИСПРАВЛЕННАЯ ВЕРСИЯ
 """
 import pandas as pd
 import numpy as np
+from datetime import datetime
 from typing import Dict, Optional
 import logging
 
@@ -39,6 +40,10 @@ class MomentumStrategy(BaseStrategy):
     ROC_BEARISH_THRESHOLD = -2.0
     VOLUME_RATIO_THRESHOLD = 1.5
     RSI_NEUTRAL = 50
+    RSI_BULLISH = 60
+    RSI_BEARISH = 40
+    RSI_OVERBOUGHT = 80
+    RSI_OVERSOLD = 20
     
     # Метаинформация для фабрики
     STRATEGY_TYPE = 'momentum'
@@ -61,33 +66,45 @@ class MomentumStrategy(BaseStrategy):
         self.ema_fast = self.config.get('ema_fast', 9)
         self.ema_slow = self.config.get('ema_slow', 21)
         self.roc_period = self.config.get('roc_period', 10)
+        self.atr_period = self.config.get('atr_period', 14)
         self.min_momentum_score = self.config.get('min_momentum_score', 0.6)
         
+        # Пороги RSI (перебираются в grid_backtest)
+        self.rsi_bullish = self.config.get('rsi_bullish', self.RSI_BULLISH)
+        self.rsi_bearish = self.config.get('rsi_bearish', self.RSI_BEARISH)
+        self.rsi_overbought = self.config.get('rsi_overbought', self.RSI_OVERBOUGHT)
+        self.rsi_oversold = self.config.get('rsi_oversold', self.RSI_OVERSOLD)
+        
         logger.debug(f"✅ MomentumStrategy инициализирована: {self.name}")
         
     async def analyze(self, df: pd.DataFrame, symbol: str) -> TradingSignal:
         """Анализ momentum с улучшенной обработкой ошибок"""
         
         if not self.validate_dataframe(df):
-            return TradingSignal('WAIT', 0, 0, reason='Недостаточно данных')
+            return self._wait_signal(df, symbol, 'Недостаточно данных')
         
         try:
             # Рассчитываем индикаторы
-            indicators = self._calculate_indicators(df)
+            indicators = await self._calculate_indicators(df)
             
             # Проверяем корректность данных
             if not indicators:
-                return TradingSignal('WAIT', 0, 0, reason='Ошибка расчета индикаторов')
+                return self._wait_signal(df, symbol, 'Ошибка расчета индикаторов')
             
             # Анализируем momentum
             momentum_score = self._analyze_momentum(indicators)
             
             # Принимаем решение
-            return self._make_decision(momentum_score, indicators, df)
+            return self._make_decision(momentum_score, indicators, df, symbol)
             
         except Exception as e:
             logger.error(f"❌ Ошибка анализа momentum для {symbol}: {e}")
-            return TradingSignal('WAIT', 0, 0, reason=f'Ошибка анализа: {e}')
+            return self._wait_signal(df, symbol, f'Ошибка анализа: {e}')
+    
+    def _wait_signal(self, df: pd.DataFrame, symbol: str, reason: str) -> TradingSignal:
+        """Сигнал WAIT по последней цене (нулевая цена не проходит валидацию сигнала)"""
+        price = float(df['close'].iloc[-1]) if len(df) > 0 else 0.0
+        return TradingSignal(symbol, 'WAIT', 0, price, reason=reason)
     
     async def _calculate_indicators(self, df: pd.DataFrame) -> Dict:
         """Улучшенный расчет индикаторов с защитой от ошибок"""
@@ -98,6 +115,7 @@ class MomentumStrategy(BaseStrategy):
                 'current_price': current_price,
                 'timestamp': datetime.utcnow()
             }
+            ctx = self.indicator_context(df)
             
             # === PRICE MOMENTUM ===
             # Краткосрочный momentum (5 периодов)
@@ -117,63 +135,58 @@ class MomentumStrategy(BaseStrategy):
             # === MOVING AVERAGES ===
             # Быстрая EMA
             if TA_AVAILABLE:
-                ema_fast = EMAIndicator(close=df['close'], window=self.ema_fast)
-                indicators['ema_fast'] = ema_fast.ema_indicator().iloc[-1]
+                ema_fast = ctx.get('ta_ema', (self.ema_fast,),
+                                   lambda: EMAIndicator(close=df['close'], window=self.ema_fast).ema_indicator())
+                indicators['ema_fast'] = ema_fast.iloc[-1]
             else:
                 # Ручная реализация EMA
-                indicators['ema_fast'] = df['close'].ewm(span=self.ema_fast).mean().iloc[-1]
+                indicators['ema_fast'] = ctx.ema(self.ema_fast).iloc[-1]
                 
             # Медленная EMA
             if TA_AVAILABLE:
-                ema_slow = EMAIndicator(close=df['close'], window=self.ema_slow)
-                indicators['ema_slow'] = ema_slow.ema_indicator().iloc[-1]
+                ema_slow = ctx.get('ta_ema', (self.ema_slow,),
+                                   lambda: EMAIndicator(close=df['close'], window=self.ema_slow).ema_indicator())
+                indicators['ema_slow'] = ema_slow.iloc[-1]
             else:
-                indicators['ema_slow'] = df['close'].ewm(span=self.ema_slow).mean().iloc[-1]
+                indicators['ema_slow'] = ctx.ema(self.ema_slow).iloc[-1]
                 
             # EMA Cross Signal
             indicators['ema_cross'] = 'bullish' if indicators['ema_fast'] > indicators['ema_slow'] else 'bearish'
             
             # === RSI ===
             if TA_AVAILABLE:
-                rsi = RSIIndicator(close=df['close'], window=self.rsi_period)
-                indicators['rsi'] = rsi.rsi().iloc[-1]
+                rsi = ctx.get('ta_rsi', (self.rsi_period,),
+                              lambda: RSIIndicator(close=df['close'], window=self.rsi_period).rsi())
+                indicators['rsi'] = rsi.iloc[-1]
             else:
-                # Упрощенная ручная RSI
-                delta = df['close'].diff()
-                gain = (delta.where(delta > 0, 0)).rolling(window=self.rsi_period).mean()
-                loss = (-delta.where(delta < 0, 0)).rolling(window=self.rsi_period).mean()
-                rs = gain / loss.replace(0, np.inf)
-                indicators['rsi'] = 100 - (100 / (1 + rs)).iloc[-1]
+                # Ручная RSI (без потерь за период RSI = 100)
+                indicators['rsi'] = ctx.rsi(self.rsi_period).iloc[-1]
                 
             # === ROC (Rate of Change) ===
             if TA_AVAILABLE:
                 roc = ROCIndicator(close=df['close'], window=self.roc_period)
                 indicators['roc'] = roc.roc().iloc[-1]
             else:
-                # Ручная ROC
-                if len(df) >= self.roc_period:
-                    roc_value = ((current_price - df['close'].iloc[-self.roc_period]) / 
-                               df['close'].iloc[-self.roc_period]) * 100
-                    indicators['roc'] = roc_value
+                # Ручная ROC (изменение за roc_period баров, как в ta)
+                if len(df) > self.roc_period:
+                    indicators['roc'] = ctx.roc(self.roc_period).iloc[-1]
                 else:
                     indicators['roc'] = 0
                     
             # === ATR для расчета уровней ===
             if TA_AVAILABLE:
-                atr = AverageTrueRange(high=df['high'], low=df['low'], close=df['close'], window=14)
-                indicators['atr'] = atr.average_true_range().iloc[-1]
+                atr = ctx.get('ta_atr', (self.atr_period,), lambda: AverageTrueRange(
+                    high=df['high'], low=df['low'], close=df['close'],
+                    window=self.atr_period).average_true_range())
+                indicators['atr'] = atr.iloc[-1]
             else:
                 # Упрощенный ATR
-                high_low = df['high'] - df['low']
-                high_close = abs(df['high'] - df['close'].shift())
-                low_close = abs(df['low'] - df['close'].shift())
-                true_range = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-                indicators['atr'] = true_range.rolling(window=14).mean().iloc[-1]
+                indicators['atr'] = ctx.atr(self.atr_period).iloc[-1]
                 
             # === VOLUME ANALYSIS ===
             if 'volume' in df.columns:
                 # Средний объем за последние 20 периодов
-                avg_volume = df['volume'].rolling(window=20).mean().iloc[-1]
+                avg_volume = ctx.sma(20, 'volume').iloc[-1]
                 current_volume = df['volume'].iloc[-1]
                 indicators['volume_ratio'] = current_volume / avg_volume if avg_volume > 0 else 1
                 
@@ -258,10 +271,10 @@ class MomentumStrategy(BaseStrategy):
                 
             # === 3. RSI MOMENTUM (15% веса) ===
             rsi = indicators['rsi']
-            if rsi > 60:
+            if rsi > self.rsi_bullish:
                 bullish_score += 0.15
                 momentum_score['components'].append(f'RSI бычий: {rsi:.1f}')
-            elif rsi < 40:
+            elif rsi < self.rsi_bearish:
                 bearish_score += 0.15
                 momentum_score['components'].append(f'RSI медвежий: {rsi:.1f}')
                 
@@ -306,14 +319,7 @@ class MomentumStrategy(BaseStrategy):
                 momentum_score['strength'] = max(bullish_score, bearish_score)
                 
             # Добавляем качественную оценку силы
-            if momentum_score['strength'] >= 0.8:
-                momentum_score['strength_label'] = 'ОЧЕНЬ_СИЛЬНЫЙ'
-            elif momentum_score['strength'] >= 0.6:
-                momentum_score['strength_label'] = 'СИЛЬНЫЙ'
-            elif momentum_score['strength'] >= 0.4:
-                momentum_score['strength_label'] = 'УМЕРЕННЫЙ'
-            else:
-                momentum_score['strength_label'] = 'СЛАБЫЙ'
+            momentum_score['strength_label'] = self._strength_label(momentum_score['strength'])
                 
         except Exception as e:
             logger.error(f"❌ Ошибка анализа momentum: {e}")
@@ -321,8 +327,16 @@ class MomentumStrategy(BaseStrategy):
             
         return momentum_score
         
-    
-
+    @staticmethod
+    def _strength_label(strength: float) -> str:
+        """Качественная оценка силы momentum"""
+        if strength >= 0.8:
+            return 'ОЧЕНЬ_СИЛЬНЫЙ'
+        elif strength >= 0.6:
+            return 'СИЛЬНЫЙ'
+        elif strength >= 0.4:
+            return 'УМЕРЕННЫЙ'
+        return 'СЛАБЫЙ'
     
     def _calculate_with_talib(self, df: pd.DataFrame) -> Dict:
         """Расчет индикаторов с помощью TA-Lib"""
@@ -419,10 +433,10 @@ class MomentumStrategy(BaseStrategy):
             
             # RSI momentum
             rsi = indicators['rsi']
-            if rsi > 60:
+            if rsi > self.rsi_bullish:
                 bullish_score += 0.2
                 momentum_score['components'].append('RSI сильный')
-            elif rsi < 40:
+            elif rsi < self.rsi_bearish:
                 bearish_score += 0.2
                 momentum_score['components'].append('RSI слабый')
             
@@ -454,19 +468,24 @@ class MomentumStrategy(BaseStrategy):
             else:
                 momentum_score['direction'] = 'NEUTRAL'
                 momentum_score['strength'] = max(bullish_score, bearish_score)
+            
+            # Нужна _make_decision для причины и метаданных сигнала
+            momentum_score['strength_label'] = self._strength_label(momentum_score['strength'])
                 
         except Exception as e:
             logger.error(f"❌ Ошибка анализа momentum: {e}")
             
         return momentum_score
     
-    def _make_decision(self, momentum_score: Dict, indicators: Dict, df: pd.DataFrame) -> TradingSignal:
+    def _make_decision(self, momentum_score: Dict, indicators: Dict, df: pd.DataFrame,
+                       symbol: str) -> TradingSignal:
         """Улучшенное принятие решения с дополнительными фильтрами"""
         
         try:
             # === ОСНОВНАЯ ПРОВЕРКА СИЛЫ MOMENTUM ===
             if momentum_score['strength'] < self.min_momentum_score:
                 return TradingSignal(
+                    symbol=symbol,
                     action='WAIT',
                     confidence=0,
                     price=indicators['current_price'],
@@ -481,6 +500,7 @@ class MomentumStrategy(BaseStrategy):
                 action = 'SELL'
             else:
                 return TradingSignal(
+                    symbol=symbol,
                     action='WAIT',
                     confidence=0,
                     price=indicators['current_price'],
@@ -494,16 +514,18 @@ class MomentumStrategy(BaseStrategy):
             
             # Фильтр RSI - избегаем экстремальных зон
             rsi = indicators['rsi']
-            if action == 'BUY' and rsi > 80:
+            if action == 'BUY' and rsi > self.rsi_overbought:
                 return TradingSignal(
+                    symbol=symbol,
                     action='WAIT',
                     confidence=0,
                     price=current_price,
                     reason=f"RSI перекуплен: {rsi:.1f}",
                     metadata={'rsi': rsi}
                 )
-            elif action == 'SELL' and rsi < 20:
+            elif action == 'SELL' and rsi < self.rsi_oversold:
                 return TradingSignal(
+                    symbol=symbol,
                     action='WAIT',
                     confidence=0,
                     price=current_price,
@@ -513,11 +535,14 @@ class MomentumStrategy(BaseStrategy):
             
             # === РАСЧЕТ УРОВНЕЙ ===
             # Динамический расчет стоп-лосса на основе ATR и силы momentum
-            atr_multiplier = 2.5 if momentum_score['strength'] > 0.7 else 2.0
+            # (множители из BaseStrategy, по умолчанию 2.0/2.5 и 3.0/4.0)
+            atr_multiplier = self.atr_multiplier_stop + 0.5 if momentum_score['strength'] > 0.7 \
+                else self.atr_multiplier_stop
             stop_loss = self.calculate_stop_loss(current_price, action, atr, atr_multiplier)
             
             # Динамический расчет тейк-профита
-            tp_multiplier = 4.0 if momentum_score['strength'] > 0.8 else 3.0  
+            tp_multiplier = self.atr_multiplier_take + 1.0 if momentum_score['strength'] > 0.8 \
+                else self.atr_multiplier_take
             take_profit = self.calculate_take_profit(current_price, action, atr, tp_multiplier)
             
             risk_reward = self.calculate_risk_reward(current_price, stop_loss, take_profit)
@@ -526,6 +551,7 @@ class MomentumStrategy(BaseStrategy):
             min_rr = 1.5 if momentum_score['strength'] > 0.7 else 2.0
             if risk_reward < min_rr:
                 return TradingSignal(
+                    symbol=symbol,
                     action='WAIT',
                     confidence=0,
                     price=current_price,
@@ -557,6 +583,7 @@ class MomentumStrategy(BaseStrategy):
             
             # === СОЗДАНИЕ ИТОГОВОГО СИГНАЛА ===
             return TradingSignal(
+                symbol=symbol,
                 action=action,
                 confidence=confidence,
                 price=current_price,
@@ -577,6 +604,7 @@ class MomentumStrategy(BaseStrategy):
         except Exception as e:
             logger.error(f"❌ Ошибка принятия решения: {e}")
             return TradingSignal(
+                symbol=symbol,
                 action='WAIT',
                 confidence=0,
                 price=indicators.get('current_price', 0),
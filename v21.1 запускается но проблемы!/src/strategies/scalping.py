@@ -141,38 +141,45 @@ class ScalpingStrategy(BaseStrategy):
             indicators = {}
             current_price = float(df['close'].iloc[-1])
             indicators['current_price'] = current_price
+            ctx = self.indicator_context(df)
             
             if TA_AVAILABLE:
                 # Быстрые EMA
-                ema_fast = EMAIndicator(df['close'], window=self.ema_fast)
-                ema_slow = EMAIndicator(df['close'], window=self.ema_slow)
-                indicators['ema_fast'] = float(ema_fast.ema_indicator().iloc[-1])
-                indicators['ema_slow'] = float(ema_slow.ema_indicator().iloc[-1])
+                ema_fast = ctx.get('ta_ema', (self.ema_fast,),
+                                   lambda: EMAIndicator(df['close'], window=self.ema_fast).ema_indicator())
+                ema_slow = ctx.get('ta_ema', (self.ema_slow,),
+                                   lambda: EMAIndicator(df['close'], window=self.ema_slow).ema_indicator())
+                indicators['ema_fast'] = float(ema_fast.iloc[-1])
+                indicators['ema_slow'] = float(ema_slow.iloc[-1])
                 
                 # Предыдущие значения для определения пересечений
-                indicators['ema_fast_prev'] = float(ema_fast.ema_indicator().iloc[-2])
-                indicators['ema_slow_prev'] = float(ema_slow.ema_indicator().iloc[-2])
+                indicators['ema_fast_prev'] = float(ema_fast.iloc[-2])
+                indicators['ema_slow_prev'] = float(ema_slow.iloc[-2])
                 
                 # RSI с коротким периодом
-                rsi = RSIIndicator(df['close'], window=7)  # Короткий RSI для скальпинга
-                indicators['rsi'] = float(rsi.rsi().iloc[-1])
+                rsi = ctx.get('ta_rsi', (7,), lambda: RSIIndicator(df['close'], window=7).rsi())  # Короткий RSI для скальпинга
+                indicators['rsi'] = float(rsi.iloc[-1])
                 
                 # Stochastic для точного тайминга
-                stoch = StochasticOscillator(df['high'], df['low'], df['close'], window=5, smooth_window=3)
+                stoch = ctx.get('ta_stoch', (5, 3), lambda: StochasticOscillator(
+                    df['high'], df['low'], df['close'], window=5, smooth_window=3))
                 indicators['stoch_k'] = float(stoch.stoch().iloc[-1])
                 indicators['stoch_d'] = float(stoch.stoch_signal().iloc[-1])
                 
                 # ATR для стоп-лоссов
-                atr = AverageTrueRange(df['high'], df['low'], df['close'], window=7)
-                indicators['atr'] = float(atr.average_true_range().iloc[-1])
+                atr = ctx.get('ta_atr', (7,), lambda: AverageTrueRange(
+                    df['high'], df['low'], df['close'], window=7).average_true_range())
+                indicators['atr'] = float(atr.iloc[-1])
                 
             else:
                 # Базовые вычисления без TA-Lib
-                indicators['ema_fast'] = df['close'].ewm(span=self.ema_fast).mean().iloc[-1]
-                indicators['ema_slow'] = df['close'].ewm(span=self.ema_slow).mean().iloc[-1]
-                indicators['ema_fast_prev'] = df['close'].ewm(span=self.ema_fast).mean().iloc[-2]
-                indicators['ema_slow_prev'] = df['close'].ewm(span=self.ema_slow).mean().iloc[-2]
-                indicators['rsi'] = self._calculate_rsi(df['close'], 7)
+                ema_fast = ctx.ema(self.ema_fast)
+                ema_slow = ctx.ema(self.ema_slow)
+                indicators['ema_fast'] = ema_fast.iloc[-1]
+                indicators['ema_slow'] = ema_slow.iloc[-1]
+                indicators['ema_fast_prev'] = ema_fast.iloc[-2]
+                indicators['ema_slow_prev'] = ema_slow.iloc[-2]
+                indicators['rsi'] = self._calculate_rsi(df, 7)
                 indicators['stoch_k'], indicators['stoch_d'] = self._calculate_stochastic(df)
                 indicators['atr'] = self._calculate_atr(df, 7)
             
@@ -393,33 +400,20 @@ class ScalpingStrategy(BaseStrategy):
             return TradingSignal('WAIT', 0, 0, reason=f'Ошибка решения: {e}')
     
     # Вспомогательные методы
-    def _calculate_rsi(self, prices, period=7):
+    def _calculate_rsi(self, df, period=7):
         """RSI без TA-Lib с коротким периодом"""
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
+        rsi = self.indicator_context(df).rsi(period)
         return float(rsi.iloc[-1]) if not rsi.empty else 50.0
     
     def _calculate_stochastic(self, df, k_period=5, d_period=3):
         """Stochastic без TA-Lib"""
-        low_min = df['low'].rolling(window=k_period).min()
-        high_max = df['high'].rolling(window=k_period).max()
-        
-        k_percent = 100 * ((df['close'] - low_min) / (high_max - low_min))
-        d_percent = k_percent.rolling(window=d_period).mean()
+        k_percent, d_percent = self.indicator_context(df).stoch(k_period, d_period)
         
         return float(k_percent.iloc[-1]) if not k_percent.empty else 50.0, float(d_percent.iloc[-1]) if not d_percent.empty else 50.0
     
     def _calculate_atr(self, df, period=7):
         """ATR без TA-Lib с коротким периодом"""
-        high_low = df['high'] - df['low']
-        high_close = np.abs(df['high'] - df['close'].shift())
-        low_close = np.abs(df['low'] - df['close'].shift())
-        
-        tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-        atr = tr.rolling(window=period).mean()
+        atr = self.indicator_context(df).atr(period)
         return float(atr.iloc[-1]) if not atr.empty else 0.001
     
     def validate_dataframe(self, df: pd.DataFrame) -> bool:
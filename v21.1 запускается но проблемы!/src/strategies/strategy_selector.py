@@ -9,14 +9,17 @@ STRATEGY SELECTOR - Интеллектуальный выбор торговых
 ✅ Адаптивное переключение между стратегиями
 ✅ Ensemble подход - комбинирование нескольких стратегий
 ✅ Учет корреляции и диверсификации стратегий
+✅ Параллельная оценка стратегий с лимитом времени на каждую
 """
 
 import asyncio
+import threading
 import numpy as np
 import pandas as pd
 from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
 from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 import logging
 
@@ -26,12 +29,15 @@ from .momentum import MomentumStrategy
 from .mean_reversion import MeanReversionStrategy
 from .scalping import ScalpingStrategy
 from ..core.database import SessionLocal
+from ..indicators.memo import get_indicator_memo
 try:
-    from ..core.models import StrategyPerformance, MarketCondition
+    from ..core.models import StrategyPerformance, MarketCondition, Trade, TradeStatus
 except ImportError:
     # Если моделей нет, используем заглушки
     StrategyPerformance = None
     MarketCondition = None
+    Trade = None
+    TradeStatus = None
 from ..core.unified_config import unified_config as config
 
 logger = logging.getLogger(__name__)
@@ -48,6 +54,7 @@ class StrategyScore:
     sharpe_ratio: float           # Коэффициент Шарпа
     recent_performance: float     # Производительность за последние дни
     market_condition_fit: float   # Соответствие рыночным условиям
+    degraded: bool = False        # Оценка без технического анализа (таймаут)
 
 @dataclass
 class MarketCondition:
@@ -82,6 +89,23 @@ class StrategySelector:
         self.min_confidence = config.MIN_STRATEGY_CONFIDENCE
         self.ensemble_min_strategies = config.ENSEMBLE_MIN_STRATEGIES
         self.performance_window_days = config.STRATEGY_PERFORMANCE_WINDOW_DAYS
+        self.evaluation_timeout = config.STRATEGY_EVALUATION_TIMEOUT
+        
+        # Свой ограниченный пул для analyze(): зависшая стратегия не занимает
+        # потоки общего executor'а цикла (asyncio.to_thread, run_in_executor)
+        self.evaluation_executor = ThreadPoolExecutor(
+            max_workers=config.STRATEGY_EVALUATION_WORKERS,
+            thread_name_prefix='strategy_eval'
+        )
+        # Экземпляры стратегий не потокобезопасны - один analyze на экземпляр
+        self._analysis_locks: Dict[int, threading.Lock] = {
+            id(strategy): threading.Lock() for strategy in self.strategies.values()
+        }
+        
+        # Историческая производительность: (strategy, symbol) -> метрики
+        self.historical_cache: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self.historical_cache_time: Dict[str, datetime] = {}
+        self.historical_cache_ttl = timedelta(seconds=config.CACHE_TTL_SECONDS)
         
         logger.info(f"✅ StrategySelector инициализирован с {len(self.strategies)} стратегиями")
     
@@ -172,9 +196,11 @@ class StrategySelector:
     async def _analyze_market_conditions(self, df: pd.DataFrame) -> MarketCondition:
         """Анализ текущих рыночных условий"""
         try:
+            ctx = get_indicator_memo().context(df)
+            
             # Определяем тренд
-            sma_20 = df['close'].rolling(20).mean()
-            sma_50 = df['close'].rolling(50).mean()
+            sma_20 = ctx.sma(20)
+            sma_50 = ctx.sma(50)
             current_price = df['close'].iloc[-1]
             
             if current_price > sma_20.iloc[-1] > sma_50.iloc[-1]:
@@ -185,7 +211,7 @@ class StrategySelector:
                 trend = 'SIDEWAYS'
             
             # Определяем волатильность
-            volatility_20 = df['close'].rolling(20).std()
+            volatility_20 = ctx.rolling_std(20)
             current_vol = volatility_20.iloc[-1]
             avg_vol = volatility_20.mean()
             
@@ -198,7 +224,7 @@ class StrategySelector:
             
             # Анализ объемов (если доступны)
             if 'volume' in df.columns:
-                vol_sma = df['volume'].rolling(20).mean()
+                vol_sma = ctx.sma(20, 'volume')
                 recent_vol = df['volume'].tail(5).mean()
                 
                 if recent_vol > vol_sma.iloc[-1] * 1.2:
@@ -240,18 +266,56 @@ class StrategySelector:
     
     async def _evaluate_strategies(self, df: pd.DataFrame, symbol: str,
                                  market_condition: MarketCondition) -> List[StrategyScore]:
-        """Оценка всех стратегий для текущих условий"""
-        strategy_scores = []
+        """
+        Оценка всех стратегий для текущих условий
+        
+        Стратегии оцениваются параллельно, каждая не дольше evaluation_timeout.
+        Историческая производительность загружается заранее одним запросом.
+        
+        Таймаут отменяет только ожидание: поток пула, в котором идет
+        analyze(), прервать нельзя, и он доработает в фоне (результат
+        отбрасывается). Пока он не завершится, стратегия держит свою
+        блокировку и занимает один из STRATEGY_EVALUATION_WORKERS потоков;
+        такая стратегия в пул повторно не отправляется и получает
+        деградированный скор.
+        """
+        await self.prefetch_historical_performance([symbol])
         
+        strategy_scores = []
+        names = []
         for name, strategy in self.strategies.items():
-            try:
-                score = await self._calculate_strategy_score(
-                    strategy, df, symbol, market_condition
+            if self._analysis_lock(strategy).locked():
+                logger.warning(f"⚠️ Стратегия {name} еще занята прошлой оценкой - оценка без технического анализа")
+                strategy_scores.append(self._degraded_strategy_score(strategy, symbol, market_condition))
+            else:
+                names.append(name)
+        
+        results = await asyncio.gather(
+            *[
+                asyncio.wait_for(
+                    self._calculate_strategy_score(self.strategies[name], df, symbol, market_condition),
+                    timeout=self.evaluation_timeout
                 )
-                strategy_scores.append(score)
+                for name in names
+            ],
+            return_exceptions=True
+        )
+        
+        for name, result in zip(names, results):
+            if isinstance(result, StrategyScore):
+                strategy_scores.append(result)
                 
-            except Exception as e:
-                logger.error(f"❌ Ошибка оценки стратегии {name}: {e}")
+            elif isinstance(result, asyncio.TimeoutError):
+                logger.warning(
+                    f"⚠️ Стратегия {name} не уложилась в {self.evaluation_timeout}с - "
+                    f"оценка без технического анализа"
+                )
+                strategy_scores.append(
+                    self._degraded_strategy_score(self.strategies[name], symbol, market_condition)
+                )
+                
+            else:
+                logger.error(f"❌ Ошибка оценки стратегии {name}: {result}")
                 # Добавляем с низким скором
                 strategy_scores.append(StrategyScore(
                     name=name,
@@ -267,6 +331,34 @@ class StrategySelector:
         
         return sorted(strategy_scores, key=lambda x: x.score, reverse=True)
     
+    def _degraded_strategy_score(self, strategy: BaseStrategy, symbol: str,
+                                 market_condition: MarketCondition) -> StrategyScore:
+        """Скор стратегии без технического анализа (вклад technical_score = 0)"""
+        historical_perf = self.historical_cache.get(
+            (strategy.name, symbol), self._default_historical_performance()
+        )
+        market_fit = self._calculate_market_fit(strategy, market_condition)
+        recent_perf = self._calculate_recent_performance(strategy.name)
+        
+        final_score = (
+            historical_perf['avg_return'] * 0.3 +
+            market_fit * 0.25 +
+            recent_perf * 0.25
+        ) * 100
+        
+        return StrategyScore(
+            name=strategy.name,
+            score=max(0, min(100, final_score)),
+            confidence=max(0.0, min(1.0, final_score / 100)),
+            win_rate=historical_perf['win_rate'],
+            avg_return=historical_perf['avg_return'],
+            max_drawdown=historical_perf['max_drawdown'],
+            sharpe_ratio=historical_perf['sharpe_ratio'],
+            recent_performance=recent_perf,
+            market_condition_fit=market_fit,
+            degraded=True
+        )
+    
     async def _calculate_strategy_score(self, strategy: BaseStrategy, 
                                       df: pd.DataFrame, symbol: str,
                                       market_condition: MarketCondition) -> StrategyScore:
@@ -321,54 +413,88 @@ class StrategySelector:
     async def _get_historical_performance(self, strategy_name: str, 
                                         symbol: str) -> Dict[str, float]:
         """Получение исторической производительности стратегии"""
+        await self.prefetch_historical_performance([symbol])
+        return self.historical_cache.get(
+            (strategy_name, symbol), self._default_historical_performance()
+        )
+    
+    async def prefetch_historical_performance(self, symbols: List[str], force: bool = False):
+        """
+        Загрузка исторической производительности всех стратегий по символам
+        
+        Один запрос на все пары (стратегия, символ); результат кэшируется
+        на historical_cache_ttl. Запрос выполняется в отдельном потоке.
+        """
+        now = datetime.utcnow()
+        stale = [
+            symbol for symbol in dict.fromkeys(symbols)
+            if force or symbol not in self.historical_cache_time
+            or now - self.historical_cache_time[symbol] > self.historical_cache_ttl
+        ]
+        if not stale:
+            return
+        
+        strategy_names = list(dict.fromkeys(strategy.name for strategy in self.strategies.values()))
         try:
-            db = SessionLocal()
-            
-            # Запрос производительности за последние дни
-            cutoff_date = datetime.utcnow() - timedelta(days=self.performance_window_days)
-            
-            performance = db.query(StrategyPerformance).filter(
-                StrategyPerformance.strategy_name == strategy_name,
-                StrategyPerformance.symbol == symbol,
-                StrategyPerformance.created_at >= cutoff_date
-            ).all()
-            
-            if not performance:
-                return {
-                    'avg_return': 0.0,
-                    'win_rate': 0.5,
-                    'max_drawdown': 0.05,
-                    'sharpe_ratio': 0.5
-                }
-            
-            if not StrategyPerformance:
-                return {
-                    'avg_return': 0.0,
-                    'win_rate': 0.5,
-                    'max_drawdown': 0.05,
-                    'sharpe_ratio': 0.5
-                }
-            # Рассчитываем метрики
-            returns = [p.total_return for p in performance]
-            wins = sum(1 for r in returns if r > 0)
-            
-            return {
-                'avg_return': np.mean(returns),
-                'win_rate': wins / len(returns) if returns else 0.5,
-                'max_drawdown': abs(min(returns)) if returns else 0.05,
-                'sharpe_ratio': np.mean(returns) / (np.std(returns) + 0.01) if returns else 0.5
-            }
-            
+            performance = await asyncio.to_thread(
+                self._load_historical_performance, strategy_names, stale
+            )
         except Exception as e:
             logger.error(f"❌ Ошибка получения исторической производительности: {e}")
-            return {
-                'avg_return': 0.0,
-                'win_rate': 0.5,
-                'max_drawdown': 0.05,
-                'sharpe_ratio': 0.5
-            }
+            performance = {}
+        
+        for symbol in stale:
+            for strategy_name in strategy_names:
+                self.historical_cache[(strategy_name, symbol)] = performance.get(
+                    (strategy_name, symbol), self._default_historical_performance()
+                )
+            self.historical_cache_time[symbol] = now
+    
+    def _load_historical_performance(self, strategy_names: List[str],
+                                     symbols: List[str]) -> Dict[Tuple[str, str], Dict[str, float]]:
+        """Доходности закрытых сделок за окно performance_window_days одним запросом"""
+        if Trade is None:
+            return {}
+        
+        cutoff_date = datetime.utcnow() - timedelta(days=self.performance_window_days)
+        
+        db = SessionLocal()
+        try:
+            rows = db.query(
+                Trade.strategy, Trade.symbol, Trade.profit_loss_percent
+            ).filter(
+                Trade.strategy.in_(strategy_names),
+                Trade.symbol.in_(symbols),
+                Trade.status == TradeStatus.CLOSED,
+                Trade.profit_loss_percent.isnot(None),
+                Trade.created_at >= cutoff_date
+            ).all()
         finally:
             db.close()
+        
+        returns = defaultdict(list)
+        for strategy_name, symbol, profit_loss_percent in rows:
+            returns[(strategy_name, symbol)].append(profit_loss_percent / 100)
+        
+        # Рассчитываем метрики
+        return {
+            key: {
+                'avg_return': float(np.mean(values)),
+                'win_rate': sum(1 for r in values if r > 0) / len(values),
+                'max_drawdown': abs(min(values)),
+                'sharpe_ratio': float(np.mean(values) / (np.std(values) + 0.01))
+            }
+            for key, values in returns.items()
+        }
+    
+    @staticmethod
+    def _default_historical_performance() -> Dict[str, float]:
+        return {
+            'avg_return': 0.0,
+            'win_rate': 0.5,
+            'max_drawdown': 0.05,
+            'sharpe_ratio': 0.5
+        }
     
     def _calculate_market_fit(self, strategy: BaseStrategy, 
                             market_condition: MarketCondition) -> float:
@@ -430,8 +556,13 @@ class StrategySelector:
                                            df: pd.DataFrame) -> float:
         """Оценка технических условий для стратегии"""
         try:
-            # Тестируем стратегию на текущих данных
-            signal = await strategy.analyze(df, 'TEST')
+            # Тестируем стратегию на текущих данных. analyze считает индикаторы
+            # без точек ожидания, поэтому выполняется в потоке пула со своим
+            # циклом - иначе таймаут оценки не смог бы прервать ожидание
+            loop = asyncio.get_running_loop()
+            signal = await loop.run_in_executor(
+                self.evaluation_executor, self._run_strategy_analysis, strategy, df
+            )
             
             # Конвертируем уверенность в скор
             if signal.action == 'WAIT':
@@ -443,6 +574,25 @@ class StrategySelector:
             logger.error(f"❌ Ошибка оценки технических условий: {e}")
             return 0.5
     
+    def _analysis_lock(self, strategy: BaseStrategy) -> threading.Lock:
+        """Блокировка analyze() экземпляра стратегии"""
+        return self._analysis_locks.setdefault(id(strategy), threading.Lock())
+    
+    def _run_strategy_analysis(self, strategy: BaseStrategy, df: pd.DataFrame) -> TradingSignal:
+        """
+        analyze() стратегии в потоке пула (под блокировкой экземпляра)
+        
+        Второй параллельный analyze одного экземпляра не запускается:
+        если блокировка занята (прошлая оценка ушла в таймаут), - ошибка.
+        """
+        lock = self._analysis_lock(strategy)
+        if not lock.acquire(blocking=False):
+            raise RuntimeError(f"{strategy.name}: предыдущий analyze еще выполняется")
+        try:
+            return asyncio.run(strategy.analyze(df, 'TEST'))
+        finally:
+            lock.release()
+    
     def _select_optimal_strategy(self, strategy_scores: List[StrategyScore]) -> StrategyScore:
         """Выбор оптимальной стратегии из оценок"""
         try:
@@ -5,7 +5,6 @@
 """
 
 import pandas as pd
-import numpy as np
 from typing import Dict, Optional, List
 import logging
 
@@ -94,8 +93,9 @@ class SwingStrategy(BaseStrategy):
         """Анализ основного тренда"""
         try:
             # Используем EMA для определения тренда
-            ema_short = df['close'].ewm(span=self.ema_short).mean()
-            ema_long = df['close'].ewm(span=self.ema_long).mean()
+            ctx = self.indicator_context(df)
+            ema_short = ctx.ema(self.ema_short)
+            ema_long = ctx.ema(self.ema_long)
             
             current_price = df['close'].iloc[-1]
             ema_short_current = ema_short.iloc[-1]
@@ -152,51 +152,54 @@ class SwingStrategy(BaseStrategy):
             indicators = {}
             current_price = float(df['close'].iloc[-1])
             indicators['current_price'] = current_price
+            ctx = self.indicator_context(df)
             
             if TA_AVAILABLE:
                 # RSI
-                rsi = RSIIndicator(df['close'], window=14)
-                indicators['rsi'] = float(rsi.rsi().iloc[-1])
+                rsi = ctx.get('ta_rsi', (14,), lambda: RSIIndicator(df['close'], window=14).rsi())
+                indicators['rsi'] = float(rsi.iloc[-1])
                 
                 # MACD для подтверждения тренда
-                macd = MACD(df['close'])
+                macd = ctx.get('ta_macd', (26, 12, 9), lambda: MACD(df['close']))
                 indicators['macd'] = float(macd.macd().iloc[-1])
                 indicators['macd_signal'] = float(macd.macd_signal().iloc[-1])
                 indicators['macd_diff'] = float(macd.macd_diff().iloc[-1])
                 
                 # ADX для силы тренда
-                adx = ADXIndicator(df['high'], df['low'], df['close'])
+                adx = ctx.get('ta_adx', (14,), lambda: ADXIndicator(df['high'], df['low'], df['close']))
                 indicators['adx'] = float(adx.adx().iloc[-1])
                 indicators['adx_pos'] = float(adx.adx_pos().iloc[-1])
                 indicators['adx_neg'] = float(adx.adx_neg().iloc[-1])
                 
                 # Bollinger Bands для определения перерастяжения
-                bb = BollingerBands(df['close'], window=20, window_dev=2)
+                bb = ctx.get('ta_bbands', (20, 2), lambda: BollingerBands(df['close'], window=20, window_dev=2))
                 indicators['bb_upper'] = float(bb.bollinger_hband().iloc[-1])
                 indicators['bb_lower'] = float(bb.bollinger_lband().iloc[-1])
                 indicators['bb_middle'] = float(bb.bollinger_mavg().iloc[-1])
                 indicators['bb_percent'] = float(bb.bollinger_pband().iloc[-1])
                 
                 # ATR для волатильности
-                atr = AverageTrueRange(df['high'], df['low'], df['close'])
-                indicators['atr'] = float(atr.average_true_range().iloc[-1])
+                atr = ctx.get('ta_atr', (14,), lambda: AverageTrueRange(
+                    df['high'], df['low'], df['close']).average_true_range())
+                indicators['atr'] = float(atr.iloc[-1])
                 
                 # OBV для объемного анализа
                 if 'volume' in df.columns:
-                    obv = OnBalanceVolumeIndicator(df['close'], df['volume'])
-                    indicators['obv'] = float(obv.on_balance_volume().iloc[-1])
-                    indicators['obv_trend'] = self._calculate_obv_trend(obv.on_balance_volume())
+                    obv = ctx.get('ta_obv', (), lambda: OnBalanceVolumeIndicator(
+                        df['close'], df['volume']).on_balance_volume())
+                    indicators['obv'] = float(obv.iloc[-1])
+                    indicators['obv_trend'] = self._calculate_obv_trend(obv)
                 
             else:
                 # Базовые вычисления без TA-Lib
-                indicators['rsi'] = self._calculate_rsi(df['close'])
-                macd, signal, hist = self._calculate_macd(df['close'])
+                indicators['rsi'] = self._calculate_rsi(df)
+                macd, signal, hist = self._calculate_macd(df)
                 indicators['macd'] = macd
                 indicators['macd_signal'] = signal
                 indicators['macd_diff'] = hist
                 indicators['adx'] = 30.0  # Предполагаем средний ADX
                 
-                bb_upper, bb_middle, bb_lower = self._calculate_bollinger_bands(df['close'])
+                bb_upper, bb_middle, bb_lower = self._calculate_bollinger_bands(df)
                 indicators['bb_upper'] = bb_upper
                 indicators['bb_middle'] = bb_middle
                 indicators['bb_lower'] = bb_lower
@@ -215,7 +218,7 @@ class SwingStrategy(BaseStrategy):
             
             # Анализ объема
             if 'volume' in df.columns:
-                volume_ma = df['volume'].rolling(20).mean()
+                volume_ma = ctx.sma(20, 'volume')
                 current_volume = df['volume'].iloc[-1]
                 indicators['volume_ratio'] = current_volume / volume_ma.iloc[-1] if volume_ma.iloc[-1] > 0 else 1.0
             else:
@@ -498,41 +501,25 @@ class SwingStrategy(BaseStrategy):
         else:
             return 'NEUTRAL'
     
-    def _calculate_rsi(self, prices, period=14):
+    def _calculate_rsi(self, df, period=14):
         """RSI без TA-Lib"""
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
+        rsi = self.indicator_context(df).rsi(period)
         return float(rsi.iloc[-1]) if not rsi.empty else 50.0
     
-    def _calculate_macd(self, prices, fast=12, slow=26, signal=9):
+    def _calculate_macd(self, df, fast=12, slow=26, signal=9):
         """MACD без TA-Lib"""
-        ema_fast = prices.ewm(span=fast).mean()
-        ema_slow = prices.ewm(span=slow).mean()
-        macd_line = ema_fast - ema_slow
-        signal_line = macd_line.ewm(span=signal).mean()
-        histogram = macd_line - signal_line
+        macd_line, signal_line, histogram = self.indicator_context(df).macd(fast, slow, signal)
         
         return float(macd_line.iloc[-1]), float(signal_line.iloc[-1]), float(histogram.iloc[-1])
     
-    def _calculate_bollinger_bands(self, prices, period=20, std_dev=2):
+    def _calculate_bollinger_bands(self, df, period=20, std_dev=2):
         """Bollinger Bands без TA-Lib"""
-        sma = prices.rolling(window=period).mean()
-        std = prices.rolling(window=period).std()
-        upper = sma + (std * std_dev)
-        lower = sma - (std * std_dev)
+        upper, sma, lower = self.indicator_context(df).bbands(period, std_dev)
         return float(upper.iloc[-1]), float(sma.iloc[-1]), float(lower.iloc[-1])
     
     def _calculate_atr(self, df, period=14):
         """ATR без TA-Lib"""
-        high_low = df['high'] - df['low']
-        high_close = np.abs(df['high'] - df['close'].shift())
-        low_close = np.abs(df['low'] - df['close'].shift())
-        
-        tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-        atr = tr.rolling(window=period).mean()
+        atr = self.indicator_context(df).atr(period)
         return float(atr.iloc[-1]) if not atr.empty else 0.02
     
     def validate_dataframe(self, df: pd.DataFrame) -> bool:
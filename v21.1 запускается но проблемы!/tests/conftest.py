@@ -0,0 +1,14 @@
+"""
+Общая настройка тестов
+Файл: tests/conftest.py
+
+Корень проекта добавляется в sys.path, чтобы пакет src импортировался
+и при запуске через `pytest`, а не только `python -m pytest`.
+"""
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
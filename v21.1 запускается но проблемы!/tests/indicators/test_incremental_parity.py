@@ -0,0 +1,207 @@
+"""
+Паритет потоковых индикаторов с batch-реализациями
+Файл: tests/indicators/test_incremental_parity.py
+
+Каждый Incremental* индикатор прогоняется бар за баром по случайной
+серии и сравнивается с batch-функциями из unified_indicators:
+- ручной режим (talib_compat=False) - с ручными реализациями
+  (USE_TALIB временно выключается, поэтому тесты идут и при TA-Lib);
+- режим TA-Lib (talib_compat=True) - с TA-Lib, если он установлен;
+- режим по умолчанию - с batch-функциями текущей конфигурации.
+"""
+import importlib
+
+import numpy as np
+import pytest
+
+from src.indicators import (
+    SMA, EMA, RSI, MACD, BBANDS, ROC, ATR, STOCH, WILLR, ADX, OBV, MFI, USE_TALIB,
+    IncrementalSMA, IncrementalEMA, IncrementalRSI, IncrementalMACD,
+    IncrementalBBANDS, IncrementalROC, IncrementalATR, IncrementalSTOCH,
+    IncrementalWILLR, IncrementalADX, IncrementalOBV, IncrementalMFI,
+    IncrementalIndicatorSet
+)
+
+SEEDS = [0, 1, 42]
+BARS = 400
+
+requires_talib = pytest.mark.skipif(not USE_TALIB, reason="TA-Lib не установлен")
+
+
+@pytest.fixture
+def manual_batch(monkeypatch):
+    """Batch-функции считают ручными реализациями даже при установленном TA-Lib"""
+    module = importlib.import_module('src.indicators.unified_indicators')
+    monkeypatch.setattr(module, 'USE_TALIB', False)
+
+
+def make_candles(seed: int, bars: int = BARS) -> dict:
+    """Случайное блуждание OHLCV с плоскими участками (равные close)"""
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(0, 1, bars)
+    steps[rng.random(bars) < 0.05] = 0.0
+    close = 100 + np.cumsum(steps)
+    spread = rng.uniform(0.1, 2.0, bars)
+    high = np.maximum(close, close + spread * rng.random(bars))
+    low = np.minimum(close, close - spread * rng.random(bars))
+    volume = rng.uniform(10, 1000, bars)
+    return {
+        'timestamp': np.arange(bars, dtype=np.int64) * 300_000,
+        'open': close - steps / 2,
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': volume
+    }
+
+
+def assert_parity(actual, expected):
+    np.testing.assert_allclose(
+        np.asarray(actual, dtype=np.float64),
+        np.asarray(expected, dtype=np.float64),
+        rtol=1e-9, atol=1e-8, equal_nan=True
+    )
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('period', [5, 20])
+def test_sma_ema_roc(manual_batch, seed, period):
+    c = make_candles(seed)
+    assert_parity(IncrementalSMA(period).run(c['close']), SMA(c['close'], period))
+    assert_parity(IncrementalEMA(period, talib_compat=False).run(c['close']), EMA(c['close'], period))
+    assert_parity(IncrementalROC(period).run(c['close']), ROC(c['close'], period))
+
+
+def check_all(c: dict, **mode):
+    """Все индикаторы с параметрами по умолчанию против batch-функций"""
+    high, low, close, volume = c['high'], c['low'], c['close'], c['volume']
+    assert_parity(IncrementalEMA(20, **mode).run(close), EMA(close, 20))
+    assert_parity(IncrementalRSI(14, **mode).run(close), RSI(close, 14))
+    assert_parity(IncrementalATR(14, **mode).run(high, low, close), ATR(high, low, close, 14))
+    assert_parity(IncrementalADX(14, **mode).run(high, low, close), ADX(high, low, close, 14))
+    assert_parity(IncrementalWILLR(**mode).run(high, low, close), WILLR(high, low, close))
+    assert_parity(IncrementalMFI(**mode).run(high, low, close, volume), MFI(high, low, close, volume))
+    for actual, expected in zip(IncrementalMACD(**mode).run(close), MACD(close)):
+        assert_parity(actual, expected)
+    for actual, expected in zip(IncrementalBBANDS(**mode).run(close), BBANDS(close)):
+        assert_parity(actual, expected)
+    for actual, expected in zip(IncrementalSTOCH(**mode).run(high, low, close), STOCH(high, low, close)):
+        assert_parity(actual, expected)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_default_mode_matches_batch(seed):
+    """По умолчанию режим следует USE_TALIB - те же значения, что у batch-функций"""
+    assert IncrementalRSI().talib_compat is USE_TALIB
+    check_all(make_candles(seed))
+
+
+# =================================================================
+# РУЧНЫЕ РЕАЛИЗАЦИИ
+# =================================================================
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('period', [7, 14])
+def test_rsi_atr_adx(manual_batch, seed, period):
+    c = make_candles(seed)
+    assert_parity(IncrementalRSI(period, talib_compat=False).run(c['close']), RSI(c['close'], period))
+    assert_parity(IncrementalATR(period, talib_compat=False).run(c['high'], c['low'], c['close']),
+                  ATR(c['high'], c['low'], c['close'], period))
+    assert_parity(IncrementalADX(period, talib_compat=False).run(c['high'], c['low'], c['close']),
+                  ADX(c['high'], c['low'], c['close'], period))
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_multi_output(manual_batch, seed):
+    c = make_candles(seed)
+    for actual, expected in zip(IncrementalMACD(talib_compat=False).run(c['close']), MACD(c['close'])):
+        assert_parity(actual, expected)
+    for actual, expected in zip(IncrementalBBANDS(talib_compat=False).run(c['close']), BBANDS(c['close'])):
+        assert_parity(actual, expected)
+    for actual, expected in zip(IncrementalSTOCH(talib_compat=False).run(c['high'], c['low'], c['close']),
+                                STOCH(c['high'], c['low'], c['close'])):
+        assert_parity(actual, expected)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_willr_obv_mfi(manual_batch, seed):
+    c = make_candles(seed)
+    assert_parity(IncrementalWILLR(talib_compat=False).run(c['high'], c['low'], c['close']),
+                  WILLR(c['high'], c['low'], c['close']))
+    assert_parity(IncrementalOBV().run(c['close'], c['volume']), OBV(c['close'], c['volume']))
+    assert_parity(IncrementalMFI(talib_compat=False).run(c['high'], c['low'], c['close'], c['volume']),
+                  MFI(c['high'], c['low'], c['close'], c['volume']))
+
+
+# =================================================================
+# TA-LIB
+# =================================================================
+
+@requires_talib
+@pytest.mark.parametrize('seed', SEEDS)
+def test_talib_parity(seed):
+    """Режим talib_compat совпадает с TA-Lib, включая прогрев (NaN до lookback)"""
+    check_all(make_candles(seed), talib_compat=True)
+
+
+@requires_talib
+@pytest.mark.parametrize('period', [5, 20])
+def test_talib_parity_periods(period):
+    c = make_candles(7)
+    high, low, close = c['high'], c['low'], c['close']
+    assert_parity(IncrementalRSI(period, talib_compat=True).run(close), RSI(close, period))
+    assert_parity(IncrementalATR(period, talib_compat=True).run(high, low, close), ATR(high, low, close, period))
+    assert_parity(IncrementalADX(period, talib_compat=True).run(high, low, close), ADX(high, low, close, period))
+    for actual, expected in zip(IncrementalMACD(5, period + 5, 4, talib_compat=True).run(close),
+                                MACD(close, 5, period + 5, 4)):
+        assert_parity(actual, expected)
+
+
+@requires_talib
+def test_talib_parity_flat_prices():
+    """Нулевой диапазон и нулевые изменения: TA-Lib отдает 0, а не NaN"""
+    c = make_candles(3, bars=120)
+    for name in ('open', 'high', 'low', 'close'):
+        c[name][40:80] = 100.0
+    check_all(c, talib_compat=True)
+
+
+# =================================================================
+# ЧИСЛЕННАЯ УСТОЙЧИВОСТЬ
+# =================================================================
+
+def test_bbands_std_does_not_drift():
+    """Дисперсия окна на длинном ряде BTC-масштаба совпадает с точной на каждом баре"""
+    rng = np.random.default_rng(7)
+    close = 60_000 + np.cumsum(rng.normal(0, 0.5, 100_000))
+    upper, middle, lower = IncrementalBBANDS(20, 1, 1, talib_compat=False).run(close)
+
+    windows = np.lib.stride_tricks.sliding_window_view(close, 20)
+    exact = windows.std(axis=1, ddof=1)
+    np.testing.assert_allclose(upper[19:] - middle[19:], exact, rtol=1e-7)
+    np.testing.assert_allclose(middle[19:], windows.mean(axis=1), rtol=1e-12)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_indicator_set_warmup_then_stream(seed):
+    """Прогрев по истории + потоковые бары дают то же, что полный batch"""
+    c = make_candles(seed)
+    split = BARS - 50
+    indicators = IncrementalIndicatorSet({
+        'ema_20': ('ema', {'timeperiod': 20}),
+        'sma_10': ('sma', {'timeperiod': 10}),
+    })
+    indicators.warmup({name: values[:split] for name, values in c.items()})
+
+    ema, sma = [], []
+    for i in range(split, BARS):
+        values = indicators.update_candle({name: values[i] for name, values in c.items()})
+        ema.append(values['ema_20'])
+        sma.append(values['sma_10'])
+
+    # Повтор закрытого бара не меняет состояние
+    repeated = indicators.update_candle({name: values[-1] for name, values in c.items()})
+    assert repeated['ema_20'] == ema[-1]
+
+    assert_parity(ema, EMA(c['close'], 20)[split:])
+    assert_parity(sma, SMA(c['close'], 10)[split:])
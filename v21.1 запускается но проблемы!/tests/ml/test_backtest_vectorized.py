@@ -0,0 +1,141 @@
+"""
+Регрессия векторного бэктеста против цикла run_backtest
+Файл: tests/ml/test_backtest_vectorized.py
+
+run_backtest_vectorized (backtest_engine) обязан давать тот же
+BacktestResult, что и исходный цикл по барам: те же сделки с теми же
+ценами, комиссиями и причинами выхода, ту же кривую капитала и метрики.
+"""
+import itertools
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Бэктестер тянет сторонние ML-зависимости из requirements.txt. Пропускаем
+# только при их отсутствии - ошибка импорта самого модуля должна падать
+for dependency in ('sklearn', 'scipy', 'matplotlib', 'seaborn', 'xgboost', 'sqlalchemy'):
+    pytest.importorskip(dependency)
+
+from src.ml.training import backtester  # noqa: E402
+
+Backtester = backtester.Backtester
+BacktestConfig = backtester.BacktestConfig
+
+CONFIG_MATRIX = list(itertools.product(
+    [True, False],   # use_stop_loss
+    [True, False],   # use_take_profit
+    [True, False],   # trailing_stop
+    [True, False],   # enable_shorting
+    [1, 3],          # max_open_positions
+))
+
+
+def make_data(bars: int, seed: int, nan_confidence: float = 0.0):
+    """Случайное блуждание цены и случайные сигналы модели"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+    index = pd.date_range('2023-01-01', periods=bars, freq='h')
+    market_data = pd.DataFrame({
+        'open': close,
+        'high': close * (1 + rng.uniform(0, 0.01, bars)),
+        'low': close * (1 - rng.uniform(0, 0.01, bars)),
+        'close': close,
+        'volume': 1.0
+    }, index=index)
+    predictions = pd.DataFrame({
+        'signal': rng.choice(['buy', 'sell', 'hold', 'hold', 'hold'], bars),
+        'confidence': rng.uniform(0, 1, bars),
+        'take_profit_percent': rng.uniform(0.5, 4, bars),
+        'stop_loss_percent': rng.uniform(0.3, 3, bars),
+        'strategy': rng.choice(['momentum', 'breakout', 'swing'], bars)
+    }, index=index)
+    if nan_confidence:
+        rows = predictions.sample(frac=nan_confidence, random_state=seed).index
+        predictions.loc[rows, 'confidence'] = np.nan
+    return market_data, pd.DataFrame(index=index), predictions
+
+
+def assert_same_result(expected, actual):
+    for name in expected.__dataclass_fields__:
+        left, right = getattr(expected, name), getattr(actual, name)
+        if name == 'trades':
+            assert [vars(t) for t in left] == [vars(t) for t in right]
+        elif isinstance(left, pd.Series):
+            pd.testing.assert_series_equal(left, right)
+        elif isinstance(left, float) and math.isnan(left):
+            assert isinstance(right, float) and math.isnan(right), name
+        else:
+            assert left == right, name
+
+
+@pytest.mark.parametrize('seed,options', list(enumerate(CONFIG_MATRIX)))
+def test_vectorized_matches_loop(seed, options):
+    use_stop_loss, use_take_profit, trailing_stop, enable_shorting, max_open_positions = options
+    config = BacktestConfig(
+        use_stop_loss=use_stop_loss,
+        use_take_profit=use_take_profit,
+        trailing_stop=trailing_stop,
+        trailing_stop_distance=0.005,
+        enable_shorting=enable_shorting,
+        max_open_positions=max_open_positions,
+        use_leverage=seed % 2 == 1,
+        leverage=2.0
+    )
+    market_data, features, predictions = make_data(1000, seed, nan_confidence=0.05 if seed % 3 == 0 else 0.0)
+
+    expected = Backtester(config).run_backtest(market_data, features, predictions)
+    actual = Backtester(config).run_backtest_vectorized(market_data, features, predictions)
+
+    assert_same_result(expected, actual)
+
+
+def test_vectorized_short_predictions_and_missing_columns():
+    """Предсказаний меньше, чем баров, и нет колонки strategy"""
+    market_data, features, predictions = make_data(1000, 7)
+    predictions = predictions.iloc[:800].drop(columns=['strategy'])
+
+    expected = Backtester().run_backtest(market_data, features, predictions)
+    actual = Backtester().run_backtest_vectorized(market_data, features, predictions)
+
+    assert_same_result(expected, actual)
+
+
+def test_vectorized_date_window():
+    market_data, features, predictions = make_data(2000, 11)
+    start, end = market_data.index[200], market_data.index[1700]
+
+    expected = Backtester().run_backtest(market_data, features, predictions, start, end)
+    actual = Backtester().run_backtest_vectorized(market_data, features, predictions, start, end)
+
+    assert_same_result(expected, actual)
+    assert actual.total_trades > 0
+
+
+def test_vectorized_zero_stop_loss_percent():
+    market_data, features, predictions = make_data(800, 5)
+    predictions.loc[predictions.index[::7], 'stop_loss_percent'] = 0.0
+
+    expected = Backtester().run_backtest(market_data, features, predictions)
+    actual = Backtester().run_backtest_vectorized(market_data, features, predictions)
+
+    assert_same_result(expected, actual)
+
+
+def test_walk_forward_independent_of_workers():
+    """Окна, посчитанные в пуле процессов, совпадают с последовательным прогоном"""
+    market_data, features, _ = make_data(1200, 3)
+    runs = []
+    for n_workers in (1, 2):
+        np.random.seed(123)
+        runs.append(Backtester().run_walk_forward_analysis(
+            market_data, features, {}, window_size=300, step_size=150, n_workers=n_workers
+        ))
+
+    sequential, parallel = (
+        [{k: v for k, v in period.items() if k != 'elapsed_seconds'} for period in run['period_results']]
+        for run in runs
+    )
+    assert len(sequential) > 1
+    assert sequential == parallel
@@ -0,0 +1,90 @@
+"""
+Векторные сигналы grid_backtest против MomentumStrategy
+Файл: tests/ml/test_momentum_signals.py
+
+momentum_signals повторяет оценку и решение MomentumStrategy по всему ряду
+сразу. На каждом баре фикстуры сигнал, уверенность и ATR-уровни должны
+совпадать с analyze() по истории до этого бара - и с библиотекой ta
+(зафиксирована в requirements.txt), и на ручных формулах без нее.
+"""
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+for dependency in ('sklearn', 'scipy', 'matplotlib', 'seaborn', 'xgboost', 'sqlalchemy'):
+    pytest.importorskip(dependency)
+
+from src.ml.training import backtest_engine, grid_backtest  # noqa: E402
+from src.strategies import momentum  # noqa: E402
+
+ACTIONS = {
+    backtest_engine.SIGNAL_BUY: 'BUY',
+    backtest_engine.SIGNAL_SELL: 'SELL',
+    backtest_engine.SIGNAL_HOLD: 'WAIT',
+}
+
+PARAM_SETS = [
+    {},
+    {'rsi_period': 7, 'ema_fast': 5, 'ema_slow': 30, 'roc_period': 5, 'atr_period': 10},
+    {'min_momentum_score': 0.5, 'rsi_bullish': 55, 'rsi_bearish': 45,
+     'rsi_overbought': 70, 'rsi_oversold': 30, 'atr_multiplier_take': 5.0},
+]
+
+
+def make_frame(bars: int = 320, seed: int = 6) -> pd.DataFrame:
+    """Тренды вверх и вниз со всплесками объема"""
+    rng = np.random.default_rng(seed)
+    drift = np.repeat(rng.choice([-0.006, 0.0, 0.006], bars // 40 + 1), 40)[:bars]
+    close = 100 * np.exp(np.cumsum(drift + rng.normal(0, 0.008, bars)))
+    spread = rng.uniform(0.002, 0.012, bars)
+    return pd.DataFrame({
+        'open': close * (1 + rng.normal(0, 0.002, bars)),
+        'high': close * (1 + spread),
+        'low': close * (1 - spread),
+        'close': close,
+        'volume': rng.lognormal(0, 0.6, bars) * 1000,
+    }, index=pd.date_range('2024-01-01', periods=bars, freq='h'))
+
+
+@pytest.fixture(params=['ta', 'fallback'])
+def ta_mode(request, monkeypatch):
+    """Обе конфигурации индикаторов: ta из requirements.txt и ручные формулы"""
+    if request.param == 'ta':
+        pytest.importorskip('ta')
+    available = request.param == 'ta'
+    monkeypatch.setattr(momentum, 'TA_AVAILABLE', available)
+    monkeypatch.setattr(grid_backtest, 'TA_AVAILABLE', available)
+    return request.param
+
+
+def strategy_decisions(df: pd.DataFrame, params):
+    strategy = momentum.MomentumStrategy(config={**params, 'use_ml': False})
+
+    async def run():
+        return [await strategy.analyze(df.iloc[:end], 'BTCUSDT') for end in range(1, len(df) + 1)]
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize('params', PARAM_SETS)
+def test_momentum_signals_match_strategy(ta_mode, params):
+    df = make_frame()
+    vectorized = grid_backtest.momentum_signals(grid_backtest.IndicatorCache(df), params)
+    decisions = strategy_decisions(df, params)
+
+    actions = [ACTIONS[int(signal)] for signal in vectorized['signals']]
+    assert actions == [decision.action_str for decision in decisions]
+    assert {'BUY', 'SELL'} <= set(actions), 'фикстура должна давать сделки в обе стороны'
+
+    close = df['close'].to_numpy()
+    for bar, decision in enumerate(decisions):
+        if decision.action_str == 'WAIT':
+            continue
+        side = 1 if decision.action_str == 'BUY' else -1
+        assert vectorized['confidence'][bar] == pytest.approx(decision.confidence, abs=1e-9)
+        assert close[bar] * (1 - side * vectorized['sl_percent'][bar] / 100) == \
+            pytest.approx(decision.stop_loss, rel=1e-9)
+        assert close[bar] * (1 + side * vectorized['tp_percent'][bar] / 100) == \
+            pytest.approx(decision.take_profit, rel=1e-9)